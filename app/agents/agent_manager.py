@@ -11,6 +11,31 @@ from crewai import Agent
 from crewai.tools import BaseTool  # Corrigido: importa BaseTool do CrewAI
 
 
+# Limites por agente aceitos no agents.yaml e repassados ao Agent do crewAI:
+# iterações de raciocínio, requisições por minuto e segundos por tarefa
+AGENT_LIMIT_KEYS = ("max_iter", "max_rpm", "max_execution_time")
+
+
+def agent_limits(agent_config: Dict) -> Dict[str, int]:
+    """Limites válidos (inteiros positivos) de uma configuração de agente; 0 ou vazio = sem limite"""
+    limits = {}
+    for key in AGENT_LIMIT_KEYS:
+        value = agent_config.get(key)
+        if value in (None, "", 0):
+            continue
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            print(f"⚠️ Limite '{key}' inválido ({value!r}) ignorado")
+            continue
+        if value < 0:
+            print(f"⚠️ Limite '{key}' negativo ({value}) ignorado")
+            continue
+        if value:
+            limits[key] = value
+    return limits
+
+
 class GenericArgsSchema(BaseModel):
     argumento: str = Field(..., description="Argumento genérico para a ferramenta.")
 
@@ -186,7 +211,7 @@ class AgentManager:
                 tool_names = agent_tools_config.get("tools", [])
                 tools = self._create_tool_objects(tool_names)
 
-            # Criar agente
+            # Criar agente (limites do agents.yaml podem ser sobrescritos por kwargs)
             agent = Agent(
                 role=agent_config.get("role", ""),
                 goal=agent_config.get("goal", ""),
@@ -194,7 +219,7 @@ class AgentManager:
                 tools=tools,
                 verbose=agent_config.get("verbose", True),
                 allow_delegation=agent_config.get("allow_delegation", False),
-                **kwargs
+                **{**agent_limits(agent_config), **kwargs}
             )
 
             self.agents[agent_type] = agent
@@ -0,0 +1,100 @@
+"""
+LLM do crewAI com cache de respostas por correspondência exata (ver app/utils/llm_cache.py)
+
+O CrewManager troca o LLM dos agentes das instâncias de execução por um CachedLLM
+quando o cache vale para a crew e o agente (app/config/llm_cache.yaml). Em um
+acerto, a resposta gravada é devolvida sem chamar o modelo, e nenhum token é
+contabilizado no consumo da execução.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import LLM
+
+from app.utils.llm_cache import LLMCache, cache_key
+
+# Parâmetros de geração que entram na chave do cache (além do modelo e das mensagens)
+CACHE_KEY_PARAMS = (
+    "temperature",
+    "top_p",
+    "n",
+    "stop",
+    "max_tokens",
+    "max_completion_tokens",
+    "presence_penalty",
+    "frequency_penalty",
+    "logit_bias",
+    "response_format",
+    "seed",
+    "reasoning_effort",
+)
+
+
+class CachedLLM(LLM):
+    """LLM que consulta o cache antes de chamar o modelo
+
+    Criado por with_cache a partir de um LLM já configurado, do qual mantém todos os
+    atributos; cópias do agente (ex: instâncias do pool) preservam o cache. Chamadas
+    com ferramentas (function calling) ou em streaming não passam pelo cache.
+    """
+
+    response_cache: LLMCache
+
+    def cache_params(self) -> Dict[str, Any]:
+        params = {name: getattr(self, name, None) for name in CACHE_KEY_PARAMS}
+        params.update(getattr(self, "additional_params", None) or {})
+        return params
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        if tools or getattr(self, "stream", False):
+            return super().call(messages, tools, callbacks, available_functions)
+
+        key = cache_key(self.model, self.cache_params(), messages)
+        response = self.response_cache.get(key)
+        if response is not None:
+            return response
+        response = super().call(messages, tools, callbacks, available_functions)
+        if isinstance(response, str) and response.strip():
+            self.response_cache.put(key, self.model, response)
+        return response
+
+
+def with_cache(llm, cache: LLMCache):
+    """Versão de `llm` que usa o cache (LLMs que não são do crewAI ficam sem cache)"""
+    if isinstance(llm, CachedLLM) and llm.response_cache is cache:
+        return llm
+    if not isinstance(llm, LLM):
+        return llm
+    cached = CachedLLM.__new__(CachedLLM)
+    cached.__dict__.update(llm.__dict__)
+    cached.response_cache = cache
+    return cached
+
+
+def without_cache(llm):
+    """Versão de `llm` que sempre chama o modelo"""
+    if not isinstance(llm, CachedLLM):
+        return llm
+    plain = LLM.__new__(LLM)
+    plain.__dict__.update({name: value for name, value in llm.__dict__.items() if name != "response_cache"})
+    return plain
+
+
+def with_model(llm, model: str):
+    """Cópia de `llm` com outro modelo (demais parâmetros e o cache, se houver, são mantidos)"""
+    if isinstance(llm, str) or llm is None:
+        return LLM(model=model)
+    changed = copy.copy(llm)
+    changed.model = model
+    if isinstance(changed, LLM):
+        # Atributos derivados do modelo no __init__ do crewAI
+        changed.is_anthropic = changed._is_anthropic_model(model)
+        changed.context_window_size = 0
+    return changed
@@ -0,0 +1,66 @@
+"""
+Prazos e cancelamento cooperativo das execuções de crews
+
+O kickoff do crewAI não pode ser interrompido de fora da thread que o executa. Por
+isso a execução consulta um CancellationToken a cada passo dos agentes e ao fim de
+cada tarefa: quando o prazo vence ou o cancelamento é pedido, a verificação seguinte
+lança ExecutionCancelled e o kickoff termina. Os limites por agente do agents.yaml
+(max_iter, max_rpm, max_execution_time) cobrem o intervalo entre duas verificações,
+como uma chamada ao modelo que demora a responder.
+
+ExecutionCancelled deriva de BaseException, e não de Exception: o crewAI trata as
+exceções de um agente com `except Exception` e repete a tarefa até max_retry_limit
+vezes, o que faria uma execução interrompida voltar a chamar o modelo. Quem precisa
+tratar a interrupção deve capturá-la pelo nome.
+
+Em tarefas paralelas (async_execution), a verificação roda na thread da tarefa; a
+interrupção chega ao kickoff pelo Future da tarefa (ver app/crews/parallel_tasks.py).
+"""
+
+import threading
+import time
+from typing import Optional
+
+TIMEOUT_STATUS = "timeout"
+CANCELLED_STATUS = "cancelled"
+
+
+class ExecutionCancelled(BaseException):
+    """Execução interrompida por prazo vencido ("timeout") ou pedido de cancelamento ("cancelled")"""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class CancellationToken:
+    """Prazo (em segundos, None = sem prazo) e pedido de cancelamento de uma execução"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout or None
+        self.deadline = time.monotonic() + self.timeout if self.timeout else None
+        self._event = threading.Event()
+        self._reason = "Cancelada durante a execução"
+
+    def cancel(self, reason: Optional[str] = None):
+        """Pede a interrupção; a execução para na próxima verificação"""
+        if reason:
+            self._reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Segundos até o prazo (None se não houver prazo)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Lança ExecutionCancelled se o cancelamento foi pedido ou o prazo venceu"""
+        if self._event.is_set():
+            raise ExecutionCancelled(CANCELLED_STATUS, self._reason)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise ExecutionCancelled(TIMEOUT_STATUS, f"Prazo de {self.timeout:g}s excedido")
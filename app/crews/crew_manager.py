@@ -2,35 +2,102 @@
 Gerenciador de crews para o sistema
 """
 
-from typing import Dict, List, Optional
-from datetime import datetime
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
 
 from crewai import Crew, Task
+from crewai.tasks.task_output import TaskOutput
 
 from app.agents.agent_manager import AgentManager
+from app.crews.cached_llm import with_cache, with_model, without_cache
+from app.crews.cancellation import TIMEOUT_STATUS, CancellationToken, ExecutionCancelled
+from app.crews.crew_pool import CrewPool, clone_crew
+from app.crews.execution_engine import new_batch_id
+from app.crews.parallel_tasks import guard_parallel_tasks, wait_parallel_tasks
+from app.crews.task_graph import TaskGraph, TaskGraphError
+from app.crews.task_metrics import TaskMetricsRecorder
 from app.crews.task_manager import TaskManager
-from app.utils.database import DatabaseManager
+from app.utils.async_storage import AsyncStorage
 from app.utils.config_sync_manager import ConfigSyncManager
+from app.utils.costs import REJECTED_STATUS, BudgetExceeded, CostPolicy, UsageMeter
+from app.utils.llm_cache import LLMCache, LLMCachePolicy
+from app.utils.storage import StorageBackend, create_storage
 from app.utils.log_manager import log_manager
+from app.utils.rollups import ACTIVE_STATUSES
 
 
 class CrewManager:
-    """Classe para gerenciar crews do sistema"""
+    """Classe para gerenciar crews do sistema
 
-    def __init__(self, agent_manager: AgentManager, task_manager: Optional[TaskManager] = None):
+    As crews salvas no banco são registradas como descritores (configuração) e só
+    são construídas (agentes, ferramentas e Crew) no primeiro get_crew(). Com
+    `warm_up`, as crews mais executadas são construídas em segundo plano.
+
+    A crew construída é um template: cada execução usa uma instância própria,
+    emprestada de um CrewPool (ver checkout_crew).
+    """
+
+    def __init__(
+        self,
+        agent_manager: AgentManager,
+        task_manager: Optional[TaskManager] = None,
+        storage: Optional[StorageBackend] = None,
+        warm_up: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        agents_lock: Optional[threading.RLock] = None,
+    ):
         self.agent_manager = agent_manager
         self.task_manager = task_manager or TaskManager()
-        self.crews: Dict[str, Crew] = {}
-        self.crew_configs: Dict[str, Dict] = {}
-        self.db_manager = DatabaseManager()
+        self.crews: Dict[str, Crew] = {}  # crews já construídas
+        self.crew_configs: Dict[str, Dict] = {}  # descritores de todas as crews conhecidas
+        self._config_fingerprints: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # Serializa o uso do AgentManager (não thread-safe); compartilhado com quem altera os agentes
+        self._agents_lock = agents_lock or threading.RLock()
+        self._warm_up_executor: Optional[ThreadPoolExecutor] = None
+        self._pools: Dict[str, CrewPool] = {}
+        self.task_graphs: Dict[str, TaskGraph] = {}  # DAG das tarefas das crews criadas com create_crew_with_tasks
+        self.pool_size = int(os.getenv("CREW_POOL_SIZE", "2")) if pool_size is None else pool_size
+        # Prazo padrão das execuções em segundos (0 = sem prazo) e tokens das execuções em andamento
+        self.execution_timeout = float(os.getenv("EXECUTION_TIMEOUT", "0"))
+        self._cancellation: Dict[int, CancellationToken] = {}
+        # Preços dos modelos e orçamentos por crew (app/config/budgets.yaml); DEFAULT_MODEL vale
+        # para agentes sem modelo explícito
+        self.cost_policy = CostPolicy.load()
+        self.default_model = os.getenv("DEFAULT_MODEL", "gpt-4")
+        # Cache opcional de respostas do LLM por crew/agente (app/config/llm_cache.yaml)
+        self.llm_cache_policy = LLMCachePolicy.load()
+        self.llm_cache: Optional[LLMCache] = None
+        if self.llm_cache_policy.in_use():
+            try:
+                self.llm_cache = LLMCache.from_policy(self.llm_cache_policy)
+            except Exception as e:
+                print(f"⚠️ Cache do LLM indisponível: {e}")
+        # Motor de armazenamento injetado ou definido por STORAGE_BACKEND. No SQLite, resultados
+        # são persistidos em lote por um thread escritor, fora do caminho da execução
+        self.db_manager = storage or create_storage(write_behind=True)
+        self.async_db = AsyncStorage(self.db_manager)
         self.sync_manager = ConfigSyncManager(self.db_manager)
 
         # 🔄 SINCRONIZAÇÃO AUTOMÁTICA ANTES DE CARREGAR CREWS
         self._perform_auto_sync()
 
-        # 🔄 CARREGAR CREWS SALVAS AUTOMATICAMENTE
+        # 🔄 REGISTRAR CREWS SALVAS (CONSTRUÍDAS SOB DEMANDA)
         self._load_saved_crews()
 
+        # 🔥 PRÉ-AQUECIMENTO OPCIONAL DAS CREWS MAIS USADAS (CREW_WARM_UP)
+        if warm_up is None:
+            warm_up = int(os.getenv("CREW_WARM_UP", "0"))
+        if warm_up > 0:
+            self.warm_up(warm_up)
+
     def _perform_auto_sync(self):
         """Executa sincronização automática na inicialização se necessário"""
         try:
@@ -43,81 +110,192 @@ class CrewManager:
         except Exception as e:
             print(f"⚠️ Erro na sincronização automática (continuando sem sincronização): {e}")
 
-    def _load_saved_crews(self):
-        """Carrega crews salvas do banco de dados na inicialização"""
+    def _load_saved_crews(self) -> int:
+        """Registra as crews salvas no banco de dados, sem construí-las"""
         try:
             saved_configs = self.db_manager.get_all_crew_configs()
+            with self._lock:
+                for config in saved_configs:
+                    self._register_saved_crew(config)
 
-            loaded_count = 0
-            for config in saved_configs:
-                crew_name = config["crew_name"]
-                agent_types = config["agent_types"]
-                description = config["description"]
-
-                # Recriar a crew na memória
-                success = self._recreate_crew_from_config(crew_name, agent_types, description)
-                if success:
-                    loaded_count += 1
-
-            print(f"📦 Total de crews carregadas: {loaded_count}/{len(saved_configs)}")
+            print(f"📦 Crews registradas: {len(saved_configs)} (construídas sob demanda)")
+            return len(saved_configs)
 
         except Exception as e:
             print(f"❌ Erro ao carregar crews salvas: {e}")
+            return 0
 
-    def _recreate_crew_from_config(self, name: str, agent_types: List[str], description: str) -> bool:
-        """Recria uma crew a partir da configuração salva no banco"""
-        try:
-            # Verificar se a crew já existe na memória
-            if name in self.crews:
-                return True
+    @staticmethod
+    def _fingerprint(description: str, agent_types: List[str], task_types: List[str]) -> str:
+        return json.dumps([description, agent_types, task_types], ensure_ascii=False)
 
-            # Criar agentes se não existirem
-            agents = []
-            for agent_type in agent_types:
+    def _register_saved_crew(self, config: Dict) -> bool:
+        """Registra (ou atualiza) o descritor de uma crew salva; retorna True se a configuração mudou
+
+        Uma crew já construída só é descartada, para reconstrução sob demanda, se a
+        configuração salva for diferente da que a originou.
+        """
+        crew_name = config["crew_name"]
+        fingerprint = self._fingerprint(config["description"], config["agent_types"], config.get("task_types", []))
+        with self._lock:
+            if self._config_fingerprints.get(crew_name) == fingerprint:
+                return False
+            self.crews.pop(crew_name, None)
+            self._pools.pop(crew_name, None)
+            self.task_graphs.pop(crew_name, None)
+            self._config_fingerprints[crew_name] = fingerprint
+            self.crew_configs[crew_name] = {
+                "description": config["description"],
+                "agent_types": config["agent_types"],
+                "created_at": "Carregado do banco de dados",
+                "loaded_from_db": True,
+            }
+            return True
+
+    def _hydrate_crew(self, name: str) -> Optional[Crew]:
+        """Constrói a crew a partir do descritor (uma única vez, mesmo com chamadas concorrentes)"""
+        with self._lock:
+            crew = self.crews.get(name)
+            if crew is not None or name not in self.crew_configs:
+                return crew
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                crew = self.crews.get(name)
+                config = self.crew_configs.get(name)
+            if crew is not None or config is None:
+                return crew
+
+            crew = self._build_crew(name, config["agent_types"])
+            with self._lock:
+                # A configuração pode ter sido recarregada durante a construção
+                if crew is not None and self.crew_configs.get(name) is config:
+                    self.crews[name] = crew
+            return crew
+
+    def _build_agents(self, agent_types: List[str]) -> List:
+        """Obtém (ou cria) os agentes de cada tipo informado"""
+        agents = []
+        for agent_type in agent_types:
+            # O AgentManager não é thread-safe: a criação de agentes é serializada
+            with self._agents_lock:
                 agent = self.agent_manager.get_agent(agent_type)
                 if not agent:
                     agent = self.agent_manager.create_agent(agent_type)
-                if agent:
-                    agents.append(agent)
+            if agent:
+                agents.append(agent)
+        return agents
 
+    def _build_crew(self, name: str, agent_types: List[str]) -> Optional[Crew]:
+        """Recria uma crew a partir da configuração salva no banco"""
+        try:
+            agents = self._build_agents(agent_types)
             if not agents:
                 print(f"❌ Nenhum agente válido criado para crew '{name}'")
-                return False
+                return None
 
-            # Criar crew
-            crew = Crew(
+            return Crew(
                 agents=agents,
                 tasks=[],  # Tarefas serão adicionadas posteriormente se necessário
                 verbose=True,
                 memory=True,
             )
 
-            # Adicionar à memória
-            self.crews[name] = crew
-            self.crew_configs[name] = {
-                "description": description,
-                "agent_types": agent_types,
-                "created_at": "Carregado do banco de dados",
-                "loaded_from_db": True,
-            }
-
-            return True
-
         except Exception as e:
             print(f"❌ Erro ao recriar crew '{name}': {e}")
-            return False
+            return None
+
+    def most_used_crews(self, limit: int = 3) -> List[str]:
+        """Crews registradas com mais execuções, da mais à menos executada"""
+        try:
+            per_crew = self.db_manager.get_statistics_v2("all")["per_crew"]
+        except Exception as e:
+            print(f"⚠️ Não foi possível obter as contagens de execução: {e}")
+            return []
+        totals = {name: per_crew.get(name, {}).get("total", 0) for name in self.list_crew_names()}
+        ranked = sorted((name for name, total in totals.items() if total > 0), key=totals.get, reverse=True)
+        return ranked[:limit]
+
+    def warm_up(self, limit: int = 3, max_workers: int = 2) -> List[Future]:
+        """Constrói em segundo plano as `limit` crews mais executadas que ainda não foram construídas"""
+        pending = [name for name in self.most_used_crews(limit) if name not in self.crews]
+        if not pending:
+            return []
+
+        with self._lock:
+            if self._warm_up_executor is None:
+                self._warm_up_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-warm-up")
+            executor = self._warm_up_executor
+
+        print(f"🔥 Pré-aquecendo {len(pending)} crew(s) em segundo plano: {', '.join(pending)}")
+        return [executor.submit(self._warm_crew, name) for name in pending]
+
+    def _warm_crew(self, name: str) -> Optional[Crew]:
+        """Constrói o template e deixa uma instância de execução pronta no pool"""
+        crew = self._hydrate_crew(name)
+        pool = self._pool(name)
+        if pool is not None:
+            try:
+                pool.prefill(1)
+            except Exception as e:
+                print(f"⚠️ Não foi possível preparar instância da crew '{name}': {e}")
+        return crew
+
+    def _pool(self, name: str) -> Optional[CrewPool]:
+        """Pool de instâncias do template atual da crew (recriado se o template mudou)"""
+        template = self.get_crew(name)
+        if template is None:
+            return None
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None or pool.template is not template:
+                pool = CrewPool(name, template, self.pool_size, clone=lambda crew: self._clone_instance(name, crew))
+                self._pools[name] = pool
+            return pool
+
+    def _clone_instance(self, name: str, template: Crew) -> Crew:
+        """Nova instância de execução da crew, com o cache do LLM configurado para ela
+
+        As tarefas paralelas da instância passam a entregar suas exceções ao kickoff
+        (ver app/crews/parallel_tasks.py).
+        """
+        instance = clone_crew(template)
+        guard_parallel_tasks(instance.tasks)
+        if self.llm_cache is not None:
+            self._apply_llm_cache(name, instance.agents)
+        return instance
+
+    def _apply_llm_cache(self, crew_name: Optional[str], agents: List):
+        """Liga ou desliga o cache de respostas no LLM de cada agente, conforme llm_cache.yaml"""
+        available_agents = getattr(self.agent_manager, "available_agents", None) or {}
+        for agent in agents:
+            role = str(getattr(agent, "role", "") or "")
+            agent_keys = [agent_type for agent_type, config in available_agents.items() if config.get("role") == role]
+            if self.llm_cache_policy.enabled_for(crew_name, agent_keys + [role]):
+                agent.llm = with_cache(agent.llm, self.llm_cache)
+            else:
+                agent.llm = without_cache(agent.llm)
+
+    @contextmanager
+    def checkout_crew(self, name: str) -> Iterator[Optional[Crew]]:
+        """Empresta uma instância de execução da crew (None se a crew não existir)
+
+        Alterações feitas na instância (ex: tarefas dinâmicas) não afetam o template
+        nem outras execuções; ao final do bloco, a instância volta ao pool.
+        """
+        pool = self._pool(name)
+        if pool is None:
+            yield None
+            return
+        with pool.instance() as crew:
+            yield crew
 
     def create_crew(self, name: str, agent_types: List[str], description: str = "") -> Optional[Crew]:
         """Cria uma nova crew com os agentes especificados"""
         try:
             # Criar agentes se não existirem
-            agents = []
-            for agent_type in agent_types:
-                agent = self.agent_manager.get_agent(agent_type)
-                if not agent:
-                    agent = self.agent_manager.create_agent(agent_type)
-                if agent:
-                    agents.append(agent)
+            agents = self._build_agents(agent_types)
 
             if not agents:
                 print("Nenhum agente válido foi criado")
@@ -136,12 +314,14 @@ class CrewManager:
                 print(f"❌ Criação de crew abortada: Um ou mais agentes estão sem ferramentas configuradas.")
                 return None
 
-            self.crews[name] = crew
-            self.crew_configs[name] = {
-                "description": description,
-                "agent_types": agent_types,
-                "created_at": datetime.now().isoformat(),
-            }
+            with self._lock:
+                self.crews[name] = crew
+                self.crew_configs[name] = {
+                    "description": description,
+                    "agent_types": agent_types,
+                    "created_at": datetime.now().isoformat(),
+                }
+                self._config_fingerprints[name] = self._fingerprint(description, agent_types, [])
 
             # Salvar configuração no banco de dados
             self.db_manager.save_crew_config(name, description, agent_types, [])
@@ -171,7 +351,8 @@ class CrewManager:
                 print(f"❌ Agente não especificado para tarefa {task_type}")
                 return False
 
-            agent = self.agent_manager.get_agent(agent_type)
+            with self._agents_lock:
+                agent = self.agent_manager.get_agent(agent_type)
             if not agent:
                 print(f"❌ Agente {agent_type} não encontrado")
                 return False
@@ -182,8 +363,10 @@ class CrewManager:
                 print(f"❌ Falha ao criar tarefa {task_type}")
                 return False
 
-            # Adicionar tarefa à crew
+            # Adicionar tarefa à crew (as instâncias de execução são recriadas a partir do template)
             crew.tasks.append(task)
+            with self._lock:
+                self._pools.pop(crew_name, None)
             print(f"✅ Tarefa '{task_type}' adicionada à crew '{crew_name}' com sucesso!")
             return True
 
@@ -203,17 +386,65 @@ class CrewManager:
         description: str = "",
         **task_params,
     ) -> Optional[Crew]:
-        """Cria uma crew com agentes e tarefas pré-definidas"""
+        """Cria uma crew com agentes e tarefas pré-definidas
+
+        As tarefas seguem o DAG de dependências do tasks.yaml (`depends_on`): tarefas
+        independentes rodam em paralelo (assíncronas) e recebem como contexto apenas
+        as saídas das tarefas de que dependem.
+        """
+        try:
+            graph = TaskGraph.from_configs(task_types, self.task_manager.get_task_configs())
+        except TaskGraphError as e:
+            print(f"❌ Crew '{name}' não criada: {e}")
+            return None
+
         crew = self.create_crew(name, agent_types, description)
         if not crew:
             return None
 
-        # Adicionar tarefas
-        for task_type in task_types:
-            self.add_task_to_crew(name, task_type, **task_params)
-
+        # Adicionar tarefas na ordem do plano, ligando cada uma às suas dependências
+        created = {}
+        for task_type, async_execution in graph.plan():
+            if not self.add_task_to_crew(name, task_type, **task_params):
+                continue
+            task = crew.tasks[-1]
+            context = [created[dependency] for dependency in graph.dependencies[task_type] if dependency in created]
+            if context:
+                task.context = context
+            task.async_execution = async_execution
+            created[task_type] = task
+
+        if len(created) < len(task_types):
+            # Plano incompleto: execução sequencial, que não depende da posição das tarefas
+            print(f"⚠️ Nem todas as tarefas da crew '{name}' foram criadas; execução será sequencial")
+            for task in created.values():
+                task.async_execution = False
+            graph = TaskGraph(list(created), graph.dependencies)
+        else:
+            levels = " | ".join(", ".join(level) for level in graph.levels)
+            print(f"🧭 Plano de tarefas da crew '{name}': {levels}")
+
+        with self._lock:
+            self.task_graphs[name] = graph
+            self._pools.pop(name, None)
         return crew
 
+    def _report_critical_path(self, crew_name: str, crew: Crew, execution_id: int):
+        """Registra o caminho crítico da execução (cadeia de tarefas que definiu o tempo total)"""
+        graph = self.task_graphs.get(crew_name)
+        if graph is None or len(crew.tasks) != len(graph.order):
+            return
+        try:
+            durations = {
+                task_type: getattr(task, "execution_duration", None) for task_type, task in zip(graph.order, crew.tasks)
+            }
+            path, total = graph.critical_path(durations)
+            summary = f"{' → '.join(path)} ({total:.1f}s)"
+            print(f"🧭 Caminho crítico da crew '{crew_name}': {summary}")
+            self.db_manager.save_critical_path(execution_id, summary)
+        except Exception as e:
+            print(f"⚠️ Não foi possível calcular o caminho crítico: {e}")
+
     def _select_best_agent_for_task(self, crew, task_description: str) -> Optional[object]:
         """Seleciona o agente mais adequado da crew para a tarefa dinâmica"""
         # Busca por correspondência no role ou ferramentas
@@ -237,9 +468,17 @@ class CrewManager:
         # Se ninguém pontuou, retorna o primeiro agente (fallback)
         return best_agent or (crew.agents[0] if crew.agents else None)
 
-    def execute_crew_task(self, crew_name: str, task_description: str) -> Optional[str]:
-        """Executa uma tarefa usando uma crew específica"""
-        crew = self.get_crew(crew_name)
+    def execute_crew_task(self, crew_name: str, task_description: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Executa uma tarefa usando uma crew específica
+
+        `timeout`: prazo em segundos (padrão: EXECUTION_TIMEOUT; 0 = sem prazo).
+        """
+        with self.checkout_crew(crew_name) as crew:
+            return self._execute_crew_task(crew, crew_name, task_description, timeout)
+
+    def _execute_crew_task(
+        self, crew: Optional[Crew], crew_name: str, task_description: str, timeout: Optional[float]
+    ) -> Optional[str]:
         if not crew:
             print(f"Crew {crew_name} não encontrada")
             return None
@@ -247,7 +486,9 @@ class CrewManager:
         if not self._validate_agents_tools(crew):
             print(f"❌ Execução abortada: Um ou mais agentes da crew '{crew_name}' estão sem ferramentas configuradas.")
             return None
+        restore = None
         try:
+            restore = self._apply_budget(crew_name, crew)
             # Seleciona o agente mais adequado
             agent = self._select_best_agent_for_task(crew, task_description)
             # Criar tarefa dinâmica
@@ -257,17 +498,52 @@ class CrewManager:
                 agent=agent,
             )
 
-            # Executar crew
+            # Executar crew (sem execução registrada: o prazo é verificado a cada passo)
+            self._attach_checkpoints(crew, None, self._new_token(timeout))
             result = crew.kickoff()
             return str(result)
 
+        except ExecutionCancelled as e:
+            print(f"🛑 Tarefa na crew {crew_name} interrompida: {e}")
+            return None
+
+        except BudgetExceeded as e:
+            print(f"💰 Tarefa na crew {crew_name} rejeitada: {e}")
+            return None
+
         except Exception as e:
             print(f"Erro ao executar tarefa na crew {crew_name}: {e}")
             return None
 
-    def execute_crew(self, crew_name: str, inputs: Optional[Dict] = None) -> Optional[str]:
-        """Executa uma crew com suas tarefas pré-definidas ou cria tarefas dinâmicas"""
-        crew = self.get_crew(crew_name)
+        finally:
+            if restore is not None:
+                restore()
+
+    def execute_crew(
+        self,
+        crew_name: str,
+        inputs: Optional[Dict] = None,
+        execution_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """Executa uma crew com suas tarefas pré-definidas ou cria tarefas dinâmicas
+
+        `execution_id` indica uma execução já registrada (ex: pelo motor de execução).
+        A execução usa uma instância própria da crew, emprestada do pool. `timeout` é o
+        prazo em segundos (padrão: EXECUTION_TIMEOUT; 0 = sem prazo); ao vencer, a
+        execução termina como "timeout" (ver cancel_execution).
+        """
+        with self.checkout_crew(crew_name) as crew:
+            return self._execute_crew(crew, crew_name, inputs, execution_id, timeout)
+
+    def _execute_crew(
+        self,
+        crew: Optional[Crew],
+        crew_name: str,
+        inputs: Optional[Dict],
+        execution_id: Optional[int],
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
         if not crew:
             print(f"Crew {crew_name} não encontrada")
             return None
@@ -275,9 +551,14 @@ class CrewManager:
         # Salvar execução no banco de dados
         topic = inputs.get("topic", "Execução sem tópico") if inputs else "Execução sem tópico"
         start_time = datetime.now()
-        execution_id = self.db_manager.save_execution(crew_name, topic, start_time)
+        if execution_id is None:
+            execution_id = self.db_manager.save_execution(crew_name, topic, start_time)
+        token = self._open_cancellation(execution_id, timeout)
+        restore = meter = None
 
         try:
+            self.db_manager.save_execution_inputs(execution_id, inputs)
+            restore = self._apply_budget(crew_name, crew)
             # Se não há tarefas pré-definidas, criar uma tarefa dinâmica
             if not crew.tasks:
                 print(f"Crew {crew_name} não possui tarefas definidas, criando tarefa dinâmica...")
@@ -294,18 +575,21 @@ class CrewManager:
                     return None
                 # Seleciona o agente mais adequado
                 agent = self._select_best_agent_for_task(crew, inputs["topic"])
-                # Criar tarefa dinâmica baseada no tópico
+                # Criar tarefa dinâmica baseada no tópico (preenchido pelo kickoff a partir das entradas)
                 topic = inputs["topic"]
                 task = Task(
-                    description=f"Execute a seguinte tarefa: {topic}",
+                    description="Execute a seguinte tarefa: {topic}",
                     expected_output="Resultado detalhado da execução da tarefa",
                     agent=agent,
                 )
                 crew.tasks = [task]
-            # Executar crew normalmente
-            result = crew.kickoff()
+            # Executar crew normalmente (cada tarefa concluída é salva ao terminar)
+            meter = UsageMeter(crew, self.default_model)
+            outputs = self._attach_checkpoints(crew, execution_id, token, meter)
+            result = crew.kickoff(inputs=inputs or {})
             end_time = datetime.now()
             duration = str(end_time - start_time).split(".")[0]
+            self._report_critical_path(crew_name, crew, execution_id)
 
             # SISTEMA AVANÇADO DE AVALIAÇÃO AUTOMÁTICA
             try:
@@ -313,6 +597,7 @@ class CrewManager:
                     crew,
                     result,
                     {
+                        "execution_id": execution_id,
                         "crew_name": crew_name,
                         "topic": topic,
                         "start_time": start_time,
@@ -322,8 +607,9 @@ class CrewManager:
                     },
                 )
 
-                # Anexar relatório de avaliação ao resultado
-                result = f"{str(result)}\n\n{self._format_evaluation_separator()}\n{evaluation_report}"
+                # Anexar relatório de avaliação ao resultado (como segmento separado, para que o
+                # banco armazene o relatório uma única vez junto com evaluation_reports)
+                segments = [str(result), f"\n\n{self._format_evaluation_separator()}\n", evaluation_report]
 
                 # Salvar relatório de avaliação separadamente no banco
                 self.db_manager.save_evaluation_report(execution_id, evaluation_report)
@@ -333,19 +619,33 @@ class CrewManager:
                 # Fallback para avaliação básica
                 try:
                     basic_evaluation = self._execute_basic_evaluation(crew, result)
-                    result = f"{str(result)}\n\n{self._format_evaluation_separator()}\n{basic_evaluation}"
+                    segments = [str(result), f"\n\n{self._format_evaluation_separator()}\n", basic_evaluation]
                 except Exception as fallback_error:
                     print(f"❌ Erro também na avaliação básica: {fallback_error}")
-                    result = f"{str(result)}\n\n{self._format_evaluation_separator()}\n⚠️ Avaliação automática não disponível nesta execução."
+                    segments = [
+                        str(result),
+                        f"\n\n{self._format_evaluation_separator()}\n",
+                        "⚠️ Avaliação automática não disponível nesta execução.",
+                    ]
 
             # Salvar resultado no banco de dados
-            self.db_manager.update_execution_result(execution_id, str(result), end_time, duration, "completed")
-            return str(result)
+            self.db_manager.update_execution_result(execution_id, segments, end_time, duration, "completed")
+            return "".join(segments)
+
+        except ExecutionCancelled as e:
+            self._stop_parallel_tasks(crew, token)
+            self._finish_interrupted(execution_id, start_time, e, outputs)
+            return None
+
+        except BudgetExceeded as e:
+            self._finish_rejected(execution_id, start_time, e)
+            return None
 
         except Exception as e:
             end_time = datetime.now()
             duration = str(end_time - start_time).split(".")[0]
             error_msg = str(e)
+            self._stop_parallel_tasks(crew, token)
 
             # Salvar erro no banco de dados
             self.db_manager.update_execution_result(execution_id, "", end_time, duration, "error", error_msg)
@@ -353,6 +653,310 @@ class CrewManager:
             print(f"Erro ao executar crew {crew_name}: {e}")
             return None
 
+        finally:
+            self._finish_usage(execution_id, meter, restore)
+            self._close_cancellation(execution_id, token)
+
+    def _attach_checkpoints(
+        self,
+        crew: Crew,
+        execution_id: Optional[int],
+        token: Optional[CancellationToken] = None,
+        meter: Optional[UsageMeter] = None,
+    ) -> List[str]:
+        """Faz cada tarefa salvar sua saída e suas métricas em execution_results assim que termina
+
+        Os passos de cada agente (e as ferramentas chamadas) são contados pelo step_callback;
+        início, fim e duração vêm da própria tarefa (ver TaskMetricsRecorder). Com `meter`,
+        os tokens consumidos desde a tarefa anterior e seu custo entram nas métricas. Com
+        `token`, o prazo e o pedido de cancelamento são verificados a cada passo e ao fim
+        de cada tarefa. Cada saída é salva com a posição da tarefa em crew.tasks
+        (ver resume_execution). Retorna a lista, preenchida durante o kickoff, das saídas
+        das tarefas concluídas nesta execução.
+        """
+        outputs: List[str] = []
+        recorder = TaskMetricsRecorder()
+
+        def checkpoint(task, task_index: int):
+            def save_output(output):
+                outputs.append(str(output.raw))
+                metrics = recorder.finish_task(task, output)
+                if meter is not None:
+                    metrics.update(self._usage_metrics(meter.take()))
+                if execution_id is not None:
+                    try:
+                        self.db_manager.save_task_result(
+                            execution_id,
+                            str(getattr(output, "agent", "") or ""),
+                            output.description,
+                            output.raw,
+                            "completed",
+                            metrics=metrics,
+                            task_index=task_index,
+                        )
+                    except Exception as e:
+                        print(f"⚠️ Não foi possível salvar a saída da tarefa da execução #{execution_id}: {e}")
+                if token is not None:
+                    token.check()
+
+            return save_output
+
+        def step_recorder(agent_role: Optional[str]):
+            def on_step(step):
+                if agent_role is not None:
+                    recorder.record_step(agent_role, step)
+                if token is not None:
+                    token.check()
+
+            return on_step
+
+        # A instância é reaproveitada entre execuções: os callbacks são sempre os da execução atual
+        for task_index, task in enumerate(crew.tasks):
+            task.callback = checkpoint(task, task_index)
+        # O crewAI só repassa o step_callback da crew a agentes sem callback próprio (ex: gerente)
+        crew.step_callback = step_recorder(None)
+        for agent in crew.agents:
+            agent.step_callback = step_recorder(str(getattr(agent, "role", "") or ""))
+        return outputs
+
+    def _new_token(self, timeout: Optional[float]) -> CancellationToken:
+        return CancellationToken(self.execution_timeout if timeout is None else timeout)
+
+    def _open_cancellation(self, execution_id: int, timeout: Optional[float]) -> CancellationToken:
+        """Cria o token de prazo/cancelamento da execução, visível para cancel_execution"""
+        token = self._new_token(timeout)
+        with self._lock:
+            self._cancellation[execution_id] = token
+        return token
+
+    def _close_cancellation(self, execution_id: int, token: CancellationToken):
+        with self._lock:
+            if self._cancellation.get(execution_id) is token:
+                del self._cancellation[execution_id]
+
+    def _stop_parallel_tasks(self, crew: Crew, token: CancellationToken):
+        """Interrompe e aguarda as tarefas paralelas ainda em andamento após um kickoff sem sucesso
+
+        A falha de uma tarefa paralela chega ao kickoff no ponto de junção, enquanto as
+        tarefas irmãs seguem em suas threads: o token as faz parar no próximo passo, e a
+        execução só é gravada (e a instância só volta ao pool) depois que terminam.
+        """
+        token.cancel("Execução interrompida após falha de outra tarefa")
+        wait_parallel_tasks(crew.tasks)
+
+    def cancel_execution(self, execution_id: int, reason: Optional[str] = None) -> bool:
+        """Pede a interrupção de uma execução em andamento neste processo
+
+        A crew para no próximo passo de um agente ou ao fim da tarefa atual, e a execução
+        é gravada como "cancelled" com as saídas das tarefas já concluídas.
+        """
+        with self._lock:
+            token = self._cancellation.get(execution_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        print(f"🛑 Cancelamento da execução #{execution_id} solicitado")
+        return True
+
+    def _finish_interrupted(
+        self, execution_id: int, start_time: datetime, interruption: ExecutionCancelled, outputs: List[str]
+    ):
+        """Grava o prazo vencido/cancelamento mantendo as saídas das tarefas já concluídas"""
+        end_time = datetime.now()
+        duration = str(end_time - start_time).split(".")[0]
+        self.db_manager.update_execution_result(
+            execution_id, "\n\n".join(outputs), end_time, duration, interruption.status, str(interruption)
+        )
+        icon = "⏱️" if interruption.status == TIMEOUT_STATUS else "🛑"
+        print(
+            f"{icon} Execução #{execution_id} interrompida ({interruption.status}): {interruption}; "
+            f"{len(outputs)} tarefa(s) concluída(s) mantida(s)"
+        )
+
+    def _finish_rejected(self, execution_id: int, start_time: datetime, rejection: BudgetExceeded):
+        """Grava a execução rejeitada pelo orçamento da crew (antes do kickoff)"""
+        end_time = datetime.now()
+        duration = str(end_time - start_time).split(".")[0]
+        self.db_manager.update_execution_result(execution_id, "", end_time, duration, REJECTED_STATUS, str(rejection))
+        print(f"💰 Execução #{execution_id} rejeitada: {rejection}")
+
+    def check_budget(self, crew_name: str) -> Tuple[str, Optional[str]]:
+        """Verifica o orçamento da crew: ("allow", None), ("reject", motivo) ou ("degrade", motivo)
+
+        O gasto do dia e do mês (UTC) vem dos agregados de consumo; a próxima execução é
+        estimada pelo custo médio das execuções recentes da crew.
+        """
+        budget = self.cost_policy.budget(crew_name)
+        if budget["daily_usd"] is None and budget["monthly_usd"] is None:
+            return "allow", None
+        today = datetime.now(timezone.utc).date()
+        rows = self.db_manager.get_usage_summary(since=today.replace(day=1), crew_name=crew_name)
+        spent_today = sum(row["cost_usd"] for row in rows if row["day"] == today.isoformat())
+        spent_month = sum(row["cost_usd"] for row in rows)
+        expected_cost = self.db_manager.get_average_execution_cost(crew_name) or 0.0
+        return self.cost_policy.check(crew_name, spent_today, spent_month, expected_cost)
+
+    def _apply_budget(self, crew_name: str, crew: Crew) -> Optional[Callable[[], None]]:
+        """Aplica o orçamento antes do kickoff
+
+        Lança BudgetExceeded se a execução deve ser rejeitada. Na degradação, cada agente
+        da instância passa a usar uma cópia do seu LLM com o modelo `degrade_model`;
+        retorna a função que devolve os LLMs originais (a instância volta ao pool).
+        """
+        action, reason = self.check_budget(crew_name)
+        if action == "allow":
+            return None
+        if action == "reject":
+            raise BudgetExceeded(reason)
+
+        model = self.cost_policy.budget(crew_name)["degrade_model"]
+        print(f"💰 {reason}; executando com o modelo {model}")
+        original_llms = [(agent, agent.llm) for agent in crew.agents]
+        for agent in crew.agents:
+            agent.llm = with_model(agent.llm, model)
+
+        def restore():
+            for agent, llm in original_llms:
+                agent.llm = llm
+
+        return restore
+
+    def _usage_metrics(self, usage: Dict[Optional[str], Tuple[int, int]]) -> Dict:
+        """Tokens e custo estimado (tokens por modelo, de um UsageMeter), nas chaves de USAGE_COLUMNS
+
+        Vazio se nada foi medido; o custo soma o preço de cada modelo.
+        """
+        prompt_tokens = sum(tokens[0] for tokens in usage.values())
+        completion_tokens = sum(tokens[1] for tokens in usage.values())
+        if not prompt_tokens and not completion_tokens:
+            return {}
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": self.cost_policy.estimate_usage_cost(usage),
+        }
+
+    def _record_usage(self, execution_id: Optional[int], meter: Optional[UsageMeter]):
+        """Soma ao consumo da execução os tokens medidos por `meter`, um registro por modelo
+
+        O modelo com mais tokens vem primeiro e fica como modelo da execução.
+        """
+        if execution_id is None or meter is None:
+            return
+        try:
+            usage = meter.total()
+            for model, tokens in sorted(usage.items(), key=lambda item: -sum(item[1])):
+                metrics = self._usage_metrics({model: tokens})
+                if metrics:
+                    self.db_manager.record_execution_usage(execution_id, model, **metrics)
+        except Exception as e:
+            print(f"⚠️ Não foi possível registrar o consumo da execução #{execution_id}: {e}")
+
+    def _finish_usage(
+        self, execution_id: Optional[int], meter: Optional[UsageMeter], restore: Optional[Callable[[], None]]
+    ):
+        """Registra o consumo da execução (concluída ou não) e desfaz a degradação de modelo"""
+        self._record_usage(execution_id, meter)
+        if restore is not None:
+            restore()
+
+    def resume_execution(self, execution_id: int, timeout: Optional[float] = None) -> Optional[str]:
+        """Retoma uma execução que falhou, executando apenas as tarefas ainda não concluídas
+
+        As saídas salvas em execution_results (localizadas pela posição da tarefa na crew)
+        são injetadas como contexto das tarefas restantes, que rodam com as mesmas entradas
+        da execução original. O resultado final é gravado na mesma execução. `timeout` vale para a
+        retomada, como em execute_crew.
+        """
+        details = self.db_manager.get_execution_details(execution_id)
+        if details is None:
+            print(f"❌ Execução #{execution_id} não encontrada")
+            return None
+        if details["status"] in ACTIVE_STATUSES or details["status"] == "completed" or details.get("archived"):
+            print(f"⚠️ Execução #{execution_id} não pode ser retomada (status: {details['status']})")
+            return None
+
+        crew_name = details["crew_name"]
+        template = self.get_crew(crew_name)
+        if template is None:
+            print(f"❌ Crew '{crew_name}' não encontrada")
+            return None
+
+        # Instância exclusiva: contexto e saídas injetadas não voltam ao pool
+        crew = self._clone_instance(crew_name, template)
+        if not crew.agents:
+            print(f"❌ Crew '{crew_name}' não possui agentes")
+            return None
+        if not crew.tasks:
+            crew.tasks = [
+                Task(
+                    description=f"Execute a seguinte tarefa: {details['topic']}",
+                    expected_output="Resultado detalhado da execução da tarefa",
+                    agent=crew.agents[0],
+                )
+            ]
+
+        completed = [task for task in details["task_results"] if task["task_status"] == "completed"]
+        saved = {task["task_index"]: task["task_result"] for task in completed if task["task_index"] is not None}
+        # Saídas gravadas antes da posição das tarefas só podem ser localizadas pela descrição
+        legacy = {task["task_description"]: task["task_result"] for task in completed if task["task_index"] is None}
+        done, remaining = [], []
+        for index, task in enumerate(crew.tasks):
+            raw = saved[index] if index in saved else legacy.get(task.description)
+            if raw is not None:
+                agent_role = getattr(task.agent, "role", "") if task.agent else ""
+                task.output = TaskOutput(description=task.description, raw=raw, agent=agent_role)
+                done.append(task)
+                continue
+            # Sem contexto explícito, a tarefa recebe as saídas de todas as anteriores, como na execução original
+            if not isinstance(task.context, list):
+                task.context = done + remaining
+            task.async_execution = False
+            remaining.append(task)
+
+        if not self.db_manager.reopen_execution(execution_id):
+            print(f"⚠️ Execução #{execution_id} não pode ser retomada")
+            return None
+        print(f"🔁 Retomando execução #{execution_id}: {len(done)} tarefa(s) reaproveitada(s), {len(remaining)} restante(s)")
+
+        start_time = datetime.fromisoformat(details["start_time"])
+        token = self._open_cancellation(execution_id, timeout)
+        restore = meter = None
+        try:
+            if remaining:
+                restore = self._apply_budget(crew_name, crew)
+                meter = UsageMeter(crew, self.default_model)
+                # Checkpoints ligados com todas as tarefas, para que cada saída mantenha sua posição
+                outputs = self._attach_checkpoints(crew, execution_id, token, meter)
+                crew.tasks = remaining
+                result = str(crew.kickoff(inputs=details.get("inputs") or {}))
+            else:
+                result = done[-1].output.raw
+            end_time = datetime.now()
+            duration = str(end_time - start_time).split(".")[0]
+            self.db_manager.update_execution_result(execution_id, result, end_time, duration, "completed")
+            print(f"✅ Execução #{execution_id} retomada e concluída")
+            return result
+
+        except ExecutionCancelled as e:
+            self._finish_interrupted(execution_id, start_time, e, [task.output.raw for task in done] + outputs)
+            return None
+
+        except BudgetExceeded as e:
+            self._finish_rejected(execution_id, start_time, e)
+            return None
+
+        except Exception as e:
+            end_time = datetime.now()
+            duration = str(end_time - start_time).split(".")[0]
+            print(f"❌ Erro ao retomar a execução #{execution_id}: {e}")
+            self.db_manager.update_execution_result(execution_id, "", end_time, duration, "error", str(e))
+            return None
+
+        finally:
+            self._finish_usage(execution_id, meter, restore)
+            self._close_cancellation(execution_id, token)
+
     def execute_crew_with_logs(self, crew_name: str, inputs: Optional[Dict] = None):
         """Executa uma crew capturando todos os logs em tempo real (versão segura)"""
         logs = []
@@ -384,79 +988,384 @@ class CrewManager:
             except:
                 pass  # Ignorar erros ao parar captura
 
-    def execute_crew_safe(self, crew_name: str, inputs: Optional[Dict] = None) -> Optional[str]:
-        """Versão segura de execução sem captura de logs (fallback)"""
+    def execute_crew_safe(
+        self,
+        crew_name: str,
+        inputs: Optional[Dict] = None,
+        execution_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        context: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Versão segura de execução sem captura de logs (fallback)
+
+        `execution_id` indica uma execução já registrada (ex: pelo motor de execução).
+        A execução usa uma instância própria da crew, emprestada do pool. `timeout` é o
+        prazo em segundos, como em execute_crew. `context` são saídas externas (ex: da
+        etapa anterior de um pipeline) entregues como contexto a todas as tarefas.
+        """
+        print(f"🚀 Executando crew '{crew_name}' (modo seguro)")
         try:
-            print(f"🚀 Executando crew '{crew_name}' (modo seguro)")
+            with self.checkout_crew(crew_name) as crew:
+                return self._execute_crew_safe(crew, crew_name, inputs, execution_id, timeout, context)
+        except Exception as e:
+            self._record_preparation_error(crew_name, inputs, execution_id, e)
+            return None
 
-            crew = self.get_crew(crew_name)
-            if not crew:
-                print(f"❌ Crew '{crew_name}' não encontrada")
-                return None
+    def _record_preparation_error(
+        self, crew_name: str, inputs: Optional[Dict], execution_id: Optional[int], error: Exception
+    ):
+        """Grava como erro uma execução cuja instância da crew não pôde ser preparada"""
+        print(f"❌ Erro ao preparar a crew '{crew_name}': {error}")
+        try:
+            if execution_id is None:
+                topic = (inputs or {}).get("topic", "Execução sem tópico")
+                execution_id = self.db_manager.save_execution(crew_name, topic, datetime.now())
+            self.db_manager.update_execution_result(execution_id, "", datetime.now(), "0:00:00", "error", str(error))
+        except Exception as e:
+            print(f"⚠️ Não foi possível registrar o erro da crew '{crew_name}': {e}")
 
-            # Verificar se crew tem agentes
-            if not crew.agents:
-                print(f"❌ Crew '{crew_name}' não possui agentes")
-                return None
+    def _prepare_safe_run(self, crew: Crew, inputs: Optional[Dict]) -> Optional[str]:
+        """Cria a tarefa dinâmica de uma crew sem tarefas; retorna a mensagem de erro, se houver
+
+        O tópico entra na descrição pelo kickoff, que interpola as entradas nas tarefas e
+        agentes (como `{topic}`), e não diretamente no texto.
+        """
+        if crew.tasks:
+            return None
+        if not inputs or "topic" not in inputs:
+            return "Parâmetro 'topic' não fornecido"
+        crew.tasks = [
+            Task(
+                description="Execute a seguinte tarefa: {topic}",
+                expected_output="Resultado detalhado da execução da tarefa",
+                agent=crew.agents[0],
+            )
+        ]
+        return None
+
+    def _start_safe_run(
+        self, crew: Crew, execution_id: int, token: CancellationToken
+    ) -> Tuple[UsageMeter, List[str]]:
+        """Liga a medição de consumo e os checkpoints da execução; retorna (medidor, saídas concluídas)"""
+        meter = UsageMeter(crew, self.default_model)
+        return meter, self._attach_checkpoints(crew, execution_id, token, meter)
+
+    def _complete_safe_run(self, crew_name: str, crew: Crew, execution_id: int, start_time: datetime, result: str):
+        """Grava o resultado de uma execução concluída"""
+        end_time = datetime.now()
+        duration = str(end_time - start_time).split(".")[0]
+        self._report_critical_path(crew_name, crew, execution_id)
+        print(f"✅ Execução concluída em {duration}")
+        self.db_manager.update_execution_result(execution_id, result, end_time, duration, "completed")
+
+    def _fail_safe_run(self, execution_id: int, start_time: datetime, error: BaseException, outputs: List[str]):
+        """Grava o fim de uma execução não concluída: interrompida, rejeitada pelo orçamento ou com erro"""
+        if isinstance(error, ExecutionCancelled):
+            self._finish_interrupted(execution_id, start_time, error, outputs)
+        elif isinstance(error, BudgetExceeded):
+            self._finish_rejected(execution_id, start_time, error)
+        else:
+            end_time = datetime.now()
+            duration = str(end_time - start_time).split(".")[0]
+            print(f"❌ Erro na execução: {error}")
+            self.db_manager.update_execution_result(execution_id, "", end_time, duration, "error", str(error))
+
+    def _execute_crew_safe(
+        self,
+        crew: Optional[Crew],
+        crew_name: str,
+        inputs: Optional[Dict],
+        execution_id: Optional[int],
+        timeout: Optional[float] = None,
+        context: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        if not crew:
+            print(f"❌ Crew '{crew_name}' não encontrada")
+            return None
+
+        # Verificar se crew tem agentes
+        if not crew.agents:
+            print(f"❌ Crew '{crew_name}' não possui agentes")
+            return None
 
-            # Salvar execução no banco de dados
-            topic = inputs.get("topic", "Execução segura") if inputs else "Execução segura"
-            start_time = datetime.now()
+        # Salvar execução no banco de dados
+        topic = inputs.get("topic", "Execução segura") if inputs else "Execução segura"
+        start_time = datetime.now()
+        if execution_id is None:
             execution_id = self.db_manager.save_execution(crew_name, topic, start_time)
+        token = self._open_cancellation(execution_id, timeout)
+        restore = meter = None
+        outputs: List[str] = []
+        restore_context = None
+        try:
+            self.db_manager.save_execution_inputs(execution_id, inputs)
+            restore = self._apply_budget(crew_name, crew)
 
             # Se não há tarefas pré-definidas, criar uma tarefa dinâmica
-            if not crew.tasks:
-                print(f"Criando tarefa dinâmica para '{crew_name}'...")
+            error_msg = self._prepare_safe_run(crew, inputs)
+            if error_msg:
+                print(f"❌ {error_msg}")
+                self.db_manager.update_execution_result(execution_id, "", datetime.now(), "0:00:00", "error", error_msg)
+                return None
+            if context:
+                restore_context = self._inject_context(crew, context)
 
-                if not inputs or "topic" not in inputs:
-                    error_msg = "Parâmetro 'topic' não fornecido"
-                    print(f"❌ {error_msg}")
-                    self.db_manager.update_execution_result(
-                        execution_id, "", datetime.now(), "0:00:00", "error", error_msg
-                    )
+            print(f"🔄 Executando crew com {len(crew.agents)} agentes e {len(crew.tasks)} tarefas")
+
+            # Executar crew (cada tarefa concluída é salva ao terminar)
+            meter, outputs = self._start_safe_run(crew, execution_id, token)
+            result = str(crew.kickoff(inputs=inputs or {}))
+            self._complete_safe_run(crew_name, crew, execution_id, start_time, result)
+            return result
+
+        except (Exception, ExecutionCancelled) as e:
+            self._stop_parallel_tasks(crew, token)
+            self._fail_safe_run(execution_id, start_time, e, outputs)
+            return None
+
+        finally:
+            if restore_context is not None:
+                restore_context()
+            self._finish_usage(execution_id, meter, restore)
+            self._close_cancellation(execution_id, token)
+
+    def _inject_context(self, crew: Crew, context: List[str]) -> Callable[[], None]:
+        """Inclui saídas externas no contexto de todas as tarefas da instância
+
+        Cada saída vira uma tarefa já concluída, como as saídas reaproveitadas em
+        resume_execution. Retorna a função que devolve os contextos originais (as tarefas
+        pré-definidas voltam ao pool).
+        """
+        sources = []
+        for index, text in enumerate(context, start=1):
+            description = f"Entrada externa {index}"
+            source = Task(description=description, expected_output=description)
+            source.output = TaskOutput(description=description, raw=text, agent="")
+            sources.append(source)
+
+        original_contexts = [(task, task.context) for task in crew.tasks]
+        for index, task in enumerate(crew.tasks):
+            # Sem contexto explícito, a tarefa continua recebendo as saídas de todas as anteriores
+            previous = task.context if isinstance(task.context, list) else crew.tasks[:index]
+            task.context = sources + list(previous)
+
+        def restore():
+            for task, original in original_contexts:
+                task.context = original
+
+        return restore
+
+    async def execute_crew_async(
+        self,
+        crew_name: str,
+        inputs: Optional[Dict] = None,
+        execution_id: Optional[int] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """Executa uma crew no event loop (kickoff_async), com o mesmo registro do modo seguro
+
+        `semaphore` limita execuções simultâneas e `timeout` é o prazo, como em execute_crew.
+        Falhas ao preparar a instância são gravadas como erro da execução (retorno None).
+        Se a corrotina for cancelada, a execução é gravada como "cancelled", o kickoff para
+        no próximo passo e o cancelamento é propagado ao chamador.
+        """
+        async with semaphore or nullcontext():
+            crew = pool = None
+            try:
+                pool = await asyncio.to_thread(self._pool, crew_name)
+                if pool is None:
+                    print(f"❌ Crew '{crew_name}' não encontrada")
                     return None
+                crew = await asyncio.to_thread(pool.checkout)
+                return await self._execute_instance_async(crew, crew_name, inputs, execution_id, timeout)
+            except asyncio.CancelledError:
+                # O kickoff só para no próximo passo, em sua thread; a instância não volta ao pool
+                if crew is not None:
+                    pool.discard(crew)
+                    crew = None
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self._record_preparation_error, crew_name, inputs, execution_id, e)
+                return None
+            finally:
+                if crew is not None:
+                    pool.checkin(crew)
 
-                # Criar tarefa dinâmica
-                task = Task(
-                    description=f"Execute a seguinte tarefa: {topic}",
-                    expected_output="Resultado detalhado da execução da tarefa",
-                    agent=crew.agents[0],
+    async def _execute_instance_async(
+        self,
+        crew: Crew,
+        crew_name: str,
+        inputs: Optional[Dict],
+        execution_id: Optional[int],
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        if not crew.agents:
+            print(f"❌ Crew '{crew_name}' não possui agentes")
+            return None
+
+        topic = inputs.get("topic", "Execução assíncrona") if inputs else "Execução assíncrona"
+        start_time = datetime.now()
+        if execution_id is None:
+            execution_id = await self.async_db.save_execution(crew_name, topic, start_time)
+        token = self._open_cancellation(execution_id, timeout)
+        restore = meter = None
+        outputs: List[str] = []
+        try:
+            await self.async_db.save_execution_inputs(execution_id, inputs)
+            restore = await asyncio.to_thread(self._apply_budget, crew_name, crew)
+            error_msg = self._prepare_safe_run(crew, inputs)
+            if error_msg:
+                print(f"❌ {error_msg}")
+                await self.async_db.update_execution_result(
+                    execution_id, "", datetime.now(), "0:00:00", "error", error_msg
                 )
-                crew.tasks = [task]
+                return None
 
-            print(f"🔄 Executando crew com {len(crew.agents)} agentes e {len(crew.tasks)} tarefas")
+            meter, outputs = self._start_safe_run(crew, execution_id, token)
+            result = str(await crew.kickoff_async(inputs=inputs or {}))
+            await asyncio.to_thread(self._complete_safe_run, crew_name, crew, execution_id, start_time, result)
+            return result
 
-            # Executar crew
-            result = crew.kickoff()
+        except asyncio.CancelledError:
+            token.cancel()
+            # Gravação síncrona: a tarefa já foi cancelada e não deve aguardar outro await
             end_time = datetime.now()
             duration = str(end_time - start_time).split(".")[0]
+            self.db_manager.update_execution_result(
+                execution_id, "", end_time, duration, "cancelled", "Cancelada durante a execução"
+            )
+            print(f"🛑 Execução #{execution_id} da crew '{crew_name}' cancelada")
+            raise
 
-            print(f"✅ Execução concluída em {duration}")
+        except (Exception, ExecutionCancelled) as e:
+            await asyncio.to_thread(self._stop_parallel_tasks, crew, token)
+            await asyncio.to_thread(self._fail_safe_run, execution_id, start_time, e, outputs)
+            return None
 
-            # Salvar resultado
-            self.db_manager.update_execution_result(execution_id, str(result), end_time, duration, "completed")
+        finally:
+            self._finish_usage(execution_id, meter, restore)
+            self._close_cancellation(execution_id, token)
 
-            return str(result)
+    async def execute_many_async(
+        self,
+        crew_name: str,
+        inputs_list: List[Optional[Dict]],
+        max_concurrency: int = 4,
+        timeout: Optional[float] = None,
+    ) -> List[Optional[str]]:
+        """Executa a crew uma vez para cada entrada, no máximo `max_concurrency` ao mesmo tempo
+
+        Cada entrada é registrada como uma execução própria, com prazo `timeout`; os
+        resultados seguem a ordem de `inputs_list`. Cancelar a chamada cancela todas as
+        execuções pendentes.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        return await asyncio.gather(
+            *(
+                self.execute_crew_async(crew_name, inputs, semaphore=semaphore, timeout=timeout)
+                for inputs in inputs_list
+            )
+        )
 
-        except Exception as e:
-            end_time = datetime.now()
-            duration = str(end_time - start_time).split(".")[0] if "start_time" in locals() else "0:00:00"
-            error_msg = str(e)
+    def execute_crew_batch(
+        self,
+        crew_name: str,
+        inputs_list: List[Dict],
+        max_concurrency: int = 4,
+        fail_fast: bool = False,
+        evaluate: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """Executa a crew uma vez para cada entrada, no máximo `max_concurrency` ao mesmo tempo
+
+        Cada item é registrado como uma execução própria ("queued" até iniciar), agrupada
+        pelo `batch_id` retornado. Com `fail_fast`, a primeira falha cancela os itens que
+        ainda não começaram. `progress(concluídos, total)` é chamado na thread de quem
+        chamou, após cada item. `timeout` é o prazo de cada item, como em execute_crew.
+        Retorna {"batch_id", "executions"} na ordem das entradas.
+        """
+        if crew_name not in self.list_crew_names():
+            raise ValueError(f"Crew '{crew_name}' não encontrada")
+
+        batch_id = new_batch_id()
+        execution_ids = [
+            self.db_manager.save_execution(
+                crew_name,
+                (inputs or {}).get("topic", "Execução sem tópico"),
+                datetime.now(),
+                status="queued",
+                batch_id=batch_id,
+            )
+            for inputs in inputs_list
+        ]
+        print(f"📥 Lote {batch_id}: {len(execution_ids)} execução(ões) da crew '{crew_name}'")
 
-            print(f"❌ Erro na execução: {error_msg}")
+        runner = self.execute_crew if evaluate else self.execute_crew_safe
+        stop = threading.Event()
 
-            if "execution_id" in locals():
-                self.db_manager.update_execution_result(execution_id, "", end_time, duration, "error", error_msg)
+        def run_item(execution_id: int, inputs: Dict) -> bool:
+            if stop.is_set():
+                self.db_manager.update_execution_result(
+                    execution_id, "", datetime.now(), "0:00:00", "cancelled", "Lote interrompido após falha"
+                )
+                return False
+            self.db_manager.start_execution(execution_id, datetime.now())
+            try:
+                result = runner(crew_name, inputs, execution_id=execution_id, timeout=timeout)
+            except Exception as e:
+                print(f"❌ Erro na execução #{execution_id} do lote {batch_id}: {e}")
+                result = None
+            if result is None:
+                self._mark_unfinished_as_error(execution_id, "Execução encerrada sem resultado")
+                if fail_fast:
+                    stop.set()
+                return False
+            return True
 
-            return None
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="crew-batch") as executor:
+            futures = [
+                executor.submit(run_item, execution_id, inputs)
+                for execution_id, inputs in zip(execution_ids, inputs_list)
+            ]
+            for _ in as_completed(futures):
+                done += 1
+                if progress is not None:
+                    progress(done, len(futures))
+
+        executions = self.db_manager.get_batch_executions(batch_id)
+
+        completed = sum(1 for execution in executions if execution["status"] == "completed")
+        print(f"✅ Lote {batch_id} concluído: {completed}/{len(executions)} com sucesso")
+        return {"batch_id": batch_id, "executions": executions}
+
+    def _mark_unfinished_as_error(self, execution_id: int, message: str):
+        """Grava erro em uma execução que terminou sem registrar o estado final"""
+        details = self.db_manager.get_execution_details(execution_id, include_result=False)
+        if details is not None and details["status"] in ACTIVE_STATUSES:
+            self.db_manager.update_execution_result(execution_id, "", datetime.now(), "0:00:00", "error", message)
 
     def get_crew(self, name: str) -> Optional[Crew]:
-        """Retorna uma crew existente"""
-        return self.crews.get(name)
+        """Retorna uma crew existente, construindo-a no primeiro acesso"""
+        crew = self.crews.get(name)
+        if crew is not None:
+            return crew
+        return self._hydrate_crew(name)
+
+    def is_crew_loaded(self, name: str) -> bool:
+        """Indica se a crew já foi construída (sem construí-la)"""
+        return name in self.crews
 
     def get_all_crews(self) -> Dict[str, Crew]:
-        """Retorna todas as crews criadas"""
-        return self.crews
+        """Retorna todas as crews (construindo as que ainda não foram)"""
+        crews = {}
+        for name in self.list_crew_names():
+            crew = self.get_crew(name)
+            if crew is not None:
+                crews[name] = crew
+        return crews
 
     def get_crew_info(self, name: str) -> Optional[Dict]:
         """Retorna informações sobre uma crew"""
@@ -464,22 +1373,27 @@ class CrewManager:
 
     def delete_crew(self, name: str) -> bool:
         """Remove uma crew (mantém o histórico no banco de dados)"""
-        if name in self.crews:
-            del self.crews[name]
+        with self._lock:
+            if name not in self.crew_configs:
+                return False
+            self.crews.pop(name, None)
+            self._pools.pop(name, None)
+            self.task_graphs.pop(name, None)
             del self.crew_configs[name]
+            self._config_fingerprints.pop(name, None)
             # Não deletar do banco de dados para manter histórico
             # self.db_manager.delete_crew_config(name)
             return True
-        return False
 
     def list_crew_names(self) -> List[str]:
         """Lista todos os nomes de crews"""
-        return list(self.crews.keys())
+        return list(self.crew_configs.keys())
 
     def reload_configs(self) -> bool:
         """Recarrega as configurações de agentes e tarefas"""
         try:
-            self.agent_manager.reload_configs()
+            with self._agents_lock:
+                self.agent_manager.reload_configs()
             self.task_manager.reload_configs()
             return True
         except Exception as e:
@@ -487,21 +1401,28 @@ class CrewManager:
             return False
 
     def reload_crews_from_database(self) -> int:
-        """Recarrega crews do banco de dados (força recarregamento)"""
+        """Recarrega crews do banco de dados, reconstruindo apenas as que mudaram"""
         try:
             print("🔄 Recarregando crews do banco de dados...")
-
-            # Limpar crews atuais em memória
-            crews_before = len(self.crews)
-            self.crews.clear()
-            self.crew_configs.clear()
-
-            # Carregar crews do banco
-            self._load_saved_crews()
-
-            crews_after = len(self.crews)
-            print(f"🔄 Recarregamento concluído: {crews_before} → {crews_after} crews")
-
+            saved_configs = self.db_manager.get_all_crew_configs()
+            saved_names = {config["crew_name"] for config in saved_configs}
+
+            with self._lock:
+                crews_before = len(self.crew_configs)
+                removed = [name for name in self.crew_configs if name not in saved_names]
+                for name in removed:
+                    self.crews.pop(name, None)
+                    self._pools.pop(name, None)
+                    self.task_graphs.pop(name, None)
+                    del self.crew_configs[name]
+                    self._config_fingerprints.pop(name, None)
+                changed = sum(1 for config in saved_configs if self._register_saved_crew(config))
+                crews_after = len(self.crew_configs)
+
+            print(
+                f"🔄 Recarregamento concluído: {crews_before} → {crews_after} crews "
+                f"({changed} nova(s) ou alterada(s), {len(removed)} removida(s))"
+            )
             return crews_after
 
         except Exception as e:
@@ -517,6 +1438,12 @@ class CrewManager:
             for config in saved_configs:
                 crew_name = config["crew_name"]
                 is_loaded = crew_name in self.crews
+                if is_loaded:
+                    status = "✅ Carregada"
+                elif crew_name in self.crew_configs:
+                    status = "💤 Registrada (construída no primeiro uso)"
+                else:
+                    status = "⚠️ Não carregada"
 
                 crew_info.append(
                     {
@@ -526,7 +1453,7 @@ class CrewManager:
                         "agent_count": len(config["agent_types"]),
                         "created_at": config["created_at"],
                         "is_loaded_in_memory": is_loaded,
-                        "status": "✅ Carregada" if is_loaded else "⚠️ Não carregada",
+                        "status": status,
                     }
                 )
 
@@ -547,6 +1474,9 @@ class CrewManager:
         evaluator_agent = self._get_or_create_evaluator_agent()
         if not evaluator_agent:
             raise Exception("Não foi possível criar o agente avaliador")
+        if self.llm_cache is not None:
+            # Agente compartilhado entre as crews: vale só a configuração do agente (ou o padrão)
+            self._apply_llm_cache(None, [evaluator_agent])
 
         # Criar tarefa de avaliação específica, passando os parâmetros como um dicionário
         evaluation_task = self.task_manager.create_task_with_params(
@@ -564,9 +1494,13 @@ class CrewManager:
         # Criar uma crew temporária para a avaliação
         evaluation_crew = Crew(agents=[evaluator_agent], tasks=[evaluation_task], verbose=True)
 
-        # Executar a crew de avaliação
+        # Executar a crew de avaliação (o consumo entra na execução avaliada)
         print("📊 Executando análise detalhada...")
-        evaluation_report_result = evaluation_crew.kickoff()
+        meter = UsageMeter(evaluation_crew, self.default_model)
+        try:
+            evaluation_report_result = evaluation_crew.kickoff()
+        finally:
+            self._record_usage(execution_data.get("execution_id"), meter)
 
         # Garantir que o resultado seja uma string
         evaluation_report = (
@@ -644,25 +1578,27 @@ class CrewManager:
         """Obtém ou cria o agente avaliador especializado"""
         evaluator_type = "crewai_evaluator"
 
-        # Tentar obter agente existente
-        evaluator_agent = self.agent_manager.get_agent(evaluator_type)
-        if evaluator_agent:
-            return evaluator_agent
+        with self._agents_lock:
+            # Tentar obter agente existente
+            evaluator_agent = self.agent_manager.get_agent(evaluator_type)
+            if evaluator_agent:
+                return evaluator_agent
 
-        # Criar novo agente avaliador
-        return self.agent_manager.create_agent(evaluator_type)
+            # Criar novo agente avaliador
+            return self.agent_manager.create_agent(evaluator_type)
 
     def _get_or_create_simple_evaluator(self):
         """Obtém ou cria o agente avaliador simples para fallback"""
         evaluator_type = "simple_evaluator"
 
-        # Tentar obter agente existente
-        evaluator_agent = self.agent_manager.get_agent(evaluator_type)
-        if evaluator_agent:
-            return evaluator_agent
+        with self._agents_lock:
+            # Tentar obter agente existente
+            evaluator_agent = self.agent_manager.get_agent(evaluator_type)
+            if evaluator_agent:
+                return evaluator_agent
 
-        # Criar novo agente avaliador simples
-        return self.agent_manager.create_agent(evaluator_type)
+            # Criar novo agente avaliador simples
+            return self.agent_manager.create_agent(evaluator_type)
 
     def _build_comprehensive_evaluation_context(self, evaluation_data):
         """Constrói contexto abrangente para avaliação"""
@@ -835,6 +1771,7 @@ Verificar logs do sistema e configurações dos agentes avaliadores.
                 "last_sync": "Sistema ativo",
                 "crews_in_database": len(self.db_manager.get_all_crew_configs()),
                 "crews_in_memory": len(self.crews),
+                "crews_registered": len(self.crew_configs),
                 "sync_manager_status": "Ativo",
                 "auto_sync_enabled": True,
             }
@@ -0,0 +1,97 @@
+"""
+Pool de instâncias de execução de uma crew
+
+A crew construída pelo CrewManager funciona como template imutável: cada execução
+recebe uma instância própria (clonada do template, com agentes e tarefas próprios),
+de modo que tarefas dinâmicas de uma execução não afetam execuções simultâneas nem
+as seguintes. As instâncias são reaproveitadas: ao serem devolvidas, voltam à lista
+de tarefas original e ficam disponíveis para a próxima execução.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+def clone_crew(template):
+    """Cria uma instância independente da crew (agentes e tarefas copiados)
+
+    Não há alternativa rasa: as execuções alteram os agentes da instância (callbacks,
+    LLM com cache ou de orçamento), e agentes compartilhados alterariam o template
+    e as execuções simultâneas.
+    """
+    try:
+        return template.copy()
+    except Exception as e:
+        raise RuntimeError(f"Não foi possível copiar a crew: {e}") from e
+
+
+class CrewPool:
+    """Instâncias pré-validadas de uma crew, emprestadas por execução e reaproveitadas"""
+
+    def __init__(self, name: str, template, size: int = 2, clone: Callable = clone_crew):
+        self.name = name
+        self.template = template
+        self.size = size  # instâncias ociosas mantidas; a mais, são descartadas na devolução
+        self._clone = clone
+        self._idle: List = []
+        self._original_tasks: Dict[int, List] = {}
+        self._lock = threading.Lock()
+
+    def _new_instance(self):
+        instance = self._clone(self.template)
+        if not getattr(instance, "agents", None):
+            raise ValueError(f"Instância da crew '{self.name}' sem agentes")
+        with self._lock:
+            self._original_tasks[id(instance)] = list(instance.tasks)
+        return instance
+
+    def prefill(self, count: Optional[int] = None) -> int:
+        """Clona instâncias até haver `count` (padrão: `size`) ociosas; retorna quantas foram criadas"""
+        target = self.size if count is None else min(count, self.size)
+        created = 0
+        while True:
+            with self._lock:
+                if len(self._idle) >= target:
+                    return created
+            instance = self._new_instance()
+            with self._lock:
+                self._idle.append(instance)
+            created += 1
+
+    def checkout(self):
+        """Empresta uma instância ociosa (ou clona uma nova se todas estiverem em uso)"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._new_instance()
+
+    def checkin(self, instance):
+        """Devolve a instância, restaurando as tarefas originais do template"""
+        with self._lock:
+            original_tasks = self._original_tasks.get(id(instance))
+            if original_tasks is None:
+                return  # instância de outro pool (template substituído)
+            if len(self._idle) >= self.size:
+                del self._original_tasks[id(instance)]
+                return
+            instance.tasks = list(original_tasks)
+            self._idle.append(instance)
+
+    def discard(self, instance):
+        """Esquece uma instância que não pode ser reaproveitada (ex: ainda em uso após cancelamento)"""
+        with self._lock:
+            self._original_tasks.pop(id(instance), None)
+
+    @contextmanager
+    def instance(self) -> Iterator:
+        """Empresta uma instância durante o bloco `with`"""
+        crew = self.checkout()
+        try:
+            yield crew
+        finally:
+            self.checkin(crew)
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
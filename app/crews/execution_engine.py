@@ -0,0 +1,242 @@
+"""
+Motor de execução de crews em segundo plano
+
+As execuções são enviadas a um pool de threads do próprio processo e acompanhadas
+por um identificador (o id da execução no banco). O estado de cada execução fica
+persistido na tabela `executions` ("queued" → "running" → estado final), de modo
+que qualquer sessão pode consultá-lo sem bloquear a interface.
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.utils.rollups import ACTIVE_STATUSES
+
+DEFAULT_WORKERS = 4
+
+
+def new_batch_id(prefix: str = "lote") -> str:
+    """Identificador de um lote de execuções (coluna batch_id)"""
+    return f"{prefix}-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+class ExecutionEngine:
+    """Executa crews de um CrewManager em segundo plano: submit → status/result/cancel"""
+
+    def __init__(self, crew_manager, max_workers: Optional[int] = None):
+        self.crew_manager = crew_manager
+        self.storage = crew_manager.db_manager
+        self.max_workers = max_workers or int(os.getenv("EXECUTION_WORKERS", str(DEFAULT_WORKERS)))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-exec")
+        self._jobs: Dict[int, Future] = {}
+        self._stopped_batches: Set[str] = set()  # lotes com fail_fast que já tiveram uma falha
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        crew_name: str,
+        inputs: Optional[Dict] = None,
+        evaluate: bool = False,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """Coloca a execução de uma crew na fila e retorna o id do job (= id da execução)
+
+        Com `evaluate=True`, a execução inclui a avaliação automática de qualidade.
+        `timeout` é o prazo em segundos contado a partir do início da execução (padrão:
+        EXECUTION_TIMEOUT); ao vencer, o job termina como "timeout".
+        """
+        if crew_name not in self.crew_manager.list_crew_names():
+            raise ValueError(f"Crew '{crew_name}' não encontrada")
+        job_id = self._enqueue(crew_name, inputs, evaluate, timeout)
+        print(f"📥 Execução #{job_id} da crew '{crew_name}' enviada para a fila")
+        return job_id
+
+    def submit_batch(
+        self,
+        crew_name: str,
+        inputs_list: List[Dict],
+        evaluate: bool = False,
+        timeout: Optional[float] = None,
+        fail_fast: bool = False,
+    ) -> str:
+        """Coloca na fila uma execução por entrada, agrupadas por um batch_id, e o retorna
+
+        Cada item é um job comum (no máximo `max_workers` simultâneos), acompanhado por
+        storage.get_batch_executions(batch_id). Com `fail_fast`, a primeira falha cancela
+        os itens do lote que ainda aguardam na fila.
+        """
+        if crew_name not in self.crew_manager.list_crew_names():
+            raise ValueError(f"Crew '{crew_name}' não encontrada")
+        batch_id = new_batch_id()
+        for inputs in inputs_list:
+            self._enqueue(crew_name, inputs, evaluate, timeout, batch_id, fail_fast)
+        print(f"📥 Lote {batch_id}: {len(inputs_list)} execução(ões) da crew '{crew_name}' enviadas para a fila")
+        return batch_id
+
+    def cancel_batch(self, batch_id: str) -> int:
+        """Cancela os itens de um lote ainda na fila ou em execução; retorna quantos foram cancelados"""
+        executions = self.storage.get_batch_executions(batch_id, include_result=False)
+        active = [execution["id"] for execution in executions if execution["status"] in ACTIVE_STATUSES]
+        return sum(1 for job_id in active if self.cancel(job_id))
+
+    def _enqueue(
+        self,
+        crew_name: str,
+        inputs: Optional[Dict],
+        evaluate: bool,
+        timeout: Optional[float],
+        batch_id: Optional[str] = None,
+        fail_fast: bool = False,
+    ) -> int:
+        topic = (inputs or {}).get("topic", "Execução sem tópico")
+        job_id = self.storage.save_execution(crew_name, topic, datetime.now(), status="queued", batch_id=batch_id)
+        with self._lock:
+            future = self._executor.submit(
+                self._run, job_id, crew_name, inputs, evaluate, timeout, batch_id if fail_fast else None
+            )
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def resume(self, job_id: int) -> bool:
+        """Retoma em segundo plano uma execução que falhou (só as tarefas não concluídas)"""
+        job = self.status(job_id)
+        if job is None or not job["done"] or job["status"] == "completed":
+            return False
+        with self._lock:
+            if job_id in self._jobs:
+                return False
+            future = self._executor.submit(self._resume, job_id)
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        print(f"🔁 Execução #{job_id} enviada para retomada")
+        return True
+
+    def _resume(self, job_id: int) -> Optional[str]:
+        try:
+            return self.crew_manager.resume_execution(job_id)
+        except Exception as e:
+            print(f"❌ Erro ao retomar a execução #{job_id}: {e}")
+            self._finish_with_error(job_id, str(e))
+            return None
+
+    def _forget(self, job_id: int):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _run(
+        self,
+        job_id: int,
+        crew_name: str,
+        inputs: Optional[Dict],
+        evaluate: bool,
+        timeout: Optional[float],
+        fail_fast_batch: Optional[str] = None,
+    ) -> Optional[str]:
+        """Executa o job em um worker; o resultado e o estado final são gravados pelo CrewManager
+
+        Se o job falhar e `fail_fast_batch` for o lote dele, os itens do lote ainda na fila
+        são cancelados ao sair dela.
+        """
+        with self._lock:
+            stopped = fail_fast_batch in self._stopped_batches
+        if stopped:
+            self.storage.update_execution_result(
+                job_id, "", datetime.now(), "0:00:00", "cancelled", "Lote interrompido após falha"
+            )
+            return None
+        if not self.storage.start_execution(job_id, datetime.now()):
+            return None  # cancelado enquanto aguardava na fila
+
+        runner = self.crew_manager.execute_crew if evaluate else self.crew_manager.execute_crew_safe
+        try:
+            result = runner(crew_name, inputs, execution_id=job_id, timeout=timeout)
+        except Exception as e:
+            print(f"❌ Erro na execução #{job_id}: {e}")
+            result = None
+            self._finish_with_error(job_id, str(e))
+
+        # Saídas antecipadas (ex: crew sem agentes) não gravam estado final
+        if result is None:
+            self._finish_with_error(job_id, "Execução encerrada sem resultado")
+            if fail_fast_batch is not None:
+                with self._lock:
+                    self._stopped_batches.add(fail_fast_batch)
+        return result
+
+    def _finish_with_error(self, job_id: int, message: str):
+        job = self.status(job_id)
+        if job is not None and job["status"] in ACTIVE_STATUSES:
+            self.storage.update_execution_result(job_id, "", datetime.now(), "0:00:00", "error", message)
+
+    def status(self, job_id: int) -> Optional[Dict]:
+        """Estado persistido do job (None se não existir)"""
+        details = self.storage.get_execution_details(job_id, include_result=False)
+        if details is None:
+            return None
+        job = {
+            key: details.get(key)
+            for key in (
+                "crew_name",
+                "topic",
+                "status",
+                "start_time",
+                "end_time",
+                "duration",
+                "error_message",
+                "result_size",
+            )
+        }
+        job["job_id"] = job_id
+        job["done"] = job["status"] not in ACTIVE_STATUSES
+        return job
+
+    def result(self, job_id: int, timeout: Optional[float] = None) -> Optional[str]:
+        """Resultado do job, aguardando até `timeout` segundos se ainda estiver em andamento
+
+        Lança TimeoutError se o job não terminar a tempo.
+        """
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is not None and not future.cancelled():
+            future.result(timeout)
+        details = self.storage.get_execution_details(job_id)
+        return details["result"] if details else None
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancela um job na fila ou pede a interrupção de um job em execução
+
+        A interrupção é cooperativa: a crew para no próximo passo de um agente e o job
+        termina como "cancelled", mantendo as saídas das tarefas já concluídas.
+        """
+        if self._cancel_queued(job_id):
+            return True
+        with self._lock:
+            running = job_id in self._jobs
+        return running and self.crew_manager.cancel_execution(job_id)
+
+    def _cancel_queued(self, job_id: int) -> bool:
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None or not future.cancel():
+            return False
+        self.storage.update_execution_result(
+            job_id, "", datetime.now(), "0:00:00", "cancelled", "Cancelada antes de iniciar"
+        )
+        print(f"🛑 Execução #{job_id} cancelada")
+        return True
+
+    def active_jobs(self) -> List[int]:
+        """Jobs deste processo ainda na fila ou em execução"""
+        with self._lock:
+            return sorted(self._jobs)
+
+    def shutdown(self, wait: bool = True):
+        """Cancela os jobs na fila e encerra o pool (aguardando os em execução se `wait`)"""
+        for job_id in self.active_jobs():
+            self._cancel_queued(job_id)
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,57 @@
+"""
+Tarefas paralelas (async_execution) que sempre entregam o resultado ao kickoff
+
+No crewAI 0.130, uma tarefa assíncrona roda em uma thread própria que só conclui o
+Future em caso de sucesso: um erro do modelo ou de uma ferramenta, ou a interrupção
+de prazo/cancelamento (ExecutionCancelled), encerra a thread sem avisar o Future, e
+o kickoff espera para sempre no ponto de junção. As instâncias de execução trocam a
+classe de suas tarefas assíncronas por ParallelSafeTask, que entrega a exceção ao
+Future; o kickoff a relança e a execução termina como falha ou interrupção.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Iterable, Optional
+
+from crewai import Task
+
+
+class ParallelSafeTask(Task):
+    """Task do crewAI cuja execução assíncrona conclui o Future também em caso de exceção
+
+    A thread da execução fica em `_thread` (atributo privado do próprio Task), para que
+    as tarefas irmãs de uma que falhou possam ser aguardadas (ver wait_parallel_tasks).
+    """
+
+    def execute_async(self, agent=None, context: Optional[str] = None, tools=None) -> Future:
+        future: Future = Future()
+        self._thread = threading.Thread(
+            daemon=True, target=self._execute_task_async, args=(agent, context, tools, future)
+        )
+        self._thread.start()
+        return future
+
+    def _execute_task_async(self, agent, context: Optional[str], tools, future: Future) -> None:
+        try:
+            future.set_result(self._execute_core(agent, context, tools))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+def guard_parallel_tasks(tasks: Iterable[Task]):
+    """Troca a classe das tarefas assíncronas por ParallelSafeTask
+
+    Os campos e atributos privados são os mesmos do Task; só o comportamento da execução
+    assíncrona muda. Cópias da tarefa (Task.copy) mantêm a classe.
+    """
+    for task in tasks:
+        if getattr(task, "async_execution", False) and type(task) is Task:
+            task.__class__ = ParallelSafeTask
+
+
+def wait_parallel_tasks(tasks: Iterable[Task]):
+    """Aguarda as threads de tarefas assíncronas ainda em andamento"""
+    for task in tasks:
+        thread = getattr(task, "_thread", None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
@@ -0,0 +1,231 @@
+"""
+Pipelines de crews: cadeias como pesquisa → análise → redação executadas em lote
+
+Cada etapa é uma crew com seus próprios workers, ligada à etapa seguinte por uma
+fila limitada. Enquanto a etapa 2 processa o item k, a etapa 1 já trabalha no item
+k+1; quando a fila de uma etapa enche, a anterior aguarda (backpressure). O tempo
+total de um lote tende ao da etapa mais lenta, e não à soma das etapas.
+
+Cada execução de etapa é registrada como uma execução normal, agrupada pelo
+`batch_id` do pipeline (ver get_batch_executions).
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.crews.execution_engine import new_batch_id
+from app.utils.rollups import ACTIVE_STATUSES
+
+_STOP = object()  # sinaliza aos workers de uma etapa que não há mais itens
+
+
+def default_handoff(inputs: Dict, previous_result: str) -> Dict:
+    """Entradas da etapa seguinte: as entradas originais e o resultado anterior em `previous_result`"""
+    return {**inputs, "previous_result": previous_result}
+
+
+class PipelineStage:
+    """Uma etapa do pipeline: a crew, quantas execuções simultâneas e o tamanho da fila de entrada
+
+    `handoff(entradas_originais, resultado_anterior)` monta as entradas da etapa (as
+    entradas do kickoff, que preenchem campos como `{previous_result}`). O resultado
+    anterior também chega a todas as tarefas da etapa como contexto.
+    """
+
+    def __init__(
+        self,
+        crew_name: str,
+        concurrency: int = 1,
+        queue_size: Optional[int] = None,
+        handoff: Callable[[Dict, str], Dict] = default_handoff,
+    ):
+        self.crew_name = crew_name
+        self.concurrency = concurrency
+        self.queue_size = queue_size or 2 * concurrency
+        self.handoff = handoff
+
+
+class StageMetrics:
+    """Latências e ocupação de uma etapa durante um lote"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.completed = 0
+        self.failed = 0
+        self.latencies: List[float] = []
+        self.queue_waits: List[float] = []  # tempo de espera na fila de entrada
+        self.max_queue_depth = 0
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "stage": self.label,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": round(latencies[-1], 3) if latencies else None,
+            "queue_wait_avg": round(sum(self.queue_waits) / len(self.queue_waits), 3) if self.queue_waits else None,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class CrewPipeline:
+    """Encadeia crews de um CrewManager em etapas ligadas por filas limitadas"""
+
+    def __init__(self, crew_manager, stages: List[PipelineStage]):
+        if not stages:
+            raise ValueError("O pipeline precisa de ao menos uma etapa")
+        known = set(crew_manager.list_crew_names())
+        for stage in stages:
+            if stage.crew_name not in known:
+                raise ValueError(f"Crew '{stage.crew_name}' não encontrada")
+            if stage.concurrency < 1:
+                raise ValueError(f"Concorrência inválida para a etapa '{stage.crew_name}'")
+        self.crew_manager = crew_manager
+        self.storage = crew_manager.db_manager
+        self.stages = stages
+
+    def run(self, inputs_list: List[Dict], progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """Processa cada entrada por todas as etapas e retorna itens, métricas e tempo total
+
+        Um item cuja etapa falha não segue para as próximas. `progress(concluídos, total)`
+        é chamado na thread de quem chamou, sempre que um item sai do pipeline.
+        """
+        batch_id = new_batch_id("pipeline")
+        labels = [f"{index + 1}. {stage.crew_name}" for index, stage in enumerate(self.stages)]
+        metrics = [StageMetrics(label) for label in labels]
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        finished: "queue.Queue[Dict]" = queue.Queue()
+        items = [
+            {"index": index, "inputs": dict(inputs), "status": "pending", "stages": []}
+            for index, inputs in enumerate(inputs_list)
+        ]
+        remaining_workers = [stage.concurrency for stage in self.stages]
+        lock = threading.Lock()
+        started = time.monotonic()
+
+        def enqueue(position: int, item: Dict, stage_inputs: Dict, previous_result: Optional[str]):
+            # bloqueia se a etapa estiver cheia
+            queues[position].put((item, stage_inputs, previous_result, time.monotonic()))
+            with lock:
+                metrics[position].max_queue_depth = max(metrics[position].max_queue_depth, queues[position].qsize())
+
+        def process(position: int, item: Dict, stage_inputs: Dict, previous_result: Optional[str], queued_at: float):
+            """Executa a etapa para o item e o repassa à seguinte; sem repasse, o item sai do pipeline"""
+            result = None
+            try:
+                queue_wait = time.monotonic() - queued_at
+                result, execution_id, latency = self._run_stage(
+                    self.stages[position], stage_inputs, previous_result, batch_id, labels[position]
+                )
+                with lock:
+                    stage_metrics = metrics[position]
+                    stage_metrics.queue_waits.append(queue_wait)
+                    stage_metrics.latencies.append(latency)
+                    item["stages"].append({"stage": labels[position], "execution_id": execution_id, "latency": latency})
+
+                if result is not None and position + 1 < len(self.stages):
+                    next_inputs = self.stages[position + 1].handoff(item["inputs"], result)
+                    enqueue(position + 1, item, next_inputs, result)
+                    with lock:
+                        metrics[position].completed += 1
+                    return
+            except Exception as e:
+                print(f"❌ Erro no item {item['index']} da etapa '{labels[position]}': {e}")
+                result = None
+
+            with lock:
+                if result is None:
+                    metrics[position].failed += 1
+                    item["status"] = "error"
+                    item["failed_stage"] = labels[position]
+                else:
+                    metrics[position].completed += 1
+                    item["status"] = "completed"
+                    item["result"] = result
+            finished.put(item)
+
+        def worker(position: int):
+            try:
+                while True:
+                    entry = queues[position].get()
+                    if entry is _STOP:
+                        break
+                    process(position, *entry)
+            finally:
+                # O último worker da etapa encerra os workers da etapa seguinte
+                with lock:
+                    remaining_workers[position] -= 1
+                    last = remaining_workers[position] == 0
+                if last and position + 1 < len(self.stages):
+                    for _ in range(self.stages[position + 1].concurrency):
+                        queues[position + 1].put(_STOP)
+
+        threads = [
+            threading.Thread(target=worker, args=(position,), name=f"crew-pipeline-{position + 1}", daemon=True)
+            for position, stage in enumerate(self.stages)
+            for _ in range(stage.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        def feed():
+            for item in items:
+                enqueue(0, item, item["inputs"], None)
+            for _ in range(self.stages[0].concurrency):
+                queues[0].put(_STOP)
+
+        threading.Thread(target=feed, name="crew-pipeline-feed", daemon=True).start()
+
+        for done in range(1, len(items) + 1):
+            finished.get()
+            if progress is not None:
+                progress(done, len(items))
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.monotonic() - started
+        completed = sum(1 for item in items if item["status"] == "completed")
+        print(f"✅ Pipeline {batch_id}: {completed}/{len(items)} item(ns) concluído(s) em {elapsed:.1f}s")
+        return {
+            "batch_id": batch_id,
+            "items": items,
+            "metrics": [stage_metrics.summary() for stage_metrics in metrics],
+            "elapsed": round(elapsed, 3),
+        }
+
+    def _run_stage(
+        self, stage: PipelineStage, inputs: Dict, previous_result: Optional[str], batch_id: str, label: str
+    ):
+        """Executa a crew da etapa para um item: (resultado ou None, id da execução, latência em segundos)"""
+        started = time.monotonic()
+        topic = inputs.get("topic", "Execução sem tópico")
+        execution_id = self.storage.save_execution(stage.crew_name, topic, datetime.now(), batch_id=batch_id)
+        try:
+            result = self.crew_manager.execute_crew_safe(
+                stage.crew_name,
+                inputs,
+                execution_id=execution_id,
+                context=[previous_result] if previous_result is not None else None,
+            )
+        except Exception as e:
+            print(f"❌ Erro na etapa '{label}' (execução #{execution_id}): {e}")
+            result = None
+        if result is None:
+            details = self.storage.get_execution_details(execution_id, include_result=False)
+            if details is not None and details["status"] in ACTIVE_STATUSES:
+                self.storage.update_execution_result(
+                    execution_id, "", datetime.now(), "0:00:00", "error", "Execução encerrada sem resultado"
+                )
+        return result, execution_id, time.monotonic() - started
@@ -0,0 +1,136 @@
+"""
+Planejamento das tarefas de uma crew como grafo de dependências (DAG)
+
+No `tasks.yaml`, uma tarefa declara de quais outras depende com `depends_on`
+(ou `dependencies`, ou `context` em forma de lista, como no crewAI). Tarefas sem
+dependência entre si formam um mesmo nível e podem rodar em paralelo; o nível
+seguinte só começa depois que o anterior termina.
+
+O plano respeita as regras de tarefas assíncronas do crewAI: uma tarefa síncrona
+aguarda todas as assíncronas pendentes (é o ponto de junção entre níveis) e a crew
+não pode terminar com mais de uma tarefa assíncrona.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEPENDENCY_KEYS = ("depends_on", "dependencies", "context")
+
+
+class TaskGraphError(ValueError):
+    """Dependências inválidas (ciclo ou tarefa repetida)"""
+
+
+def task_dependencies(task_config: Optional[Dict]) -> List[str]:
+    """Tarefas das quais uma configuração de tarefa depende
+
+    `context` só é considerado quando é uma lista: em texto livre, é apenas contexto
+    descritivo para o agente.
+    """
+    dependencies: List[str] = []
+    for key in DEPENDENCY_KEYS:
+        value = (task_config or {}).get(key)
+        if isinstance(value, str) and key != "context":
+            value = [item.strip() for item in value.split(",")]
+        if isinstance(value, list):
+            dependencies.extend(str(item).strip() for item in value if str(item).strip())
+    return list(dict.fromkeys(dependencies))
+
+
+class TaskGraph:
+    """DAG das tarefas de uma crew: níveis paralelos, plano de execução e caminho crítico"""
+
+    def __init__(self, task_types: List[str], dependencies: Dict[str, Iterable[str]]):
+        duplicated = sorted({task for task in task_types if task_types.count(task) > 1})
+        if duplicated:
+            raise TaskGraphError(f"Tarefas repetidas na crew: {', '.join(duplicated)}")
+        self.task_types = list(task_types)
+        # Só contam dependências entre tarefas da própria crew
+        self.dependencies = {
+            task: [dependency for dependency in dependencies.get(task, []) if dependency in task_types]
+            for task in task_types
+        }
+        self.levels = self._levels()
+
+    @classmethod
+    def from_configs(cls, task_types: List[str], task_configs: Dict[str, Dict]) -> "TaskGraph":
+        """Monta o grafo a partir das configurações do tasks.yaml"""
+        dependencies = {task: task_dependencies(task_configs.get(task)) for task in task_types}
+        for task, required in dependencies.items():
+            missing = [dependency for dependency in required if dependency not in task_types]
+            if missing:
+                print(f"⚠️ Tarefa '{task}' depende de tarefas fora da crew (ignoradas): {', '.join(missing)}")
+        return cls(task_types, dependencies)
+
+    def _levels(self) -> List[List[str]]:
+        """Ordenação topológica em níveis (ordem original preservada dentro de cada nível)"""
+        remaining = {task: set(required) for task, required in self.dependencies.items()}
+        levels = []
+        while remaining:
+            ready = [task for task in self.task_types if task in remaining and not remaining[task]]
+            if not ready:
+                cycle = " → ".join(self._find_cycle(remaining))
+                raise TaskGraphError(f"Ciclo nas dependências das tarefas (cada uma depende da seguinte): {cycle}")
+            levels.append(ready)
+            for task in ready:
+                del remaining[task]
+            for required in remaining.values():
+                required.difference_update(ready)
+        return levels
+
+    @staticmethod
+    def _find_cycle(remaining: Dict[str, set]) -> List[str]:
+        path: List[str] = []
+        task = next(iter(remaining))
+        while task not in path:
+            path.append(task)
+            task = sorted(remaining[task])[0]
+        return path[path.index(task) :] + [task]
+
+    @property
+    def order(self) -> List[str]:
+        """Ordem de execução: nível a nível"""
+        return [task for level in self.levels for task in level]
+
+    def plan(self) -> List[Tuple[str, bool]]:
+        """[(tarefa, assíncrona)] na ordem de execução
+
+        Tarefas de um nível com mais de uma tarefa rodam de forma assíncrona. Se o nível
+        anterior deixou tarefas assíncronas pendentes, a primeira tarefa do nível é
+        síncrona (junção); no último nível, no máximo uma assíncrona pode ficar no final.
+        """
+        plan: List[Tuple[str, bool]] = []
+        pending_async = False
+        for index, level in enumerate(self.levels):
+            if len(level) == 1:
+                plan.append((level[0], False))
+                pending_async = False
+                continue
+
+            flags = [True] * len(level)
+            if pending_async:
+                flags[0] = False
+            if index == len(self.levels) - 1 and all(flags[-2:]):
+                flags[-1] = False
+            plan.extend(zip(level, flags))
+            last_sync = max((position for position, is_async in enumerate(flags) if not is_async), default=-1)
+            pending_async = any(flags[last_sync + 1 :])
+        return plan
+
+    def critical_path(self, durations: Dict[str, Optional[float]]) -> Tuple[List[str], float]:
+        """Cadeia de dependências com maior duração somada: (tarefas, duração total)"""
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for task in self.order:
+            parent = max(self.dependencies[task], key=lambda dependency: finish[dependency], default=None)
+            finish[task] = (finish[parent] if parent else 0.0) + (durations.get(task) or 0.0)
+            previous[task] = parent
+        if not finish:
+            return [], 0.0
+
+        task: Optional[str] = max(self.order, key=lambda name: finish[name])
+        total = finish[task]
+        path = []
+        while task is not None:
+            path.append(task)
+            task = previous[task]
+        return path[::-1], total
@@ -0,0 +1,113 @@
+"""
+Métricas por tarefa de uma execução: tempos, passos dos agentes e ferramentas
+
+Os callbacks de passo (step_callback) e de tarefa do crewAI alimentam um
+TaskMetricsRecorder por execução. Ao fim de cada tarefa, o recorder produz as
+métricas gravadas junto com a saída em execution_results (pela fila de escrita em
+lote do banco). As funções de linha do tempo montam o gráfico de Gantt da execução
+e mostram qual agente concentrou o tempo.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _epoch_ms(value) -> Optional[int]:
+    """datetime (horário local, como no crewAI) em epoch ms"""
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return None
+
+
+def step_tool_names(step) -> List[str]:
+    """Ferramentas chamadas em um passo do agente
+
+    O crewAI envia um AgentAction (com `tool`) ou, em versões antigas, uma lista de
+    pares (ação, observação).
+    """
+    if isinstance(step, list):
+        return [name for item in step for name in step_tool_names(item[0] if isinstance(item, tuple) else item)]
+    tool = getattr(step, "tool", None)
+    return [str(tool)] if tool else []
+
+
+class TaskMetricsRecorder:
+    """Acumula os passos de cada agente e fecha as métricas de cada tarefa concluída
+
+    Os passos são atribuídos à próxima tarefa concluída do mesmo agente. Quando a
+    tarefa não informa o próprio início (Task.start_time), ela começa no fim da
+    tarefa anterior, como no processo sequencial do crewAI.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict] = {}  # papel do agente → {"steps", "tools"}
+        self._last_end_ts = _now_ms()
+
+    def record_step(self, agent_role: str, step) -> None:
+        with self._lock:
+            state = self._agents.setdefault(agent_role, {"steps": 0, "tools": {}})
+            state["steps"] += 1
+            for name in step_tool_names(step):
+                state["tools"][name] = state["tools"].get(name, 0) + 1
+
+    def finish_task(self, task, output) -> Dict:
+        """Métricas da tarefa que acabou de terminar (chaves de TASK_METRIC_COLUMNS)"""
+        end_ts = _epoch_ms(getattr(task, "end_time", None)) or _now_ms()
+        start_ts = _epoch_ms(getattr(task, "start_time", None))
+        agent_role = str(getattr(output, "agent", "") or "")
+        with self._lock:
+            state = self._agents.pop(agent_role, None) or {"steps": 0, "tools": {}}
+            if start_ts is None:
+                start_ts = min(self._last_end_ts, end_ts)
+            self._last_end_ts = max(self._last_end_ts, end_ts)
+        return {
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+            "duration_ms": end_ts - start_ts,
+            "output_chars": len(str(getattr(output, "raw", "") or "")),
+            "step_count": state["steps"],
+            "tool_calls": sum(state["tools"].values()),
+            "tool_names": state["tools"],
+        }
+
+
+def timeline_rows(task_results: List[Dict]) -> List[Dict]:
+    """Tarefas com tempos registrados, em ordem de início, prontas para um gráfico de Gantt"""
+    rows = []
+    for task in task_results:
+        if task.get("start_ts") is None or task.get("end_ts") is None:
+            continue
+        rows.append(
+            {
+                "agent": task.get("agent_name") or "—",
+                "task": (task.get("task_description") or "")[:60],
+                "start": datetime.fromtimestamp(task["start_ts"] / 1000),
+                "end": datetime.fromtimestamp(task["end_ts"] / 1000),
+                "duration_s": round((task.get("duration_ms") or 0) / 1000, 1),
+                "steps": task.get("step_count") or 0,
+                "tool_calls": task.get("tool_calls") or 0,
+            }
+        )
+    return sorted(rows, key=lambda row: row["start"])
+
+
+def agent_busy_time(task_results: List[Dict]) -> List[Tuple[str, int, float]]:
+    """(agente, duração somada em ms, fração do total), do agente mais ocupado ao menos"""
+    busy: Dict[str, int] = {}
+    for task in task_results:
+        if task.get("duration_ms") is None:
+            continue
+        agent = task.get("agent_name") or "—"
+        busy[agent] = busy.get(agent, 0) + task["duration_ms"]
+    total = sum(busy.values())
+    return [
+        (agent, duration, duration / total if total else 0.0)
+        for agent, duration in sorted(busy.items(), key=lambda item: item[1], reverse=True)
+    ]
@@ -9,10 +9,7 @@ import streamlit as st
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
 
-from app.agents.agent_manager import AgentManager
-from app.crews.crew_manager import CrewManager
-from app.crews.task_manager import TaskManager
-from app.utils.tools_manager import ToolsManager
+from app.utils.managers import get_shared_managers
 
 # Importar páginas
 from app.pages.dashboard import show_dashboard
@@ -22,6 +19,7 @@ from app.pages.tools import show_tools_tab
 from app.pages.crews import show_crews_tab
 from app.pages.whatsapp import show_whatsapp_tab
 from app.pages.execution import show_execution_tab
+from app.pages.search import show_search_tab
 from app.pages.help import main as show_help_tab
 from app.pages.workflow_builder import show_workflow_builder
 from app.pages.about import show_about
@@ -83,21 +81,19 @@ st.set_page_config(
 
 
 def inicializar_gerenciadores():
-    """Inicializa os gerenciadores no session_state se não existirem."""
-    if "agent_manager" not in st.session_state:
-        st.session_state.agent_manager = AgentManager()
-    if "task_manager" not in st.session_state:
-        st.session_state.task_manager = TaskManager()
-    if "tools_manager" not in st.session_state:
-        st.session_state.tools_manager = ToolsManager()
-
-    # IMPORTANTE: Configurar o ToolsManager no AgentManager ANTES de criar o CrewManager
-    st.session_state.agent_manager.set_tools_manager(st.session_state.tools_manager)
-
-    if "crew_manager" not in st.session_state:
-        st.session_state.crew_manager = CrewManager(
-            st.session_state.agent_manager, st.session_state.task_manager
-        )
+    """Associa à sessão os gerenciadores compartilhados pelo processo.
+
+    Os gerenciadores são construídos uma única vez (na primeira sessão) e
+    compartilhados; a sessão guarda apenas referências e seu estado de interface.
+    """
+    managers = get_shared_managers()
+    if st.session_state.get("shared_managers") is not managers:
+        st.session_state.shared_managers = managers
+        st.session_state.agent_manager = managers.agent_manager
+        st.session_state.task_manager = managers.task_manager
+        st.session_state.tools_manager = managers.tools_manager
+        st.session_state.crew_manager = managers.crew_manager
+        st.session_state.execution_engine = managers.execution_engine
 
 
 def main():
@@ -150,7 +146,7 @@ def main():
         # Botão para recarregar configurações
         if st.button("🔄 Recarregar Configurações"):
             try:
-                if st.session_state.crew_manager.reload_configs():
+                if st.session_state.shared_managers.reload_configs():
                     st.success("Configurações recarregadas!")
                 else:
                     st.error("Erro ao recarregar configurações")
@@ -184,6 +180,7 @@ def main():
         ],
         "📊 Execução": [
             st.Page(show_execution_tab, title="Execução", icon="📊"),
+            st.Page(show_search_tab, title="Busca no Histórico", icon="🔍"),
         ],
         "📱 Integrações": [
             st.Page(show_whatsapp_tab, title="WhatsApp", icon="📱"),
@@ -52,6 +52,13 @@ ROLE_ICONS = {
     "crewai_evaluator": "📈",
 }
 
+# Limites por agente do agents.yaml: (chave, rótulo, ajuda)
+AGENT_LIMIT_FIELDS = [
+    ("max_iter", "Máx. iterações", "Iterações de raciocínio por tarefa antes de entregar a melhor resposta."),
+    ("max_rpm", "Máx. requisições/min", "Requisições por minuto ao modelo."),
+    ("max_execution_time", "Tempo máx. (s)", "Segundos por tarefa; evita ciclos longos de delegação."),
+]
+
 # Nomes amigáveis em português brasileiro para os agentes
 NOMES_AGENTES = {
     # Equipe Principal de Engenharia
@@ -170,6 +177,8 @@ def show_agents_tab():
     st.info("Gerencie os seus agentes: edite, exclua ou crie novos agentes para sua equipe de engenharia civil.")
 
     agent_manager = st.session_state.agent_manager
+    # O AgentManager é compartilhado pelo processo: alterações usam o mesmo lock da construção das crews
+    managers_lock = st.session_state.shared_managers.lock
 
     # Estado de edição/criação/exclusão
     if "editing_agent" not in st.session_state:
@@ -181,10 +190,11 @@ def show_agents_tab():
 
     # Forçar recarregamento do agent_manager após edição/exclusão/criação
     if st.session_state.get('force_reload_agents', False):
-        if hasattr(agent_manager, 'reload_from_file'):
-            agent_manager.reload_from_file()
-        elif hasattr(agent_manager, 'load_agents_from_file'):
-            agent_manager.load_agents_from_file()
+        with managers_lock:
+            if hasattr(agent_manager, 'reload_from_file'):
+                agent_manager.reload_from_file()
+            elif hasattr(agent_manager, 'load_agents_from_file'):
+                agent_manager.load_agents_from_file()
         st.session_state.force_reload_agents = False
 
     # Agrupamento de agentes por categoria para visualização em 4 colunas
@@ -248,7 +258,8 @@ def show_agents_tab():
         with col1:
             if st.button("Confirmar Exclusão", key="confirm_delete"):
                 try:
-                    agent_manager.delete_agent(agent_to_delete)
+                    with managers_lock:
+                        agent_manager.delete_agent(agent_to_delete)
                     st.success(f"Agente '{nome_amigavel}' excluído com sucesso!")
                 except Exception as e:
                     st.error(f"Erro ao excluir agente: {e}")
@@ -289,6 +300,14 @@ def show_agents_tab():
                 "Verbose", value=agent_data.get("verbose", True), help="Habilitar logs detalhados para o agente"
             )
             allow_delegation = st.checkbox("Permitir delegação", value=agent_data.get("allow_delegation", False))
+            st.markdown("**Limites do agente** (0 = sem limite)")
+            limit_cols = st.columns(3)
+            limits = {}
+            for col, (key, label, help_text) in zip(limit_cols, AGENT_LIMIT_FIELDS):
+                with col:
+                    limits[key] = st.number_input(
+                        label, min_value=0, value=int(agent_data.get(key) or 0), step=1, help=help_text
+                    )
             submitted = st.form_submit_button("Salvar")
             if submitted:
                 try:
@@ -300,18 +319,25 @@ def show_agents_tab():
                         st.error("Nome do agente é obrigatório!")
                         return
 
-                    config_ok = agent_manager.update_agent_config(
-                        agent_type,
-                        {
-                            "name": name,
-                            "role": role,
-                            "goal": goal,
-                            "backstory": backstory,
-                            "tools": selected_tools,
-                            "verbose": verbose,
-                            "allow_delegation": allow_delegation,
-                        },
-                    )
+                    with managers_lock:
+                        config_ok = agent_manager.update_agent_config(
+                            agent_type,
+                            {
+                                "name": name,
+                                "role": role,
+                                "goal": goal,
+                                "backstory": backstory,
+                                "tools": selected_tools,
+                                "verbose": verbose,
+                                "allow_delegation": allow_delegation,
+                                # Limites zerados só são gravados para apagar um limite existente
+                                **{
+                                    key: int(value) or None
+                                    for key, value in limits.items()
+                                    if value or agent_data.get(key) is not None
+                                },
+                            },
+                        )
                     if config_ok:
                         st.success(f"Agente '{name}' {'atualizado' if edit_key else 'criado'} com sucesso!")
                         st.session_state.editing_agent = None
@@ -457,28 +457,36 @@ def show_crews_tab():
     st.subheader("📋 Crews Existentes")
 
     try:
-        crews = crew_manager.get_all_crews()
+        # Apenas os descritores: a lista não constrói as crews que ainda não foram usadas
+        crew_names = crew_manager.list_crew_names()
 
-        if not crews:
+        if not crew_names:
             st.info("Nenhuma crew foi criada ainda. Crie sua primeira crew acima!")
         else:
-            for crew_name, crew in crews.items():
+            for crew_name in crew_names:
                 crew_info = crew_manager.get_crew_info(crew_name)
+                crew = crew_manager.crews.get(crew_name)
 
                 with st.expander(f"👥 {crew_name}", expanded=False):
                     if crew_info:
                         st.markdown(f"**Descrição:** {crew_info.get('description', 'Sem descrição')}")
-                        st.markdown(f"**Agentes:** {len(crew.agents)}")
-                        st.markdown(f"**Tarefas:** {len(crew.tasks)}")
+                        st.markdown(f"**Agentes:** {len(crew_info.get('agent_types', []))}")
+                        if crew is not None:
+                            st.markdown(f"**Tarefas:** {len(crew.tasks)}")
+                        else:
+                            st.caption("💤 Crew ainda não construída (construída no primeiro uso)")
 
                         # Mostrar agentes da crew
                         st.markdown("**Agentes na Crew:**")
-                        for i, agent in enumerate(crew.agents, 1):
-                            agent_role = getattr(agent, "role", "Agente")
+                        if crew is not None:
+                            agent_roles = [getattr(agent, "role", "Agente") for agent in crew.agents]
+                        else:
+                            agent_roles = crew_info.get("agent_types", [])
+                        for i, agent_role in enumerate(agent_roles, 1):
                             st.markdown(f"{i}. {agent_role}")
 
                         # Mostrar tarefas da crew
-                        if crew.tasks:
+                        if crew is not None and crew.tasks:
                             st.markdown("**Tarefas da Crew:**")
                             for i, task in enumerate(crew.tasks, 1):
                                 task_desc = getattr(task, "description", "Tarefa")
@@ -4,9 +4,16 @@ Dashboard Principal da Aplicação - Versão Profissional
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from app.utils.backup import get_backup_service
+from app.utils.database import DatabaseManager
+from app.utils.retention import RetentionPolicy, apply_retention, list_archives
+
+# Idade máxima (s) do snapshot usado pelas estatísticas do dashboard
+ANALYTICS_SNAPSHOT_MAX_AGE = 300
+
 
 def show_dashboard():
     """Dashboard principal da aplicação com layout profissional e acesso rápido."""
@@ -197,18 +204,68 @@ def show_dashboard():
             st.markdown("✅ Anthropic API configurada")
         else:
             st.markdown("⚠️ Anthropic API não configurada")
+
+    with st.expander("🗄️ Retenção do Histórico", expanded=False):
+        db_manager = crew_manager.db_manager
+        policy = RetentionPolicy.load()
+        archives = list_archives(db_manager.archive_dir)
+        st.markdown(
+            f"Execuções com mais de **{policy.default_hot_days} dias** são movidas para arquivos mensais "
+            "(regras por crew em `app/config/retention.yaml`) e continuam disponíveis no histórico e na busca."
+        )
+        st.caption(f"Arquivos mensais: {len(archives)}" + (f" ({archives[-1][0]} a {archives[0][0]})" if archives else ""))
+        if st.button("Aplicar retenção agora", key="dashboard_apply_retention"):
+            with st.spinner("Arquivando execuções antigas..."):
+                report = apply_retention(db_manager, policy)
+            st.success(
+                f"✅ {sum(report['archived'].values())} execução(ões) arquivada(s) · "
+                f"{report['bytes_reclaimed'] / 1024:.1f} KB recuperados"
+            )
+
+    if isinstance(crew_manager.db_manager, DatabaseManager):
+        with st.expander("💾 Backups", expanded=False):
+            backup_service = get_backup_service(crew_manager.db_manager)
+            snapshots = backup_service.list_snapshots()
+            st.markdown(
+                f"Snapshots online em `{backup_service.snapshot_dir}` "
+                f"(mantidos os {backup_service.keep} mais recentes; criados sem bloquear as execuções)."
+            )
+            if snapshots:
+                st.caption(f"Último snapshot: {Path(snapshots[0]).name} · {len(snapshots)} disponível(is)")
+            if st.button("Criar snapshot agora", key="dashboard_create_snapshot"):
+                progress_bar = st.progress(0.0)
+
+                def _update_progress(status, remaining, total):
+                    progress_bar.progress((total - remaining) / total if total else 1.0)
+
+                path = backup_service.create_snapshot(progress=_update_progress)
+                st.success(f"✅ Snapshot criado: {Path(path).name}")
     
     st.markdown("---")
     
     # ===== ATIVIDADE RECENTE =====
     st.subheader("📜 Atividade Recente")
     
+    window_labels = {"24h": "Últimas 24h", "7d": "7 dias", "30d": "30 dias", "all": "Todo o histórico"}
+    window = st.radio(
+        "Período",
+        options=list(window_labels),
+        format_func=window_labels.get,
+        index=3,
+        horizontal=True,
+        key="dashboard_stats_window",
+    )
+
     try:
-        # Buscar estatísticas do banco de dados
-        stats = crew_manager.db_manager.get_statistics()
+        # Estatísticas lidas dos agregados incrementais de um snapshot somente leitura,
+        # sem disputar o banco com as gravações das execuções em andamento
+        stats_source = _analytics_storage(crew_manager.db_manager)
+        stats = stats_source.get_statistics_v2(window)
+        if stats_source is not crew_manager.db_manager:
+            st.caption(f"📸 Dados do snapshot de {datetime.fromtimestamp(os.path.getmtime(stats_source.db_path)):%d/%m %H:%M}")
         
         if stats["total_executions"] > 0:
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 st.metric("Total de Execuções", stats["total_executions"])
@@ -221,6 +278,33 @@ def show_dashboard():
                     st.metric("Crew Mais Usada", stats["most_executed_crew"])
                 else:
                     st.metric("Crew Mais Usada", "N/A")
+
+            with col4:
+                st.metric("Em Andamento", stats["running_executions"])
+
+            percentiles = stats["duration_percentiles_ms"]
+            if percentiles.get("p50") is not None:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Duração p50", _format_duration_ms(percentiles["p50"]))
+                col2.metric("Duração p95", _format_duration_ms(percentiles["p95"]))
+                col3.metric("Duração p99", _format_duration_ms(percentiles["p99"]))
+
+            if stats["per_crew"]:
+                per_crew_df = pd.DataFrame(
+                    [
+                        {
+                            "Crew": crew_name,
+                            "Execuções": crew_stats["total"],
+                            "Sucesso": crew_stats["completed"],
+                            "Falhas": crew_stats["failed"],
+                            "Duração Média": _format_duration_ms(crew_stats["avg_duration_ms"]),
+                        }
+                        for crew_name, crew_stats in sorted(
+                            stats["per_crew"].items(), key=lambda item: item[1]["total"], reverse=True
+                        )
+                    ]
+                )
+                st.dataframe(per_crew_df, use_container_width=True, hide_index=True)
             
             # Mostrar execuções recentes se disponível
             if "execution_history" in st.session_state and st.session_state.execution_history:
@@ -246,6 +330,16 @@ def show_dashboard():
     
     st.markdown("---")
     
+    # ===== CONSUMO DE TOKENS =====
+    _show_token_usage(crew_manager)
+    
+    st.markdown("---")
+    
+    # ===== CACHE DO LLM =====
+    _show_llm_cache(crew_manager)
+    
+    st.markdown("---")
+    
     # ===== FOOTER PROFISSIONAL =====
     st.markdown("""
     <div style="text-align: center; padding: 20px; background: #f8f9fa; border-radius: 10px; margin-top: 30px;">
@@ -257,6 +351,104 @@ def show_dashboard():
     """, unsafe_allow_html=True)
 
 
+def _show_token_usage(crew_manager):
+    """Tokens e custo estimado do mês (dias UTC) por crew, dia e modelo, com os orçamentos"""
+    st.subheader("💰 Consumo de Tokens")
+    try:
+        today = datetime.now(timezone.utc).date()
+        rows = crew_manager.db_manager.get_usage_summary(since=today.replace(day=1))
+    except Exception as e:
+        st.warning(f"⚠️ Não foi possível carregar o consumo: {e}")
+        return
+    if not rows:
+        st.info("Nenhum consumo de tokens registrado neste mês.")
+        return
+
+    usage_df = pd.DataFrame(rows)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Custo Hoje (US$)", f"{usage_df.loc[usage_df['day'] == today.isoformat(), 'cost_usd'].sum():.2f}")
+    col2.metric("Custo no Mês (US$)", f"{usage_df['cost_usd'].sum():.2f}")
+    col3.metric("Tokens no Mês", f"{int(usage_df['total_tokens'].sum()):,}".replace(",", "."))
+
+    per_crew = []
+    for crew_name, crew_rows in usage_df.groupby("crew_name"):
+        budget = crew_manager.cost_policy.budget(crew_name)
+        per_crew.append(
+            {
+                "Crew": crew_name,
+                "Hoje (US$)": round(crew_rows.loc[crew_rows["day"] == today.isoformat(), "cost_usd"].sum(), 4),
+                "Mês (US$)": round(crew_rows["cost_usd"].sum(), 4),
+                "Orçamento Diário": budget["daily_usd"] if budget["daily_usd"] is not None else "—",
+                "Orçamento Mensal": budget["monthly_usd"] if budget["monthly_usd"] is not None else "—",
+                "Ao Exceder": budget["on_exceed"],
+            }
+        )
+    st.dataframe(pd.DataFrame(per_crew), use_container_width=True, hide_index=True)
+
+    with st.expander("📅 Consumo por dia e modelo", expanded=False):
+        st.dataframe(
+            usage_df.rename(
+                columns={
+                    "day": "Dia (UTC)",
+                    "crew_name": "Crew",
+                    "model": "Modelo",
+                    "prompt_tokens": "Tokens de Prompt",
+                    "completion_tokens": "Tokens de Resposta",
+                    "total_tokens": "Total de Tokens",
+                    "cost_usd": "Custo (US$)",
+                }
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def _show_llm_cache(crew_manager):
+    """Acertos e falhas do cache de respostas do LLM (neste processo) e tamanho do cache"""
+    st.subheader("🧠 Cache de Respostas do LLM")
+    llm_cache = getattr(crew_manager, "llm_cache", None)
+    if llm_cache is None:
+        st.info("Cache desligado. Ative-o por crew ou agente em `app/config/llm_cache.yaml`.")
+        return
+    try:
+        stats = llm_cache.stats()
+    except Exception as e:
+        st.warning(f"⚠️ Não foi possível ler o cache: {e}")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Acertos", stats["hits"])
+    col2.metric("Falhas", stats["misses"])
+    col3.metric("Taxa de Acerto", f"{stats['hit_rate']:.0%}")
+    col4.metric("Entradas", stats["entries"], help=f"{stats['size_bytes'] / 1024 / 1024:.1f} MB gravados")
+    st.caption(
+        f"Acertos e falhas desde o início do servidor · {stats['total_hits']} resposta(s) reaproveitada(s) "
+        "pelas entradas ainda válidas"
+    )
+    if st.button("🧹 Limpar cache do LLM", key="clear_llm_cache"):
+        removed = llm_cache.clear()
+        st.success(f"✅ {removed} entrada(s) removida(s)")
+
+
+def _analytics_storage(db_manager):
+    """Último snapshot somente leitura para as estatísticas (ou o próprio banco, se ainda não há um)"""
+    if not isinstance(db_manager, DatabaseManager) or db_manager.read_only:
+        return db_manager
+    try:
+        # Enquanto o primeiro snapshot é gerado em segundo plano, lê do próprio banco
+        return get_backup_service(db_manager).analytics_storage(max_age=ANALYTICS_SNAPSHOT_MAX_AGE) or db_manager
+    except Exception as e:
+        print(f"⚠️ Snapshot analítico indisponível, usando o banco principal: {e}")
+        return db_manager
+
+
+def _format_duration_ms(duration_ms) -> str:
+    """Formata uma duração em ms como H:MM:SS"""
+    if duration_ms is None:
+        return "N/A"
+    return str(timedelta(seconds=int(duration_ms / 1000)))
+
+
 def show_config_files():
     """Exibe o conteúdo dos arquivos de configuração em abas."""
     st.subheader("📄 Conteúdo dos Arquivos de Configuração")
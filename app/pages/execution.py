@@ -4,8 +4,21 @@ Página de Execução de Crews - Inicie e Acompanhe Suas Equipes em Ação
 
 import streamlit as st
 from datetime import datetime
+import io
+import os
+import tempfile
 import pandas as pd
 
+from app.crews.task_metrics import agent_busy_time, timeline_rows
+from app.utils import exporter
+from app.utils.database import DatabaseManager
+from app.utils.rollups import ACTIVE_STATUSES
+
+try:  # altair acompanha o streamlit; sem ele, a linha do tempo é exibida como tabela
+    import altair as alt
+except ImportError:
+    alt = None
+
 
 def show_execution_tab():
     """Exibe a aba de execução de crews."""
@@ -25,6 +38,7 @@ def show_execution_tab():
     st.markdown("---")
 
     crew_manager = st.session_state.crew_manager
+    execution_engine = st.session_state.execution_engine
 
     # Seção de Execução
     st.subheader("⚙️ Configurar e Iniciar Execução")
@@ -42,114 +56,51 @@ def show_execution_tab():
             help="Escolha qual equipe de agentes você deseja acionar.",
         )
 
-        st.markdown("**Parâmetros de Entrada:**")
-        # Parâmetros dinâmicos baseados nas tarefas da crew
-        task_inputs = {}
-        # Por enquanto, usamos um campo genérico "topic", mas isso pode ser expandido
-        topic = st.text_input(
-            "Tópico ou Instrução Principal",
-            placeholder="Ex: Análise de mercado sobre IA no Brasil",
-            help="Forneça o contexto principal para a execução das tarefas.",
-        )
-        task_inputs["topic"] = topic
+        mode = st.radio("Modo de execução", ["Execução única", "Lote (CSV/Excel)"], horizontal=True)
 
-        if st.button("🚀 Iniciar Execução da Crew", type="primary", use_container_width=True):
-            if not selected_crew:
-                st.error("Por favor, selecione uma crew.")
-            elif not topic:
-                st.error("Por favor, forneça um tópico ou instrução.")
-            else:
-                # Criar containers para resultado e logs
-                col1, col2 = st.columns([1, 1])
-
-                with col1:
-                    st.subheader("📄 Resultado da Execução")
-                    result_container = st.empty()
-
-                with col2:
-                    st.subheader("📊 Logs de Execução em Tempo Real")
-                    logs_container = st.empty()
-
-                # Botão para escolher modo de execução
-                execution_mode = st.radio(
-                    "Modo de Execução:",
-                    ["🔍 Com Logs (Recomendado)", "⚡ Modo Rápido (Sem Logs)"],
-                    horizontal=True,
-                    help="Logs mostram o progresso em tempo real, mas podem ser mais lentos",
-                )
+        evaluate = st.checkbox(
+            "Incluir avaliação automática de qualidade",
+            value=False,
+            help="Executa o agente avaliador ao final e anexa o relatório ao resultado (mais lento).",
+        )
+        timeout_minutes = st.number_input(
+            "Prazo por execução (minutos)",
+            min_value=0,
+            value=0,
+            help="Ao vencer, a execução é interrompida e mantém as saídas das tarefas já concluídas. "
+            "0 usa o prazo padrão do servidor (EXECUTION_TIMEOUT).",
+        )
+        timeout = timeout_minutes * 60 or None
 
-                # Iniciar execução
-                with st.spinner(
-                    f"Executando a crew '{selected_crew}'... Acompanhe o progresso {'nos logs ao lado' if 'Com Logs' in execution_mode else 'abaixo'}."
-                ):
+        if mode == "Lote (CSV/Excel)":
+            _show_batch_execution(execution_engine, selected_crew, evaluate, timeout)
+        else:
+            st.markdown("**Parâmetros de Entrada:**")
+            # Parâmetros dinâmicos baseados nas tarefas da crew
+            task_inputs = {}
+            # Por enquanto, usamos um campo genérico "topic", mas isso pode ser expandido
+            topic = st.text_input(
+                "Tópico ou Instrução Principal",
+                placeholder="Ex: Análise de mercado sobre IA no Brasil",
+                help="Forneça o contexto principal para a execução das tarefas.",
+            )
+            task_inputs["topic"] = topic
+
+            if st.button("🚀 Iniciar Execução da Crew", type="primary", use_container_width=True):
+                if not selected_crew:
+                    st.error("Por favor, selecione uma crew.")
+                elif not topic:
+                    st.error("Por favor, forneça um tópico ou instrução.")
+                else:
                     try:
-                        if "Com Logs" in execution_mode:
-                            # Execução com status visual
-                            with logs_container.container():
-                                st.markdown("### 📊 Status da Execução")
-                                status_messages = st.empty()
-
-                                # Mostrar status inicial
-                                status_messages.markdown(
-                                    """
-                                🔵 **Iniciando execução da crew...**
-                                
-                                📋 Preparando agentes e tarefas...
-                                """
-                                )
-
-                            # Executar crew
-                            result = crew_manager.execute_crew_safe(selected_crew, inputs=task_inputs)
-
-                            # Atualizar status final
-                            with logs_container.container():
-                                if result:
-                                    status_messages.markdown(
-                                        """
-                                    ✅ **Execução concluída!**
-                                    
-                                    🔍 Crew executada com sucesso
-                                    📄 Resultado gerado
-                                    ✅ Avaliação automática aplicada
-                                    """
-                                    )
-                                else:
-                                    status_messages.markdown(
-                                        """
-                                    ❌ **Execução falhou**
-                                    
-                                    ⚠️ Houve um problema durante a execução
-                                    """
-                                    )
-
-                            # Exibir resultado
-                            with result_container.container():
-                                if result:
-                                    st.success("✅ Execução concluída com sucesso!")
-                                    st.markdown(result)
-                                else:
-                                    st.error("❌ A execução falhou. Verifique os logs no terminal para mais detalhes.")
-
-                        else:
-                            # Modo rápido sem logs
-                            with logs_container.container():
-                                st.info("💡 **Modo Rápido Ativo**\n\nExecução direta sem logs detalhados.")
-
-                            result = crew_manager.execute_crew_safe(selected_crew, inputs=task_inputs)
-
-                            with result_container.container():
-                                if result:
-                                    st.success("✅ Execução concluída com sucesso!")
-                                    st.markdown(result)
-                                else:
-                                    st.error("❌ A execução falhou. Tente o modo com logs para mais detalhes.")
-
+                        # A execução roda em segundo plano: a página continua respondendo
+                        job_id = execution_engine.submit(selected_crew, task_inputs, evaluate=evaluate, timeout=timeout)
+                        st.session_state.setdefault("execution_jobs", []).append(job_id)
+                        st.success(f"✅ Execução #{job_id} enviada para a fila. Acompanhe o andamento abaixo.")
                     except Exception as e:
-                        with result_container.container():
-                            st.error(f"❌ Erro crítico durante a execução: {e}")
+                        st.error(f"❌ Não foi possível iniciar a execução: {e}")
 
-                        with logs_container.container():
-                            st.error("❌ Não foi possível capturar logs devido ao erro crítico.")
+        _show_execution_jobs(execution_engine)
 
     except Exception as e:
         st.error(f"Erro ao carregar as opções de crew: {e}")
@@ -159,96 +110,462 @@ def show_execution_tab():
     st.subheader("📜 Histórico de Execuções")
 
     try:
-        # Buscar histórico do banco de dados
-        history = crew_manager.db_manager.get_execution_history()
-
-        if not history:
-            st.info("Nenhuma execução foi realizada ainda.")
-        else:
-            # Converter para DataFrame
-            history_data = []
-            for exec_data in history:
-                history_data.append(
-                    {
-                        "ID": exec_data["id"],
-                        "Crew": exec_data["crew_name"],
-                        "Tópico": exec_data["topic"],
-                        "Início": exec_data["start_time"][:19] if exec_data["start_time"] else "N/A",
-                        "Duração": exec_data["duration"] or "N/A",
-                        "Status": exec_data["status"],
-                        "Resultado": (
-                            exec_data["result"][:100] + "..."
-                            if exec_data["result"] and len(exec_data["result"]) > 100
-                            else exec_data["result"] or "N/A"
-                        ),
-                    }
-                )
+        show_execution_history(crew_manager.db_manager)
+    except Exception as e:
+        st.error(f"Erro ao carregar histórico: {e}")
+        st.info("Nenhuma execução foi realizada ainda.")
 
-            history_df = pd.DataFrame(history_data)
 
-            st.dataframe(
-                history_df[["Crew", "Tópico", "Início", "Duração", "Status"]], use_container_width=True, hide_index=True
+MAX_BATCH_ITEMS = 500
+
+
+def _read_batch_inputs(uploaded_file) -> pd.DataFrame:
+    """Lê a planilha de entradas do lote (uma linha por item, coluna obrigatória `topic`)."""
+    if uploaded_file.name.lower().endswith(".xlsx"):
+        frame = pd.read_excel(uploaded_file, dtype=str)
+    else:
+        frame = pd.read_csv(uploaded_file, dtype=str, sep=None, engine="python")
+    frame.columns = [str(column).strip() for column in frame.columns]
+    if "topic" not in frame.columns:
+        raise ValueError("A planilha precisa de uma coluna 'topic'")
+    frame = frame.dropna(subset=["topic"])
+    frame = frame[frame["topic"].str.strip() != ""].reset_index(drop=True)
+    if len(frame) > MAX_BATCH_ITEMS:
+        raise ValueError(f"O lote tem {len(frame)} itens; o máximo é {MAX_BATCH_ITEMS}")
+    return frame
+
+
+def _batch_table(inputs: pd.DataFrame, executions: list) -> pd.DataFrame:
+    """Junta as entradas do lote aos resultados de cada execução (na mesma ordem)."""
+    table = inputs.copy()
+    table.insert(0, "item", range(1, len(table) + 1))
+    table["execution_id"] = [execution["id"] for execution in executions]
+    table["status"] = [execution["status"] for execution in executions]
+    table["duration"] = [execution["duration"] for execution in executions]
+    table["error_message"] = [execution["error_message"] for execution in executions]
+    table["result"] = [execution["result"] for execution in executions]
+    return table
+
+
+def _show_batch_execution(execution_engine, selected_crew: str, evaluate: bool, timeout=None):
+    """Coloca na fila do motor de execução uma execução da crew para cada linha de uma planilha CSV/Excel."""
+    st.markdown("**Entradas do lote:**")
+    uploaded_file = st.file_uploader(
+        "Planilha com uma linha por item",
+        type=["csv", "xlsx"],
+        help="Coluna obrigatória `topic`; as demais colunas são enviadas como entradas adicionais "
+        "e preenchem os campos `{coluna}` das tarefas e agentes.",
+    )
+    fail_fast = st.checkbox("Interromper na primeira falha", value=False)
+    st.caption(
+        f"Os itens entram na fila de execução em segundo plano ({execution_engine.max_workers} simultâneos no máximo)."
+    )
+
+    if uploaded_file is not None:
+        try:
+            inputs = _read_batch_inputs(uploaded_file)
+        except Exception as e:
+            st.error(f"❌ Planilha inválida: {e}")
+            return
+        st.caption(f"{len(inputs)} item(ns) encontrados")
+        st.dataframe(inputs.head(20), use_container_width=True, hide_index=True)
+
+        if st.button(f"🚀 Executar lote ({len(inputs)} itens)", type="primary", use_container_width=True):
+            records = [{key: value for key, value in row.items() if pd.notna(value)} for row in inputs.to_dict("records")]
+            try:
+                batch_id = execution_engine.submit_batch(
+                    selected_crew, records, evaluate=evaluate, timeout=timeout, fail_fast=fail_fast
+                )
+            except Exception as e:
+                st.error(f"❌ Não foi possível iniciar o lote: {e}")
+                return
+            st.session_state.batch_job = {"batch_id": batch_id, "inputs": inputs}
+
+    _show_batch_progress(execution_engine)
+
+
+def _show_batch_result(batch_id: str, table: pd.DataFrame):
+    """Resumo e download da tabela consolidada de um lote encerrado."""
+    completed = int((table["status"] == "completed").sum())
+    st.markdown(f"**📦 Lote `{batch_id}`:** {completed}/{len(table)} item(ns) concluído(s) com sucesso")
+    st.dataframe(table.drop(columns=["result"]), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Baixar CSV",
+            data=table.to_csv(index=False).encode("utf-8"),
+            file_name=f"{batch_id}.csv",
+            mime="text/csv",
+            key="batch_download_csv",
+        )
+    with col2:
+        try:
+            excel = io.BytesIO()
+            table.to_excel(excel, index=False)
+            st.download_button(
+                "⬇️ Baixar Excel",
+                data=excel.getvalue(),
+                file_name=f"{batch_id}.xlsx",
+                key="batch_download_excel",
             )
-
-            # Seleção de execução para detalhes
-            if len(history) > 0:
-                selected_execution_id = st.selectbox(
-                    "Ver detalhes de uma execução anterior",
-                    options=[exec_data["id"] for exec_data in history],
-                    format_func=lambda id: f"Execução #{id} - {next(exec['crew_name'] for exec in history if exec['id'] == id)} ({next(exec['start_time'][:19] for exec in history if exec['start_time'] and exec['id'] == id)})",
-                    index=None,
-                    placeholder="Selecione uma execução para ver o resultado",
+        except ImportError:
+            st.caption("Instale `openpyxl` para baixar em Excel.")
+
+
+def _show_result_pager(db_manager, execution_id: int, result_size: int):
+    """Carrega e renderiza o resultado de uma execução uma seção por vez."""
+    sections = db_manager.get_result_sections(execution_id)
+    if len(sections) <= 1:
+        st.markdown(db_manager.get_result_range(execution_id, 0, result_size) or "")
+        return
+
+    state_key = f"result_section_{execution_id}"
+    index = min(st.session_state.get(state_key, 0), len(sections) - 1)
+
+    nav_cols = st.columns([1, 4, 1])
+    with nav_cols[0]:
+        if st.button("⬅️ Anterior", key=f"{state_key}_prev", disabled=index == 0, use_container_width=True):
+            index -= 1
+    with nav_cols[2]:
+        if st.button("Próxima ➡️", key=f"{state_key}_next", disabled=index == len(sections) - 1, use_container_width=True):
+            index += 1
+    with nav_cols[1]:
+        index = st.selectbox(
+            "Seção",
+            options=range(len(sections)),
+            index=index,
+            format_func=lambda i: f"{i + 1}. {sections[i]['title']}",
+            label_visibility="collapsed",
+        )
+    st.session_state[state_key] = index
+
+    section = sections[index]
+    st.caption(f"📑 Seção {index + 1} de {len(sections)} · {result_size / 1024:.1f} KB no total")
+    st.markdown(db_manager.get_result_range(execution_id, section["offset"], section["length"]) or "")
+
+
+JOB_POLL_SECONDS = 3
+JOB_STATUS_ICONS = {
+    "queued": "⏳",
+    "running": "🔄",
+    "completed": "✅",
+    "error": "❌",
+    "cancelled": "🛑",
+    "timeout": "⏱️",
+    "rejected": "💰",
+}
+# Execuções encerradas sem sucesso podem ser retomadas a partir das tarefas já concluídas
+# ("rejected": barrada pelo orçamento da crew; a retomada verifica o orçamento de novo)
+RESUMABLE_STATUSES = ("error", "cancelled", "timeout", "rejected")
+# Execuções interrompidas guardam como resultado as saídas das tarefas concluídas até o momento
+INTERRUPTED_STATUSES = ("cancelled", "timeout")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _show_execution_jobs(execution_engine):
+    """Acompanha as execuções enviadas nesta sessão (atualizado periodicamente, sem bloquear a página)."""
+    job_ids = st.session_state.get("execution_jobs", [])
+    if not job_ids:
+        return
+
+    jobs = [job for job in (execution_engine.status(job_id) for job_id in reversed(job_ids)) if job is not None]
+
+    st.markdown("**📡 Execuções desta sessão:**")
+    for job in jobs:
+        job_id = job["job_id"]
+        icon = JOB_STATUS_ICONS.get(job["status"], "❔")
+        cols = st.columns([5, 1])
+        with cols[0]:
+            st.markdown(f"{icon} **#{job_id}** · {job['crew_name']} · {job['topic']} — `{job['status']}`")
+            if job["duration"]:
+                st.caption(f"Duração: {job['duration']}")
+            if job["error_message"]:
+                st.caption(f"Erro: {job['error_message']}")
+        with cols[1]:
+            if not job["done"] and st.button("🛑 Cancelar", key=f"cancel_job_{job_id}"):
+                execution_engine.cancel(job_id)
+                st.rerun(scope="fragment")
+            if job["status"] in RESUMABLE_STATUSES and st.button("🔁 Retomar", key=f"resume_job_{job_id}"):
+                execution_engine.resume(job_id)
+                st.rerun(scope="fragment")
+        if job["status"] in ("completed",) + INTERRUPTED_STATUSES and job["result_size"]:
+            label = "Saídas parciais" if job["status"] in INTERRUPTED_STATUSES else "Resultado"
+            with st.expander(f"📄 {label} da execução #{job_id}", expanded=False):
+                _show_result_pager(execution_engine.storage, job_id, job["result_size"])
+
+    if any(job["done"] for job in jobs) and st.button("🧹 Limpar finalizadas", key="clear_finished_jobs"):
+        st.session_state.execution_jobs = [job["job_id"] for job in reversed(jobs) if not job["done"]]
+        st.rerun(scope="fragment")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _show_batch_progress(execution_engine):
+    """Acompanha o último lote enviado nesta sessão (atualizado periodicamente, sem bloquear a página)."""
+    batch_job = st.session_state.get("batch_job")
+    if not batch_job:
+        return
+    batch_id = batch_job["batch_id"]
+    executions = execution_engine.storage.get_batch_executions(batch_id, include_result=False)
+    finished = sum(1 for execution in executions if execution["status"] not in ACTIVE_STATUSES)
+
+    if finished < len(executions):
+        st.markdown(f"**📦 Lote `{batch_id}`:**")
+        st.progress(finished / len(executions), text=f"{finished}/{len(executions)} item(ns) concluído(s)")
+        if st.button("🛑 Cancelar lote", key="cancel_batch"):
+            execution_engine.cancel_batch(batch_id)
+            st.rerun(scope="fragment")
+        return
+
+    # Lote encerrado: os resultados são carregados uma única vez para a tabela consolidada
+    if "table" not in batch_job:
+        executions = execution_engine.storage.get_batch_executions(batch_id)
+        batch_job["table"] = _batch_table(batch_job["inputs"], executions)
+    _show_batch_result(batch_id, batch_job["table"])
+
+
+HISTORY_PAGE_SIZE = 25
+STATUS_OPTIONS = ["Todos", "completed", "error", "running", "queued", "cancelled", "timeout", "rejected"]
+
+
+def show_execution_history(db_manager):
+    """Exibe o histórico paginado (cursor) com filtros aplicados no banco de dados."""
+    filter_cols = st.columns([2, 1, 2])
+    with filter_cols[0]:
+        crew_filter = st.selectbox("Crew", ["Todas"] + db_manager.get_execution_crew_names(), key="history_crew")
+    with filter_cols[1]:
+        status_filter = st.selectbox("Status", STATUS_OPTIONS, key="history_status")
+    with filter_cols[2]:
+        date_range = st.date_input("Período", value=(), key="history_dates")
+
+    date_from = date_range[0] if len(date_range) > 0 else None
+    date_to = date_range[1] if len(date_range) > 1 else date_from
+    filters = {
+        "crew_name": None if crew_filter == "Todas" else crew_filter,
+        "status": None if status_filter == "Todos" else status_filter,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    # Pilha de cursores: reiniciada sempre que os filtros mudam
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+
+    cursors = st.session_state.history_cursors
+    page = db_manager.get_execution_history_page(limit=HISTORY_PAGE_SIZE, cursor=cursors[-1], **filters)
+    items = page["items"]
+
+    if not items:
+        st.info("Nenhuma execução encontrada para os filtros selecionados.")
+        return
+
+    history_df = pd.DataFrame(
+        [
+            {
+                "ID": exec_data["id"],
+                "Crew": exec_data["crew_name"],
+                "Tópico": exec_data["topic"],
+                "Início": exec_data["start_time"][:19] if exec_data["start_time"] else "N/A",
+                "Duração": exec_data["duration"] or "N/A",
+                "Status": exec_data["status"],
+                "Resultado": exec_data["result_preview"] or "N/A",
+            }
+            for exec_data in items
+        ]
+    )
+    st.dataframe(
+        history_df[["ID", "Crew", "Tópico", "Início", "Duração", "Status", "Resultado"]],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    nav_cols = st.columns([1, 2, 1])
+    with nav_cols[0]:
+        if st.button("⬅️ Anterior", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with nav_cols[1]:
+        st.caption(f"Página {len(cursors)}")
+    with nav_cols[2]:
+        if st.button("Próxima ➡️", disabled=page["next_cursor"] is None, use_container_width=True):
+            cursors.append(page["next_cursor"])
+            st.rerun()
+
+    if isinstance(db_manager, DatabaseManager):
+        _show_history_export(db_manager, filters)
+
+    # Seleção de execução para detalhes
+    labels = {
+        exec_data["id"]: f"Execução #{exec_data['id']} - {exec_data['crew_name']} ({(exec_data['start_time'] or '')[:19]})"
+        for exec_data in items
+    }
+    selected_execution_id = st.selectbox(
+        "Ver detalhes de uma execução anterior",
+        options=list(labels),
+        format_func=labels.get,
+        index=None,
+        placeholder="Selecione uma execução para ver o resultado",
+    )
+
+    if selected_execution_id is not None:
+        show_execution_details(db_manager, selected_execution_id)
+
+
+EXPORT_TABLE_LABELS = {
+    "executions": "Execuções",
+    "execution_results": "Resultados das tarefas",
+    "evaluation_reports": "Relatórios de avaliação",
+}
+
+
+def _show_history_export(db_manager, filters: dict):
+    """Gera um arquivo de exportação (em streaming) com os filtros de crew e período."""
+    with st.expander("📤 Exportar histórico", expanded=False):
+        formats = ["ndjson"] + (["parquet", "feather"] if exporter.pyarrow is not None else [])
+        col1, col2 = st.columns(2)
+        with col1:
+            table = st.selectbox("Dados", list(EXPORT_TABLE_LABELS), format_func=EXPORT_TABLE_LABELS.get, key="export_table")
+        with col2:
+            export_format = st.radio("Formato", formats, format_func=str.upper, horizontal=True, key="export_format")
+        st.caption("Usa os filtros de crew e período acima. Execuções em andamento não são exportadas.")
+
+        if st.button("Preparar arquivo", key="export_prepare"):
+            with st.spinner("Exportando..."):
+                rows = exporter.iter_rows(
+                    db_manager, table, filters["crew_name"], filters["date_from"], filters["date_to"]
+                )
+                with tempfile.NamedTemporaryFile(suffix=f".{export_format}", delete=False) as sink:
+                    count = exporter.write_table(rows, table, sink, export_format)
+            previous = st.session_state.get("export_file")
+            if previous and os.path.exists(previous["path"]):
+                os.remove(previous["path"])
+            st.session_state.export_file = {
+                "path": sink.name,
+                "name": f"{table}_{datetime.now():%Y%m%d_%H%M%S}.{export_format}",
+                "rows": count,
+            }
+
+        export_file = st.session_state.get("export_file")
+        if export_file and os.path.exists(export_file["path"]):
+            with open(export_file["path"], "rb") as file:
+                st.download_button(
+                    f"⬇️ Baixar {export_file['name']} ({export_file['rows']} linha(s))",
+                    data=file,
+                    file_name=export_file["name"],
+                    key="export_download",
                 )
 
-                if selected_execution_id is not None:
-                    # Buscar detalhes da execução
-                    execution_details = crew_manager.db_manager.get_execution_details(selected_execution_id)
-
-                    if execution_details:
-                        with st.expander(f"Resultado da Execução #{selected_execution_id}", expanded=True):
-                            st.markdown(f"**Crew:** {execution_details['crew_name']}")
-                            st.markdown(f"**Tópico:** {execution_details['topic']}")
-                            st.markdown(f"**Status:** {execution_details['status']}")
-                            st.markdown(f"**Duração:** {execution_details['duration']}")
-
-                            # RESUMO DA ATUAÇÃO DOS AGENTES (campo retraído)
-                            with st.expander("🔎 Resumo do Fluxo dos Agentes", expanded=False):
-                                if execution_details.get("task_results"):
-                                    for idx, task_result in enumerate(execution_details["task_results"]):
-                                        st.markdown(f"**Agente:** {task_result.get('agent_name', 'N/A')}")
-                                        st.write(f"- Tarefa: {task_result.get('task_description', 'N/A')}")
-                                        st.write(f"- Ferramentas usadas: {task_result.get('tools_used', 'N/A')}")
-                                        st.write(f"- Recebeu: {task_result.get('input_info', 'N/A')}")
-                                        st.write(f"- Passou para o próximo: {task_result.get('output_info', 'N/A')}")
-                                        st.write("---")
-                                else:
-                                    st.info("Nenhuma informação detalhada dos agentes disponível.")
-                                # Agente Avaliador fixo
-                                st.markdown("**Agente Avaliador (Qualidade do Processo)**")
-                                st.write("- Avaliação do tempo de trabalho de cada agente")
-                                st.write("- Importância da atuação de cada agente na tarefa")
-                                st.write("- Observações sobre a qualidade do processo")
-                            # ...existing code...
-                            if execution_details["result"]:
-                                st.markdown("**Resultado:**")
-                                st.markdown(execution_details["result"])
-
-                            if execution_details["error_message"]:
-                                st.error(f"**Erro:** {execution_details['error_message']}")
-
-                            # Mostrar resultados das tarefas se houver
-                            if execution_details.get("task_results"):
-                                st.markdown("**Resultados das Tarefas:**")
-                                for task_result in execution_details["task_results"]:
-                                    with st.expander(
-                                        f"Tarefa: {task_result['task_description'][:50]}...", expanded=False
-                                    ):
-                                        st.markdown(f"**Agente:** {task_result['agent_name']}")
-                                        st.markdown(f"**Status:** {task_result['task_status']}")
-                                        st.markdown(f"**Resultado:** {task_result['task_result']}")
-                    else:
-                        st.error("Detalhes da execução não encontrados.")
 
-    except Exception as e:
-        st.error(f"Erro ao carregar histórico: {e}")
-        st.info("Nenhuma execução foi realizada ainda.")
+def _show_task_timeline(rows: list):
+    """Gráfico de Gantt das tarefas de uma execução, colorido por agente."""
+    frame = pd.DataFrame(rows)
+    if alt is None:
+        st.dataframe(frame, use_container_width=True, hide_index=True)
+        return
+    chart = (
+        alt.Chart(frame)
+        .mark_bar()
+        .encode(
+            x=alt.X("start:T", title="Início"),
+            x2="end:T",
+            y=alt.Y("task:N", sort=None, title="Tarefa"),
+            color=alt.Color("agent:N", title="Agente"),
+            tooltip=["agent", "task", "duration_s", "steps", "tool_calls"],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+def _format_usage(row: dict) -> str:
+    """Tokens e custo estimado de uma execução ou tarefa."""
+    prompt_tokens, completion_tokens = row.get("prompt_tokens") or 0, row.get("completion_tokens") or 0
+    text = f"{prompt_tokens + completion_tokens:,} tokens ({prompt_tokens:,} de prompt + {completion_tokens:,} de resposta)"
+    if row.get("cost_usd") is not None:
+        text += f" · US$ {row['cost_usd']:.4f}"
+    return text.replace(",", ".")
+
+
+def show_execution_details(db_manager, execution_id: int):
+    """Exibe os detalhes completos de uma execução."""
+    # O resultado completo não é carregado: o paginador lê uma seção por vez
+    execution_details = db_manager.get_execution_details(execution_id, include_result=False)
+
+    if not execution_details:
+        st.error("Detalhes da execução não encontrados.")
+        return
+
+    with st.expander(f"Resultado da Execução #{execution_id}", expanded=True):
+        st.markdown(f"**Crew:** {execution_details['crew_name']}")
+        st.markdown(f"**Tópico:** {execution_details['topic']}")
+        st.markdown(f"**Status:** {execution_details['status']}")
+        st.markdown(f"**Duração:** {execution_details['duration']}")
+        if execution_details.get("prompt_tokens") is not None:
+            model = f" · {execution_details['model']}" if execution_details.get("model") else ""
+            st.markdown(f"**Consumo:** {_format_usage(execution_details)}{model}")
+        if execution_details.get("critical_path"):
+            st.markdown(f"**🧭 Caminho crítico:** {execution_details['critical_path']}")
+        if execution_details.get("archived"):
+            st.caption("🗄️ Execução arquivada (lida do arquivo mensal, somente leitura)")
+
+        # RESUMO DA ATUAÇÃO DOS AGENTES (campo retraído)
+        with st.expander("🔎 Resumo do Fluxo dos Agentes", expanded=False):
+            task_results = execution_details.get("task_results") or []
+            timeline = timeline_rows(task_results)
+            if timeline:
+                _show_task_timeline(timeline)
+                busy = agent_busy_time(task_results)
+                agent, duration_ms, share = busy[0]
+                st.caption(f"⏳ Agente com mais tempo de tarefa: **{agent}** ({duration_ms / 1000:.1f}s, {share:.0%} do total)")
+            if task_results:
+                for task_result in task_results:
+                    st.markdown(f"**Agente:** {task_result.get('agent_name') or 'N/A'}")
+                    st.write(f"- Tarefa: {task_result.get('task_description', 'N/A')}")
+                    if task_result.get("duration_ms") is not None:
+                        st.write(
+                            f"- Duração: {task_result['duration_ms'] / 1000:.1f}s · "
+                            f"{task_result.get('step_count') or 0} passo(s) · "
+                            f"saída de {task_result.get('output_chars') or 0} caracteres"
+                        )
+                    if task_result.get("prompt_tokens") is not None:
+                        st.write(f"- Consumo: {_format_usage(task_result)}")
+                    tools = task_result.get("tool_names") or {}
+                    tools_text = ", ".join(f"{name} ({calls}x)" for name, calls in tools.items())
+                    st.write(f"- Ferramentas usadas: {tools_text or 'nenhuma'}")
+                    st.write("---")
+            else:
+                st.info("Nenhuma informação detalhada dos agentes disponível.")
+            # Agente Avaliador fixo
+            st.markdown("**Agente Avaliador (Qualidade do Processo)**")
+            st.write("- Avaliação do tempo de trabalho de cada agente")
+            st.write("- Importância da atuação de cada agente na tarefa")
+            st.write("- Observações sobre a qualidade do processo")
+        # ...existing code...
+        if execution_details.get("result_size"):
+            st.markdown("**Resultado:**")
+            _show_result_pager(db_manager, execution_id, execution_details["result_size"])
+
+        if execution_details["error_message"]:
+            st.error(f"**Erro:** {execution_details['error_message']}")
+
+        if execution_details["status"] in RESUMABLE_STATUSES and not execution_details.get("archived"):
+            completed_tasks = sum(1 for task in execution_details.get("task_results", []) if task["task_status"] == "completed")
+            st.caption(f"💾 {completed_tasks} tarefa(s) concluída(s) serão reaproveitadas ao retomar.")
+            if st.button("🔁 Retomar", key=f"resume_execution_{execution_id}"):
+                execution_engine = st.session_state.execution_engine
+                if execution_engine.resume(execution_id):
+                    job_ids = st.session_state.setdefault("execution_jobs", [])
+                    if execution_id not in job_ids:
+                        job_ids.append(execution_id)
+                    st.success(f"✅ Execução #{execution_id} retomada. Acompanhe o andamento na seção de execuções.")
+                else:
+                    st.warning("Esta execução já está em andamento ou não pode ser retomada.")
+
+        # Mostrar resultados das tarefas se houver
+        if execution_details.get("task_results"):
+            st.markdown("**Resultados das Tarefas:**")
+            for task_result in execution_details["task_results"]:
+                with st.expander(f"Tarefa: {task_result['task_description'][:50]}...", expanded=False):
+                    st.markdown(f"**Agente:** {task_result['agent_name']}")
+                    st.markdown(f"**Status:** {task_result['task_status']}")
+                    st.markdown(f"**Resultado:** {task_result['task_result']}")
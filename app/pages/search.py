@@ -0,0 +1,114 @@
+"""
+Página de Busca - Pesquisa textual no histórico de execuções, tarefas e avaliações
+"""
+
+import streamlit as st
+
+from app.pages.execution import show_execution_details
+
+KIND_LABELS = {
+    "execution": "📄 Resultado da execução",
+    "task_result": "📋 Resultado de tarefa",
+    "evaluation": "✅ Relatório de avaliação",
+}
+PAGE_SIZE = 20
+
+
+def show_search_tab():
+    """Exibe a busca textual ranqueada sobre o histórico."""
+    st.header("🔍 Busca no Histórico")
+    st.markdown("### Encontre resultados, tarefas e avaliações de execuções anteriores")
+
+    with st.expander("ℹ️ Como buscar", expanded=False):
+        st.info(
+            """
+        - Todas as palavras digitadas precisam aparecer no conteúdo (acentos são ignorados).
+        - A última palavra é buscada por prefixo: `fund` encontra `fundação` e `fundações`.
+        - Use `*` no fim de qualquer palavra para buscá-la por prefixo (ex: `geotec* talude`).
+        - Os resultados são ordenados por relevância.
+        """
+        )
+
+    db_manager = st.session_state.crew_manager.db_manager
+
+    if not db_manager.full_text_search_enabled:
+        st.warning("⚠️ O SQLite desta instalação não possui FTS5. A busca usará comparação simples (LIKE).")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        query = st.text_input("Buscar", placeholder="Ex: fundação estaca", key="search_query")
+    with col2:
+        kinds = st.multiselect(
+            "Origem",
+            options=list(KIND_LABELS),
+            format_func=KIND_LABELS.get,
+            default=list(KIND_LABELS),
+            key="search_kinds",
+        )
+
+    if not query:
+        return
+
+    if st.session_state.get("search_last") != (query, tuple(kinds)):
+        st.session_state.search_last = (query, tuple(kinds))
+        st.session_state.search_page = 0
+
+    page = st.session_state.search_page
+
+    try:
+        if db_manager.full_text_search_enabled:
+            results = db_manager.search_full_text(query, limit=PAGE_SIZE + 1, offset=page * PAGE_SIZE, kinds=kinds)
+        else:
+            results = [
+                {
+                    "kind": "execution",
+                    "execution_id": row["id"],
+                    "crew_name": row["crew_name"],
+                    "title": row["topic"],
+                    "snippet": (row["result"] or "")[:200],
+                    "topic": row["topic"],
+                    "status": row["status"],
+                    "start_time": row["start_time"],
+                }
+                for row in db_manager.search_executions(query, limit=PAGE_SIZE)
+            ]
+    except Exception as e:
+        st.error(f"Erro na busca: {e}")
+        return
+
+    has_more = len(results) > PAGE_SIZE
+    results = results[:PAGE_SIZE]
+
+    if not results:
+        st.info("Nenhum resultado encontrado.")
+        return
+
+    for idx, item in enumerate(results):
+        with st.container(border=True):
+            st.markdown(
+                f"**{KIND_LABELS.get(item['kind'], item['kind'])}** · Execução #{item['execution_id']} · "
+                f"{item['crew_name'] or 'N/A'} · {(item['start_time'] or '')[:19]}"
+            )
+            if item["title"] and item["title"] != item["topic"]:
+                st.caption(item["title"][:150])
+            st.caption(f"Tópico: {item['topic'] or 'N/A'}")
+            st.markdown(item["snippet"] or "")
+            if st.button("Ver execução", key=f"search_open_{page}_{idx}"):
+                st.session_state.search_selected_execution = item["execution_id"]
+
+    nav_cols = st.columns([1, 2, 1])
+    with nav_cols[0]:
+        if st.button("⬅️ Anterior", disabled=page == 0, use_container_width=True, key="search_prev"):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with nav_cols[1]:
+        st.caption(f"Página {page + 1}")
+    with nav_cols[2]:
+        if st.button("Próxima ➡️", disabled=not has_more, use_container_width=True, key="search_next"):
+            st.session_state.search_page += 1
+            st.rerun()
+
+    selected_execution = st.session_state.get("search_selected_execution")
+    if selected_execution is not None:
+        st.markdown("---")
+        show_execution_details(db_manager, selected_execution)
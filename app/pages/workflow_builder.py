@@ -1,7 +1,7 @@
 import streamlit as st
 import yaml
 import uuid
-from app.utils.database import DatabaseManager
+from app.utils.storage import create_storage
 import re
 import os
 import tempfile
@@ -22,7 +22,9 @@ Os arquivos `agents.yaml` e `tasks.yaml` são carregados automaticamente. Seleci
 """
     )
 
-    db = DatabaseManager()
+    # Reutiliza o armazenamento do CrewManager da sessão (mesmo motor e conexões)
+    crew_manager = st.session_state.get("crew_manager")
+    db = crew_manager.db_manager if crew_manager is not None else create_storage()
 
     def export_crews_summary():
         """Exporta um resumo das crews do banco para JSON resumido."""
@@ -0,0 +1,31 @@
+"""
+Fachada assíncrona do armazenamento
+
+Expõe as operações de um StorageBackend como corrotinas, executando cada chamada
+em uma thread (asyncio.to_thread) para não bloquear o event loop. O esquema e as
+regras de persistência são os do motor envolvido (SQLite ou memória).
+"""
+
+import asyncio
+import functools
+from typing import Any
+
+from app.utils.storage import StorageBackend
+
+
+class AsyncStorage:
+    """Versão awaitable de um StorageBackend: `await storage.save_execution(...)`"""
+
+    def __init__(self, storage: StorageBackend):
+        self.storage = storage
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.storage, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+
+        return call
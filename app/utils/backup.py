@@ -0,0 +1,249 @@
+"""
+Backup online e snapshots somente leitura do banco de crews
+
+Os snapshots são gerados com a API de backup online do SQLite, copiando o banco
+em passos de N páginas: em WAL, a cópia não bloqueia as gravações das execuções.
+Uma gravação feita por outra conexão reinicia a cópia em passos; depois de
+algumas reinicializações, o banco é copiado em um único passo.
+Os N snapshots mais recentes são mantidos, e o mais recente pode ser aberto como
+um DatabaseManager somente leitura para o dashboard e consultas analíticas.
+
+Uso pela linha de comando:
+    python -m app.utils.backup [--db app/data/crews_database.db] [--keep 5]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.utils.database import DatabaseManager
+
+SNAPSHOT_FILE_PATTERN = re.compile(r"^crews_snapshot_(\d{8}_\d{6}_\d{6})\.db$")
+
+
+class _RestartLimitReached(Exception):
+    """A cópia em passos foi reiniciada mais vezes que o permitido"""
+
+
+class BackupService:
+    """Gera, rotaciona e abre snapshots de um banco gerenciado pelo DatabaseManager"""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        snapshot_dir: Optional[str] = None,
+        keep: int = 5,
+        pages_per_step: int = 1024,
+        step_sleep: float = 0.005,
+        max_restarts: int = 3,
+        retry_after: float = 60.0,
+    ):
+        self.db_manager = db_manager
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(os.path.abspath(db_manager.db_path)), "snapshots")
+        self.keep = keep
+        self.pages_per_step = pages_per_step  # -1 copia tudo em um único passo
+        self.step_sleep = step_sleep  # pausa entre passos, cedendo o disco às gravações
+        self.max_restarts = max_restarts  # reinicializações da cópia em passos antes de copiar tudo de uma vez
+        self.retry_after = retry_after  # segundos antes de tentar de novo um snapshot analítico que falhou
+
+        self._lock = threading.Lock()
+        self._analytics_lock = threading.Lock()
+        self._analytics: Optional[DatabaseManager] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_failed_at: Optional[float] = None
+
+    def create_snapshot(self, progress: Optional[Callable[[int, int, int], None]] = None) -> str:
+        """Copia o banco para um novo snapshot e retorna o caminho do arquivo
+
+        `progress(status, remaining, total)` é chamado a cada passo da cópia.
+        """
+        Path(self.snapshot_dir).mkdir(parents=True, exist_ok=True)
+        name = f"crews_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db"
+        path = os.path.join(self.snapshot_dir, name)
+        temp_path = f"{path}.tmp"
+
+        self.db_manager.flush()
+        started = time.monotonic()
+        destination = sqlite3.connect(temp_path)
+        try:
+            with self._lock:
+                self._copy(destination, progress)
+            # O snapshot é um arquivo autônomo e imutável: sem WAL
+            destination.execute("PRAGMA journal_mode = DELETE")
+        except Exception:
+            destination.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        destination.close()
+        os.replace(temp_path, path)
+
+        print(f"💾 Snapshot criado em {time.monotonic() - started:.2f}s: {path}")
+        self.rotate()
+        return path
+
+    def _copy(self, destination: sqlite3.Connection, progress: Optional[Callable[[int, int, int], None]]):
+        """Copia o banco em passos; sob gravações constantes, recorre a uma cópia em passo único
+
+        O SQLite reinicia a cópia em passos sempre que outra conexão altera o banco de
+        origem, o que é percebido como um passo sem redução das páginas restantes.
+        """
+        source = self.db_manager.connections.connection()
+        restarts = 0
+        last_remaining: Optional[int] = None
+
+        def on_step(status: int, remaining: int, total: int):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining >= last_remaining:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise _RestartLimitReached()
+            last_remaining = remaining
+            if progress is not None:
+                progress(status, remaining, total)
+
+        try:
+            source.backup(destination, pages=self.pages_per_step, progress=on_step, sleep=self.step_sleep)
+        except _RestartLimitReached:
+            # Um único passo lê um retrato consistente do banco; em WAL, as gravações continuam
+            print(f"⚠️ Cópia do banco reiniciada {restarts} vez(es) por gravações concorrentes; copiando em um único passo")
+            source.backup(destination, pages=-1, progress=progress)
+
+    def list_snapshots(self) -> List[str]:
+        """Snapshots existentes, do mais recente ao mais antigo"""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        names = sorted((name for name in os.listdir(self.snapshot_dir) if SNAPSHOT_FILE_PATTERN.match(name)), reverse=True)
+        return [os.path.join(self.snapshot_dir, name) for name in names]
+
+    def latest_snapshot(self) -> Optional[str]:
+        snapshots = self.list_snapshots()
+        return snapshots[0] if snapshots else None
+
+    def rotate(self) -> List[str]:
+        """Remove os snapshots além dos `keep` mais recentes e retorna os removidos"""
+        removed = []
+        for path in self.list_snapshots()[self.keep :]:
+            if self._analytics is not None and self._analytics.db_path == path:
+                continue  # ainda em uso pelas consultas analíticas
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"⚠️ Não foi possível remover o snapshot {path}: {e}")
+        return removed
+
+    def open_snapshot(self, path: Optional[str] = None) -> DatabaseManager:
+        """Abre um snapshot (o mais recente, por padrão) como DatabaseManager somente leitura"""
+        path = path or self.latest_snapshot()
+        if path is None:
+            raise FileNotFoundError(f"Nenhum snapshot encontrado em {self.snapshot_dir}")
+        return DatabaseManager(path, archive_dir=self.db_manager.archive_dir, read_only=True)
+
+    def snapshot_age(self, path: Optional[str] = None) -> Optional[float]:
+        """Idade (segundos) do snapshot informado ou do mais recente"""
+        path = path or self.latest_snapshot()
+        if path is None:
+            return None
+        return time.time() - os.path.getmtime(path)
+
+    def analytics_storage(self, max_age: float = 300.0) -> Optional[DatabaseManager]:
+        """Último snapshot somente leitura para relatórios, sem esperar por um novo
+
+        Consultas pesadas feitas aqui não disputam o banco com as gravações das execuções.
+        Quando o snapshot é mais velho que `max_age` segundos, um novo é gerado em segundo
+        plano e passa a ser usado quando fica pronto. Retorna None se ainda não há nenhum.
+        """
+        with self._analytics_lock:
+            if self._analytics is None:
+                latest = self.latest_snapshot()
+                if latest is not None:
+                    self._analytics = self.open_snapshot(latest)
+
+            current = self._analytics
+            age = self.snapshot_age(current.db_path) if current is not None else None
+            if age is None or age > max_age:
+                self._start_refresh()
+            return current
+
+    def _start_refresh(self):
+        """Inicia a geração de um snapshot analítico em segundo plano (se ainda não estiver em andamento)"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        if self._refresh_failed_at is not None and time.monotonic() - self._refresh_failed_at < self.retry_after:
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_analytics, name="analytics-snapshot", daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_analytics(self):
+        try:
+            path = self.create_snapshot()
+        except Exception as e:
+            # O último snapshot bom continua sendo servido
+            print(f"⚠️ Falha ao gerar snapshot analítico: {e}")
+            self._refresh_failed_at = time.monotonic()
+            return
+
+        self._refresh_failed_at = None
+        with self._analytics_lock:
+            previous, self._analytics = self._analytics, self.open_snapshot(path)
+            if previous is not None:
+                previous.close()
+            self.rotate()
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda o snapshot analítico em andamento; retorna False se ainda não terminou"""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def close(self):
+        """Fecha o snapshot aberto para consultas analíticas"""
+        self.wait_for_refresh()
+        if self._analytics is not None:
+            self._analytics.close()
+            self._analytics = None
+
+
+_backup_services: Dict[str, BackupService] = {}
+_backup_services_lock = threading.Lock()
+
+
+def get_backup_service(db_manager: DatabaseManager, **options) -> BackupService:
+    """Retorna o serviço de backup compartilhado para o arquivo do banco"""
+    key = os.path.abspath(db_manager.db_path)
+    with _backup_services_lock:
+        service = _backup_services.get(key)
+        if service is None:
+            service = BackupService(db_manager, **options)
+            _backup_services[key] = service
+        return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria um snapshot online do banco de crews")
+    parser.add_argument("--db", default="app/data/crews_database.db", help="Banco de dados principal")
+    parser.add_argument("--dir", default=None, help="Diretório dos snapshots (padrão: <pasta do banco>/snapshots)")
+    parser.add_argument("--keep", type=int, default=5, help="Quantidade de snapshots mantidos")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    service = BackupService(db_manager, snapshot_dir=args.dir, keep=args.keep)
+    path = service.create_snapshot()
+    db_manager.close()
+
+    print(f"✅ Snapshot: {path} ({os.path.getsize(path) / 1024:.1f} KB, {len(service.list_snapshots())} mantido(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Armazenamento de conteúdo grande (resultados, saídas de tarefas e relatórios)
+comprimido e endereçado por conteúdo (SHA-256)
+
+Conteúdos idênticos são gravados uma única vez. As linhas das tabelas guardam
+apenas o hash, e a descompressão só acontece quando o conteúdo é solicitado.
+"""
+
+import hashlib
+import json
+import sqlite3
+import zlib
+from typing import List, Optional, Sequence, Union
+
+try:  # zstd é opcional; sem ele, usa zlib da biblioteca padrão
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Conteúdos menores que isso não compensam a compressão
+MIN_COMPRESS_SIZE = 256
+
+# Segmentos maiores que isso são gravados em pedaços, para que a leitura de um
+# trecho (get_range) descomprima apenas os pedaços que o contêm
+CHUNK_CHARS = 65536
+
+# Um resultado pode ser um texto único ou uma sequência de segmentos (ex: resultado + relatório)
+Content = Union[str, Sequence[str]]
+
+
+def content_hash(data: bytes) -> str:
+    """Hash SHA-256 do conteúdo descomprimido"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress(data: bytes) -> tuple:
+    """Comprime o conteúdo e retorna (codec, bytes)"""
+    if len(data) < MIN_COMPRESS_SIZE:
+        return "raw", data
+    if zstandard is not None:
+        compressed = zstandard.ZstdCompressor(level=9).compress(data)
+        codec = "zstd"
+    else:
+        compressed = zlib.compress(data, 6)
+        codec = "zlib"
+    if len(compressed) >= len(data):
+        return "raw", data
+    return codec, compressed
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """Descomprime o conteúdo gravado com o codec informado"""
+    if codec == "raw":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Conteúdo comprimido com zstd, mas o pacote 'zstandard' não está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Codec de blob desconhecido: {codec}")
+
+
+def create_blob_table(conn: sqlite3.Connection):
+    """Cria a tabela de blobs"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,          -- SHA-256 do conteúdo descomprimido
+            codec TEXT NOT NULL,            -- 'raw', 'zlib' ou 'zstd'
+            size INTEGER NOT NULL,          -- tamanho original em bytes
+            stored_size INTEGER NOT NULL,   -- tamanho gravado em bytes
+            data BLOB NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+
+def put_text(conn: sqlite3.Connection, text: str) -> str:
+    """Grava um texto (se ainda não existir) e retorna seu hash"""
+    data = text.encode("utf-8")
+    digest = content_hash(data)
+    if conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+        codec, stored = compress(data)
+        # OR IGNORE: outra conexão pode ter gravado o mesmo conteúdo desde a consulta acima
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (hash, codec, size, stored_size, data) VALUES (?, ?, ?, ?, ?)",
+            (digest, codec, len(data), len(stored), stored),
+        )
+    return digest
+
+
+def get_text(conn: sqlite3.Connection, digest: str, schema: str = "main") -> Optional[str]:
+    """Lê e descomprime um texto pelo hash (`schema` indica o banco anexado que contém o blob)"""
+    row = conn.execute(f"SELECT codec, data FROM {schema}.blobs WHERE hash = ?", (digest,)).fetchone()
+    if row is None:
+        return None
+    return decompress(row[0], row[1]).decode("utf-8")
+
+
+def segments_of(content: Optional[Content]) -> List[str]:
+    """Normaliza o conteúdo em uma lista de segmentos não vazios"""
+    if content is None:
+        return []
+    if isinstance(content, str):
+        return [content] if content else []
+    return [segment for segment in content if segment]
+
+
+def chunks_of(content: Optional[Content]) -> List[str]:
+    """Divide cada segmento em pedaços de até CHUNK_CHARS caracteres
+
+    A divisão é feita por segmento e em posições fixas, então um segmento pequeno
+    (ex: o relatório de avaliação) continua sendo um único blob deduplicável.
+    """
+    return [
+        segment[start : start + CHUNK_CHARS] for segment in segments_of(content) for start in range(0, len(segment), CHUNK_CHARS)
+    ]
+
+
+def put_segments(conn: sqlite3.Connection, content: Optional[Content]) -> Optional[str]:
+    """Grava cada pedaço dos segmentos como blob e retorna a lista de hashes em JSON"""
+    hashes = [put_text(conn, chunk) for chunk in chunks_of(content)]
+    return json.dumps(hashes) if hashes else None
+
+
+def chunk_lengths(content: Optional[Content]) -> Optional[str]:
+    """Tamanho em caracteres de cada pedaço gravado por put_segments, em JSON"""
+    lengths = [len(chunk) for chunk in chunks_of(content)]
+    return json.dumps(lengths) if lengths else None
+
+
+def get_segments(conn: sqlite3.Connection, hashes_json: Optional[str], schema: str = "main") -> Optional[str]:
+    """Reconstrói o texto completo a partir da lista de hashes em JSON"""
+    if not hashes_json:
+        return None
+    return "".join(get_text(conn, digest, schema) or "" for digest in json.loads(hashes_json))
+
+
+def get_range(
+    conn: sqlite3.Connection,
+    hashes_json: Optional[str],
+    lengths_json: Optional[str],
+    offset: int,
+    length: int,
+    schema: str = "main",
+) -> Optional[str]:
+    """Lê `length` caracteres a partir de `offset`, descomprimindo só os pedaços necessários
+
+    Sem os tamanhos dos pedaços (linhas antigas), lê os pedaços em ordem até cobrir o trecho.
+    """
+    if not hashes_json:
+        return None
+    hashes = json.loads(hashes_json)
+    lengths = json.loads(lengths_json) if lengths_json else [None] * len(hashes)
+    end = offset + length
+
+    parts = []
+    position = 0
+    for digest, size in zip(hashes, lengths):
+        if position >= end:
+            break
+        if size is not None and position + size <= offset:
+            position += size
+            continue
+        text = get_text(conn, digest, schema) or ""
+        if position + len(text) > offset:
+            parts.append(text[max(offset - position, 0) : end - position])
+        position += len(text)
+    return "".join(parts)
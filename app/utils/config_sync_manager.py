@@ -11,14 +11,14 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Set
 from pathlib import Path
 
-from app.utils.database import DatabaseManager
+from app.utils.storage import StorageBackend, create_storage
 
 
 class ConfigSyncManager:
     """Gerenciador de sincronização automática entre arquivos YAML e banco de dados"""
 
-    def __init__(self, db_manager: Optional[DatabaseManager] = None):
-        self.db_manager = db_manager or DatabaseManager()
+    def __init__(self, db_manager: Optional[StorageBackend] = None):
+        self.db_manager = db_manager or create_storage()
         self.config_paths = {
             "agents": "app/config/agents.yaml",
             "tasks": "app/config/tasks.yaml",
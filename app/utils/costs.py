@@ -0,0 +1,183 @@
+"""
+Custo estimado das execuções (tokens × preço do modelo) e orçamentos por crew
+
+Os preços (USD por milhão de tokens) e os orçamentos diário/mensal de cada crew
+ficam em app/config/budgets.yaml. Antes do kickoff, o CrewManager compara o gasto
+do dia e do mês (lido dos agregados de consumo, em dias UTC) somado ao custo médio
+das execuções recentes da crew com o orçamento: a execução é rejeitada ou
+degradada para um modelo mais barato, conforme `on_exceed`.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_CONFIG_PATH = "app/config/budgets.yaml"
+
+BUDGET_ACTIONS = ("reject", "degrade")
+REJECTED_STATUS = "rejected"
+
+
+class BudgetExceeded(Exception):
+    """Execução rejeitada por exceder o orçamento da crew"""
+
+
+def usage_tokens(usage) -> Optional[Tuple[int, int]]:
+    """(tokens de prompt, tokens de resposta) de um UsageMetrics do crewAI ou dicionário equivalente"""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+    return int(getattr(usage, "prompt_tokens", 0) or 0), int(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def agent_token_usage(agent) -> Tuple[int, int]:
+    """Tokens acumulados por um agente (os contadores que calculate_usage_metrics do crewAI soma)"""
+    try:
+        return usage_tokens(agent._token_process.get_summary()) or (0, 0)
+    except Exception:
+        return 0, 0
+
+
+def agent_model(agent) -> Optional[str]:
+    """Nome do modelo do agente (agent.llm pode ser um LLM do crewAI ou um texto)"""
+    llm = getattr(agent, "llm", None)
+    if isinstance(llm, str):
+        return llm
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None)
+
+
+def crew_agents(crew) -> List:
+    """Agentes da crew, incluindo o gerente de uma crew hierárquica"""
+    agents = list(getattr(crew, "agents", None) or [])
+    manager = getattr(crew, "manager_agent", None)
+    if manager is not None and all(agent is not manager for agent in agents):
+        agents.append(manager)
+    return agents
+
+
+class UsageMeter:
+    """Tokens consumidos por uma instância de crew a partir da criação do medidor, por modelo
+
+    Os agentes acumulam o consumo entre execuções (instâncias do pool são
+    reaproveitadas), por isso o medidor guarda a leitura inicial de cada agente e
+    devolve diferenças, atribuídas ao modelo do agente (agentes da mesma crew podem
+    usar modelos diferentes). Tarefas executadas em paralelo na mesma instância
+    dividem o consumo conforme a ordem em que terminam.
+    """
+
+    def __init__(self, crew, default_model: Optional[str] = None):
+        self.crew = crew
+        self.default_model = default_model  # para agentes sem modelo identificável
+        self._lock = threading.Lock()
+        self._start = self._last = self._read()
+
+    def _read(self) -> Dict[int, Tuple[Optional[str], int, int]]:
+        return {
+            id(agent): (agent_model(agent) or self.default_model, *agent_token_usage(agent))
+            for agent in crew_agents(self.crew)
+        }
+
+    @staticmethod
+    def _since(previous: Dict, current: Dict) -> Dict[Optional[str], Tuple[int, int]]:
+        usage: Dict[Optional[str], Tuple[int, int]] = {}
+        for key, (model, prompt_tokens, completion_tokens) in current.items():
+            _, prompt_before, completion_before = previous.get(key, (model, 0, 0))
+            prompt_tokens, completion_tokens = prompt_tokens - prompt_before, completion_tokens - completion_before
+            if prompt_tokens or completion_tokens:
+                prompt_sum, completion_sum = usage.get(model, (0, 0))
+                usage[model] = (prompt_sum + prompt_tokens, completion_sum + completion_tokens)
+        return usage
+
+    def take(self) -> Dict[Optional[str], Tuple[int, int]]:
+        """Tokens por modelo desde a última chamada (ex: pela tarefa que acabou de terminar)"""
+        with self._lock:
+            current = self._read()
+            usage = self._since(self._last, current)
+            self._last = current
+        return usage
+
+    def total(self) -> Dict[Optional[str], Tuple[int, int]]:
+        """Tokens por modelo desde a criação do medidor"""
+        return self._since(self._start, self._read())
+
+
+class CostPolicy:
+    """Preços dos modelos e orçamentos (padrão global e exceções por crew)"""
+
+    def __init__(
+        self,
+        pricing: Optional[Dict[str, Dict[str, float]]] = None,
+        default: Optional[Dict] = None,
+        crews: Optional[Dict[str, Dict]] = None,
+    ):
+        self.pricing = pricing or {}
+        self.default = {"daily_usd": None, "monthly_usd": None, "on_exceed": "reject", "degrade_model": None}
+        self.default.update(default or {})
+        self.crews = crews or {}
+        self._unpriced: set = set()
+
+    @classmethod
+    def load(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "CostPolicy":
+        """Carrega preços e orçamentos do arquivo YAML (sem orçamentos se ausente)"""
+        try:
+            if not os.path.exists(config_path):
+                return cls()
+            with open(config_path, "r", encoding="utf-8") as file:
+                config = yaml.safe_load(file) or {}
+        except Exception as e:
+            print(f"Erro ao carregar preços e orçamentos: {e}")
+            return cls()
+        return cls(config.get("pricing"), config.get("default"), config.get("crews"))
+
+    def price(self, model: Optional[str]) -> Optional[Dict[str, float]]:
+        """Preço do modelo; aceita nomes com prefixo de provedor (ex: openai/gpt-4o)"""
+        if not model:
+            return None
+        return self.pricing.get(model) or self.pricing.get(model.split("/")[-1])
+
+    def estimate_cost(self, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Custo em USD (None se o modelo não tiver preço configurado)"""
+        price = self.price(model)
+        if price is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                print(f"⚠️ Modelo '{model}' sem preço em {DEFAULT_CONFIG_PATH}: custo não estimado")
+            return None
+        cost = prompt_tokens * float(price.get("prompt", 0)) + completion_tokens * float(price.get("completion", 0))
+        return round(cost / 1_000_000, 6)
+
+    def estimate_usage_cost(self, usage: Dict[Optional[str], Tuple[int, int]]) -> Optional[float]:
+        """Custo em USD dos tokens por modelo de um UsageMeter (None se nenhum modelo tiver preço)"""
+        costs = [self.estimate_cost(model, *tokens) for model, tokens in usage.items()]
+        priced = [cost for cost in costs if cost is not None]
+        return round(sum(priced), 6) if priced else None
+
+    def budget(self, crew_name: str) -> Dict:
+        """Orçamento efetivo da crew: daily_usd, monthly_usd (None = sem limite), on_exceed e degrade_model"""
+        budget = dict(self.default)
+        budget.update(self.crews.get(crew_name) or {})
+        if budget["on_exceed"] not in BUDGET_ACTIONS:
+            print(f"⚠️ on_exceed inválido para '{crew_name}' ({budget['on_exceed']}); usando 'reject'")
+            budget["on_exceed"] = "reject"
+        return budget
+
+    def check(self, crew_name: str, spent_today: float, spent_month: float, expected_cost: float) -> Tuple[str, Optional[str]]:
+        """Decide a execução: ("allow", None) ou (ação de on_exceed, motivo)"""
+        budget = self.budget(crew_name)
+        for label, spent, limit in (
+            ("diário", spent_today, budget["daily_usd"]),
+            ("mensal", spent_month, budget["monthly_usd"]),
+        ):
+            if limit is not None and spent + expected_cost > float(limit):
+                reason = (
+                    f"Orçamento {label} da crew '{crew_name}' excedido: US$ {spent:.2f} gastos "
+                    f"+ US$ {expected_cost:.2f} estimados > US$ {float(limit):.2f}"
+                )
+                action = budget["on_exceed"]
+                if action == "degrade" and not budget["degrade_model"]:
+                    action = "reject"
+                return action, reason
+        return "allow", None
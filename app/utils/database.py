@@ -4,117 +4,571 @@ Sistema de banco de dados para armazenar resultados e histórico de crews
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Callable, Iterator
 from pathlib import Path
 
+from app.utils.blob_store import (
+    Content,
+    chunk_lengths,
+    get_range,
+    get_segments,
+    get_text,
+    put_segments,
+    put_text,
+    segments_of,
+)
+from app.utils.migrations import (
+    RESULT_PREVIEW_CHARS,
+    TASK_METRIC_COLUMNS,
+    USAGE_COLUMNS,
+    get_schema_version,
+    parse_duration_ms,
+    run_migrations,
+)
+from app.utils.result_sections import dump_sections, index_sections, load_sections
+from app.utils.retention import archive_schema, ensure_archive, list_archives, month_bounds
+from app.utils.rollups import (
+    ACTIVE_STATUSES,
+    STATISTICS_WINDOWS,
+    move_execution_start,
+    record_execution_finished,
+    record_execution_reopened,
+    record_execution_started,
+    record_usage,
+    summarize_statistics,
+    usage_row,
+    window_start,
+)
+from app.utils.search_index import (
+    BM25_WEIGHTS,
+    SEARCH_KIND_CODES,
+    index_entry,
+    make_snippet,
+    query_patterns,
+)
+from app.utils.write_behind import WriteBehindQueue
+
+
+class ConnectionManager:
+    """Mantém uma conexão SQLite reutilizável por thread, em modo WAL"""
+
+    # PRAGMAs aplicados a cada nova conexão
+    PRAGMAS = {
+        "auto_vacuum": "INCREMENTAL",  # só tem efeito em bancos novos (ver retention.reclaim_space)
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # seguro em WAL e sem fsync a cada commit
+        "busy_timeout": 5000,  # ms aguardando o lock de escrita antes de "database is locked"
+        "cache_size": -16000,  # ~16 MB de cache de páginas por conexão
+        "temp_store": "MEMORY",
+    }
+    # PRAGMAs que alteram o arquivo e não se aplicam a conexões somente leitura
+    WRITE_PRAGMAS = ("auto_vacuum", "journal_mode")
+
+    def __init__(
+        self,
+        db_path: str,
+        cached_statements: int = 256,
+        checkpoint_interval: float = 60.0,
+        checkpoint_every_writes: int = 500,
+        read_only: bool = False,
+    ):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.cached_statements = cached_statements
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_every_writes = checkpoint_every_writes
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, tuple] = {}  # ident da thread -> (thread, conexão)
+        self._writes_since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+        # Bancos em memória precisam de cache compartilhado para serem vistos por todas as threads
+        self._uri = db_path.startswith("file:")
+        self._keepalive: Optional[sqlite3.Connection] = None
+        if db_path == ":memory:":
+            self.db_path = f"file:memdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+            self._keepalive = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs de desempenho"""
+        # Sempre em modo URI, para que ATTACH aceite "file:...?mode=ro" (arquivos mensais)
+        target = self.db_path if self._uri else Path(self.db_path).absolute().as_uri()
+        if self.read_only:
+            # Snapshots nunca mudam depois de gravados: dispensa locks e o arquivo -shm
+            target = f"{target}?mode=ro&immutable=1"
+        conn = sqlite3.connect(
+            target,
+            timeout=self.PRAGMAS["busy_timeout"] / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # permite fechar a conexão a partir de outra thread
+            uri=True,
+        )
+        for pragma, value in self.PRAGMAS.items():
+            if self.read_only and pragma in self.WRITE_PRAGMAS:
+                continue
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, criando-a se necessário"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            current = threading.current_thread()
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[current.ident] = (current, conn)
+        return conn
+
+    def _prune_dead_threads(self):
+        """Fecha conexões de threads que já terminaram (ex: reruns do Streamlit)"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Executa um bloco de escrita com commit/rollback automático"""
+        conn = self.connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._maybe_checkpoint(conn)
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Fornece a conexão da thread atual para consultas somente leitura"""
+        yield self.connection()
+
+    def _maybe_checkpoint(self, conn: sqlite3.Connection):
+        """Executa checkpoint do WAL após N escritas ou a cada intervalo de tempo"""
+        with self._lock:
+            self._writes_since_checkpoint += 1
+            due = (
+                self._writes_since_checkpoint >= self.checkpoint_every_writes
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+            )
+            if not due:
+                return
+            self._writes_since_checkpoint = 0
+            self._last_checkpoint = time.monotonic()
+        self.checkpoint(conn=conn)
+
+    def checkpoint(self, mode: str = "PASSIVE", conn: Optional[sqlite3.Connection] = None) -> Optional[tuple]:
+        """Transfere o conteúdo do WAL para o arquivo principal sem bloquear leitores"""
+        try:
+            return (conn or self.connection()).execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Falha no checkpoint do WAL: {e}")
+            return None
+
+    def close_all(self):
+        """Fecha todas as conexões abertas por este gerenciador"""
+        with self._lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+            if self._keepalive is not None:
+                self._keepalive.close()
+                self._keepalive = None
+        self._local = threading.local()
+
+
+def _local_date_to_utc_text(value: date) -> str:
+    """Converte uma data local no formato de texto UTC usado por created_at"""
+    local_midnight = datetime(value.year, value.month, value.day).astimezone()
+    return local_midnight.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_fts_query(query: str, prefix: bool = True) -> str:
+    """Converte texto livre em uma expressão MATCH segura para o FTS5
+
+    Cada palavra vira um termo entre aspas (todos obrigatórios). Palavras terminadas
+    em * e, com `prefix=True`, a última palavra digitada são buscadas por prefixo.
+    """
+    tokens = re.findall(r"\w+\*?", query or "")
+    terms = []
+    for index, token in enumerate(tokens):
+        is_prefix = token.endswith("*") or (prefix and index == len(tokens) - 1)
+        word = token.rstrip("*")
+        terms.append(f'"{word}"*' if is_prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+_connection_managers: Dict[str, ConnectionManager] = {}
+_connection_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> ConnectionManager:
+    """Retorna o gerenciador de conexões compartilhado para um arquivo de banco"""
+    if db_path == ":memory:":
+        return ConnectionManager(db_path)
+
+    key = os.path.abspath(db_path)
+    with _connection_managers_lock:
+        manager = _connection_managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _connection_managers[key] = manager
+        return manager
+
 
 class DatabaseManager:
     """Gerenciador de banco de dados SQLite para o sistema"""
 
-    def __init__(self, db_path: str = "app/data/crews_database.db"):
+    STATISTICS_WINDOWS = STATISTICS_WINDOWS
+
+    # Máximo de arquivos mensais anexados ao mesmo tempo a uma conexão (o SQLite permite 10)
+    MAX_ATTACHED_ARCHIVES = 8
+
+    def __init__(
+        self,
+        db_path: str = "app/data/crews_database.db",
+        write_behind: bool = False,
+        archive_dir: Optional[str] = None,
+        read_only: bool = False,
+    ):
         self.db_path = db_path
-        self._ensure_data_directory()
-        self._create_tables()
+        self.read_only = read_only
+        if read_only:
+            # Ex: snapshots de backup usados por consultas analíticas (ver app/utils/backup.py).
+            # Fora do registro compartilhado: o snapshot é descartado na rotação
+            self.connections = ConnectionManager(db_path, read_only=True)
+            self.schema_version = get_schema_version(self.connections.connection())
+        else:
+            self._ensure_data_directory()
+            self.connections = get_connection_manager(db_path)
+            self._create_tables()
+
+        # Arquivos mensais gerados pela política de retenção (ver app/utils/retention.py)
+        if archive_dir is None and not db_path.startswith((":memory:", "file:")):
+            archive_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
+        self.archive_dir = archive_dir
+        self._checked_archives: set = set()
+
+        # Com write_behind, resultados de tarefas e atualizações de execução são
+        # gravados em lote por um thread escritor (ver flush())
+        self.write_queue: Optional[WriteBehindQueue] = None
+        if write_behind and not read_only:
+            self.write_queue = WriteBehindQueue(self._apply_write_batch)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a gravação de todas as escritas pendentes na fila"""
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+
+    def close(self):
+        """Grava as escritas pendentes e fecha as conexões abertas para este banco"""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        self.connections.checkpoint()
+        self.connections.close_all()
+
+    def _apply_write_batch(self, events: List[tuple]):
+        """Aplica um lote de eventos da fila em uma única transação"""
+        with self.connections.transaction() as conn:
+            index = 0
+            while index < len(events):
+                kind, params = events[index]
+                if kind == "task_result":
+                    # Resultados de tarefas consecutivos são gravados com executemany
+                    rows = []
+                    while index < len(events) and events[index][0] == "task_result":
+                        rows.append(events[index][1])
+                        index += 1
+                    self._insert_task_results(conn, rows)
+                    continue
+                if kind == "execution_result":
+                    self._write_execution_result(conn, *params)
+                elif kind == "execution_usage":
+                    self._write_execution_usage(conn, *params)
+                elif kind == "critical_path":
+                    self._write_critical_path(conn, *params)
+                elif kind == "execution_inputs":
+                    self._write_execution_inputs(conn, *params)
+                else:
+                    print(f"⚠️ Evento de persistência desconhecido: {kind}")
+                index += 1
 
     def _ensure_data_directory(self):
         """Garante que o diretório de dados existe"""
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _create_tables(self):
-        """Cria as tabelas necessárias se não existirem"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """Cria/atualiza o schema aplicando as migrações pendentes"""
+        with self.connections.read() as conn:
+            self.schema_version = run_migrations(conn)
 
-            # Tabela de execuções
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS executions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_name TEXT NOT NULL,
-                    topic TEXT NOT NULL,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT,
-                    duration TEXT,
-                    status TEXT DEFAULT 'running',
-                    result TEXT,
-                    error_message TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
+    def save_execution(
+        self,
+        crew_name: str,
+        topic: str,
+        start_time: datetime,
+        status: str = "running",
+        batch_id: Optional[str] = None,
+    ) -> int:
+        """Salva uma nova execução e retorna o ID
 
-            # Tabela de resultados detalhados
+        Execuções enviadas ao motor de execução começam como "queued" e passam a
+        "running" com start_execution quando um worker as inicia. `batch_id` agrupa
+        as execuções de um mesmo lote.
+        """
+        start_ts = int(start_time.timestamp() * 1000)
+        with self.connections.transaction() as conn:
+            cursor = conn.cursor()
             cursor.execute(
                 """
-                CREATE TABLE IF NOT EXISTS execution_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    execution_id INTEGER,
-                    agent_name TEXT,
-                    task_description TEXT,
-                    task_result TEXT,
-                    task_status TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (execution_id) REFERENCES executions (id)
-                )
-            """
+                INSERT INTO executions (crew_name, topic, start_time, start_ts, created_ts, status, batch_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+                (crew_name, topic, start_time.isoformat(), start_ts, int(time.time() * 1000), status, batch_id),
             )
+            result = cursor.lastrowid
+            if result is None:
+                raise Exception("Falha ao inserir execução no banco de dados")
+            record_execution_started(conn, crew_name, start_ts)
+            self._index_search_entry(conn, "execution", result, result, crew_name, topic, "", None)
+            return result
 
-            # Tabela de configurações de crews (backup)
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS crew_configs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    crew_name TEXT UNIQUE NOT NULL,
-                    description TEXT,
-                    agent_types TEXT,  -- JSON array
-                    task_types TEXT,   -- JSON array
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """
+    def start_execution(self, execution_id: int, start_time: datetime) -> bool:
+        """Marca uma execução na fila como iniciada; retorna False se ela não estava mais na fila"""
+        start_ts = int(start_time.timestamp() * 1000)
+        self.flush()
+        with self.connections.transaction() as conn:
+            row = conn.execute(
+                "SELECT crew_name, start_ts FROM executions WHERE id = ? AND status = 'queued'", (execution_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute(
+                "UPDATE executions SET status = 'running', start_time = ?, start_ts = ? WHERE id = ?",
+                (start_time.isoformat(), start_ts, execution_id),
             )
+            move_execution_start(conn, row[0], row[1], start_ts)
+            return True
 
-            conn.commit()
+    def reopen_execution(self, execution_id: int) -> bool:
+        """Volta uma execução encerrada sem sucesso para "running" (ex: para retomá-la)
 
-    def save_execution(self, crew_name: str, topic: str, start_time: datetime) -> int:
-        """Salva uma nova execução e retorna o ID"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        Os agregados deixam de contar o término anterior; o resultado final será gravado
+        novamente por update_execution_result. Execuções concluídas, ainda ativas ou
+        arquivadas não são reabertas.
+        """
+        self.flush()
+        with self.connections.transaction() as conn:
+            row = conn.execute(
+                "SELECT crew_name, start_ts, status, duration_ms FROM executions WHERE id = ?", (execution_id,)
+            ).fetchone()
+            if row is None or row[2] in ACTIVE_STATUSES or row[2] == "completed":
+                return False
+            conn.execute(
                 """
-                INSERT INTO executions (crew_name, topic, start_time)
-                VALUES (?, ?, ?)
+                UPDATE executions
+                SET status = 'running', end_time = NULL, end_ts = NULL, duration = NULL, duration_ms = NULL,
+                    error_message = NULL
+                WHERE id = ?
             """,
-                (crew_name, topic, start_time.isoformat()),
+                (execution_id,),
             )
-            conn.commit()
-            result = cursor.lastrowid
-            if result is None:
-                raise Exception("Falha ao inserir execução no banco de dados")
-            return result
+            record_execution_reopened(conn, row[0], row[1], row[2], row[3])
+            return True
 
     def update_execution_result(
         self,
         execution_id: int,
-        result: str,
+        result: Content,
         end_time: datetime,
         duration: str,
         status: str = "completed",
         error_message: Optional[str] = None,
     ):
-        """Atualiza o resultado de uma execução"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        """Atualiza o resultado de uma execução
+
+        `result` pode ser um texto ou uma lista de segmentos (ex: resultado da crew,
+        separador e relatório de avaliação). Cada segmento é gravado como blob, de
+        modo que um relatório também salvo em evaluation_reports não é duplicado.
+        """
+        params = (execution_id, result, end_time, duration, status, error_message)
+        if self.write_queue is not None:
+            self.write_queue.submit("execution_result", params)
+            return
+        with self.connections.transaction() as conn:
+            self._write_execution_result(conn, *params)
+
+    def _write_execution_result(
+        self,
+        conn: sqlite3.Connection,
+        execution_id: int,
+        result: Content,
+        end_time: datetime,
+        duration: str,
+        status: str,
+        error_message: Optional[str],
+    ):
+        """Grava o resultado de uma execução e atualiza os agregados (dentro de uma transação)"""
+        end_ts = int(end_time.timestamp() * 1000)
+        cursor = conn.cursor()
+        previous = cursor.execute(
+            "SELECT crew_name, topic, status, start_ts FROM executions WHERE id = ?", (execution_id,)
+        ).fetchone()
+        if previous is None:
+            return
+        crew_name, topic, previous_status, start_ts = previous
+        duration_ms = end_ts - start_ts if start_ts is not None else parse_duration_ms(duration)
+        segments = segments_of(result)
+        full_text = "".join(segments)
+
+        cursor.execute(
+            """
+            UPDATE executions 
+            SET result = NULL, result_blobs = ?, result_chunk_chars = ?, result_sections = ?,
+                result_preview = ?, result_size = ?, end_time = ?, duration = ?, status = ?, error_message = ?,
+                end_ts = ?, duration_ms = ?
+            WHERE id = ?
+        """,
+            (
+                put_segments(conn, result),
+                chunk_lengths(result),
+                dump_sections(index_sections(full_text)),
+                full_text[:RESULT_PREVIEW_CHARS],
+                len(full_text),
+                end_time.isoformat(),
+                duration,
+                status,
+                error_message,
+                end_ts,
+                duration_ms,
+                execution_id,
+            ),
+        )
+        # Só o resultado da crew é indexado: o relatório anexado a ele tem sua própria entrada
+        crew_result = segments[0] if segments else ""
+        self._index_search_entry(
+            conn, "execution", execution_id, execution_id, crew_name, topic, crew_result, put_segments(conn, crew_result)
+        )
+
+        # Agregados só contam a primeira transição para um estado final
+        if previous_status in ACTIVE_STATUSES and status not in ACTIVE_STATUSES:
+            record_execution_finished(conn, crew_name, start_ts, status, duration_ms)
+
+    def record_execution_usage(
+        self,
+        execution_id: int,
+        model: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: Optional[float] = None,
+    ):
+        """Soma tokens e custo estimado (USD) ao consumo de uma execução
+
+        O consumo é cumulativo (ex: execução da crew e depois a avaliação) e entra no
+        agregado por crew, modelo e dia UTC do início da execução.
+        """
+        params = (execution_id, model, prompt_tokens, completion_tokens, cost_usd)
+        if self.write_queue is not None:
+            self.write_queue.submit("execution_usage", params)
+            return
+        with self.connections.transaction() as conn:
+            self._write_execution_usage(conn, *params)
+
+    def save_execution_inputs(self, execution_id: int, inputs: Optional[Dict]):
+        """Grava as entradas do kickoff da execução (repetidas ao retomá-la)"""
+        params = (execution_id, json.dumps(inputs or {}, ensure_ascii=False, default=str))
+        if self.write_queue is not None:
+            self.write_queue.submit("execution_inputs", params)
+            return
+        with self.connections.transaction() as conn:
+            self._write_execution_inputs(conn, *params)
+
+    def _write_execution_inputs(self, conn: sqlite3.Connection, execution_id: int, inputs: str):
+        conn.execute("UPDATE executions SET inputs = ? WHERE id = ?", (inputs, execution_id))
+
+    def save_critical_path(self, execution_id: int, summary: str):
+        """Grava o caminho crítico do DAG de tarefas da execução (ex: "a → b (12.0s)")"""
+        params = (execution_id, summary)
+        if self.write_queue is not None:
+            self.write_queue.submit("critical_path", params)
+            return
+        with self.connections.transaction() as conn:
+            self._write_critical_path(conn, *params)
+
+    def _write_critical_path(self, conn: sqlite3.Connection, execution_id: int, summary: str):
+        conn.execute("UPDATE executions SET critical_path = ? WHERE id = ?", (summary, execution_id))
+
+    def _write_execution_usage(
+        self,
+        conn: sqlite3.Connection,
+        execution_id: int,
+        model: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: Optional[float],
+    ):
+        """Grava o consumo de uma execução e atualiza o agregado (dentro de uma transação)"""
+        row = conn.execute("SELECT crew_name, start_ts FROM executions WHERE id = ?", (execution_id,)).fetchone()
+        if row is None:
+            return
+        conn.execute(
+            """
+            UPDATE executions
+            SET model = COALESCE(model, ?),
+                prompt_tokens = COALESCE(prompt_tokens, 0) + ?,
+                completion_tokens = COALESCE(completion_tokens, 0) + ?,
+                cost_usd = CASE WHEN ? IS NULL THEN cost_usd ELSE COALESCE(cost_usd, 0) + ? END
+            WHERE id = ?
+        """,
+            (model, prompt_tokens, completion_tokens, cost_usd, cost_usd, execution_id),
+        )
+        record_usage(conn, row[0], row[1], model, prompt_tokens, completion_tokens, cost_usd)
+
+    def get_usage_summary(self, since: Optional[date] = None, crew_name: Optional[str] = None) -> List[Dict]:
+        """Tokens e custo por dia UTC, crew e modelo (dias mais recentes primeiro)"""
+        self.flush()
+        since_ts = int(datetime(since.year, since.month, since.day, tzinfo=timezone.utc).timestamp() * 1000) if since else 0
+        query = """
+            SELECT day_ts, crew_name, model, prompt_tokens, completion_tokens, cost_usd
+            FROM usage_rollups WHERE day_ts >= ?
+        """
+        params: List[Any] = [since_ts]
+        if crew_name:
+            query += " AND crew_name = ?"
+            params.append(crew_name)
+        query += " ORDER BY day_ts DESC, crew_name, model"
+        with self.connections.read() as conn:
+            return [usage_row(*row) for row in conn.execute(query, params).fetchall()]
+
+    def get_average_execution_cost(self, crew_name: str, limit: int = 20) -> Optional[float]:
+        """Custo médio (USD) das últimas execuções da crew com custo registrado"""
+        self.flush()
+        with self.connections.read() as conn:
+            row = conn.execute(
                 """
-                UPDATE executions 
-                SET result = ?, end_time = ?, duration = ?, status = ?, error_message = ?
-                WHERE id = ?
+                SELECT AVG(cost_usd) FROM (
+                    SELECT cost_usd FROM executions
+                    WHERE crew_name = ? AND cost_usd IS NOT NULL
+                    ORDER BY start_ts DESC LIMIT ?
+                )
             """,
-                (result, end_time.isoformat(), duration, status, error_message, execution_id),
-            )
-            conn.commit()
+                (crew_name, limit),
+            ).fetchone()
+        return row[0]
 
     def save_task_result(
         self,
@@ -123,78 +577,370 @@ class DatabaseManager:
         task_description: str,
         task_result: str,
         task_status: str = "completed",
+        metrics: Optional[Dict] = None,
+        task_index: Optional[int] = None,
     ):
-        """Salva o resultado de uma tarefa específica"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
+        """Salva o resultado de uma tarefa específica
+
+        `metrics` traz os tempos, passos e consumo da tarefa (chaves de TASK_METRIC_COLUMNS);
+        `task_index` é a posição da tarefa na crew, que a retomada usa para reaproveitá-la.
+        """
+        params = (execution_id, agent_name, task_description, task_result, task_status, metrics, task_index)
+        if self.write_queue is not None:
+            self.write_queue.submit("task_result", params)
+            return
+        with self.connections.transaction() as conn:
+            self._insert_task_results(conn, [params])
+
+    def _insert_task_results(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """Insere resultados de tarefas (dentro de uma transação)"""
+        for execution_id, agent_name, task_description, task_result, task_status, metrics, task_index in rows:
+            metric_values = [(metrics or {}).get(column) for column in TASK_METRIC_COLUMNS]
+            if metric_values[-1] is not None:
+                metric_values[-1] = json.dumps(metric_values[-1])
+            digest = put_text(conn, task_result or "")
+            cursor = conn.execute(
+                f"""
                 INSERT INTO execution_results 
-                (execution_id, agent_name, task_description, task_result, task_status)
-                VALUES (?, ?, ?, ?, ?)
+                (execution_id, agent_name, task_description, task_result_blob, task_status, task_index,
+                 {", ".join(TASK_METRIC_COLUMNS)})
+                VALUES (?, ?, ?, ?, ?, ?{", ?" * len(TASK_METRIC_COLUMNS)})
             """,
-                (execution_id, agent_name, task_description, task_result, task_status),
+                (execution_id, agent_name, task_description, digest, task_status, task_index, *metric_values),
             )
-            conn.commit()
+            self._index_search_entry(
+                conn,
+                "task_result",
+                cursor.lastrowid,
+                execution_id,
+                None,
+                task_description or "",
+                task_result or "",
+                json.dumps([digest]),
+            )
+
+    def _index_search_entry(
+        self,
+        conn: sqlite3.Connection,
+        kind: str,
+        ref_id: int,
+        execution_id: int,
+        crew_name: Optional[str],
+        title: str,
+        body: str,
+        body_blobs: Optional[str],
+    ):
+        """Grava (ou substitui) a entrada do índice FTS de um conteúdo
+
+        O índice não guarda o texto: `body_blobs` (hashes em JSON dos blobs que
+        formam `body`) permite reconstruí-lo para trechos e remoções.
+        """
+        if not self.full_text_search_enabled:
+            return
+        if crew_name is None:
+            row = conn.execute("SELECT crew_name FROM executions WHERE id = ?", (execution_id,)).fetchone()
+            crew_name = row[0] if row else None
+        rowid = ref_id * 4 + SEARCH_KIND_CODES[kind]
+        index_entry(conn, rowid, kind, execution_id, crew_name, title, body, body_blobs)
+
+    def _row_with_result(self, conn: sqlite3.Connection, row: Dict, schema: str = "main") -> Dict:
+        """Preenche `result` a partir dos blobs (descomprimidos sob demanda)"""
+        blobs = row.pop("result_blobs", None)
+        if row.get("result") is None:
+            row["result"] = get_segments(conn, blobs, schema)
+        return row
+
+    def _attach_archive(self, conn: sqlite3.Connection, month: str, path: str) -> str:
+        """Anexa um arquivo mensal somente leitura à conexão e retorna o nome do esquema"""
+        schema = archive_schema(month)
+        attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+        if schema in attached:
+            return schema
+
+        if path not in self._checked_archives:
+            ensure_archive(path)  # arquivos criados por versões anteriores recebem as novas migrações
+            self._checked_archives.add(path)
+
+        archives = [name for name in attached if name.startswith("archive_")]
+        for name in archives[: max(len(archives) - self.MAX_ATTACHED_ARCHIVES + 1, 0)]:
+            conn.execute(f"DETACH DATABASE {name}")
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"{Path(path).absolute().as_uri()}?mode=ro",))
+        return schema
+
+    def sources(
+        self,
+        conn: sqlite3.Connection,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        stop_before: Optional[Callable[[str], bool]] = None,
+    ) -> Iterator[str]:
+        """Produz "main" e, sob demanda, o esquema de cada arquivo mensal necessário
+
+        Só são anexados os arquivos cujo mês intersecta [created_from, created_to].
+        `stop_before(fim_do_mes)` permite encerrar antes de anexar arquivos mais antigos.
+        """
+        yield "main"
+        for month, path in list_archives(self.archive_dir):
+            month_start, month_end = month_bounds(month)
+            if (created_from and month_end <= created_from) or (created_to and month_start > created_to):
+                continue
+            if stop_before is not None and stop_before(month_end):
+                return
+            yield self._attach_archive(conn, month, path)
 
     def get_execution_history(self) -> List[Dict]:
-        """Retorna o histórico completo de execuções"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        """Retorna o histórico completo de execuções (incluindo arquivos mensais)"""
+        rows = []
+        with self.connections.read() as conn:
+            for schema in self.sources(conn):
+                cursor = conn.execute(
+                    f"""
+                    SELECT id, crew_name, topic, start_time, end_time, duration, 
+                           status, result, error_message, created_at, result_blobs
+                    FROM {schema}.executions 
+                    ORDER BY created_at DESC
                 """
-                SELECT id, crew_name, topic, start_time, end_time, duration, 
-                       status, result, error_message, created_at
-                FROM executions 
-                ORDER BY created_at DESC
-            """
-            )
+                )
+                columns = [description[0] for description in cursor.description]
+                rows.extend(self._row_with_result(conn, dict(zip(columns, row)), schema) for row in cursor.fetchall())
 
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        rows.sort(key=lambda row: (row["created_at"] or "", row["id"]), reverse=True)
+        return rows
 
-    def get_execution_details(self, execution_id: int) -> Optional[Dict]:
-        """Retorna detalhes de uma execução específica"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+    def get_execution_history_page(
+        self,
+        limit: int = 25,
+        cursor: Optional[tuple] = None,
+        crew_name: Optional[str] = None,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        preview_chars: int = 100,
+    ) -> Dict:
+        """Retorna uma página do histórico (mais recentes primeiro) usando cursor (created_at, id)
 
-            # Buscar execução principal
-            cursor.execute(
-                """
-                SELECT id, crew_name, topic, start_time, end_time, duration, 
-                       status, result, error_message, created_at
-                FROM executions 
-                WHERE id = ?
-            """,
-                (execution_id,),
-            )
+        Apenas colunas de resumo são lidas; o resultado vem como prévia via substr.
+        Passe o `next_cursor` retornado para obter a página seguinte. Arquivos mensais
+        só são consultados quando a página ainda pode conter execuções daquele mês.
+        """
+        conditions = []
+        params: List[Any] = []
+        created_from = created_to = None
 
-            execution = cursor.fetchone()
-            if not execution:
-                return None
+        if crew_name:
+            conditions.append("crew_name = ?")
+            params.append(crew_name)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        # created_at é gravado em UTC pelo SQLite; os limites de data são locais
+        if date_from:
+            created_from = _local_date_to_utc_text(date_from)
+            conditions.append("created_at >= ?")
+            params.append(created_from)
+        if date_to:
+            created_to = _local_date_to_utc_text(date_to + timedelta(days=1))
+            conditions.append("created_at < ?")
+            params.append(created_to)
+        if cursor:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(cursor)
+            created_to = min(created_to or cursor[0], cursor[0])
 
-            columns = [description[0] for description in cursor.description]
-            execution_dict = dict(zip(columns, execution))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows: List[Dict] = []
+        with self.connections.read() as conn:
+            # Execuções arquivadas têm created_at < fim do mês: se a página já está
+            # completa com linhas mais novas, este e os arquivos seguintes são dispensáveis
+            def page_is_full(month_end: str) -> bool:
+                return len(rows) > limit and rows[limit]["created_at"] >= month_end
 
-            # Buscar resultados das tarefas
-            cursor.execute(
-                """
-                SELECT agent_name, task_description, task_result, task_status, created_at
-                FROM execution_results 
-                WHERE execution_id = ?
-                ORDER BY created_at
-            """,
-                (execution_id,),
-            )
+            for schema in self.sources(conn, created_from, created_to, stop_before=page_is_full):
+                cursor_db = conn.execute(
+                    f"""
+                    SELECT id, crew_name, topic, start_time, duration, duration_ms, status, created_at,
+                           substr(COALESCE(result, result_preview), 1, ?) AS result_preview
+                    FROM {schema}.executions
+                    {where}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                """,
+                    [min(preview_chars, RESULT_PREVIEW_CHARS), *params, limit + 1],
+                )
+                columns = [description[0] for description in cursor_db.description]
+                rows.extend(dict(zip(columns, row)) for row in cursor_db.fetchall())
+                rows.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+                del rows[limit + 1 :]
 
-            task_columns = [description[0] for description in cursor.description]
-            execution_dict["task_results"] = [dict(zip(task_columns, row)) for row in cursor.fetchall()]
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = (items[-1]["created_at"], items[-1]["id"]) if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_execution_crew_names(self) -> List[str]:
+        """Lista os nomes de crews que possuem execuções registradas (inclusive arquivadas)"""
+        with self.connections.read() as conn:
+            rows = conn.execute(
+                "SELECT crew_name FROM execution_rollups WHERE granularity = 'all' AND total > 0 ORDER BY crew_name"
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def get_execution_details(self, execution_id: int, include_result: bool = True) -> Optional[Dict]:
+        """Retorna detalhes de uma execução específica (procurando também nos arquivos mensais)
+
+        Com `include_result=False`, o resultado não é descomprimido (`result` fica None);
+        use get_result_sections/get_result_range para lê-lo por partes.
+        """
+        self.flush()
+        with self.connections.read() as conn:
+            for schema in self.sources(conn):
+                details = self._get_execution_details(conn, schema, execution_id, include_result)
+                if details is not None:
+                    return details
+        return None
+
+    def _get_execution_details(
+        self, conn: sqlite3.Connection, schema: str, execution_id: int, include_result: bool = True
+    ) -> Optional[Dict]:
+        cursor = conn.cursor()
+
+        # Buscar execução principal
+        cursor.execute(
+            f"""
+            SELECT id, crew_name, topic, start_time, end_time, duration, 
+                   status, result, error_message, created_at, duration_ms, result_blobs, result_size,
+                   model, {", ".join(USAGE_COLUMNS)}, critical_path, inputs
+            FROM {schema}.executions 
+            WHERE id = ?
+        """,
+            (execution_id,),
+        )
+
+        execution = cursor.fetchone()
+        if not execution:
+            return None
+
+        columns = [description[0] for description in cursor.description]
+        execution_dict = dict(zip(columns, execution))
+        if include_result:
+            execution_dict = self._row_with_result(conn, execution_dict, schema)
+        else:
+            execution_dict.pop("result_blobs")
+            if execution_dict["result"] is not None and execution_dict["result_size"] is None:
+                execution_dict["result_size"] = len(execution_dict["result"])
+            execution_dict["result"] = None
+        execution_dict["archived"] = schema != "main"
+        execution_dict["inputs"] = json.loads(execution_dict["inputs"]) if execution_dict["inputs"] else None
+
+        # Buscar resultados das tarefas
+        cursor.execute(
+            f"""
+            SELECT agent_name, task_description, task_result, task_result_blob, task_status, created_at, task_index,
+                   {", ".join(TASK_METRIC_COLUMNS)}
+            FROM {schema}.execution_results 
+            WHERE execution_id = ?
+            ORDER BY created_at, id
+        """,
+            (execution_id,),
+        )
+
+        task_columns = [description[0] for description in cursor.description]
+        task_results = []
+        for row in cursor.fetchall():
+            task = dict(zip(task_columns, row))
+            blob = task.pop("task_result_blob")
+            if task["task_result"] is None and blob:
+                task["task_result"] = get_text(conn, blob, schema)
+            task["tool_names"] = json.loads(task["tool_names"]) if task["tool_names"] else {}
+            task_results.append(task)
+        execution_dict["task_results"] = task_results
+
+        return execution_dict
+
+    def get_batch_executions(self, batch_id: str, include_result: bool = True) -> List[Dict]:
+        """Execuções de um lote, na ordem em que os itens foram registrados"""
+        self.flush()
+        rows = []
+        with self.connections.read() as conn:
+            for schema in self.sources(conn):
+                cursor = conn.execute(
+                    f"""
+                    SELECT id, crew_name, topic, start_time, end_time, duration, status,
+                           result, error_message, result_blobs, result_size
+                    FROM {schema}.executions
+                    WHERE batch_id = ?
+                """,
+                    (batch_id,),
+                )
+                columns = [description[0] for description in cursor.description]
+                for row in cursor.fetchall():
+                    execution = dict(zip(columns, row))
+                    if include_result:
+                        execution = self._row_with_result(conn, execution, schema)
+                    else:
+                        execution.pop("result_blobs")
+                        execution["result"] = None
+                    rows.append(execution)
+        rows.sort(key=lambda row: row["id"])
+        return rows
 
-            return execution_dict
+    def _find_result(
+        self, conn: sqlite3.Connection, execution_id: int, columns: str, params: tuple = ()
+    ) -> Optional[tuple]:
+        """Colunas do resultado de uma execução, procurando também nos arquivos mensais: (esquema, linha)"""
+        for schema in self.sources(conn):
+            row = conn.execute(
+                f"SELECT {columns} FROM {schema}.executions WHERE id = ?", (*params, execution_id)
+            ).fetchone()
+            if row is not None:
+                return schema, row
+        return None
+
+    def get_result_length(self, execution_id: int) -> Optional[int]:
+        """Tamanho do resultado em caracteres, sem descomprimi-lo"""
+        self.flush()
+        with self.connections.read() as conn:
+            found = self._find_result(conn, execution_id, "COALESCE(length(result), result_size, 0)")
+        return found[1][0] if found else None
+
+    def get_result_sections(self, execution_id: int) -> List[Dict]:
+        """Índice de seções markdown do resultado: [{"offset", "length", "level", "title"}, ...]
+
+        Resultados gravados sem índice (texto puro legado) são indexados na leitura.
+        """
+        self.flush()
+        with self.connections.read() as conn:
+            found = self._find_result(conn, execution_id, "result_sections, result")
+        if found is None:
+            return []
+        sections_json, legacy_result = found[1]
+        return load_sections(sections_json) if sections_json else index_sections(legacy_result)
+
+    def get_result_range(self, execution_id: int, offset: int = 0, length: int = 20000) -> Optional[str]:
+        """Trecho do resultado: `length` caracteres a partir de `offset`
+
+        Texto puro é cortado pelo próprio SQLite (substr); resultados em blobs
+        descomprimem apenas os pedaços que contêm o trecho.
+        """
+        offset, length = max(offset, 0), max(length, 0)
+        self.flush()
+        with self.connections.read() as conn:
+            found = self._find_result(
+                conn,
+                execution_id,
+                "substr(result, ?, ?), result IS NULL, result_blobs, result_chunk_chars",
+                (offset + 1, length),
+            )
+            if found is None:
+                return None
+            schema, (text, in_blobs, result_blobs, chunk_chars) = found
+            if not in_blobs:
+                return text
+            return get_range(conn, result_blobs, chunk_chars, offset, length, schema)
 
     def save_crew_config(self, crew_name: str, description: str, agent_types: List[str], task_types: List[str]):
         """Salva configuração de uma crew"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -204,11 +950,10 @@ class DatabaseManager:
             """,
                 (crew_name, description, json.dumps(agent_types), json.dumps(task_types), datetime.now().isoformat()),
             )
-            conn.commit()
 
     def get_crew_config(self, crew_name: str) -> Optional[Dict]:
         """Retorna configuração de uma crew"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -234,15 +979,14 @@ class DatabaseManager:
 
     def delete_crew_config(self, crew_name: str) -> bool:
         """Remove configuração de uma crew"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM crew_configs WHERE crew_name = ?", (crew_name,))
-            conn.commit()
             return cursor.rowcount > 0
 
     def get_all_crew_configs(self) -> List[Dict]:
         """Retorna todas as configurações de crews"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.read() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -267,103 +1011,222 @@ class DatabaseManager:
 
             return results
 
-    def search_executions(self, query: str) -> List[Dict]:
-        """Busca execuções por texto"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT id, crew_name, topic, start_time, end_time, duration, 
-                       status, result, error_message, created_at
-                FROM executions 
-                WHERE crew_name LIKE ? OR topic LIKE ? OR result LIKE ?
-                ORDER BY created_at DESC
-            """,
-                (f"%{query}%", f"%{query}%", f"%{query}%"),
-            )
+    @property
+    def full_text_search_enabled(self) -> bool:
+        """Indica se o índice FTS5 está disponível neste banco"""
+        if not hasattr(self, "_fts_enabled"):
+            with self.connections.read() as conn:
+                row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").fetchone()
+            self._fts_enabled = row is not None
+        return self._fts_enabled
+
+    def search_full_text(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        kinds: Optional[List[str]] = None,
+        crew_name: Optional[str] = None,
+        prefix: bool = True,
+        snippet_tokens: int = 16,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Dict]:
+        """Busca ranqueada (bm25) em execuções, resultados de tarefas e relatórios de avaliação
+
+        `kinds` filtra por origem ("execution", "task_result", "evaluation").
+        Cada item traz um trecho (snippet) com os termos encontrados entre **.
+        Os arquivos mensais que intersectam [date_from, date_to] também são consultados.
+        """
+        match = build_fts_query(query, prefix=prefix)
+        if not match or not self.full_text_search_enabled:
+            return []
+
+        conditions = ["search_index MATCH ?"]
+        params: List[Any] = [match]
+        created_from = created_to = None
+        if kinds:
+            conditions.append(f"m.kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        if crew_name:
+            conditions.append("m.crew_name = ?")
+            params.append(crew_name)
+        if date_from:
+            created_from = _local_date_to_utc_text(date_from)
+            conditions.append("e.created_at >= ?")
+            params.append(created_from)
+        if date_to:
+            created_to = _local_date_to_utc_text(date_to + timedelta(days=1))
+            conditions.append("e.created_at < ?")
+            params.append(created_to)
+
+        results: List[Dict] = []
+        with self.connections.read() as conn:
+            for schema in self.sources(conn, created_from, created_to):
+                cursor = conn.execute(
+                    f"""
+                    SELECT m.kind, m.execution_id, m.crew_name, m.title, m.body_blobs,
+                           bm25(search_index, {BM25_WEIGHTS}) AS score,
+                           e.topic, e.status, e.start_time
+                    FROM {schema}.search_index s
+                    CROSS JOIN {schema}.search_entries m ON m.rowid = s.rowid
+                    LEFT JOIN {schema}.executions e ON e.id = m.execution_id
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY score
+                    LIMIT ?
+                """,
+                    [*params, limit + offset],
+                )
+                columns = [description[0] for description in cursor.description]
+                results.extend(dict(zip(columns, row), schema=schema) for row in cursor.fetchall())
+
+            results.sort(key=lambda item: item["score"])
+            page = results[offset : offset + limit]
+
+            # O índice não guarda o texto: os trechos são montados só para a página retornada
+            patterns = query_patterns(query, prefix)
+            for item in page:
+                body = get_segments(conn, item.pop("body_blobs"), item.pop("schema")) or ""
+                item["snippet"] = make_snippet(body, patterns, snippet_tokens)
+        return page
 
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    def search_executions(self, query: str, limit: int = 100) -> List[Dict]:
+        """Busca execuções por texto (índice FTS5, com fallback para LIKE), inclusive arquivadas"""
+        match = build_fts_query(query)
+        use_index = bool(match) and self.full_text_search_enabled
+        found = []  # (chave de ordenação, linha)
+        with self.connections.read() as conn:
+            for schema in self.sources(conn):
+                cursor = conn.cursor()
+                if use_index:
+                    # Melhor pontuação entre execução, tarefas e avaliação de cada execução.
+                    # O LIMIT interno (melhores trechos) também impede o SQLite de achatar a
+                    # subconsulta, o que tornaria bm25() inválido dentro do GROUP BY.
+                    cursor.execute(
+                        f"""
+                        SELECT e.id, e.crew_name, e.topic, e.start_time, e.end_time, e.duration,
+                               e.status, e.result, e.error_message, e.created_at, e.result_blobs, m.score
+                        FROM (
+                            SELECT execution_id, MIN(score) AS score
+                            FROM (
+                                SELECT m.execution_id, bm25(search_index, {BM25_WEIGHTS}) AS score
+                                FROM {schema}.search_index s
+                                CROSS JOIN {schema}.search_entries m ON m.rowid = s.rowid
+                                WHERE search_index MATCH ?
+                                ORDER BY score
+                                LIMIT ?
+                            )
+                            GROUP BY execution_id
+                        ) m
+                        JOIN {schema}.executions e ON e.id = m.execution_id
+                        ORDER BY m.score
+                        LIMIT ?
+                    """,
+                        (match, limit * 10, limit),
+                    )
+                else:
+                    cursor.execute(
+                        f"""
+                        SELECT id, crew_name, topic, start_time, end_time, duration, 
+                               status, result, error_message, created_at, result_blobs
+                        FROM {schema}.executions 
+                        WHERE crew_name LIKE ? OR topic LIKE ? OR COALESCE(result, result_preview) LIKE ?
+                        ORDER BY created_at DESC
+                        LIMIT ?
+                    """,
+                        (f"%{query}%", f"%{query}%", f"%{query}%", limit),
+                    )
+
+                columns = [description[0] for description in cursor.description]
+                for values in cursor.fetchall():
+                    row = dict(zip(columns, values))
+                    key = row.pop("score") if use_index else (row["created_at"] or "")
+                    found.append((key, self._row_with_result(conn, row, schema)))
+
+        found.sort(key=lambda item: item[0], reverse=not use_index)
+        return [row for _, row in found[:limit]]
 
     def get_statistics(self) -> Dict:
         """Retorna estatísticas do banco de dados"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        stats = self.get_statistics_v2("all")
+        return {
+            "total_executions": stats["total_executions"],
+            "successful_executions": stats["successful_executions"],
+            "total_crews": stats["total_crews"],
+            "most_executed_crew": stats["most_executed_crew"],
+            "success_rate": stats["success_rate"],
+        }
 
-            # Total de execuções
-            cursor.execute("SELECT COUNT(*) FROM executions")
-            total_executions = cursor.fetchone()[0]
+    def get_statistics_v2(self, window: str = "all") -> Dict:
+        """Retorna estatísticas de uma janela de tempo lidas dos agregados incrementais
 
-            # Execuções bem-sucedidas
-            cursor.execute("SELECT COUNT(*) FROM executions WHERE status = 'completed'")
-            successful_executions = cursor.fetchone()[0]
+        Janelas: "1h", "24h" (buckets por hora), "7d", "30d" (buckets por dia) e "all".
+        O custo depende apenas do número de buckets e crews, não do tamanho do histórico.
+        """
+        if window not in self.STATISTICS_WINDOWS:
+            raise ValueError(f"Janela inválida: {window}. Use uma de {list(self.STATISTICS_WINDOWS)}")
 
-            # Total de crews configuradas
-            cursor.execute("SELECT COUNT(*) FROM crew_configs")
-            total_crews = cursor.fetchone()[0]
+        granularity, bucket_count = self.STATISTICS_WINDOWS[window]
+        since = window_start(granularity, bucket_count, int(time.time() * 1000))
 
-            # Crew mais executada
-            cursor.execute(
+        with self.connections.read() as conn:
+            per_crew_rows = conn.execute(
                 """
-                SELECT crew_name, COUNT(*) as count 
-                FROM executions 
-                GROUP BY crew_name 
-                ORDER BY count DESC 
-                LIMIT 1
-            """
-            )
-            most_executed = cursor.fetchone()
+                SELECT crew_name, SUM(total), SUM(finished), SUM(completed), SUM(failed), SUM(duration_ms_total)
+                FROM execution_rollups
+                WHERE granularity = ? AND bucket_ts >= ?
+                GROUP BY crew_name
+            """,
+                (granularity, since),
+            ).fetchall()
+            histogram_rows = conn.execute(
+                """
+                SELECT bin, SUM(count) FROM duration_histogram
+                WHERE granularity = ? AND bucket_ts >= ?
+                GROUP BY bin
+            """,
+                (granularity, since),
+            ).fetchall()
+            total_crews = conn.execute("SELECT COUNT(*) FROM crew_configs").fetchone()[0]
 
-            return {
-                "total_executions": total_executions,
-                "successful_executions": successful_executions,
-                "total_crews": total_crews,
-                "most_executed_crew": most_executed[0] if most_executed else None,
-                "success_rate": (successful_executions / total_executions * 100) if total_executions > 0 else 0,
-            }
+        return summarize_statistics(window, per_crew_rows, dict(histogram_rows), total_crews)
 
     def save_evaluation_report(self, execution_id: int, evaluation_report: str):
         """Salva relatório de avaliação para uma execução específica"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connections.transaction() as conn:
             cursor = conn.cursor()
-
-            # Verificar se a tabela de relatórios de avaliação existe
+            digest = put_text(conn, evaluation_report)
             cursor.execute(
                 """
-                CREATE TABLE IF NOT EXISTS evaluation_reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    execution_id INTEGER,
-                    evaluation_report TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (execution_id) REFERENCES executions (id)
-                )
-            """
-            )
-
-            # Inserir relatório de avaliação
-            cursor.execute(
-                """
-                INSERT INTO evaluation_reports (execution_id, evaluation_report)
+                INSERT INTO evaluation_reports (execution_id, report_blob)
                 VALUES (?, ?)
             """,
-                (execution_id, evaluation_report),
+                (execution_id, digest),
+            )
+            self._index_search_entry(
+                conn,
+                "evaluation",
+                cursor.lastrowid,
+                execution_id,
+                None,
+                "Relatório de avaliação",
+                evaluation_report,
+                json.dumps([digest]),
             )
-
-            conn.commit()
 
     def get_evaluation_report(self, execution_id: int) -> Optional[str]:
         """Recupera relatório de avaliação para uma execução específica"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT evaluation_report FROM evaluation_reports 
-                WHERE execution_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT 1
-            """,
-                (execution_id,),
-            )
-
-            result = cursor.fetchone()
-            return result[0] if result else None
+        with self.connections.read() as conn:
+            for schema in self.sources(conn):
+                result = conn.execute(
+                    f"""
+                    SELECT evaluation_report, report_blob FROM {schema}.evaluation_reports 
+                    WHERE execution_id = ? 
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT 1
+                """,
+                    (execution_id,),
+                ).fetchone()
+                if result:
+                    return result[0] if result[0] is not None else get_text(conn, result[1], schema)
+        return None
@@ -0,0 +1,332 @@
+"""
+Exportação em streaming do histórico de execuções (NDJSON, Parquet ou Feather)
+
+As linhas são lidas com fetchmany em lotes e gravadas lote a lote, de modo que a
+memória usada não depende do tamanho do histórico. Arquivos mensais da política
+de retenção também são lidos quando o período exportado os inclui.
+
+Exportação incremental: o arquivo de watermark guarda, por tabela, a posição da
+última linha exportada; a próxima exportação começa a partir dela.
+
+Uso pela linha de comando:
+    python -m app.utils.exporter --format ndjson --output exports/ [--watermark exports/watermark.json]
+        [--crew NOME] [--date-from 2025-01-01] [--date-to 2025-01-31] [--tables executions,execution_results]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Sequence
+
+from app.utils.blob_store import get_segments, get_text
+from app.utils.database import DatabaseManager, _local_date_to_utc_text
+from app.utils.rollups import ACTIVE_STATUSES
+
+try:  # pyarrow é opcional; sem ele, apenas NDJSON
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ("ndjson", "parquet", "feather")
+
+# Colunas exportadas por tabela: (nome, tipo)
+EXPORT_COLUMNS: Dict[str, List[tuple]] = {
+    "executions": [
+        ("id", "int"),
+        ("crew_name", "str"),
+        ("topic", "str"),
+        ("status", "str"),
+        ("start_time", "str"),
+        ("end_time", "str"),
+        ("duration", "str"),
+        ("duration_ms", "int"),
+        ("start_ts", "int"),
+        ("end_ts", "int"),
+        ("created_at", "str"),
+        ("error_message", "str"),
+        ("model", "str"),
+        ("prompt_tokens", "int"),
+        ("completion_tokens", "int"),
+        ("cost_usd", "float"),
+        ("result", "str"),
+    ],
+    "execution_results": [
+        ("id", "int"),
+        ("execution_id", "int"),
+        ("crew_name", "str"),
+        ("agent_name", "str"),
+        ("task_description", "str"),
+        ("task_status", "str"),
+        ("created_at", "str"),
+        ("prompt_tokens", "int"),
+        ("completion_tokens", "int"),
+        ("cost_usd", "float"),
+        ("task_result", "str"),
+    ],
+    "evaluation_reports": [
+        ("id", "int"),
+        ("execution_id", "int"),
+        ("crew_name", "str"),
+        ("created_at", "str"),
+        ("evaluation_report", "str"),
+    ],
+}
+
+# Consultas por tabela. Execuções só são exportadas depois de terminadas, em ordem
+# de término (end_ts, id); resultados e relatórios são apenas inseridos, em ordem de id.
+_QUERIES = {
+    "executions": """
+        SELECT e.id, e.crew_name, e.topic, e.status, e.start_time, e.end_time, e.duration, e.duration_ms,
+               e.start_ts, e.end_ts, e.created_at, e.error_message, e.model, e.prompt_tokens,
+               e.completion_tokens, e.cost_usd, e.result, e.result_blobs
+        FROM {schema}.executions e
+        WHERE e.status NOT IN ({active}) {conditions}
+        ORDER BY e.end_ts, e.id
+    """,
+    "execution_results": """
+        SELECT r.id, r.execution_id, e.crew_name, r.agent_name, r.task_description, r.task_status,
+               r.created_at, r.prompt_tokens, r.completion_tokens, r.cost_usd, r.task_result, r.task_result_blob
+        FROM {schema}.execution_results r
+        JOIN {schema}.executions e ON e.id = r.execution_id
+        WHERE 1 = 1 {conditions}
+        ORDER BY r.id
+    """,
+    "evaluation_reports": """
+        SELECT r.id, r.execution_id, e.crew_name, r.created_at, r.evaluation_report, r.report_blob
+        FROM {schema}.evaluation_reports r
+        JOIN {schema}.executions e ON e.id = r.execution_id
+        WHERE 1 = 1 {conditions}
+        ORDER BY r.id
+    """,
+}
+
+
+def iter_rows(
+    db_manager: DatabaseManager,
+    table: str,
+    crew_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    watermark: Optional[Dict] = None,
+    chunk_size: int = 500,
+) -> Iterator[Dict]:
+    """Produz as linhas de uma tabela, lidas em lotes e com o conteúdo descomprimido"""
+    if table not in _QUERIES:
+        raise ValueError(f"Tabela não exportável: {table}. Use uma de {list(_QUERIES)}")
+
+    conditions = []
+    params: List = []
+    created_from = created_to = None
+    if crew_name:
+        conditions.append("e.crew_name = ?")
+        params.append(crew_name)
+    if date_from:
+        created_from = _local_date_to_utc_text(date_from)
+        conditions.append("e.created_at >= ?")
+        params.append(created_from)
+    if date_to:
+        created_to = _local_date_to_utc_text(date_to + timedelta(days=1))
+        conditions.append("e.created_at < ?")
+        params.append(created_to)
+
+    position = (watermark or {}).get(table)
+    if position is not None and table == "executions":
+        conditions.append("(e.end_ts, e.id) > (?, ?)")
+        params.extend(position)
+    elif position is not None:
+        conditions.append("r.id > ?")
+        params.append(position)
+
+    db_manager.flush()
+    sql = _QUERIES[table]
+    placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+    with db_manager.connections.read() as conn:
+        for schema in db_manager.sources(conn, created_from, created_to):
+            query = sql.format(
+                schema=schema, active=placeholders, conditions="".join(f" AND {condition}" for condition in conditions)
+            )
+            cursor = conn.cursor()
+            cursor.execute(query, [*ACTIVE_STATUSES, *params] if table == "executions" else params)
+            columns = [description[0] for description in cursor.description]
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                for values in chunk:
+                    yield _with_content(conn, schema, table, dict(zip(columns, values)))
+
+
+def _with_content(conn, schema: str, table: str, row: Dict) -> Dict:
+    """Substitui as referências a blobs pelo conteúdo descomprimido"""
+    if table == "executions":
+        blobs = row.pop("result_blobs")
+        if row["result"] is None:
+            row["result"] = get_segments(conn, blobs, schema)
+    elif table == "execution_results":
+        blob = row.pop("task_result_blob")
+        if row["task_result"] is None and blob:
+            row["task_result"] = get_text(conn, blob, schema)
+    else:
+        blob = row.pop("report_blob")
+        if row["evaluation_report"] is None and blob:
+            row["evaluation_report"] = get_text(conn, blob, schema)
+    return row
+
+
+def _advance_watermark(watermark: Dict, table: str, row: Dict):
+    if table == "executions":
+        position = [row["end_ts"], row["id"]]
+        if row["end_ts"] is not None and (watermark.get(table) is None or position > watermark[table]):
+            watermark[table] = position
+    else:
+        watermark[table] = max(watermark.get(table) or 0, row["id"])
+
+
+def _batches(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _arrow_schema(table: str):
+    types = {"int": pyarrow.int64(), "float": pyarrow.float64(), "str": pyarrow.string()}
+    return pyarrow.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS[table]])
+
+
+def write_table(
+    rows: Iterator[Dict], table: str, sink: IO, export_format: str = "ndjson", watermark: Optional[Dict] = None, chunk_size: int = 500
+) -> int:
+    """Grava as linhas no formato escolhido, lote a lote, e retorna quantas foram gravadas
+
+    `sink` é um arquivo aberto em modo binário. Se `watermark` for informado, é
+    atualizado com a posição da última linha gravada.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato desconhecido: {export_format}. Use um de {list(EXPORT_FORMATS)}")
+    if export_format != "ndjson" and pyarrow is None:
+        raise RuntimeError("Exportar em Parquet/Feather requer o pacote 'pyarrow'")
+
+    columns = [name for name, _ in EXPORT_COLUMNS[table]]
+    writer = None
+    count = 0
+    try:
+        if export_format == "parquet":
+            writer = pyarrow.parquet.ParquetWriter(sink, _arrow_schema(table))
+        elif export_format == "feather":
+            writer = pyarrow.ipc.new_file(sink, _arrow_schema(table))
+
+        for batch in _batches(rows, chunk_size):
+            records = [{column: row.get(column) for column in columns} for row in batch]
+            if writer is None:
+                lines = (json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                sink.write("".join(lines).encode("utf-8"))
+            else:
+                writer.write_batch(pyarrow.RecordBatch.from_pylist(records, schema=writer.schema))
+            if watermark is not None:
+                for row in batch:
+                    _advance_watermark(watermark, table, row)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def load_watermark(path: Optional[str]) -> Dict:
+    """Lê o arquivo de watermark (vazio se não existir)"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_watermark(path: str, watermark: Dict):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(watermark, file, indent=2)
+    os.replace(temp_path, path)
+
+
+def export_history(
+    db_manager: DatabaseManager,
+    output_dir: str,
+    export_format: str = "ndjson",
+    tables: Sequence[str] = tuple(EXPORT_COLUMNS),
+    crew_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    watermark_path: Optional[str] = None,
+    chunk_size: int = 500,
+) -> Dict[str, Dict]:
+    """Exporta as tabelas para `output_dir` (um arquivo por tabela) e retorna {tabela: {path, rows}}
+
+    Com `watermark_path`, exporta apenas o que mudou desde a última exportação e
+    atualiza o watermark ao final.
+    """
+    watermark = load_watermark(watermark_path)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    summary = {}
+    for table in tables:
+        path = os.path.join(output_dir, f"{table}_{stamp}.{export_format}")
+        rows = iter_rows(db_manager, table, crew_name, date_from, date_to, watermark, chunk_size)
+        with open(path, "wb") as sink:
+            count = write_table(rows, table, sink, export_format, watermark, chunk_size)
+        summary[table] = {"path": path, "rows": count}
+
+    if watermark_path:
+        save_watermark(watermark_path, watermark)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o histórico de execuções em streaming")
+    parser.add_argument("--db", default="app/data/crews_database.db", help="Banco de dados principal")
+    parser.add_argument("--output", default="exports", help="Diretório de saída")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--tables", default=",".join(EXPORT_COLUMNS), help="Tabelas separadas por vírgula")
+    parser.add_argument("--crew", default=None, help="Exporta apenas uma crew")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=None, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--date-to", type=date.fromisoformat, default=None, help="Data final (AAAA-MM-DD)")
+    parser.add_argument("--watermark", default=None, help="Arquivo JSON para exportação incremental")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    try:
+        summary = export_history(
+            db_manager,
+            args.output,
+            args.format,
+            [table.strip() for table in args.tables.split(",") if table.strip()],
+            args.crew,
+            args.date_from,
+            args.date_to,
+            args.watermark,
+            args.chunk_size,
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ Erro na exportação: {e}")
+        return 1
+    finally:
+        db_manager.close()
+
+    for table, info in summary.items():
+        print(f"📤 {table}: {info['rows']} linha(s) → {info['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Cache de respostas do LLM por correspondência exata, persistido em SQLite
+
+A chave é o hash do modelo, dos parâmetros de geração e das mensagens normalizadas:
+repetir uma chamada idêntica (ex: o prompt do avaliador para o mesmo tópico, ou uma
+crew reexecutada enquanto o fluxo é ajustado) devolve a resposta gravada sem chamar
+o modelo. As entradas expiram após `ttl_hours` e, acima de `max_entries` ou
+`max_mb`, as menos usadas recentemente são removidas.
+
+O cache é opcional e configurado em app/config/llm_cache.yaml, com padrão global e
+exceções por crew e por agente (desligue-o em tarefas criativas, em que respostas
+diferentes para o mesmo prompt são desejadas).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import yaml
+
+from app.utils.blob_store import compress, decompress
+from app.utils.database import get_connection_manager
+
+DEFAULT_CONFIG_PATH = "app/config/llm_cache.yaml"
+DEFAULT_CACHE_PATH = "app/data/llm_cache.db"
+
+# A cada quantas gravações os limites de tamanho e as entradas expiradas são verificados
+PRUNE_EVERY_PUTS = 50
+
+
+def _normalize_text(text: str) -> str:
+    """Normaliza Unicode e espaços, que não mudam o sentido do prompt"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"[ \t]+\n", "\n", re.sub(r"[ \t]+", " ", text)).strip()
+
+
+def normalize_messages(messages: Union[str, Iterable[Dict]]) -> list:
+    """Mensagens como [{"role", "content"}], com o texto normalizado"""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        normalized.append(
+            {
+                "role": message.get("role", "user"),
+                "content": _normalize_text(content) if isinstance(content, str) else content,
+            }
+        )
+    return normalized
+
+
+def cache_key(model: str, params: Dict, messages: Union[str, Iterable[Dict]]) -> str:
+    """Hash SHA-256 do modelo, dos parâmetros (sem valores None) e das mensagens normalizadas"""
+    payload = {
+        "model": model,
+        "params": {name: value for name, value in sorted(params.items()) if value is not None},
+        "messages": normalize_messages(messages),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMCachePolicy:
+    """Configuração do cache: padrão global, exceções por crew e por agente e limites"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        ttl_hours: float = 168,
+        max_entries: int = 5000,
+        max_mb: float = 200,
+        path: str = DEFAULT_CACHE_PATH,
+        crews: Optional[Dict[str, bool]] = None,
+        agents: Optional[Dict[str, bool]] = None,
+    ):
+        self.enabled = bool(enabled)
+        self.ttl_hours = ttl_hours
+        self.max_entries = max_entries
+        self.max_mb = max_mb
+        self.path = path
+        self.crews = crews or {}
+        self.agents = agents or {}
+
+    @classmethod
+    def load(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "LLMCachePolicy":
+        """Carrega a configuração do arquivo YAML (cache desligado se ausente)"""
+        try:
+            if not os.path.exists(config_path):
+                return cls()
+            with open(config_path, "r", encoding="utf-8") as file:
+                config = yaml.safe_load(file) or {}
+        except Exception as e:
+            print(f"Erro ao carregar configuração do cache do LLM: {e}")
+            return cls()
+        return cls(**{key: value for key, value in config.items() if value is not None})
+
+    def in_use(self) -> bool:
+        """Se alguma crew ou agente pode usar o cache"""
+        return self.enabled or any(self.crews.values()) or any(self.agents.values())
+
+    def enabled_for(self, crew_name: Optional[str], agent_keys: Iterable[str] = ()) -> bool:
+        """Se o cache vale para um agente de uma crew: agente > crew > padrão"""
+        for key in agent_keys:
+            if key in self.agents:
+                return bool(self.agents[key])
+        if crew_name in self.crews:
+            return bool(self.crews[crew_name])
+        return self.enabled
+
+
+class LLMCache:
+    """Respostas do LLM em SQLite (WAL), com validade (TTL) e remoção das menos usadas (LRU)"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_hours: float = 168,
+        max_entries: int = 5000,
+        max_mb: float = 200,
+    ):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl_ms = int(ttl_hours * 3600 * 1000)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.connections = get_connection_manager(path)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._puts = 0
+        with self.connections.transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,           -- SHA-256 de modelo, parâmetros e mensagens
+                    model TEXT,
+                    codec TEXT NOT NULL,            -- 'raw', 'zlib' ou 'zstd' (ver blob_store)
+                    response BLOB NOT NULL,
+                    size INTEGER NOT NULL,          -- bytes gravados
+                    created_ts INTEGER NOT NULL,
+                    last_used_ts INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_ts)")
+
+    @classmethod
+    def from_policy(cls, policy: LLMCachePolicy) -> "LLMCache":
+        return cls(policy.path, policy.ttl_hours, policy.max_entries, policy.max_mb)
+
+    def get(self, key: str) -> Optional[str]:
+        """Resposta gravada para a chave (None se ausente ou expirada)"""
+        now = int(time.time() * 1000)
+        with self.connections.transaction() as conn:
+            row = conn.execute("SELECT codec, response, created_ts FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_ms and row[2] < now - self.ttl_ms:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_used_ts = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return None if row is None else decompress(row[0], row[1]).decode("utf-8")
+
+    def put(self, key: str, model: Optional[str], response: str):
+        """Grava a resposta (substituindo a anterior da mesma chave)"""
+        codec, data = compress(response.encode("utf-8"))
+        now = int(time.time() * 1000)
+        with self.connections.transaction() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, model, codec, response, size, created_ts, last_used_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+                (key, model, codec, data, len(data), now, now),
+            )
+        with self._lock:
+            self._puts += 1
+            due = self._puts % PRUNE_EVERY_PUTS == 1
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Remove entradas expiradas e, acima dos limites, as usadas há mais tempo; retorna quantas"""
+        now = int(time.time() * 1000)
+        with self.connections.transaction() as conn:
+            removed = 0
+            if self.ttl_ms:
+                removed += conn.execute("DELETE FROM llm_cache WHERE created_ts < ?", (now - self.ttl_ms,)).rowcount
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            if entries <= self.max_entries and size <= self.max_bytes:
+                return removed
+            evicted = 0
+            for key, entry_size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used_ts").fetchall():
+                if entries - evicted <= self.max_entries and size <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                evicted += 1
+                size -= entry_size
+        if evicted:
+            print(f"🧹 Cache do LLM: {evicted} entrada(s) menos usada(s) removida(s)")
+        return removed + evicted
+
+    def clear(self) -> int:
+        """Remove todas as entradas; retorna quantas foram removidas"""
+        with self.connections.transaction() as conn:
+            return conn.execute("DELETE FROM llm_cache").rowcount
+
+    def stats(self) -> Dict:
+        """Acertos e falhas neste processo e tamanho atual do cache"""
+        with self.connections.read() as conn:
+            entries, size, stored_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM llm_cache"
+            ).fetchone()
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "total_hits": stored_hits,  # acertos acumulados das entradas ainda gravadas
+        }
@@ -0,0 +1,90 @@
+"""
+Registro dos gerenciadores compartilhados pelo processo (agentes, tarefas, tools,
+crews e o motor de execução)
+
+No Streamlit, cada sessão do navegador executa o script do zero. Os gerenciadores
+(que leem os YAML, sincronizam as crews com o banco e guardam as crews construídas)
+são criados uma única vez por processo e compartilhados por todas as sessões; cada
+sessão guarda apenas referências a eles e o seu próprio estado de interface.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class SharedManagers:
+    """Conjunto de gerenciadores de um processo
+
+    `lock` serializa operações que alteram a configuração compartilhada
+    (ex: recarregar os YAML, editar ou excluir agentes) enquanto outras sessões
+    estão ativas. É o mesmo lock com que o CrewManager cria os agentes das crews.
+    """
+
+    def __init__(self, agent_manager, task_manager, tools_manager, crew_manager, execution_engine=None, lock=None):
+        self.agent_manager = agent_manager
+        self.task_manager = task_manager
+        self.tools_manager = tools_manager
+        self.crew_manager = crew_manager
+        self.execution_engine = execution_engine
+        self.lock = lock or threading.RLock()
+        self.created_at = time.time()
+
+    def reload_configs(self) -> bool:
+        """Recarrega as configurações de agentes e tarefas para todas as sessões"""
+        with self.lock:
+            return self.crew_manager.reload_configs()
+
+
+def build_managers() -> SharedManagers:
+    """Constrói os gerenciadores (leitura dos YAML, sincronização e registro das crews)"""
+    from app.agents.agent_manager import AgentManager
+    from app.crews.crew_manager import CrewManager
+    from app.crews.execution_engine import ExecutionEngine
+    from app.crews.task_manager import TaskManager
+    from app.utils.tools_manager import ToolsManager
+
+    started = time.monotonic()
+    agent_manager = AgentManager()
+    task_manager = TaskManager()
+    tools_manager = ToolsManager()
+
+    # IMPORTANTE: Configurar o ToolsManager no AgentManager ANTES de criar o CrewManager
+    agent_manager.set_tools_manager(tools_manager)
+    # Edições de agentes pelas páginas e a construção das crews usam o mesmo lock
+    lock = threading.RLock()
+    crew_manager = CrewManager(agent_manager, task_manager, agents_lock=lock)
+    execution_engine = ExecutionEngine(crew_manager)
+
+    print(f"🧩 Gerenciadores compartilhados inicializados em {time.monotonic() - started:.2f}s")
+    return SharedManagers(agent_manager, task_manager, tools_manager, crew_manager, execution_engine, lock=lock)
+
+
+_shared_managers: Optional[SharedManagers] = None
+_shared_managers_lock = threading.Lock()
+
+
+def get_shared_managers(factory: Callable[[], SharedManagers] = build_managers) -> SharedManagers:
+    """Retorna os gerenciadores do processo, construindo-os na primeira chamada
+
+    Sessões que chegam durante a construção aguardam e recebem a mesma instância.
+    """
+    global _shared_managers
+    shared = _shared_managers
+    if shared is not None:
+        return shared
+    with _shared_managers_lock:
+        if _shared_managers is None:
+            _shared_managers = factory()
+        return _shared_managers
+
+
+def reset_shared_managers():
+    """Descarta os gerenciadores do processo; a próxima sessão constrói novos"""
+    global _shared_managers
+    with _shared_managers_lock:
+        shared, _shared_managers = _shared_managers, None
+    if shared is not None:
+        if shared.execution_engine is not None:
+            shared.execution_engine.shutdown(wait=False)
+        shared.crew_manager.db_manager.flush()
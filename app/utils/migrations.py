@@ -0,0 +1,471 @@
+"""
+Migrações versionadas do schema do banco de dados (PRAGMA user_version)
+"""
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from app.utils.blob_store import chunk_lengths, create_blob_table, get_segments, get_text, put_segments, put_text
+from app.utils.result_sections import dump_sections, index_sections
+from app.utils.rollups import create_rollup_tables, create_usage_table, rebuild_rollups
+from app.utils.search_index import SEARCH_KIND_CODES, blob_list, create_search_tables, index_entry, remove_entries
+
+# Caracteres do resultado mantidos em texto puro para o histórico
+RESULT_PREVIEW_CHARS = 300
+
+# Consumo de tokens e custo estimado (USD), por execução (executions) e por tarefa (execution_results)
+USAGE_COLUMNS = ("prompt_tokens", "completion_tokens", "cost_usd")
+
+# Métricas opcionais de cada tarefa em execution_results (tool_names é JSON {ferramenta: chamadas})
+TASK_METRIC_COLUMNS = ("start_ts", "end_ts", "duration_ms", "output_chars", "step_count", "tool_calls", *USAGE_COLUMNS, "tool_names")
+
+
+def parse_duration_ms(duration: Optional[str]) -> Optional[int]:
+    """Converte durações no formato de timedelta ("0:01:23", "1 day, 2:00:00") em milissegundos"""
+    if not duration:
+        return None
+    match = re.fullmatch(r"\s*(?:(\d+) days?, )?(\d+):(\d{2}):(\d{2})(?:\.(\d+))?\s*", duration)
+    if not match:
+        return None
+    days, hours, minutes, seconds, fraction = match.groups()
+    total_seconds = int(days or 0) * 86400 + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+    fraction_ms = int((fraction or "0")[:3].ljust(3, "0"))
+    return total_seconds * 1000 + fraction_ms
+
+
+def to_epoch_ms(value: Optional[str]) -> Optional[int]:
+    """Converte um timestamp ISO (horário local) em milissegundos desde a época"""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def _migration_001_base_tables(conn: sqlite3.Connection):
+    """Tabelas originais do sistema"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crew_name TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            duration TEXT,
+            status TEXT DEFAULT 'running',
+            result TEXT,
+            error_message TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS execution_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            execution_id INTEGER,
+            agent_name TEXT,
+            task_description TEXT,
+            task_result TEXT,
+            task_status TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (execution_id) REFERENCES executions (id)
+        )
+    """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crew_configs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crew_name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            agent_types TEXT,  -- JSON array
+            task_types TEXT,   -- JSON array
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    # Antes criada a cada save_evaluation_report
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS evaluation_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            execution_id INTEGER,
+            evaluation_report TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (execution_id) REFERENCES executions (id)
+        )
+    """
+    )
+
+
+def _migration_002_indexes(conn: sqlite3.Connection):
+    """Índices para histórico, estatísticas e detalhes"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_created_at ON executions (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_crew_created ON executions (crew_name, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_status ON executions (status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_execution_results_execution ON execution_results (execution_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_reports_execution ON evaluation_reports (execution_id)")
+
+
+def _migration_003_numeric_timings(conn: sqlite3.Connection):
+    """Colunas numéricas de tempo (epoch em ms e duração em ms) com backfill"""
+    for column in ("start_ts", "end_ts", "created_ts", "duration_ms"):
+        conn.execute(f"ALTER TABLE executions ADD COLUMN {column} INTEGER")
+
+    # created_at é gravado pelo SQLite em UTC
+    conn.execute("UPDATE executions SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) * 1000")
+
+    # start_time/end_time são ISO em horário local, convertidos em Python
+    rows = conn.execute("SELECT id, start_time, end_time, duration FROM executions").fetchall()
+    updates = []
+    for execution_id, start_time, end_time, duration in rows:
+        start_ts = to_epoch_ms(start_time)
+        end_ts = to_epoch_ms(end_time)
+        duration_ms = end_ts - start_ts if start_ts is not None and end_ts is not None else parse_duration_ms(duration)
+        updates.append((start_ts, end_ts, duration_ms, execution_id))
+    conn.executemany("UPDATE executions SET start_ts = ?, end_ts = ?, duration_ms = ? WHERE id = ?", updates)
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_start_ts ON executions (start_ts)")
+
+
+# O rowid do índice FTS é derivado da origem (id * 4 + 1 execução, 2 tarefa, 3 avaliação),
+# permitindo que os triggers removam entradas por rowid sem varrer o índice
+_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER search_executions_ai AFTER INSERT ON executions BEGIN
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        VALUES (new.id * 4 + 1, 'execution', new.id, new.crew_name, new.topic, COALESCE(new.result, ''));
+    END;
+    """,
+    """
+    CREATE TRIGGER search_executions_au AFTER UPDATE OF crew_name, topic, result ON executions BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        VALUES (new.id * 4 + 1, 'execution', new.id, new.crew_name, new.topic, COALESCE(new.result, ''));
+    END;
+    """,
+    """
+    CREATE TRIGGER search_executions_ad AFTER DELETE ON executions BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+    END;
+    """,
+    """
+    CREATE TRIGGER search_task_results_ai AFTER INSERT ON execution_results BEGIN
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        VALUES (
+            new.id * 4 + 2, 'task_result', new.execution_id,
+            (SELECT crew_name FROM executions WHERE id = new.execution_id),
+            COALESCE(new.task_description, ''), COALESCE(new.task_result, '')
+        );
+    END;
+    """,
+    """
+    CREATE TRIGGER search_task_results_au AFTER UPDATE OF task_description, task_result ON execution_results BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        VALUES (
+            new.id * 4 + 2, 'task_result', new.execution_id,
+            (SELECT crew_name FROM executions WHERE id = new.execution_id),
+            COALESCE(new.task_description, ''), COALESCE(new.task_result, '')
+        );
+    END;
+    """,
+    """
+    CREATE TRIGGER search_task_results_ad AFTER DELETE ON execution_results BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+    END;
+    """,
+    """
+    CREATE TRIGGER search_evaluations_ai AFTER INSERT ON evaluation_reports BEGIN
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        VALUES (
+            new.id * 4 + 3, 'evaluation', new.execution_id,
+            (SELECT crew_name FROM executions WHERE id = new.execution_id),
+            'Relatório de avaliação', COALESCE(new.evaluation_report, '')
+        );
+    END;
+    """,
+    """
+    CREATE TRIGGER search_evaluations_ad AFTER DELETE ON evaluation_reports BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+    END;
+    """,
+]
+
+
+def _migration_004_full_text_search(conn: sqlite3.Connection):
+    """Índice FTS5 sobre execuções, resultados de tarefas e relatórios de avaliação"""
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE search_index USING fts5(
+                kind UNINDEXED,
+                execution_id UNINDEXED,
+                crew_name,
+                title,
+                body,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """
+        )
+    except sqlite3.OperationalError as e:
+        # SQLite compilado sem FTS5: a busca continua funcionando via LIKE
+        print(f"⚠️ FTS5 indisponível, busca textual usará LIKE: {e}")
+        return
+
+    # executescript faria COMMIT implícito; os triggers são criados um a um dentro da transação
+    for trigger_sql in _SEARCH_TRIGGERS:
+        conn.execute(trigger_sql)
+
+    # Backfill com o conteúdo já existente
+    conn.execute(
+        """
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        SELECT id * 4 + 1, 'execution', id, crew_name, topic, COALESCE(result, '') FROM executions
+    """
+    )
+    conn.execute(
+        """
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        SELECT r.id * 4 + 2, 'task_result', r.execution_id, e.crew_name,
+               COALESCE(r.task_description, ''), COALESCE(r.task_result, '')
+        FROM execution_results r LEFT JOIN executions e ON e.id = r.execution_id
+    """
+    )
+    conn.execute(
+        """
+        INSERT INTO search_index (rowid, kind, execution_id, crew_name, title, body)
+        SELECT r.id * 4 + 3, 'evaluation', r.execution_id, e.crew_name,
+               'Relatório de avaliação', COALESCE(r.evaluation_report, '')
+        FROM evaluation_reports r LEFT JOIN executions e ON e.id = r.execution_id
+    """
+    )
+
+
+def _migration_005_rollups(conn: sqlite3.Connection):
+    """Agregados incrementais de estatísticas (por crew, hora e dia)"""
+    create_rollup_tables(conn)
+    rebuild_rollups(conn)
+
+
+def _migration_006_blob_store(conn: sqlite3.Connection):
+    """Move resultados, saídas de tarefas e relatórios para blobs comprimidos e deduplicados"""
+    create_blob_table(conn)
+    conn.execute("ALTER TABLE executions ADD COLUMN result_blobs TEXT")  # JSON com hashes dos segmentos
+    conn.execute("ALTER TABLE executions ADD COLUMN result_preview TEXT")
+    conn.execute("ALTER TABLE executions ADD COLUMN result_size INTEGER")
+    conn.execute("ALTER TABLE execution_results ADD COLUMN task_result_blob TEXT")
+    conn.execute("ALTER TABLE evaluation_reports ADD COLUMN report_blob TEXT")
+
+    # O conteúdo deixa de estar legível em SQL: o índice de busca passa a ser
+    # alimentado pelo DatabaseManager. Os triggers de remoção continuam valendo.
+    for trigger in (
+        "search_executions_ai",
+        "search_executions_au",
+        "search_task_results_ai",
+        "search_task_results_au",
+        "search_evaluations_ai",
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    rows = conn.execute("SELECT id, result FROM executions WHERE result IS NOT NULL AND result != ''").fetchall()
+    for execution_id, result in rows:
+        conn.execute(
+            """
+            UPDATE executions
+            SET result = NULL, result_blobs = ?, result_preview = ?, result_size = ?
+            WHERE id = ?
+        """,
+            (put_segments(conn, result), result[:RESULT_PREVIEW_CHARS], len(result), execution_id),
+        )
+
+    rows = conn.execute("SELECT id, task_result FROM execution_results WHERE task_result IS NOT NULL").fetchall()
+    for row_id, task_result in rows:
+        conn.execute(
+            "UPDATE execution_results SET task_result = NULL, task_result_blob = ? WHERE id = ?",
+            (put_text(conn, task_result), row_id),
+        )
+
+    rows = conn.execute("SELECT id, evaluation_report FROM evaluation_reports WHERE evaluation_report IS NOT NULL").fetchall()
+    for row_id, report in rows:
+        conn.execute(
+            "UPDATE evaluation_reports SET evaluation_report = NULL, report_blob = ? WHERE id = ?",
+            (put_text(conn, report), row_id),
+        )
+
+
+def _migration_007_result_sections(conn: sqlite3.Connection):
+    """Grava resultados em pedaços com tamanhos conhecidos e indexa suas seções markdown"""
+    conn.execute("ALTER TABLE executions ADD COLUMN result_chunk_chars TEXT")  # JSON com o tamanho de cada pedaço
+    conn.execute("ALTER TABLE executions ADD COLUMN result_sections TEXT")  # JSON com [offset, tamanho, nível, título]
+
+    rows = conn.execute("SELECT id, result_blobs FROM executions WHERE result_blobs IS NOT NULL").fetchall()
+    for execution_id, result_blobs in rows:
+        # Mantém a divisão em segmentos (e a deduplicação com evaluation_reports)
+        segments = [get_text(conn, digest) or "" for digest in json.loads(result_blobs)]
+        conn.execute(
+            "UPDATE executions SET result_blobs = ?, result_chunk_chars = ?, result_sections = ? WHERE id = ?",
+            (
+                put_segments(conn, segments),
+                chunk_lengths(segments),
+                dump_sections(index_sections("".join(segments))),
+                execution_id,
+            ),
+        )
+
+
+def _migration_008_execution_batches(conn: sqlite3.Connection):
+    """Agrupa execuções disparadas em lote (uma execução por item) sob um identificador"""
+    conn.execute("ALTER TABLE executions ADD COLUMN batch_id TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_batch ON executions(batch_id) WHERE batch_id IS NOT NULL")
+
+
+def _migration_009_task_metrics(conn: sqlite3.Connection):
+    """Tempos, passos e ferramentas de cada tarefa, para a linha do tempo das execuções"""
+    for column in ("start_ts", "end_ts", "duration_ms", "output_chars", "step_count", "tool_calls"):
+        conn.execute(f"ALTER TABLE execution_results ADD COLUMN {column} INTEGER")
+    conn.execute("ALTER TABLE execution_results ADD COLUMN tool_names TEXT")  # JSON {ferramenta: chamadas}
+
+
+def _migration_010_usage(conn: sqlite3.Connection):
+    """Tokens e custo estimado por execução e por tarefa, agregados por crew, dia e modelo"""
+    conn.execute("ALTER TABLE executions ADD COLUMN model TEXT")
+    for table in ("executions", "execution_results"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN prompt_tokens INTEGER")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN completion_tokens INTEGER")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN cost_usd REAL")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_executions_crew_cost ON executions (crew_name, start_ts) WHERE cost_usd IS NOT NULL"
+    )
+    create_usage_table(conn)
+
+
+def _migration_011_contentless_search(conn: sqlite3.Connection):
+    """Troca o índice FTS5 por um índice sem conteúdo, que não duplica os textos já gravados em blobs
+
+    O corpo de uma execução passa a ser só o resultado da crew: o relatório de
+    avaliação anexado a ele já é indexado como entrada própria.
+    """
+    has_index = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").fetchone() is not None
+    create_search_tables(conn, full_text=False)
+    if not has_index:
+        # SQLite sem FTS5 (ver migração 4): search_entries fica vazia
+        return
+
+    entries = conn.execute("SELECT rowid, kind, execution_id, crew_name, title FROM search_index").fetchall()
+    # Os triggers de remoção não funcionam em um índice sem conteúdo: a remoção passa ao código
+    for trigger in ("search_executions_ad", "search_task_results_ad", "search_evaluations_ad"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE search_index")
+    create_search_tables(conn)
+
+    for rowid, kind, execution_id, crew_name, title in entries:
+        ref_id = rowid // 4
+        if kind == "execution":
+            row = conn.execute("SELECT result_blobs FROM executions WHERE id = ?", (ref_id,)).fetchone()
+            reports = {
+                digest
+                for (digest,) in conn.execute("SELECT report_blob FROM evaluation_reports WHERE execution_id = ?", (ref_id,))
+            }
+            digests = [digest for digest in json.loads(row[0] or "[]") if digest not in reports] if row else []
+        elif kind == "task_result":
+            row = conn.execute("SELECT task_result_blob FROM execution_results WHERE id = ?", (ref_id,)).fetchone()
+            digests = [row[0]] if row else []
+        else:
+            row = conn.execute("SELECT report_blob FROM evaluation_reports WHERE id = ?", (ref_id,)).fetchone()
+            digests = [row[0]] if row else []
+        if row is None:
+            continue
+        body_blobs = blob_list(*digests)
+        body = get_segments(conn, body_blobs) or ""
+        index_entry(conn, rowid, kind, execution_id, crew_name, title, body, body_blobs)
+
+
+def _migration_012_critical_path(conn: sqlite3.Connection):
+    """Caminho crítico do DAG de tarefas em coluna própria da execução
+
+    Antes ele era gravado como um resultado de tarefa do "planejador de tarefas", que
+    aparecia entre as tarefas, na contagem da retomada e na busca. Essas linhas são
+    movidas para a nova coluna.
+    """
+    conn.execute("ALTER TABLE executions ADD COLUMN critical_path TEXT")
+    rows = conn.execute(
+        """
+        SELECT id, execution_id, task_result, task_result_blob FROM execution_results
+        WHERE agent_name = 'planejador de tarefas' AND task_description = 'Caminho crítico do DAG de tarefas'
+    """
+    ).fetchall()
+    for row_id, execution_id, task_result, task_result_blob in rows:
+        summary = get_text(conn, task_result_blob) if task_result_blob else task_result
+        conn.execute("UPDATE executions SET critical_path = ? WHERE id = ?", (summary, execution_id))
+        remove_entries(conn, "rowid = ?", (row_id * 4 + SEARCH_KIND_CODES["task_result"],))
+        conn.execute("DELETE FROM execution_results WHERE id = ?", (row_id,))
+
+
+def _migration_013_resume_keys(conn: sqlite3.Connection):
+    """Entradas do kickoff da execução e posição de cada tarefa concluída, usadas na retomada
+
+    A retomada localizava as saídas salvas pela descrição da tarefa, que é gravada já
+    preenchida com as entradas ({variáveis}), enquanto a crew retomada ainda tem o texto
+    original. Linhas anteriores ficam sem posição e continuam sendo localizadas pela
+    descrição.
+    """
+    conn.execute("ALTER TABLE executions ADD COLUMN inputs TEXT")  # JSON
+    conn.execute("ALTER TABLE execution_results ADD COLUMN task_index INTEGER")
+
+
+# Lista ordenada de (versão, descrição, função). Nunca altere uma migração já publicada:
+# adicione uma nova versão ao final da lista.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "tabelas base", _migration_001_base_tables),
+    (2, "índices de consulta", _migration_002_indexes),
+    (3, "colunas numéricas de tempo", _migration_003_numeric_timings),
+    (4, "índice de busca textual (FTS5)", _migration_004_full_text_search),
+    (5, "agregados de estatísticas", _migration_005_rollups),
+    (6, "armazenamento de blobs comprimidos", _migration_006_blob_store),
+    (7, "índice de seções dos resultados", _migration_007_result_sections),
+    (8, "lotes de execuções", _migration_008_execution_batches),
+    (9, "métricas por tarefa", _migration_009_task_metrics),
+    (10, "consumo de tokens e custo", _migration_010_usage),
+    (11, "índice de busca sem conteúdo", _migration_011_contentless_search),
+    (12, "caminho crítico da execução", _migration_012_critical_path),
+    (13, "entradas da execução e posição das tarefas", _migration_013_resume_keys),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Retorna a versão atual do schema"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Aplica as migrações pendentes, cada uma em sua própria transação"""
+    for version, description, migration in MIGRATIONS:
+        if get_schema_version(conn) >= version:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Outro processo pode ter migrado enquanto aguardávamos o lock
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🗄️ Migração {version} aplicada: {description}")
+
+    return get_schema_version(conn)
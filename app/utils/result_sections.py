@@ -0,0 +1,81 @@
+"""
+Índice de seções de resultados em markdown
+
+Os resultados das crews podem ter centenas de KB. O índice guarda, para cada
+seção (iniciada por um título markdown), a posição e o tamanho em caracteres,
+permitindo que a interface carregue e renderize uma seção por vez.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+# Seções maiores que isso são divididas em partes, para que nenhuma página fique pesada
+MAX_SECTION_CHARS = 20000
+
+_HEADING = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$")
+_FENCE = re.compile(r"^ {0,3}(```|~~~)")
+
+
+def index_sections(text: Optional[str], max_chars: int = MAX_SECTION_CHARS) -> List[Dict]:
+    """Divide o texto nos títulos markdown (fora de blocos de código)
+
+    Retorna uma lista de {"offset", "length", "level", "title"}; o trecho antes do
+    primeiro título vira a seção "Início" (nível 0).
+    """
+    if not text:
+        return []
+
+    starts = [(0, 0, "Início")]
+    fence = None
+    position = 0
+    for line in text.splitlines(keepends=True):
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+        elif fence is None:
+            heading = _HEADING.match(line.rstrip("\r\n"))
+            if heading:
+                starts.append((position, len(heading.group(1)), heading.group(2).strip()))
+        position += len(line)
+
+    # Sem conteúdo antes do primeiro título, a seção "Início" é descartada
+    if len(starts) > 1 and not text[: starts[1][0]].strip():
+        starts.pop(0)
+
+    sections = []
+    for index, (offset, level, title) in enumerate(starts):
+        end = starts[index + 1][0] if index + 1 < len(starts) else len(text)
+        parts = range(offset, end, max_chars)
+        for part, part_offset in enumerate(parts):
+            sections.append(
+                {
+                    "offset": part_offset,
+                    "length": min(max_chars, end - part_offset),
+                    "level": level,
+                    "title": title if part == 0 else f"{title} (parte {part + 1})",
+                }
+            )
+    return sections
+
+
+def dump_sections(sections: List[Dict]) -> Optional[str]:
+    """Serializa o índice de forma compacta: [[offset, length, level, title], ...]"""
+    if not sections:
+        return None
+    return json.dumps(
+        [[section["offset"], section["length"], section["level"], section["title"]] for section in sections], ensure_ascii=False
+    )
+
+
+def load_sections(sections_json: Optional[str]) -> List[Dict]:
+    """Lê o índice gravado por dump_sections"""
+    if not sections_json:
+        return []
+    return [
+        {"offset": offset, "length": length, "level": level, "title": title}
+        for offset, length, level, title in json.loads(sections_json)
+    ]
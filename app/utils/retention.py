@@ -0,0 +1,273 @@
+"""
+Política de retenção do histórico de execuções
+
+Execuções mais antigas que o período "quente" de cada crew são movidas (com
+resultados de tarefas, relatórios, blobs e entradas do índice de busca) para
+arquivos SQLite mensais. Os arquivos são anexados somente leitura pelo
+DatabaseManager quando uma consulta de histórico ou busca precisa deles.
+
+Uso pela linha de comando:
+    python -m app.utils.retention [--config app/config/retention.yaml] [--db app/data/crews_database.db]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from app.utils.migrations import SCHEMA_VERSION, run_migrations
+from app.utils.rollups import ACTIVE_STATUSES, DAY_MS
+from app.utils.search_index import copy_entries, remove_entries
+
+DEFAULT_CONFIG_PATH = "app/config/retention.yaml"
+DEFAULT_HOT_DAYS = 90
+
+ARCHIVE_FILE_PATTERN = re.compile(r"^crews_archive_(\d{4})_(\d{2})\.db$")
+
+# Tabelas com linhas dependentes de uma execução: (tabela, coluna com o id da execução)
+ARCHIVED_TABLES: List[Tuple[str, str]] = [
+    ("execution_results", "execution_id"),
+    ("evaluation_reports", "execution_id"),
+]
+
+# Consultas que listam todos os hashes de blobs ainda referenciados no banco
+BLOB_REFERENCES = [
+    "SELECT value FROM executions, json_each(executions.result_blobs) WHERE executions.result_blobs IS NOT NULL",
+    "SELECT task_result_blob FROM execution_results WHERE task_result_blob IS NOT NULL",
+    "SELECT report_blob FROM evaluation_reports WHERE report_blob IS NOT NULL",
+    "SELECT value FROM search_entries, json_each(search_entries.body_blobs) WHERE search_entries.body_blobs IS NOT NULL",
+]
+
+
+class RetentionPolicy:
+    """Dias mantidos no banco principal, com padrão global e exceções por crew"""
+
+    def __init__(self, default_hot_days: Optional[int] = DEFAULT_HOT_DAYS, crews: Optional[Dict[str, Optional[int]]] = None):
+        self.default_hot_days = default_hot_days
+        self.crews = crews or {}
+
+    @classmethod
+    def load(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "RetentionPolicy":
+        """Carrega a política do arquivo YAML (padrão de 90 dias se ausente)"""
+        try:
+            if not os.path.exists(config_path):
+                return cls()
+            with open(config_path, "r", encoding="utf-8") as file:
+                config = yaml.safe_load(file) or {}
+        except Exception as e:
+            print(f"Erro ao carregar política de retenção: {e}")
+            return cls()
+
+        default = (config.get("default") or {}).get("hot_days", DEFAULT_HOT_DAYS)
+        crews = {name: (options or {}).get("hot_days", default) for name, options in (config.get("crews") or {}).items()}
+        return cls(default, crews)
+
+    def hot_days(self, crew_name: str) -> Optional[int]:
+        """Dias mantidos no banco principal para a crew (None = nunca arquivar)"""
+        return self.crews.get(crew_name, self.default_hot_days)
+
+
+def archive_file_name(month: str) -> str:
+    """Nome do arquivo mensal para um mês no formato AAAA-MM"""
+    return f"crews_archive_{month.replace('-', '_')}.db"
+
+
+def list_archives(archive_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """Lista os arquivos mensais existentes como (AAAA-MM, caminho), do mais recente ao mais antigo"""
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return []
+    archives = []
+    for name in os.listdir(archive_dir):
+        match = ARCHIVE_FILE_PATTERN.match(name)
+        if match:
+            archives.append((f"{match.group(1)}-{match.group(2)}", os.path.join(archive_dir, name)))
+    return sorted(archives, reverse=True)
+
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    """Limites [início, fim) de um mês no formato de texto UTC de created_at"""
+    year, month_number = (int(part) for part in month.split("-"))
+    next_year, next_month = (year + 1, 1) if month_number == 12 else (year, month_number + 1)
+    return f"{year:04d}-{month_number:02d}-01 00:00:00", f"{next_year:04d}-{next_month:02d}-01 00:00:00"
+
+
+def archive_schema(month: str) -> str:
+    """Nome usado ao anexar o arquivo mensal a uma conexão"""
+    return f"archive_{month.replace('-', '_')}"
+
+
+def ensure_archive(path: str):
+    """Cria o arquivo mensal (ou atualiza seu esquema) aplicando as migrações"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            run_migrations(conn)
+    finally:
+        conn.close()
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _copy_rows(conn: sqlite3.Connection, table: str, where: str, params: tuple, target: str = "archive_w"):
+    """Copia linhas de main.table para o arquivo anexado (substituindo as já existentes)"""
+    target_columns = set(_columns(conn, target, table))
+    columns = ", ".join(column for column in _columns(conn, "main", table) if column in target_columns)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {target}.{table} ({columns}) SELECT {columns} FROM main.{table} WHERE {where}",
+        params,
+    )
+
+
+def _has_search_index(conn: sqlite3.Connection, schema: str) -> bool:
+    return (
+        conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'search_index'").fetchone()
+        is not None
+    )
+
+
+def _archive_batch(conn: sqlite3.Connection, execution_ids: List[int]):
+    """Move um lote de execuções (e tudo que depende delas) para o arquivo anexado como archive_w"""
+    conn.execute("DELETE FROM temp.retention_ids")
+    conn.executemany("INSERT INTO temp.retention_ids (id) VALUES (?)", [(execution_id,) for execution_id in execution_ids])
+    in_batch = "execution_id IN (SELECT id FROM temp.retention_ids)"
+
+    _copy_rows(conn, "executions", "id IN (SELECT id FROM temp.retention_ids)", ())
+    for table, column in ARCHIVED_TABLES:
+        _copy_rows(conn, table, f"{column} IN (SELECT id FROM temp.retention_ids)", ())
+
+    # Blobs referenciados pelas linhas movidas
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO archive_w.blobs
+        SELECT * FROM main.blobs WHERE hash IN (
+            SELECT value FROM main.executions, json_each(main.executions.result_blobs)
+            WHERE main.executions.id IN (SELECT id FROM temp.retention_ids)
+            UNION SELECT task_result_blob FROM main.execution_results WHERE {in_batch}
+            UNION SELECT report_blob FROM main.evaluation_reports WHERE {in_batch}
+        )
+    """.format(in_batch=in_batch)
+    )
+
+    # O índice não guarda o texto: as entradas são reindexadas no arquivo a partir dos blobs copiados
+    if _has_search_index(conn, "main"):
+        if _has_search_index(conn, "archive_w"):
+            copy_entries(conn, in_batch, "main", "archive_w")
+        remove_entries(conn, in_batch, schema="main")
+
+    for table, column in reversed(ARCHIVED_TABLES):
+        conn.execute(f"DELETE FROM main.{table} WHERE {column} IN (SELECT id FROM temp.retention_ids)")
+    conn.execute("DELETE FROM main.executions WHERE id IN (SELECT id FROM temp.retention_ids)")
+
+
+def delete_unreferenced_blobs(conn: sqlite3.Connection) -> int:
+    """Remove blobs que não são mais referenciados por nenhuma linha"""
+    cursor = conn.execute(f"DELETE FROM blobs WHERE hash NOT IN ({' UNION '.join(BLOB_REFERENCES)})")
+    return cursor.rowcount
+
+
+def database_size(conn: sqlite3.Connection) -> int:
+    """Tamanho lógico do banco principal em bytes"""
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_count * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def reclaim_space(conn: sqlite3.Connection) -> int:
+    """Devolve páginas livres ao sistema de arquivos e retorna os bytes recuperados
+
+    Bancos antigos (auto_vacuum = NONE) passam por um VACUUM completo uma única vez
+    para ativar o modo incremental; depois disso basta o incremental_vacuum.
+    """
+    before = database_size(conn)
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        conn.execute("PRAGMA incremental_vacuum")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return before - database_size(conn)
+
+
+def apply_retention(db_manager, policy: Optional[RetentionPolicy] = None, now: Optional[datetime] = None, batch_size: int = 500) -> Dict:
+    """Arquiva execuções fora do período quente e recupera o espaço liberado
+
+    Retorna um relatório com as execuções arquivadas por mês, blobs removidos e
+    bytes recuperados. Os agregados de estatísticas permanecem no banco principal.
+    """
+    policy = policy or RetentionPolicy.load()
+    now_ms = int((now or datetime.now(timezone.utc)).timestamp() * 1000)
+    report: Dict = {"archived": {}, "blobs_removed": 0, "bytes_reclaimed": 0, "archive_dir": db_manager.archive_dir}
+    if not db_manager.archive_dir:
+        print("⚠️ Banco sem diretório de arquivos (ex: :memory:); retenção ignorada")
+        return report
+
+    db_manager.flush()
+    conn = db_manager.connections.connection()
+    placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+
+    candidates: Dict[str, List[int]] = {}
+    for (crew_name,) in conn.execute("SELECT DISTINCT crew_name FROM executions").fetchall():
+        hot_days = policy.hot_days(crew_name)
+        if hot_days is None:
+            continue
+        rows = conn.execute(
+            f"""
+            SELECT id, substr(created_at, 1, 7) FROM executions
+            WHERE crew_name = ? AND created_ts < ? AND status NOT IN ({placeholders})
+        """,
+            (crew_name, now_ms - hot_days * DAY_MS, *ACTIVE_STATUSES),
+        ).fetchall()
+        for execution_id, month in rows:
+            candidates.setdefault(month, []).append(execution_id)
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS retention_ids (id INTEGER PRIMARY KEY)")
+    for month, execution_ids in sorted(candidates.items()):
+        path = os.path.join(db_manager.archive_dir, archive_file_name(month))
+        ensure_archive(path)
+        conn.execute("ATTACH DATABASE ? AS archive_w", (Path(path).absolute().as_uri(),))
+        try:
+            for start in range(0, len(execution_ids), batch_size):
+                with db_manager.connections.transaction() as write_conn:
+                    write_conn.execute("BEGIN IMMEDIATE")
+                    _archive_batch(write_conn, execution_ids[start : start + batch_size])
+        finally:
+            conn.execute("DETACH DATABASE archive_w")
+        report["archived"][month] = len(execution_ids)
+        print(f"🗄️ {len(execution_ids)} execução(ões) de {month} arquivada(s) em {path}")
+
+    with db_manager.connections.transaction() as write_conn:
+        report["blobs_removed"] = delete_unreferenced_blobs(write_conn)
+    report["bytes_reclaimed"] = reclaim_space(conn)
+    report["finished_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquiva execuções antigas conforme a política de retenção")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Arquivo YAML da política")
+    parser.add_argument("--db", default="app/data/crews_database.db", help="Banco de dados principal")
+    args = parser.parse_args()
+
+    from app.utils.database import DatabaseManager
+
+    db_manager = DatabaseManager(args.db)
+    report = apply_retention(db_manager, RetentionPolicy.load(args.config))
+    db_manager.close()
+
+    total = sum(report["archived"].values())
+    print(f"✅ {total} execução(ões) arquivada(s), {report['blobs_removed']} blob(s) removido(s)")
+    print(f"💾 Espaço recuperado: {report['bytes_reclaimed'] / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Agregados incrementais de execuções (contadores por crew e buckets por hora/dia)
+
+Os agregados são atualizados na mesma transação que grava a execução, de modo que
+as estatísticas do dashboard são lidas sem varrer a tabela de execuções.
+"""
+
+import math
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# Estados em que a execução ainda não terminou ("queued": aguardando um worker do motor de execução)
+ACTIVE_STATUSES = ("queued", "running")
+
+# Granularidades mantidas: "all" (bucket único) e buckets UTC de hora e dia
+GRANULARITIES = {"all": None, "hour": HOUR_MS, "day": DAY_MS}
+
+# Janelas de estatísticas: (granularidade dos buckets, quantidade de buckets)
+STATISTICS_WINDOWS = {"1h": ("hour", 1), "24h": ("hour", 24), "7d": ("day", 7), "30d": ("day", 30), "all": ("all", None)}
+
+# Histograma logarítmico de durações: 4 bins por oitava (~19% de erro máximo)
+BINS_PER_OCTAVE = 4
+
+
+def bucket_start(granularity: str, timestamp_ms: Optional[int]) -> int:
+    """Retorna o início do bucket (epoch ms) que contém o timestamp"""
+    size = GRANULARITIES[granularity]
+    if size is None or timestamp_ms is None:
+        return 0
+    return timestamp_ms - timestamp_ms % size
+
+
+def duration_bin(duration_ms: int) -> int:
+    """Retorna o bin do histograma para uma duração em ms"""
+    return int(math.log2(max(duration_ms, 1)) * BINS_PER_OCTAVE)
+
+
+def bin_upper_bound_ms(bin_index: int) -> int:
+    """Limite superior (ms) de um bin do histograma"""
+    return int(2 ** ((bin_index + 1) / BINS_PER_OCTAVE))
+
+
+def percentiles_from_histogram(histogram: Dict[int, int], percentiles: Iterable[int] = (50, 95, 99)) -> Dict[str, Optional[int]]:
+    """Estima percentis a partir de um histograma {bin: contagem}"""
+    total = sum(histogram.values())
+    result: Dict[str, Optional[int]] = {}
+    for percentile in percentiles:
+        key = f"p{percentile}"
+        if total == 0:
+            result[key] = None
+            continue
+        target = math.ceil(total * percentile / 100)
+        cumulative = 0
+        for bin_index in sorted(histogram):
+            cumulative += histogram[bin_index]
+            if cumulative >= target:
+                result[key] = bin_upper_bound_ms(bin_index)
+                break
+    return result
+
+
+def window_start(granularity: str, bucket_count: Optional[int], now_ms: int) -> int:
+    """Início (epoch ms) de uma janela com os últimos `bucket_count` buckets (0 = todo o histórico)"""
+    if bucket_count is None:
+        return 0
+    return bucket_start(granularity, now_ms) - (bucket_count - 1) * GRANULARITIES[granularity]
+
+
+def summarize_statistics(window: str, per_crew_rows: Iterable[tuple], histogram: Dict[int, int], total_crews: int) -> Dict:
+    """Monta o dicionário de estatísticas a partir dos agregados somados por crew
+
+    `per_crew_rows`: (crew, total, finished, completed, failed, duration_ms_total).
+    """
+    per_crew = {}
+    duration_total = 0
+    for crew_name, total, finished, completed, failed, crew_duration_total in per_crew_rows:
+        duration_total += crew_duration_total
+        per_crew[crew_name] = {
+            "total": total,
+            "finished": finished,
+            "completed": completed,
+            "failed": failed,
+            "avg_duration_ms": crew_duration_total / finished if finished else None,
+        }
+
+    total_executions = sum(crew["total"] for crew in per_crew.values())
+    successful_executions = sum(crew["completed"] for crew in per_crew.values())
+    finished_executions = sum(crew["finished"] for crew in per_crew.values())
+    most_executed = max(per_crew.items(), key=lambda item: item[1]["total"], default=(None, None))[0]
+
+    return {
+        "window": window,
+        "total_executions": total_executions,
+        "successful_executions": successful_executions,
+        "failed_executions": sum(crew["failed"] for crew in per_crew.values()),
+        "running_executions": total_executions - finished_executions,
+        "success_rate": (successful_executions / total_executions * 100) if total_executions > 0 else 0,
+        "total_crews": total_crews,
+        "most_executed_crew": most_executed,
+        "avg_duration_ms": duration_total / finished_executions if finished_executions else None,
+        "duration_percentiles_ms": percentiles_from_histogram(histogram),
+        "per_crew": per_crew,
+    }
+
+
+def _buckets(start_ts: Optional[int]) -> Iterable[Tuple[str, int]]:
+    for granularity in GRANULARITIES:
+        yield granularity, bucket_start(granularity, start_ts)
+
+
+def record_execution_started(conn: sqlite3.Connection, crew_name: str, start_ts: Optional[int]):
+    """Contabiliza uma nova execução nos agregados"""
+    conn.executemany(
+        """
+        INSERT INTO execution_rollups (granularity, bucket_ts, crew_name, total)
+        VALUES (?, ?, ?, 1)
+        ON CONFLICT (granularity, bucket_ts, crew_name) DO UPDATE SET total = total + 1
+    """,
+        [(granularity, bucket, crew_name) for granularity, bucket in _buckets(start_ts)],
+    )
+
+
+def move_execution_start(conn: sqlite3.Connection, crew_name: str, old_start_ts: Optional[int], new_start_ts: Optional[int]):
+    """Move a contagem de uma execução para os buckets do novo início (ex: saiu da fila em outra hora)"""
+    for granularity, old_bucket in _buckets(old_start_ts):
+        new_bucket = bucket_start(granularity, new_start_ts)
+        if new_bucket == old_bucket:
+            continue
+        conn.execute(
+            "UPDATE execution_rollups SET total = total - 1 WHERE granularity = ? AND bucket_ts = ? AND crew_name = ?",
+            (granularity, old_bucket, crew_name),
+        )
+        conn.execute(
+            """
+            INSERT INTO execution_rollups (granularity, bucket_ts, crew_name, total)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (granularity, bucket_ts, crew_name) DO UPDATE SET total = total + 1
+        """,
+            (granularity, new_bucket, crew_name),
+        )
+
+
+def record_execution_finished(
+    conn: sqlite3.Connection,
+    crew_name: str,
+    start_ts: Optional[int],
+    status: str,
+    duration_ms: Optional[int],
+):
+    """Contabiliza o término de uma execução (sucesso/falha, duração e histograma)"""
+    completed = 1 if status == "completed" else 0
+    buckets = list(_buckets(start_ts))
+    conn.executemany(
+        """
+        INSERT INTO execution_rollups (granularity, bucket_ts, crew_name, finished, completed, failed, duration_ms_total)
+        VALUES (?, ?, ?, 1, ?, ?, ?)
+        ON CONFLICT (granularity, bucket_ts, crew_name) DO UPDATE SET
+            finished = finished + 1,
+            completed = completed + excluded.completed,
+            failed = failed + excluded.failed,
+            duration_ms_total = duration_ms_total + excluded.duration_ms_total
+    """,
+        [(granularity, bucket, crew_name, completed, 1 - completed, duration_ms or 0) for granularity, bucket in buckets],
+    )
+    if duration_ms is None:
+        return
+    conn.executemany(
+        """
+        INSERT INTO duration_histogram (granularity, bucket_ts, crew_name, bin, count)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (granularity, bucket_ts, crew_name, bin) DO UPDATE SET count = count + 1
+    """,
+        [(granularity, bucket, crew_name, duration_bin(duration_ms)) for granularity, bucket in buckets],
+    )
+
+
+def record_execution_reopened(
+    conn: sqlite3.Connection,
+    crew_name: str,
+    start_ts: Optional[int],
+    status: str,
+    duration_ms: Optional[int],
+):
+    """Desfaz a contagem do término de uma execução que voltou a rodar (ex: retomada após falha)"""
+    completed = 1 if status == "completed" else 0
+    buckets = list(_buckets(start_ts))
+    conn.executemany(
+        """
+        UPDATE execution_rollups
+        SET finished = finished - 1, completed = completed - ?, failed = failed - ?,
+            duration_ms_total = duration_ms_total - ?
+        WHERE granularity = ? AND bucket_ts = ? AND crew_name = ?
+    """,
+        [(completed, 1 - completed, duration_ms or 0, granularity, bucket, crew_name) for granularity, bucket in buckets],
+    )
+    if duration_ms is None:
+        return
+    conn.executemany(
+        "UPDATE duration_histogram SET count = count - 1 WHERE granularity = ? AND bucket_ts = ? AND crew_name = ? AND bin = ?",
+        [(granularity, bucket, crew_name, duration_bin(duration_ms)) for granularity, bucket in buckets],
+    )
+
+
+def record_usage(
+    conn: sqlite3.Connection,
+    crew_name: str,
+    start_ts: Optional[int],
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    cost_usd: Optional[float],
+):
+    """Soma tokens e custo de uma execução ao agregado do dia UTC do seu início"""
+    conn.execute(
+        """
+        INSERT INTO usage_rollups (day_ts, crew_name, model, prompt_tokens, completion_tokens, cost_usd)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (day_ts, crew_name, model) DO UPDATE SET
+            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+            completion_tokens = completion_tokens + excluded.completion_tokens,
+            cost_usd = cost_usd + excluded.cost_usd
+    """,
+        (bucket_start("day", start_ts), crew_name, model or "", prompt_tokens, completion_tokens, cost_usd or 0.0),
+    )
+
+
+def usage_row(day_ts: int, crew_name: str, model: str, prompt_tokens: int, completion_tokens: int, cost_usd: float) -> Dict:
+    """Linha do resumo de consumo (dia UTC em ISO, tokens e custo)"""
+    return {
+        "day": datetime.fromtimestamp(day_ts / 1000, timezone.utc).date().isoformat(),
+        "crew_name": crew_name,
+        "model": model or None,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "cost_usd": round(cost_usd, 6),
+    }
+
+
+def create_usage_table(conn: sqlite3.Connection):
+    """Cria a tabela de consumo agregado por dia UTC, crew e modelo"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_rollups (
+            day_ts INTEGER NOT NULL,        -- início do dia UTC em epoch ms
+            crew_name TEXT NOT NULL,
+            model TEXT NOT NULL,            -- '' quando o modelo não é conhecido
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day_ts, crew_name, model)
+        ) WITHOUT ROWID
+    """
+    )
+
+
+def create_rollup_tables(conn: sqlite3.Connection):
+    """Cria as tabelas de agregados"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS execution_rollups (
+            granularity TEXT NOT NULL,      -- 'all', 'hour' ou 'day'
+            bucket_ts INTEGER NOT NULL,     -- início do bucket em epoch ms (0 para 'all')
+            crew_name TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            finished INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            duration_ms_total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_ts, crew_name)
+        ) WITHOUT ROWID
+    """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS duration_histogram (
+            granularity TEXT NOT NULL,
+            bucket_ts INTEGER NOT NULL,
+            crew_name TEXT NOT NULL,
+            bin INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_ts, crew_name, bin)
+        ) WITHOUT ROWID
+    """
+    )
+
+
+def rebuild_rollups(conn: sqlite3.Connection):
+    """Recalcula todos os agregados a partir da tabela de execuções"""
+    conn.execute("DELETE FROM execution_rollups")
+    conn.execute("DELETE FROM duration_histogram")
+    rows = conn.execute("SELECT crew_name, start_ts, status, duration_ms FROM executions").fetchall()
+    for crew_name, start_ts, status, duration_ms in rows:
+        record_execution_started(conn, crew_name, start_ts)
+        if status not in ACTIVE_STATUSES:
+            record_execution_finished(conn, crew_name, start_ts, status, duration_ms)
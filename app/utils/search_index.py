@@ -0,0 +1,142 @@
+"""
+Índice de busca textual (FTS5) sem cópia do conteúdo
+
+O índice FTS5 é "contentless" (content=''): guarda apenas os termos, e o texto
+pesquisado continua existindo só nos blobs comprimidos. Os metadados de cada
+entrada ficam em search_entries, junto com os hashes dos blobs do texto indexado.
+Esses hashes servem para montar os trechos (snippets) dos resultados e para
+remover a entrada, já que um índice sem conteúdo só remove termos quando recebe
+o texto original.
+"""
+
+import json
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, List, Optional, Pattern
+
+from app.utils.blob_store import get_segments
+
+# Código somado ao id de origem para formar o rowid do índice FTS (id * 4 + código)
+SEARCH_KIND_CODES = {"execution": 1, "task_result": 2, "evaluation": 3}
+
+# Pesos do bm25 para as colunas do índice (crew_name, title, body)
+BM25_WEIGHTS = "2.0, 5.0, 1.0"
+
+
+def create_search_tables(conn: sqlite3.Connection, full_text: bool = True):
+    """Cria a tabela de entradas e, com `full_text`, o índice FTS5 sem conteúdo"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_entries (
+            rowid INTEGER PRIMARY KEY,      -- mesmo rowid da entrada em search_index
+            kind TEXT NOT NULL,             -- 'execution', 'task_result' ou 'evaluation'
+            execution_id INTEGER NOT NULL,
+            crew_name TEXT,
+            title TEXT NOT NULL,
+            body_blobs TEXT                 -- JSON com os hashes do texto indexado
+        )
+    """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_entries_execution ON search_entries (execution_id)")
+    if full_text:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE search_index USING fts5(
+                crew_name,
+                title,
+                body,
+                content = '',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """
+        )
+
+
+def index_entry(
+    conn: sqlite3.Connection,
+    rowid: int,
+    kind: str,
+    execution_id: int,
+    crew_name: Optional[str],
+    title: str,
+    body: str,
+    body_blobs: Optional[str],
+    schema: str = "main",
+):
+    """Grava (ou substitui) uma entrada; `body_blobs` são os hashes em JSON de `body`"""
+    remove_entries(conn, "rowid = ?", (rowid,), schema)
+    conn.execute(
+        f"""
+        INSERT INTO {schema}.search_entries (rowid, kind, execution_id, crew_name, title, body_blobs)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+        (rowid, kind, execution_id, crew_name, title, body_blobs),
+    )
+    conn.execute(
+        f"INSERT INTO {schema}.search_index (rowid, crew_name, title, body) VALUES (?, ?, ?, ?)",
+        (rowid, crew_name, title, body),
+    )
+
+
+def remove_entries(conn: sqlite3.Connection, where: str, params: tuple = (), schema: str = "main") -> int:
+    """Remove as entradas de search_entries que atendem `where` e seus termos do índice"""
+    rows = conn.execute(
+        f"SELECT rowid, crew_name, title, body_blobs FROM {schema}.search_entries WHERE {where}", params
+    ).fetchall()
+    for rowid, crew_name, title, body_blobs in rows:
+        conn.execute(
+            f"INSERT INTO {schema}.search_index (search_index, rowid, crew_name, title, body) VALUES ('delete', ?, ?, ?, ?)",
+            (rowid, crew_name, title, get_segments(conn, body_blobs, schema) or ""),
+        )
+    if rows:
+        placeholders = ", ".join("?" for _ in rows)
+        conn.execute(f"DELETE FROM {schema}.search_entries WHERE rowid IN ({placeholders})", [row[0] for row in rows])
+    return len(rows)
+
+
+def copy_entries(conn: sqlite3.Connection, where: str, source: str, target: str, params: tuple = ()):
+    """Indexa em `target` as entradas de `source` que atendem `where` (os blobs já devem estar em `target`)"""
+    rows = conn.execute(
+        f"SELECT rowid, kind, execution_id, crew_name, title, body_blobs FROM {source}.search_entries WHERE {where}", params
+    ).fetchall()
+    for rowid, kind, execution_id, crew_name, title, body_blobs in rows:
+        body = get_segments(conn, body_blobs, source) or ""
+        index_entry(conn, rowid, kind, execution_id, crew_name, title, body, body_blobs, target)
+
+
+def blob_list(*digests: Optional[str]) -> Optional[str]:
+    """Lista de hashes em JSON (None se não houver nenhum)"""
+    present = [digest for digest in digests if digest]
+    return json.dumps(present) if present else None
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos, como o tokenizador unicode61 do FTS5"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def query_patterns(query: str, prefix: bool = True) -> List[Pattern]:
+    """Expressões regulares equivalentes aos termos de build_fts_query (sobre texto normalizado)"""
+    tokens = re.findall(r"\w+\*?", normalize_text(query))
+    patterns = []
+    for index, token in enumerate(tokens):
+        is_prefix = token.endswith("*") or (prefix and index == len(tokens) - 1)
+        word = re.escape(token.rstrip("*"))
+        patterns.append(re.compile(rf"\b{word}\w*" if is_prefix else rf"\b{word}\b"))
+    return patterns
+
+
+def make_snippet(body: str, patterns: Iterable[Pattern], snippet_tokens: int = 16) -> str:
+    """Trecho de `snippet_tokens` palavras em volta do primeiro termo encontrado, marcado com **"""
+    words = (body or "").split()
+    for pattern in patterns:
+        for index, word in enumerate(words):
+            if pattern.search(normalize_text(word)):
+                start = max(index - snippet_tokens // 2, 0)
+                window = words[start : start + snippet_tokens]
+                window[index - start] = f"**{word}**"
+                return ("…" if start > 0 else "") + " ".join(window) + ("…" if start + snippet_tokens < len(words) else "")
+    return " ".join(words[:snippet_tokens])
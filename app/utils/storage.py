@@ -0,0 +1,655 @@
+"""
+Interface de armazenamento usada pelos gerenciadores (execuções, resultados de
+tarefas, configurações de crews e avaliações) e o motor em memória
+
+O motor SQLite é o DatabaseManager. O motor em memória serve para testes e
+benchmarks de orquestração sem E/S de disco. O motor é escolhido por injeção
+(`CrewManager(..., storage=...)`) ou pela variável de ambiente STORAGE_BACKEND.
+"""
+
+import itertools
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Protocol, runtime_checkable
+
+from app.utils.blob_store import Content, segments_of
+from app.utils.database import DatabaseManager, _local_date_to_utc_text
+from app.utils.migrations import TASK_METRIC_COLUMNS, USAGE_COLUMNS
+from app.utils.result_sections import index_sections
+from app.utils.rollups import (
+    ACTIVE_STATUSES,
+    GRANULARITIES,
+    STATISTICS_WINDOWS,
+    bucket_start,
+    duration_bin,
+    summarize_statistics,
+    usage_row,
+    window_start,
+)
+from app.utils.search_index import make_snippet, normalize_text, query_patterns
+
+STORAGE_BACKENDS = ("sqlite", "memory")
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Operações de persistência que os gerenciadores podem usar"""
+
+    archive_dir: Optional[str]
+
+    # Execuções
+    def save_execution(
+        self,
+        crew_name: str,
+        topic: str,
+        start_time: datetime,
+        status: str = "running",
+        batch_id: Optional[str] = None,
+    ) -> int: ...
+
+    def start_execution(self, execution_id: int, start_time: datetime) -> bool: ...
+
+    def save_execution_inputs(self, execution_id: int, inputs: Optional[Dict]): ...
+
+    def reopen_execution(self, execution_id: int) -> bool: ...
+
+    def update_execution_result(
+        self,
+        execution_id: int,
+        result: Content,
+        end_time: datetime,
+        duration: str,
+        status: str = "completed",
+        error_message: Optional[str] = None,
+    ): ...
+
+    def get_execution_details(self, execution_id: int, include_result: bool = True) -> Optional[Dict]: ...
+
+    def get_result_length(self, execution_id: int) -> Optional[int]: ...
+
+    def get_result_sections(self, execution_id: int) -> List[Dict]: ...
+
+    def get_result_range(self, execution_id: int, offset: int = 0, length: int = 20000) -> Optional[str]: ...
+
+    def get_batch_executions(self, batch_id: str, include_result: bool = True) -> List[Dict]: ...
+
+    def get_execution_history(self) -> List[Dict]: ...
+
+    def get_execution_history_page(
+        self,
+        limit: int = 25,
+        cursor: Optional[tuple] = None,
+        crew_name: Optional[str] = None,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        preview_chars: int = 100,
+    ) -> Dict: ...
+
+    def get_execution_crew_names(self) -> List[str]: ...
+
+    # Consumo de tokens e custo
+    def record_execution_usage(
+        self,
+        execution_id: int,
+        model: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: Optional[float] = None,
+    ): ...
+
+    def get_usage_summary(self, since: Optional[date] = None, crew_name: Optional[str] = None) -> List[Dict]: ...
+
+    def get_average_execution_cost(self, crew_name: str, limit: int = 20) -> Optional[float]: ...
+
+    # Resultados de tarefas
+    def save_critical_path(self, execution_id: int, summary: str): ...
+
+    def save_task_result(
+        self,
+        execution_id: int,
+        agent_name: str,
+        task_description: str,
+        task_result: str,
+        task_status: str = "completed",
+        metrics: Optional[Dict] = None,
+        task_index: Optional[int] = None,
+    ): ...
+
+    # Configurações de crews
+    def save_crew_config(self, crew_name: str, description: str, agent_types: List[str], task_types: List[str]): ...
+
+    def get_crew_config(self, crew_name: str) -> Optional[Dict]: ...
+
+    def delete_crew_config(self, crew_name: str) -> bool: ...
+
+    def get_all_crew_configs(self) -> List[Dict]: ...
+
+    # Avaliações
+    def save_evaluation_report(self, execution_id: int, evaluation_report: str): ...
+
+    def get_evaluation_report(self, execution_id: int) -> Optional[str]: ...
+
+    # Busca e estatísticas
+    @property
+    def full_text_search_enabled(self) -> bool: ...
+
+    def search_full_text(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        kinds: Optional[List[str]] = None,
+        crew_name: Optional[str] = None,
+        prefix: bool = True,
+        snippet_tokens: int = 16,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Dict]: ...
+
+    def search_executions(self, query: str, limit: int = 100) -> List[Dict]: ...
+
+    def get_statistics(self) -> Dict: ...
+
+    def get_statistics_v2(self, window: str = "all") -> Dict: ...
+
+    # Ciclo de vida
+    def flush(self, timeout: Optional[float] = None) -> bool: ...
+
+    def close(self): ...
+
+
+def create_storage(backend: Optional[str] = None, db_path: Optional[str] = None, **options) -> StorageBackend:
+    """Cria o motor de armazenamento ("sqlite" ou "memory")
+
+    Sem argumentos, usa as variáveis de ambiente STORAGE_BACKEND e DATABASE_PATH.
+    Opções extras (ex: write_behind=True) são repassadas ao motor SQLite.
+    """
+    backend = (backend or os.getenv("STORAGE_BACKEND") or "sqlite").lower()
+    if backend == "memory":
+        return InMemoryStorage()
+    if backend == "sqlite":
+        return DatabaseManager(db_path or os.getenv("DATABASE_PATH") or "app/data/crews_database.db", **options)
+    raise ValueError(f"Motor de armazenamento desconhecido: {backend}. Use um de {list(STORAGE_BACKENDS)}")
+
+
+def _utc_text(value: datetime) -> str:
+    """Formato de texto UTC usado por created_at no SQLite"""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class InMemoryStorage:
+    """Motor de armazenamento em memória (mesma interface do DatabaseManager)
+
+    Os dados vivem apenas no processo. Os agregados de estatísticas seguem os
+    mesmos buckets do SQLite, para que o dashboard funcione igual.
+    """
+
+    STATISTICS_WINDOWS = STATISTICS_WINDOWS
+
+    def __init__(self):
+        self.db_path = ":memory:"
+        self.archive_dir: Optional[str] = None
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._executions: Dict[int, Dict] = {}
+        self._task_results: Dict[int, List[Dict]] = {}
+        self._evaluation_reports: Dict[int, List[str]] = {}
+        self._crew_configs: Dict[str, Dict] = {}
+        self._rollups: Dict[tuple, List[int]] = {}  # (granularidade, bucket, crew) -> [total, finished, completed, failed, duração]
+        self._histogram: Dict[tuple, int] = {}  # (granularidade, bucket, crew, bin) -> contagem
+        self._usage: Dict[tuple, List] = {}  # (dia UTC, crew, modelo) -> [prompt, resposta, custo]
+
+    # ------------------------------------------------------------------ ciclo de vida
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    # ------------------------------------------------------------------ execuções
+
+    def save_execution(
+        self,
+        crew_name: str,
+        topic: str,
+        start_time: datetime,
+        status: str = "running",
+        batch_id: Optional[str] = None,
+    ) -> int:
+        with self._lock:
+            execution_id = next(self._ids)
+            start_ts = int(start_time.timestamp() * 1000)
+            self._executions[execution_id] = {
+                "id": execution_id,
+                "crew_name": crew_name,
+                "topic": topic,
+                "start_time": start_time.isoformat(),
+                "end_time": None,
+                "duration": None,
+                "duration_ms": None,
+                "status": status,
+                "result": None,
+                "sections": [],
+                "error_message": None,
+                "created_at": _utc_text(datetime.now(timezone.utc)),
+                "start_ts": start_ts,
+                "batch_id": batch_id,
+                "model": None,
+                **{column: None for column in USAGE_COLUMNS},
+                "critical_path": None,
+                "inputs": None,
+            }
+            for granularity in GRANULARITIES:
+                self._rollup(granularity, start_ts, crew_name)[0] += 1
+            return execution_id
+
+    def start_execution(self, execution_id: int, start_time: datetime) -> bool:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None or execution["status"] != "queued":
+                return False
+            start_ts = int(start_time.timestamp() * 1000)
+            for granularity in GRANULARITIES:
+                if bucket_start(granularity, start_ts) != bucket_start(granularity, execution["start_ts"]):
+                    self._rollup(granularity, execution["start_ts"], execution["crew_name"])[0] -= 1
+                    self._rollup(granularity, start_ts, execution["crew_name"])[0] += 1
+            execution.update(status="running", start_time=start_time.isoformat(), start_ts=start_ts)
+            return True
+
+    def save_execution_inputs(self, execution_id: int, inputs: Optional[Dict]):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is not None:
+                execution["inputs"] = dict(inputs or {})
+
+    def reopen_execution(self, execution_id: int) -> bool:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None or execution["status"] in ACTIVE_STATUSES or execution["status"] == "completed":
+                return False
+            duration_ms = execution["duration_ms"]
+            for granularity in GRANULARITIES:
+                counters = self._rollup(granularity, execution["start_ts"], execution["crew_name"])
+                counters[1] -= 1
+                counters[3] -= 1
+                counters[4] -= duration_ms or 0
+                if duration_ms is not None:
+                    key = (
+                        granularity,
+                        bucket_start(granularity, execution["start_ts"]),
+                        execution["crew_name"],
+                        duration_bin(duration_ms),
+                    )
+                    self._histogram[key] = self._histogram.get(key, 0) - 1
+            execution.update(status="running", end_time=None, duration=None, duration_ms=None, error_message=None)
+            return True
+
+    def update_execution_result(
+        self,
+        execution_id: int,
+        result: Content,
+        end_time: datetime,
+        duration: str,
+        status: str = "completed",
+        error_message: Optional[str] = None,
+    ):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None:
+                return
+            previous_status = execution["status"]
+            duration_ms = int(end_time.timestamp() * 1000) - execution["start_ts"]
+            full_text = "".join(segments_of(result))
+            execution.update(
+                result=full_text,
+                sections=index_sections(full_text),
+                end_time=end_time.isoformat(),
+                duration=duration,
+                duration_ms=duration_ms,
+                status=status,
+                error_message=error_message,
+            )
+            if previous_status in ACTIVE_STATUSES and status not in ACTIVE_STATUSES:
+                completed = 1 if status == "completed" else 0
+                for granularity in GRANULARITIES:
+                    counters = self._rollup(granularity, execution["start_ts"], execution["crew_name"])
+                    counters[1] += 1
+                    counters[2] += completed
+                    counters[3] += 1 - completed
+                    counters[4] += duration_ms
+                    key = (
+                        granularity,
+                        bucket_start(granularity, execution["start_ts"]),
+                        execution["crew_name"],
+                        duration_bin(duration_ms),
+                    )
+                    self._histogram[key] = self._histogram.get(key, 0) + 1
+
+    def _rollup(self, granularity: str, start_ts: int, crew_name: str) -> List[int]:
+        key = (granularity, bucket_start(granularity, start_ts), crew_name)
+        return self._rollups.setdefault(key, [0, 0, 0, 0, 0])
+
+    def _summary(self, execution: Dict, preview_chars: int) -> Dict:
+        row = {key: execution[key] for key in ("id", "crew_name", "topic", "start_time", "duration", "duration_ms", "status", "created_at")}
+        row["result_preview"] = (execution["result"] or "")[:preview_chars]
+        return row
+
+    def _history_row(self, execution: Dict) -> Dict:
+        columns = ("id", "crew_name", "topic", "start_time", "end_time", "duration", "status", "result", "error_message", "created_at")
+        return {key: execution[key] for key in columns}
+
+    def _newest_first(self) -> List[Dict]:
+        return sorted(self._executions.values(), key=lambda execution: (execution["created_at"], execution["id"]), reverse=True)
+
+    def get_execution_history(self) -> List[Dict]:
+        with self._lock:
+            return [self._history_row(execution) for execution in self._newest_first()]
+
+    def get_execution_history_page(
+        self,
+        limit: int = 25,
+        cursor: Optional[tuple] = None,
+        crew_name: Optional[str] = None,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        preview_chars: int = 100,
+    ) -> Dict:
+        created_from = _local_date_to_utc_text(date_from) if date_from else None
+        created_to = _local_date_to_utc_text(date_to + timedelta(days=1)) if date_to else None
+        with self._lock:
+            rows = [
+                self._summary(execution, preview_chars)
+                for execution in self._newest_first()
+                if (not crew_name or execution["crew_name"] == crew_name)
+                and (not status or execution["status"] == status)
+                and (not created_from or execution["created_at"] >= created_from)
+                and (not created_to or execution["created_at"] < created_to)
+                and (not cursor or (execution["created_at"], execution["id"]) < tuple(cursor))
+            ][: limit + 1]
+
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = (items[-1]["created_at"], items[-1]["id"]) if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_execution_crew_names(self) -> List[str]:
+        with self._lock:
+            return sorted({execution["crew_name"] for execution in self._executions.values()})
+
+    def get_execution_details(self, execution_id: int, include_result: bool = True) -> Optional[Dict]:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None:
+                return None
+            details = self._history_row(execution)
+            details.update(duration_ms=execution["duration_ms"], result_size=len(execution["result"] or ""), archived=False)
+            details.update({column: execution[column] for column in ("model", *USAGE_COLUMNS, "critical_path")})
+            details["inputs"] = dict(execution["inputs"]) if execution["inputs"] is not None else None
+            if not include_result:
+                details["result"] = None
+            details["task_results"] = [dict(task) for task in self._task_results.get(execution_id, [])]
+            return details
+
+    def get_result_length(self, execution_id: int) -> Optional[int]:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            return None if execution is None else len(execution["result"] or "")
+
+    def get_result_sections(self, execution_id: int) -> List[Dict]:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            return [] if execution is None else [dict(section) for section in execution["sections"]]
+
+    def get_result_range(self, execution_id: int, offset: int = 0, length: int = 20000) -> Optional[str]:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None or execution["result"] is None:
+                return None
+            offset, length = max(offset, 0), max(length, 0)
+            return execution["result"][offset : offset + length]
+
+    def get_batch_executions(self, batch_id: str, include_result: bool = True) -> List[Dict]:
+        with self._lock:
+            rows = []
+            for execution_id in sorted(self._executions):
+                execution = self._executions[execution_id]
+                if execution["batch_id"] != batch_id:
+                    continue
+                row = self._history_row(execution)
+                row.pop("created_at")
+                row["result_size"] = len(execution["result"] or "")
+                if not include_result:
+                    row["result"] = None
+                rows.append(row)
+            return rows
+
+    # ------------------------------------------------------------------ consumo
+
+    def record_execution_usage(
+        self,
+        execution_id: int,
+        model: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: Optional[float] = None,
+    ):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None:
+                return
+            execution["model"] = execution["model"] or model
+            execution["prompt_tokens"] = (execution["prompt_tokens"] or 0) + prompt_tokens
+            execution["completion_tokens"] = (execution["completion_tokens"] or 0) + completion_tokens
+            if cost_usd is not None:
+                execution["cost_usd"] = (execution["cost_usd"] or 0) + cost_usd
+            key = (bucket_start("day", execution["start_ts"]), execution["crew_name"], model or "")
+            totals = self._usage.setdefault(key, [0, 0, 0.0])
+            totals[0] += prompt_tokens
+            totals[1] += completion_tokens
+            totals[2] += cost_usd or 0.0
+
+    def get_usage_summary(self, since: Optional[date] = None, crew_name: Optional[str] = None) -> List[Dict]:
+        since_ts = int(datetime(since.year, since.month, since.day, tzinfo=timezone.utc).timestamp() * 1000) if since else 0
+        with self._lock:
+            rows = [
+                usage_row(*key, *totals)
+                for key, totals in self._usage.items()
+                if key[0] >= since_ts and (not crew_name or key[1] == crew_name)
+            ]
+        rows.sort(key=lambda row: (row["crew_name"], row["model"] or ""))
+        rows.sort(key=lambda row: row["day"], reverse=True)
+        return rows
+
+    def get_average_execution_cost(self, crew_name: str, limit: int = 20) -> Optional[float]:
+        with self._lock:
+            costs = [
+                execution["cost_usd"]
+                for execution in sorted(self._executions.values(), key=lambda execution: execution["start_ts"], reverse=True)
+                if execution["crew_name"] == crew_name and execution["cost_usd"] is not None
+            ][:limit]
+        return sum(costs) / len(costs) if costs else None
+
+    # ------------------------------------------------------------------ tarefas
+
+    def save_critical_path(self, execution_id: int, summary: str):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is not None:
+                execution["critical_path"] = summary
+
+    def save_task_result(
+        self,
+        execution_id: int,
+        agent_name: str,
+        task_description: str,
+        task_result: str,
+        task_status: str = "completed",
+        metrics: Optional[Dict] = None,
+        task_index: Optional[int] = None,
+    ):
+        with self._lock:
+            self._task_results.setdefault(execution_id, []).append(
+                {
+                    "agent_name": agent_name,
+                    "task_description": task_description,
+                    "task_result": task_result,
+                    "task_status": task_status,
+                    "created_at": _utc_text(datetime.now(timezone.utc)),
+                    "task_index": task_index,
+                    **{column: (metrics or {}).get(column) for column in TASK_METRIC_COLUMNS},
+                    "tool_names": dict((metrics or {}).get("tool_names") or {}),
+                }
+            )
+
+    # ------------------------------------------------------------------ configurações de crews
+
+    def save_crew_config(self, crew_name: str, description: str, agent_types: List[str], task_types: List[str]):
+        with self._lock:
+            now = datetime.now().isoformat()
+            created_at = self._crew_configs.get(crew_name, {}).get("created_at", now)
+            self._crew_configs[crew_name] = {
+                "crew_name": crew_name,
+                "description": description,
+                "agent_types": list(agent_types),
+                "task_types": list(task_types),
+                "created_at": created_at,
+                "updated_at": now,
+            }
+
+    def get_crew_config(self, crew_name: str) -> Optional[Dict]:
+        with self._lock:
+            config = self._crew_configs.get(crew_name)
+            return dict(config) if config else None
+
+    def delete_crew_config(self, crew_name: str) -> bool:
+        with self._lock:
+            return self._crew_configs.pop(crew_name, None) is not None
+
+    def get_all_crew_configs(self) -> List[Dict]:
+        with self._lock:
+            configs = sorted(self._crew_configs.values(), key=lambda config: config["updated_at"], reverse=True)
+            return [dict(config) for config in configs]
+
+    # ------------------------------------------------------------------ avaliações
+
+    def save_evaluation_report(self, execution_id: int, evaluation_report: str):
+        with self._lock:
+            self._evaluation_reports.setdefault(execution_id, []).append(evaluation_report)
+
+    def get_evaluation_report(self, execution_id: int) -> Optional[str]:
+        with self._lock:
+            reports = self._evaluation_reports.get(execution_id)
+            return reports[-1] if reports else None
+
+    # ------------------------------------------------------------------ busca
+
+    @property
+    def full_text_search_enabled(self) -> bool:
+        return True
+
+    def _documents(self):
+        """Produz (tipo, execução, título, corpo) de todo o conteúdo pesquisável"""
+        for execution_id, execution in self._executions.items():
+            yield "execution", execution, execution["topic"], execution["result"] or ""
+            for task in self._task_results.get(execution_id, []):
+                yield "task_result", execution, task["task_description"] or "", task["task_result"] or ""
+            for report in self._evaluation_reports.get(execution_id, []):
+                yield "evaluation", execution, "Relatório de avaliação", report
+
+    def search_full_text(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        kinds: Optional[List[str]] = None,
+        crew_name: Optional[str] = None,
+        prefix: bool = True,
+        snippet_tokens: int = 16,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Dict]:
+        """Busca por termos (todos obrigatórios); a pontuação é o número de ocorrências"""
+        patterns = query_patterns(query, prefix)
+        if not patterns:
+            return []
+        created_from = _local_date_to_utc_text(date_from) if date_from else None
+        created_to = _local_date_to_utc_text(date_to + timedelta(days=1)) if date_to else None
+
+        results = []
+        with self._lock:
+            for kind, execution, title, body in self._documents():
+                if (kinds and kind not in kinds) or (crew_name and execution["crew_name"] != crew_name):
+                    continue
+                if (created_from and execution["created_at"] < created_from) or (
+                    created_to and execution["created_at"] >= created_to
+                ):
+                    continue
+                text = normalize_text(f"{execution['crew_name']} {title} {body}")
+                hits = [len(pattern.findall(text)) for pattern in patterns]
+                if not all(hits):
+                    continue
+                results.append(
+                    {
+                        "kind": kind,
+                        "execution_id": execution["id"],
+                        "crew_name": execution["crew_name"],
+                        "title": title,
+                        "snippet": make_snippet(body, patterns, snippet_tokens),
+                        "score": -float(sum(hits)),
+                        "topic": execution["topic"],
+                        "status": execution["status"],
+                        "start_time": execution["start_time"],
+                    }
+                )
+
+        results.sort(key=lambda item: item["score"])
+        return results[offset : offset + limit]
+
+    def search_executions(self, query: str, limit: int = 100) -> List[Dict]:
+        matches = self.search_full_text(query, limit=len(self._executions) * 10 + limit)
+        ranked: List[int] = []
+        for item in matches:
+            if item["execution_id"] not in ranked:
+                ranked.append(item["execution_id"])
+        with self._lock:
+            return [self._history_row(self._executions[execution_id]) for execution_id in ranked[:limit]]
+
+    # ------------------------------------------------------------------ estatísticas
+
+    def get_statistics(self) -> Dict:
+        stats = self.get_statistics_v2("all")
+        return {
+            "total_executions": stats["total_executions"],
+            "successful_executions": stats["successful_executions"],
+            "total_crews": stats["total_crews"],
+            "most_executed_crew": stats["most_executed_crew"],
+            "success_rate": stats["success_rate"],
+        }
+
+    def get_statistics_v2(self, window: str = "all") -> Dict:
+        if window not in STATISTICS_WINDOWS:
+            raise ValueError(f"Janela inválida: {window}. Use uma de {list(STATISTICS_WINDOWS)}")
+
+        granularity, bucket_count = STATISTICS_WINDOWS[window]
+        since = window_start(granularity, bucket_count, int(time.time() * 1000))
+
+        per_crew: Dict[str, List[int]] = {}
+        histogram: Dict[int, int] = {}
+        with self._lock:
+            for (rollup_granularity, bucket, crew_name), counters in self._rollups.items():
+                if rollup_granularity == granularity and bucket >= since:
+                    totals = per_crew.setdefault(crew_name, [0, 0, 0, 0, 0])
+                    for index, value in enumerate(counters):
+                        totals[index] += value
+            for (rollup_granularity, bucket, _, bin_index), count in self._histogram.items():
+                if rollup_granularity == granularity and bucket >= since:
+                    histogram[bin_index] = histogram.get(bin_index, 0) + count
+            total_crews = len(self._crew_configs)
+
+        rows = [(crew_name, *totals) for crew_name, totals in per_crew.items()]
+        return summarize_statistics(window, rows, histogram, total_crews)
@@ -0,0 +1,114 @@
+"""
+Fila de escrita assíncrona (write-behind) para o banco de dados
+
+Um único thread escritor consome eventos de persistência de uma fila limitada e os
+grava em lotes, cada lote em uma única transação. Produtores só bloqueiam quando a
+fila está cheia (backpressure).
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+# Evento de persistência: (tipo, parâmetros)
+WriteEvent = Tuple[str, tuple]
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Agrupa eventos de escrita e os aplica em lotes a partir de um thread dedicado"""
+
+    def __init__(
+        self,
+        apply_batch: Callable[[List[WriteEvent]], None],
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.25,
+        name: str = "db-write-behind",
+    ):
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self.batches_written = 0
+        self.events_written = 0
+        self.last_error: Optional[Exception] = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, kind: str, params: tuple):
+        """Enfileira um evento (bloqueia se a fila estiver cheia)"""
+        if self._closed:
+            raise RuntimeError("Fila de escrita já foi encerrada")
+        self._queue.put((kind, params))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a gravação de todos os eventos enfileirados até agora"""
+        if self._closed or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Grava os eventos pendentes e encerra o thread escritor"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch: List[WriteEvent] = []
+        waiters: List[threading.Event] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            stop = item is _STOP
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None and not stop:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            # Grava ao atingir o tamanho do lote, o tempo limite, um flush() ou o encerramento
+            due = len(batch) >= self.batch_size or item is None or waiters or stop
+            if due and batch:
+                self._write(batch)
+                batch = []
+            if due:
+                deadline = None
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+            if stop:
+                return
+
+    def _write(self, batch: List[WriteEvent]):
+        try:
+            self.apply_batch(batch)
+        except Exception as e:
+            # Um evento inválido não deve descartar o lote inteiro: tenta um a um
+            print(f"⚠️ Falha ao gravar lote de {len(batch)} evento(s), gravando individualmente: {e}")
+            for event in batch:
+                try:
+                    self.apply_batch([event])
+                except Exception as event_error:
+                    self.last_error = event_error
+                    print(f"❌ Evento de persistência descartado ({event[0]}): {event_error}")
+        self.batches_written += 1
+        self.events_written += len(batch)
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark do DatabaseManager
+Compara operações/segundo entre o caminho antigo (uma conexão por chamada)
+e o gerenciador de conexões persistentes em modo WAL
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.database import DatabaseManager
+
+
+def run_connect_per_call(db_path: str, operations: int) -> float:
+    """Reproduz o caminho antigo: sqlite3.connect + commit em cada chamada"""
+    # Reaproveita o schema criado pelo DatabaseManager, mas em modo de journal padrão
+    DatabaseManager(db_path).close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode = DELETE")
+
+    start = time.perf_counter()
+    for i in range(operations):
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.execute(
+                "INSERT INTO executions (crew_name, topic, start_time) VALUES (?, ?, ?)",
+                ("benchmark", f"tópico {i}", datetime.now().isoformat()),
+            )
+            conn.commit()
+            execution_id = cursor.lastrowid
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "UPDATE executions SET result = ?, end_time = ?, duration = ?, status = ? WHERE id = ?",
+                ("resultado", datetime.now().isoformat(), "0:00:01", "completed", execution_id),
+            )
+            conn.commit()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("SELECT COUNT(*) FROM executions").fetchone()
+    return operations / (time.perf_counter() - start)
+
+
+def run_connection_manager(db_path: str, operations: int) -> float:
+    """Executa as mesmas operações pelo DatabaseManager (conexões reutilizadas)"""
+    db = DatabaseManager(db_path)
+
+    start = time.perf_counter()
+    for i in range(operations):
+        execution_id = db.save_execution("benchmark", f"tópico {i}", datetime.now())
+        db.update_execution_result(execution_id, "resultado", datetime.now(), "0:00:01")
+        db.get_statistics()
+    elapsed = time.perf_counter() - start
+
+    db.close()
+    return operations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de conexões do DatabaseManager")
+    parser.add_argument("--operations", type=int, default=500, help="Número de ciclos salvar/atualizar/consultar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy = run_connect_per_call(os.path.join(tmp_dir, "legacy.db"), args.operations)
+        managed = run_connection_manager(os.path.join(tmp_dir, "managed.db"), args.operations)
+
+    print(f"📊 Benchmark com {args.operations} ciclos (insert + update + consulta)")
+    print(f"   Conexão por chamada:      {legacy:10.1f} ops/s")
+    print(f"   Conexões persistentes WAL: {managed:10.1f} ops/s")
+    print(f"   Ganho: {managed / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
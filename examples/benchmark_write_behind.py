@@ -0,0 +1,59 @@
+"""
+Benchmark da fila de escrita em lote (write-behind)
+Mede linhas/segundo de save_task_result com 1, 8 e 32 produtores concorrentes,
+comparando a gravação síncrona (um commit por linha) com a fila em lote
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.database import DatabaseManager
+
+
+def run(db_path: str, producers: int, rows_per_producer: int, write_behind: bool) -> float:
+    """Retorna linhas/segundo gravadas por `producers` threads concorrentes"""
+    db = DatabaseManager(db_path, write_behind=write_behind)
+    execution_id = db.save_execution("benchmark", "write-behind", datetime.now())
+    payload = "resultado da tarefa " * 50
+
+    def producer(worker: int):
+        for i in range(rows_per_producer):
+            db.save_task_result(execution_id, f"agente {worker}", f"tarefa {i}", payload)
+
+    threads = [threading.Thread(target=producer, args=(worker,)) for worker in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.flush()  # conta o tempo até os dados estarem efetivamente no banco
+    elapsed = time.perf_counter() - start
+
+    db.close()
+    return producers * rows_per_producer / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da fila write-behind do DatabaseManager")
+    parser.add_argument("--rows", type=int, default=2000, help="Total de linhas por cenário")
+    args = parser.parse_args()
+
+    print(f"📊 Benchmark write-behind ({args.rows} linhas por cenário)")
+    print(f"   {'Produtores':>10} | {'Síncrono (linhas/s)':>20} | {'Write-behind (linhas/s)':>24} | Ganho")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for producers in (1, 8, 32):
+            rows_per_producer = max(args.rows // producers, 1)
+            sync_rate = run(os.path.join(tmp_dir, f"sync_{producers}.db"), producers, rows_per_producer, False)
+            queued_rate = run(os.path.join(tmp_dir, f"queued_{producers}.db"), producers, rows_per_producer, True)
+            print(f"   {producers:>10} | {sync_rate:>20.1f} | {queued_rate:>24.1f} | {queued_rate / sync_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
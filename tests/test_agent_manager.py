@@ -3,7 +3,7 @@ Testes úteis para o AgentManager (apenas lógica relevante e atual)
 """
 
 
-from app.agents.agent_manager import AgentManager
+from app.agents.agent_manager import AgentManager, agent_limits
 
 
 class TestAgentManager:
@@ -56,3 +56,10 @@ class TestAgentManager:
             first_agent = agent_types[0]
             tools = self.agent_manager.get_agent_tools(first_agent)
             assert isinstance(tools, list)
+
+    def test_agent_limits(self):
+        assert agent_limits({"max_iter": 15, "max_rpm": "10", "max_execution_time": 0}) == {"max_iter": 15, "max_rpm": 10}
+        assert agent_limits({"max_iter": "muitos", "max_rpm": -1, "max_execution_time": None}) == {}
+        # Agentes com delegação têm limites para não entrar em ciclos longos
+        coordinator = self.agent_manager.get_agent_info("technical_coordinator")
+        assert set(agent_limits(coordinator)) == {"max_iter", "max_rpm", "max_execution_time"}
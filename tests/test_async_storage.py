@@ -0,0 +1,50 @@
+"""
+Testes da fachada assíncrona do armazenamento
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+from app.utils.async_storage import AsyncStorage
+from app.utils.database import DatabaseManager
+from app.utils.storage import InMemoryStorage
+
+
+class TestAsyncStorage:
+    """As operações do motor viram corrotinas executadas fora do event loop"""
+
+    def test_round_trip_in_memory(self):
+        storage = AsyncStorage(InMemoryStorage())
+
+        async def run():
+            execution_id = await storage.save_execution("crew_a", "pontes", datetime.now())
+            await storage.update_execution_result(execution_id, "relatório", datetime.now(), "0:00:01", "completed")
+            return await storage.get_execution_details(execution_id)
+
+        details = asyncio.run(run())
+        assert details["result"] == "relatório" and details["status"] == "completed"
+
+    def test_calls_run_outside_loop_thread(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "crews_test.db"))
+        storage = AsyncStorage(manager)
+        threads = []
+        original = manager.save_execution
+
+        def save_execution(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return original(*args, **kwargs)
+
+        manager.save_execution = save_execution
+
+        async def run():
+            ids = await asyncio.gather(*(storage.save_execution("crew_a", f"t{i}", datetime.now()) for i in range(3)))
+            return ids, threading.get_ident()
+
+        try:
+            ids, loop_thread = asyncio.run(run())
+            assert len(set(ids)) == 3
+            assert loop_thread not in threads
+            assert storage.archive_dir == manager.archive_dir  # atributos são repassados
+        finally:
+            manager.close()
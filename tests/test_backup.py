@@ -0,0 +1,107 @@
+"""
+Testes do backup online e dos snapshots somente leitura
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.utils.backup import BackupService
+from app.utils.database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "crews_test.db"))
+    yield manager
+    manager.close()
+
+
+class TestBackupService:
+    """Testes de snapshots, rotação e consultas analíticas"""
+
+    def test_snapshot_contains_data_and_is_read_only(self, db):
+        execution_id = db.save_execution("crew", "ponte", datetime.now())
+        db.update_execution_result(execution_id, "resultado", datetime.now(), "0:00:01")
+        service = BackupService(db, pages_per_step=1)
+
+        snapshot = service.open_snapshot(service.create_snapshot())
+        assert snapshot.get_execution_details(execution_id)["result"] == "resultado"
+        assert snapshot.get_statistics_v2()["total_executions"] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            snapshot.save_execution("crew", "outro", datetime.now())
+        snapshot.close()
+
+    def test_rotation_keeps_newest(self, db):
+        service = BackupService(db, keep=2)
+        paths = [service.create_snapshot() for _ in range(4)]
+        assert service.list_snapshots() == paths[:1:-1]
+
+    def test_writers_are_not_blocked_during_backup(self, db):
+        for i in range(200):
+            db.save_task_result(db.save_execution("crew", f"t{i}", datetime.now()), "agente", "tarefa", f"saída {i} " * 50)
+        written = []
+
+        def writer():
+            for i in range(50):
+                written.append(db.save_execution("crew", f"nova {i}", datetime.now()))
+
+        service = BackupService(db, pages_per_step=1, step_sleep=0.001)
+        thread = threading.Thread(target=writer)
+        thread.start()
+        path = service.create_snapshot()
+        thread.join()
+
+        assert len(written) == 50
+        assert service.open_snapshot(path).get_statistics_v2()["total_executions"] >= 200
+
+    def test_restart_limit_falls_back_to_single_step(self, db):
+        for i in range(200):
+            db.save_task_result(db.save_execution("crew", f"t{i}", datetime.now()), "agente", "tarefa", f"saída {i} " * 50)
+        steps = []
+
+        def write_from_other_connection(status, remaining, total):
+            # Cada passo vê o banco alterado por outra conexão, e a cópia em passos recomeça
+            steps.append(remaining)
+            thread = threading.Thread(target=lambda: db.save_execution("crew", "concorrente", datetime.now()))
+            thread.start()
+            thread.join()
+
+        service = BackupService(db, pages_per_step=1, step_sleep=0, max_restarts=3)
+        path = service.create_snapshot(progress=write_from_other_connection)
+
+        assert len(steps) <= 6  # 1 + 3 reinicializações + o passo único
+        assert steps[-1] == 0
+        assert service.open_snapshot(path).get_statistics_v2()["total_executions"] >= 200
+
+    def test_analytics_storage_is_refreshed_in_background(self, db):
+        service = BackupService(db)
+        db.save_execution("crew", "antes", datetime.now())
+        assert service.analytics_storage(max_age=300) is None  # primeiro snapshot ainda em geração
+        assert service.wait_for_refresh(timeout=10)
+        first = service.analytics_storage(max_age=300)
+        assert first is not None and service.analytics_storage(max_age=300) is first
+
+        db.save_execution("crew", "depois", datetime.now())
+        assert service.analytics_storage(max_age=-1) is first  # o snapshot antigo é servido enquanto o novo é gerado
+        assert service.wait_for_refresh(timeout=10)
+        refreshed = service.analytics_storage(max_age=300)
+        assert refreshed is not first
+        assert refreshed.get_statistics_v2()["total_executions"] == 2
+        service.close()
+
+    def test_failed_refresh_keeps_serving_last_snapshot(self, db, monkeypatch):
+        service = BackupService(db)
+        service.open_snapshot(service.create_snapshot()).close()
+        first = service.analytics_storage(max_age=300)
+
+        def fail():
+            raise sqlite3.OperationalError("disco cheio")
+
+        monkeypatch.setattr(service, "create_snapshot", fail)
+        assert service.analytics_storage(max_age=-1) is first
+        assert service.wait_for_refresh(timeout=10)
+        assert service.analytics_storage(max_age=-1) is first
+        service.close()
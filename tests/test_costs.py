@@ -0,0 +1,70 @@
+"""
+Testes do custo estimado das execuções e dos orçamentos por crew
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.costs import CostPolicy, UsageMeter, usage_tokens
+
+
+class TestCostPolicy:
+    """Preços por modelo, orçamento efetivo de cada crew e decisão antes do kickoff"""
+
+    def _policy(self):
+        return CostPolicy(
+            pricing={"gpt-4o": {"prompt": 2.5, "completion": 10.0}},
+            default={"daily_usd": 1.0, "monthly_usd": 20.0, "degrade_model": "gpt-4o-mini"},
+            crews={"pesquisa": {"daily_usd": None, "on_exceed": "degrade"}},
+        )
+
+    def test_estimate_cost(self):
+        policy = self._policy()
+        assert policy.estimate_cost("gpt-4o", 1_000_000, 100_000) == pytest.approx(3.5)
+        assert policy.estimate_cost("openai/gpt-4o", 1_000, 0) == pytest.approx(0.0025)
+        assert policy.estimate_cost("modelo-local", 1_000, 100) is None
+
+    def test_budget_check(self):
+        policy = self._policy()
+        assert policy.check("relatorio", 0.5, 5.0, 0.2) == ("allow", None)
+        action, reason = policy.check("relatorio", 0.9, 5.0, 0.2)
+        assert action == "reject" and "diário" in reason
+        # A crew "pesquisa" não tem limite diário, mas degrada ao exceder o mensal
+        assert policy.check("pesquisa", 5.0, 1.0, 0.2)[0] == "allow"
+        assert policy.check("pesquisa", 0.0, 19.9, 0.2)[0] == "degrade"
+
+    def test_load(self, tmp_path):
+        config = tmp_path / "budgets.yaml"
+        config.write_text("pricing:\n  gpt-4:\n    prompt: 30\n    completion: 60\ncrews:\n  pesquisa:\n    monthly_usd: 5\n")
+        policy = CostPolicy.load(str(config))
+        assert policy.estimate_cost("gpt-4", 1_000, 1_000) == pytest.approx(0.09)
+        assert policy.budget("pesquisa")["monthly_usd"] == 5 and policy.budget("pesquisa")["daily_usd"] is None
+        assert CostPolicy.load(str(tmp_path / "ausente.yaml")).check("pesquisa", 100.0, 100.0, 1.0)[0] == "allow"
+
+
+class TestUsageMeter:
+    """Diferenças de consumo sobre os contadores acumulados dos agentes"""
+
+    def test_meter_reports_deltas_per_model(self):
+        def agent(llm, prompt_tokens, completion_tokens):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+            return SimpleNamespace(llm=llm, usage=usage, _token_process=SimpleNamespace(get_summary=lambda: dict(usage)))
+
+        gpt_4o = SimpleNamespace(model="gpt-4o")
+        researcher, writer, reviewer = agent(gpt_4o, 5_000, 500), agent("gpt-4o-mini", 800, 80), agent(gpt_4o, 0, 0)
+        crew = SimpleNamespace(agents=[researcher, writer], manager_agent=reviewer)
+        meter = UsageMeter(crew)
+
+        researcher.usage.update(prompt_tokens=5_300, completion_tokens=540)
+        assert meter.take() == {"gpt-4o": (300, 40)}
+        writer.usage.update(prompt_tokens=900, completion_tokens=140)
+        reviewer.usage.update(prompt_tokens=100, completion_tokens=20)
+        assert meter.take() == {"gpt-4o-mini": (100, 60), "gpt-4o": (100, 20)}
+        assert meter.total() == {"gpt-4o": (400, 60), "gpt-4o-mini": (100, 60)}
+
+        policy = CostPolicy(pricing={"gpt-4o": {"prompt": 2.5, "completion": 10.0}})
+        assert policy.estimate_usage_cost(meter.total()) == pytest.approx(0.0016)  # gpt-4o-mini sem preço
+        assert policy.estimate_usage_cost({"gpt-4o-mini": (100, 60)}) is None
+        assert usage_tokens(None) is None
+        assert UsageMeter(SimpleNamespace(agents=[SimpleNamespace(llm=None)])).total() == {}  # sem métricas de uso
@@ -0,0 +1,726 @@
+"""
+Testes do registro sob demanda e do pré-aquecimento de crews no CrewManager
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from crewai import LLM, Agent, Crew, Task
+from crewai.agents.agent_builder.utilities.base_token_process import TokenProcess
+from crewai.llms.base_llm import BaseLLM
+from crewai.tasks.task_output import TaskOutput
+
+from app.crews.cached_llm import CachedLLM, with_cache, with_model
+from app.crews.crew_manager import CrewManager
+from app.crews.pipeline import CrewPipeline, PipelineStage
+from app.crews.task_graph import TaskGraph
+from app.utils.costs import CostPolicy
+from app.utils.llm_cache import LLMCache, LLMCachePolicy
+from app.utils.storage import InMemoryStorage
+
+
+class TestLazyCrews:
+    """Crews salvas são registradas como descritores e construídas no primeiro uso"""
+
+    @pytest.fixture
+    def storage(self):
+        storage = InMemoryStorage()
+        storage.save_crew_config("crew_a", "pontes", ["researcher"], [])
+        storage.save_crew_config("crew_b", "barragens", ["analyst"], [])
+        return storage
+
+    @pytest.fixture
+    def builds(self, monkeypatch):
+        built = []
+
+        def build_crew(manager, name, agent_types):
+            time.sleep(0.01)
+            built.append(name)
+            return object()
+
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", build_crew)
+        return built
+
+    def _manager(self, storage, **options):
+        return CrewManager(agent_manager=None, task_manager=object(), storage=storage, **options)
+
+    def test_cold_start_does_not_build_crews(self, storage, builds):
+        manager = self._manager(storage, warm_up=0)
+        assert sorted(manager.list_crew_names()) == ["crew_a", "crew_b"]
+        assert builds == []
+        assert manager.get_crew("crew_a") is manager.get_crew("crew_a")
+        assert builds == ["crew_a"]
+        assert manager.get_crew("inexistente") is None
+
+    def test_concurrent_first_access_builds_once(self, storage, builds):
+        manager = self._manager(storage, warm_up=0)
+        threads = [threading.Thread(target=manager.get_crew, args=("crew_b",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert builds == ["crew_b"]
+
+    def test_reload_rebuilds_only_changed_crews(self, storage, builds):
+        manager = self._manager(storage, warm_up=0)
+        crew_a = manager.get_crew("crew_a")
+        crew_b = manager.get_crew("crew_b")
+
+        storage.save_crew_config("crew_b", "barragens", ["analyst", "writer"], [])
+        storage.delete_crew_config("crew_a")
+        storage.save_crew_config("crew_c", "túneis", ["researcher"], [])
+        assert manager.reload_crews_from_database() == 2
+
+        assert "crew_a" not in manager.list_crew_names()
+        assert manager.get_crew("crew_b") is not crew_b
+        assert manager.get_crew_info("crew_b")["agent_types"] == ["analyst", "writer"]
+        assert crew_a is not None and builds == ["crew_a", "crew_b", "crew_b"]
+
+        unchanged = manager.get_crew("crew_b")
+        manager.reload_crews_from_database()
+        assert manager.get_crew("crew_b") is unchanged
+
+    def test_warm_up_builds_most_executed_crews(self, storage, builds):
+        for _ in range(3):
+            storage.save_execution("crew_b", "tópico", datetime.now())
+        storage.save_execution("crew_a", "tópico", datetime.now())
+
+        manager = self._manager(storage, warm_up=0)
+        assert manager.most_used_crews(2) == ["crew_b", "crew_a"]
+
+        futures = manager.warm_up(limit=1)
+        assert [future.result(timeout=5) is not None for future in futures] == [True]
+        assert manager.is_crew_loaded("crew_b") and not manager.is_crew_loaded("crew_a")
+
+    def test_agent_creation_waits_for_shared_lock(self, storage, builds):
+        class _AgentManager:
+            def get_agent(self, agent_type):
+                return None
+
+            def create_agent(self, agent_type):
+                return agent_type
+
+        lock = threading.RLock()
+        manager = CrewManager(_AgentManager(), task_manager=object(), storage=storage, warm_up=0, agents_lock=lock)
+        built = []
+        with lock:  # ex: a página de agentes gravando uma edição
+            thread = threading.Thread(target=lambda: built.append(manager._build_agents(["pesquisador"])))
+            thread.start()
+            thread.join(timeout=0.1)
+            assert built == []
+        thread.join()
+        assert built == [["pesquisador"]]
+
+    def test_adding_task_waits_for_shared_lock(self, storage, monkeypatch):
+        crew = SimpleNamespace(agents=["pesquisador"], tasks=[])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: crew)
+        task_manager = SimpleNamespace(
+            get_task_info=lambda task_type: {"agent": "researcher"},
+            create_task_with_params=lambda task_type, agent, **params: (task_type, agent),
+        )
+        agent_manager = SimpleNamespace(get_agent=lambda agent_type: agent_type)
+        lock = threading.RLock()
+        manager = CrewManager(agent_manager, task_manager=task_manager, storage=storage, warm_up=0, agents_lock=lock)
+        manager.get_crew("crew_a")
+        added = []
+        with lock:  # ex: a página de agentes gravando uma edição
+            thread = threading.Thread(target=lambda: added.append(manager.add_task_to_crew("crew_a", "pesquisa")))
+            thread.start()
+            thread.join(timeout=0.1)
+            assert added == []
+        thread.join()
+        assert added == [True] and crew.tasks == [("pesquisa", "researcher")]
+
+    def test_executions_use_own_crew_instance(self, storage, builds, monkeypatch):
+        class _Crew:
+            def __init__(self, tasks):
+                self.agents, self.tasks = ["pesquisador"], tasks
+
+            def copy(self):
+                return _Crew(list(self.tasks))
+
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: _Crew(["padrao"]))
+        manager = self._manager(storage, warm_up=0, pool_size=1)
+        template = manager.get_crew("crew_a")
+
+        with manager.checkout_crew("crew_a") as crew:
+            assert crew is not template
+            crew.tasks = ["dinamica"]
+        assert template.tasks == ["padrao"]
+        with manager.checkout_crew("crew_a") as reused:
+            assert reused is crew and reused.tasks == ["padrao"]
+        with manager.checkout_crew("inexistente") as missing:
+            assert missing is None
+
+
+class _AsyncCrew:
+    """Crew com kickoff_async controlável pelo teste"""
+
+    def __init__(self, tasks, gate=None):
+        self.agents, self.tasks, self.gate = [SimpleNamespace(role="pesquisador")], tasks, gate
+
+    def copy(self):
+        return _AsyncCrew(list(self.tasks), self.gate)
+
+    async def kickoff_async(self, inputs=None):
+        if self.gate is not None:
+            await self.gate.wait()
+        return f"resultado de {self.tasks[0].description.format(**inputs or {})}"
+
+
+class TestAsyncExecution:
+    """execute_crew_async/execute_many_async persistem cada execução no mesmo esquema"""
+
+    @pytest.fixture
+    def storage(self):
+        storage = InMemoryStorage()
+        storage.save_crew_config("crew_a", "pontes", ["researcher"], ["tarefa"])
+        return storage
+
+    def _manager(self, storage, monkeypatch, gate=None):
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: _AsyncCrew([SimpleNamespace(description="tarefa")], gate))
+        return CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+    def test_execute_many_respects_concurrency(self, storage, monkeypatch):
+        manager = self._manager(storage, monkeypatch)
+        running, peak = [0], [0]
+        original = manager._execute_instance_async
+
+        async def tracked(*args):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            try:
+                return await original(*args)
+            finally:
+                running[0] -= 1
+
+        manager._execute_instance_async = tracked
+        inputs = [{"topic": f"item {i}"} for i in range(6)]
+        results = asyncio.run(manager.execute_many_async("crew_a", inputs, max_concurrency=2))
+
+        assert results == ["resultado de tarefa"] * 6
+        assert peak[0] == 2
+        assert storage.get_statistics()["successful_executions"] == 6
+
+    def test_checkout_failure_is_a_per_item_error(self, storage, monkeypatch):
+        manager = self._manager(storage, monkeypatch)
+        pool = manager._pool("crew_a")
+        original_checkout, calls = pool.checkout, []
+
+        def checkout():
+            calls.append(1)
+            if len(calls) == 2:
+                raise ValueError("Instância da crew 'crew_a' sem agentes")
+            return original_checkout()
+
+        monkeypatch.setattr(pool, "checkout", checkout)
+        inputs = [{"topic": f"item {i}"} for i in range(3)]
+        results = asyncio.run(manager.execute_many_async("crew_a", inputs, max_concurrency=1))
+
+        assert results == ["resultado de tarefa", None, "resultado de tarefa"]
+        statuses = sorted(execution["status"] for execution in storage.get_execution_history())
+        assert statuses == ["completed", "completed", "error"]
+        assert pool.idle_count() == 1  # a instância foi devolvida após cada item concluído
+
+    def test_inputs_reach_kickoff(self, storage, monkeypatch):
+        manager = self._manager(storage, monkeypatch)
+        crew = _AsyncCrew([SimpleNamespace(description="custos de {topic} em {cidade}")])
+        pool = SimpleNamespace(checkout=lambda: crew, checkin=lambda instance: None)
+        monkeypatch.setattr(manager, "_pool", lambda crew_name: pool)
+        result = asyncio.run(manager.execute_crew_async("crew_a", {"topic": "ponte", "cidade": "Pelotas"}))
+        assert result == "resultado de custos de ponte em Pelotas"
+
+    def test_cancellation_is_recorded_and_propagated(self, storage, monkeypatch):
+        async def run():
+            manager = self._manager(storage, monkeypatch, gate=asyncio.Event())
+            task = asyncio.create_task(manager.execute_crew_async("crew_a", {"topic": "lento"}))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        [execution] = storage.get_execution_history()
+        assert execution["status"] == "cancelled"
+
+
+class TestBatchExecution:
+    """execute_crew_batch registra um item por execução, agrupados pelo batch_id"""
+
+    @pytest.fixture
+    def manager(self, monkeypatch):
+        storage = InMemoryStorage()
+        storage.save_crew_config("orcamento", "custos", ["analyst"], [])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+        def execute_crew_safe(crew_name, inputs=None, execution_id=None, timeout=None):
+            if inputs["topic"] == "falha":
+                manager.db_manager.update_execution_result(execution_id, "", datetime.now(), "0:00:00", "error", "boom")
+                return None
+            result = f"custo de {inputs['topic']}"
+            manager.db_manager.update_execution_result(execution_id, result, datetime.now(), "0:00:01", "completed")
+            return result
+
+        manager.execute_crew_safe = execute_crew_safe
+        return manager
+
+    def test_batch_results_follow_input_order(self, manager):
+        progress = []
+        batch = manager.execute_crew_batch(
+            "orcamento", [{"topic": f"item {i}"} for i in range(5)], max_concurrency=2, progress=lambda *p: progress.append(p)
+        )
+        assert [execution["result"] for execution in batch["executions"]] == [f"custo de item {i}" for i in range(5)]
+        assert progress[-1] == (5, 5)
+        assert manager.db_manager.get_batch_executions(batch["batch_id"]) == batch["executions"]
+
+    def test_fail_fast_cancels_pending_items(self, manager):
+        inputs = [{"topic": "falha"}] + [{"topic": f"item {i}"} for i in range(3)]
+        batch = manager.execute_crew_batch("orcamento", inputs, max_concurrency=1, fail_fast=True)
+        assert [execution["status"] for execution in batch["executions"]] == ["error", "cancelled", "cancelled", "cancelled"]
+
+    def test_unknown_crew_is_rejected(self, manager):
+        with pytest.raises(ValueError):
+            manager.execute_crew_batch("inexistente", [{"topic": "x"}])
+
+
+class _SequentialCrew:
+    """Crew que executa as tarefas em ordem, com um passo de agente (`step_delay` segundos) por tarefa"""
+
+    def __init__(self, tasks, runs, fail_on=None, step_delay=0):
+        self.agents = [SimpleNamespace(role="pesquisador", step_callback=None)]
+        self.tasks, self.runs, self.fail_on, self.step_delay = tasks, runs, fail_on, step_delay
+
+    def copy(self):
+        tasks = [Task(description=task.description, expected_output="saída") for task in self.tasks]
+        return _SequentialCrew(tasks, self.runs, self.fail_on, self.step_delay)
+
+    def kickoff(self, inputs=None):
+        output = None
+        for task in self.tasks:
+            task.interpolate_inputs_and_add_conversation_history(inputs or {})
+            time.sleep(self.step_delay)
+            if self.agents[0].step_callback:
+                self.agents[0].step_callback(task.description)
+            if task.description == self.fail_on:
+                raise RuntimeError(f"falha em {task.description}")
+            # Sem contexto definido, o crewAI usa o marcador NOT_SPECIFIED
+            previous_tasks = task.context if isinstance(task.context, list) else []
+            context = [previous.output.raw for previous in previous_tasks if previous.output is not None]
+            self.runs.append((task.description, context))
+            output = TaskOutput(description=task.description, raw=f"saída de {task.description}", agent="pesquisador")
+            task.output = output
+            if task.callback:
+                task.callback(output)
+        return output.raw
+
+
+class TestCheckpointResume:
+    """Saídas de tarefas são salvas ao terminar e a retomada executa só as restantes"""
+
+    def test_resume_runs_only_remaining_tasks(self, monkeypatch):
+        storage = InMemoryStorage()
+        storage.save_crew_config("projeto", "seis tarefas", ["researcher"], [])
+        runs = []
+        template = _SequentialCrew(
+            [Task(description=f"tarefa {i}", expected_output="saída") for i in range(1, 5)], runs, fail_on="tarefa 3"
+        )
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+        assert manager.execute_crew_safe("projeto", {"topic": "ponte"}) is None
+        [execution] = storage.get_execution_history()
+        assert execution["status"] == "error"
+        saved = storage.get_execution_details(execution["id"])["task_results"]
+        assert [task["task_description"] for task in saved] == ["tarefa 1", "tarefa 2"]
+        assert [task["step_count"] for task in saved] == [1, 1]  # um passo de agente por tarefa
+        assert saved[1]["start_ts"] == saved[0]["end_ts"]
+
+        template.fail_on = None
+        runs.clear()
+        assert manager.resume_execution(execution["id"]) == "saída de tarefa 4"
+        assert [description for description, _ in runs] == ["tarefa 3", "tarefa 4"]
+        assert runs[0][1] == ["saída de tarefa 1", "saída de tarefa 2"]
+        details = storage.get_execution_details(execution["id"])
+        assert details["status"] == "completed" and len(details["task_results"]) == 4
+        assert manager.resume_execution(execution["id"]) is None  # concluída não é retomada
+
+    def test_resume_templated_tasks_with_original_inputs(self, monkeypatch):
+        storage = InMemoryStorage()
+        storage.save_crew_config("projeto", "orçamento", ["researcher"], [])
+        runs = []
+        descriptions = ["levantar {topic}", "orçar {topic} em {cidade}", "relatar {topic}"]
+        tasks = [Task(description=text, expected_output="saída") for text in descriptions]
+        template = _SequentialCrew(tasks, runs, fail_on="orçar ponte em Pelotas")
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+        assert manager.execute_crew_safe("projeto", {"topic": "ponte", "cidade": "Pelotas"}) is None
+        [execution] = storage.get_execution_history()
+        details = storage.get_execution_details(execution["id"])
+        assert details["inputs"] == {"topic": "ponte", "cidade": "Pelotas"}
+        saved = [(task["task_index"], task["task_description"]) for task in details["task_results"]]
+        assert saved == [(0, "levantar ponte")]
+
+        template.fail_on = None
+        runs.clear()
+        # A instância retomada tem os textos com {variáveis}: a saída salva é localizada pela posição
+        assert manager.resume_execution(execution["id"]) == "saída de relatar ponte"
+        assert [description for description, _ in runs] == ["orçar ponte em Pelotas", "relatar ponte"]
+        assert runs[0][1] == ["saída de levantar ponte"]
+        details = storage.get_execution_details(execution["id"])
+        assert [task["task_index"] for task in details["task_results"]] == [0, 1, 2]
+
+    def test_inputs_fill_task_templates(self, monkeypatch):
+        storage = InMemoryStorage()
+        storage.save_crew_config("projeto", "orçamento", ["researcher"], [])
+        runs = []
+        template = _SequentialCrew([Task(description="custos de {topic} em {cidade}", expected_output="saída")], runs)
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+        # Colunas extras de um lote chegam às tarefas como entradas do kickoff
+        result = manager.execute_crew_safe("projeto", {"topic": "ponte", "cidade": "Pelotas"})
+        assert result == "saída de custos de ponte em Pelotas"
+        assert [description for description, _ in runs] == ["custos de ponte em Pelotas"]
+
+
+class TestPipelineHandoff:
+    """O resultado de uma etapa chega às tarefas pré-definidas da etapa seguinte"""
+
+    def test_previous_result_is_task_context(self, monkeypatch):
+        storage = InMemoryStorage()
+        storage.save_crew_config("pesquisa", "levantamento", ["researcher"], [])
+        storage.save_crew_config("redacao", "relatório", ["writer"], [])
+        runs = []
+        templates = {
+            "pesquisa": _SequentialCrew([Task(description="levantar dados", expected_output="saída")], runs),
+            "redacao": _SequentialCrew(
+                [Task(description=f"redigir parte {i}", expected_output="saída") for i in (1, 2)], runs
+            ),
+        }
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: templates[name])
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0, pool_size=1)
+
+        pipeline = CrewPipeline(manager, [PipelineStage("pesquisa"), PipelineStage("redacao")])
+        run = pipeline.run([{"topic": "ponte"}, {"topic": "túnel"}])
+
+        assert [item["result"] for item in run["items"]] == ["saída de redigir parte 2"] * 2
+        writing = [context for description, context in runs if description.startswith("redigir")]
+        assert writing[0] == ["saída de levantar dados"]
+        assert writing[1] == ["saída de levantar dados", "saída de redigir parte 1"]
+        # As tarefas voltam ao pool sem o contexto injetado
+        with manager.checkout_crew("redacao") as crew:
+            assert not isinstance(crew.tasks[0].context, list)
+
+
+class TestDeadlinesAndCancellation:
+    """Prazo vencido e cancelamento interrompem a crew e mantêm as saídas já concluídas"""
+
+    def _manager(self, monkeypatch, storage, template):
+        storage.save_crew_config("projeto", "quatro tarefas", ["researcher"], [])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        return CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+    def _template(self, runs, step_delay):
+        tasks = [Task(description=f"tarefa {i}", expected_output="saída") for i in range(1, 5)]
+        return _SequentialCrew(tasks, runs, step_delay=step_delay)
+
+    def test_deadline_ends_as_timeout_and_can_be_resumed(self, monkeypatch):
+        storage, runs = InMemoryStorage(), []
+        template = self._template(runs, step_delay=0.1)
+        manager = self._manager(monkeypatch, storage, template)
+
+        assert manager.execute_crew_safe("projeto", {"topic": "ponte"}, timeout=0.15) is None
+        [execution] = storage.get_execution_history()
+        details = storage.get_execution_details(execution["id"])
+        assert details["status"] == "timeout" and "Prazo" in details["error_message"]
+        saved = [task["task_result"] for task in details["task_results"]]
+        assert 0 < len(saved) < 4
+        assert details["result"] == "\n\n".join(saved)
+
+        template.step_delay = 0
+        assert manager.resume_execution(execution["id"]) == "saída de tarefa 4"
+        assert storage.get_execution_details(execution["id"])["status"] == "completed"
+
+    def test_running_execution_can_be_cancelled(self, monkeypatch):
+        storage, runs = InMemoryStorage(), []
+        manager = self._manager(monkeypatch, storage, self._template(runs, step_delay=0.05))
+        execution_id = storage.save_execution("projeto", "ponte", datetime.now())
+        thread = threading.Thread(target=manager.execute_crew_safe, args=("projeto", {"topic": "ponte"}, execution_id))
+        thread.start()
+        for _ in range(100):
+            if runs:
+                break
+            time.sleep(0.01)
+
+        assert manager.cancel_execution(execution_id, "Cancelada pelo usuário")
+        thread.join(5)
+        details = storage.get_execution_details(execution_id)
+        assert details["status"] == "cancelled" and details["error_message"] == "Cancelada pelo usuário"
+        assert 0 < len(details["task_results"]) < 4
+        assert not manager.cancel_execution(execution_id)
+
+
+class _ScriptedLLM(BaseLLM):
+    """LLM que responde sempre com a resposta final e chama `on_call(prompt)` a cada chamada (cópias inclusive)"""
+
+    def __init__(self, on_call):
+        super().__init__(model="roteiro")
+        self.on_call = on_call
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        self.on_call(str(messages))
+        return "Thought: concluído\nFinal Answer: resposta"
+
+
+class TestCancellationWithCrewAIAgents:
+    """A interrupção atravessa o Agent do crewAI sem acionar as novas tentativas (max_retry_limit)"""
+
+    def test_cancelled_agent_is_not_retried(self, monkeypatch):
+        monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+        storage = InMemoryStorage()
+        storage.save_crew_config("projeto", "uma tarefa", ["researcher"], [])
+        execution_id = storage.save_execution("projeto", "ponte", datetime.now())
+        calls = []
+
+        def on_call(prompt):
+            # O usuário cancela enquanto o modelo responde; a interrupção vem no passo seguinte
+            calls.append(1)
+            manager.cancel_execution(execution_id, "Cancelada pelo usuário")
+
+        llm = _ScriptedLLM(on_call)
+        agent = Agent(role="pesquisador", goal="pesquisar", backstory="engenheiro", llm=llm, max_retry_limit=2)
+        template = Crew(agents=[agent], tasks=[Task(description="pesquisar", expected_output="dados", agent=agent)])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+
+        assert manager.execute_crew_safe("projeto", {"topic": "ponte"}, execution_id=execution_id) is None
+        assert len(calls) == 1
+        details = storage.get_execution_details(execution_id)
+        assert details["status"] == "cancelled" and details["error_message"] == "Cancelada pelo usuário"
+
+
+def _parallel_crew(llm) -> Crew:
+    """Crew do crewAI com o plano de um DAG: "tarefa a" e "tarefa b" em paralelo, "tarefa c" depende das duas"""
+    agent = Agent(role="pesquisador", goal="pesquisar", backstory="engenheiro", llm=llm, max_retry_limit=0)
+    graph = TaskGraph(["a", "b", "c"], {"c": ["a", "b"]})
+    tasks = {}
+    for name, async_execution in graph.plan():
+        task = Task(description=f"tarefa {name}", expected_output="dados", agent=agent, async_execution=async_execution)
+        if graph.dependencies[name]:
+            task.context = [tasks[dependency] for dependency in graph.dependencies[name]]
+        tasks[name] = task
+    return Crew(agents=[agent], tasks=list(tasks.values()))
+
+
+def _run_to_end(run, seconds=15):
+    """Executa `run` em outra thread e falha o teste se o kickoff não terminar no limite"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", run()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "execução presa no ponto de junção das tarefas paralelas"
+    return result["value"]
+
+
+class TestParallelTasksWithCrewAI:
+    """Exceções de tarefas paralelas (async_execution) terminam o kickoff em vez de travá-lo"""
+
+    def _manager(self, monkeypatch, storage, template):
+        monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+        storage.save_crew_config("projeto", "tarefas paralelas", ["researcher"], [])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        return CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0, pool_size=1)
+
+    def test_failing_parallel_task_fails_the_run(self, monkeypatch):
+        storage, prompts = InMemoryStorage(), []
+
+        def on_call(prompt):
+            prompts.append(prompt)
+            if "tarefa a" in prompt:
+                raise RuntimeError("falha do modelo")
+
+        manager = self._manager(monkeypatch, storage, _parallel_crew(_ScriptedLLM(on_call)))
+
+        assert _run_to_end(lambda: manager.execute_crew_safe("projeto", {"topic": "ponte"})) is None
+        [execution] = storage.get_execution_history()
+        assert (execution["status"], execution["error_message"]) == ("error", "falha do modelo")
+        assert not any("tarefa c" in prompt for prompt in prompts)
+        assert manager._pool("projeto").idle_count() == 1  # instância devolvida, sem threads em andamento
+
+    def test_timeout_ends_parallel_run(self, monkeypatch):
+        storage, prompts = InMemoryStorage(), []
+
+        def on_call(prompt):
+            prompts.append(prompt)
+            time.sleep(0.3)
+
+        manager = self._manager(monkeypatch, storage, _parallel_crew(_ScriptedLLM(on_call)))
+
+        assert _run_to_end(lambda: manager.execute_crew_safe("projeto", {"topic": "ponte"}, timeout=0.2)) is None
+        [execution] = storage.get_execution_history()
+        assert (execution["status"], execution["error_message"]) == ("timeout", "Prazo de 0.2s excedido")
+        assert len(prompts) == 2  # uma chamada por tarefa paralela; a junção não chega a rodar
+        assert manager._pool("projeto").idle_count() == 1
+
+    def test_cancel_ends_parallel_run(self, monkeypatch):
+        storage = InMemoryStorage()
+        execution_id = storage.save_execution("projeto", "ponte", datetime.now())
+
+        def on_call(prompt):
+            if "tarefa b" in prompt:
+                manager.cancel_execution(execution_id, "Cancelada pelo usuário")
+
+        manager = self._manager(monkeypatch, storage, _parallel_crew(_ScriptedLLM(on_call)))
+
+        inputs = {"topic": "ponte"}
+        assert _run_to_end(lambda: manager.execute_crew_safe("projeto", inputs, execution_id=execution_id)) is None
+        details = storage.get_execution_details(execution_id)
+        assert (details["status"], details["error_message"]) == ("cancelled", "Cancelada pelo usuário")
+        assert manager._pool("projeto").idle_count() == 1
+
+
+class _MeteredCrew(_SequentialCrew):
+    """Crew cujos agentes (um modelo cada) acumulam tokens entre execuções, como os agentes do crewAI"""
+
+    def __init__(self, tasks, runs, models_seen):
+        super().__init__(tasks, runs)
+        self.agents = [
+            SimpleNamespace(role=role, step_callback=None, llm=llm, _token_process=TokenProcess())
+            for role, llm in (("pesquisador", LLM(model="gpt-4o", temperature=0.2)), ("revisor", LLM(model="gpt-4o-mini")))
+        ]
+        self.models_seen = models_seen
+
+    def copy(self):
+        tasks = [Task(description=task.description, expected_output="saída") for task in self.tasks]
+        return _MeteredCrew(tasks, self.runs, self.models_seen)
+
+    def kickoff(self, inputs=None):
+        self.models_seen.append((self.agents[0].llm.model, self.agents[0].llm.temperature))
+        for index, task in enumerate(self.tasks):  # cada tarefa é feita por um dos agentes, alternadamente
+            agent, previous = self.agents[index % len(self.agents)], task.callback
+            task.callback = lambda output, agent=agent, previous=previous: (self._spend(agent), previous(output))
+        return super().kickoff(inputs)
+
+    def _spend(self, agent):
+        agent._token_process.sum_prompt_tokens(1_000)
+        agent._token_process.sum_completion_tokens(200)
+
+
+class TestUsageAndBudgets:
+    """Tokens e custo são registrados por tarefa e execução; orçamentos rejeitam ou degradam"""
+
+    def _manager(self, monkeypatch, storage, models_seen):
+        storage.save_crew_config("projeto", "duas tarefas", ["researcher"], [])
+        tasks = [Task(description=f"tarefa {i}", expected_output="saída") for i in range(1, 3)]
+        template = _MeteredCrew(tasks, [], models_seen)
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0, pool_size=1)
+        manager.cost_policy = CostPolicy(
+            pricing={"gpt-4o": {"prompt": 2.5, "completion": 10.0}, "gpt-4o-mini": {"prompt": 0.15, "completion": 0.6}}
+        )
+        return manager
+
+    def test_usage_is_recorded_per_task_and_execution(self, monkeypatch):
+        storage = InMemoryStorage()
+        manager = self._manager(monkeypatch, storage, [])
+
+        for _ in range(2):  # a instância reaproveitada do pool já acumulou tokens na segunda execução
+            manager.execute_crew_safe("projeto", {"topic": "ponte"})
+
+        for execution in storage.get_execution_history():
+            details = storage.get_execution_details(execution["id"])
+            assert (details["model"], details["prompt_tokens"], details["completion_tokens"]) == ("gpt-4o", 2_000, 400)
+            assert details["cost_usd"] == pytest.approx(0.00477)
+            # Cada tarefa é cobrada pelo modelo do agente que a executou
+            assert [task["prompt_tokens"] for task in details["task_results"]] == [1_000, 1_000]
+            assert [task["cost_usd"] for task in details["task_results"]] == pytest.approx([0.0045, 0.00027])
+        usage = {row["model"]: row for row in storage.get_usage_summary(crew_name="projeto")}
+        assert usage["gpt-4o"]["total_tokens"] == usage["gpt-4o-mini"]["total_tokens"] == 2_400
+        assert usage["gpt-4o"]["cost_usd"] == pytest.approx(0.009)
+        assert usage["gpt-4o-mini"]["cost_usd"] == pytest.approx(0.00054)
+
+    def test_budget_rejects_or_degrades_execution(self, monkeypatch):
+        storage, models_seen = InMemoryStorage(), []
+        manager = self._manager(monkeypatch, storage, models_seen)
+        manager.cost_policy.default.update(daily_usd=0.005)
+
+        assert manager.execute_crew_safe("projeto", {"topic": "ponte"}) is not None
+        assert manager.execute_crew_safe("projeto", {"topic": "viaduto"}) is None
+        rejected = storage.get_execution_history()[0]
+        assert rejected["status"] == "rejected" and "Orçamento diário" in rejected["error_message"]
+
+        manager.cost_policy.default.update(on_exceed="degrade", degrade_model="gpt-4o-mini")
+        assert manager.execute_crew_safe("projeto", {"topic": "túnel"}) is not None
+        # Só o modelo muda na degradação; os demais parâmetros do LLM do agente são mantidos
+        assert models_seen == [("gpt-4o", 0.2), ("gpt-4o-mini", 0.2)]
+        degraded = storage.get_execution_details(storage.get_execution_history()[0]["id"])
+        assert degraded["model"] == "gpt-4o-mini" and degraded["cost_usd"] == pytest.approx(0.00054)
+        assert manager.check_budget("projeto")[0] == "degrade"
+        with manager.checkout_crew("projeto") as crew:
+            assert crew.agents[0].llm.model == "gpt-4o"  # modelo original devolvido ao pool
+
+
+class TestLLMResponseCache:
+    """Instâncias de execução usam o cache conforme a crew e o agente; o template não é alterado"""
+
+    def test_pool_instances_use_configured_cache(self, monkeypatch, tmp_path):
+        calls = []
+
+        def call(llm, messages, tools=None, callbacks=None, available_functions=None):
+            calls.append(messages)
+            return f"resposta {len(calls)}"
+
+        monkeypatch.setattr(LLM, "call", call, raising=False)
+
+        class _Crew:
+            def __init__(self, agents):
+                self.agents, self.tasks = agents, []
+
+            def copy(self):
+                return _Crew([SimpleNamespace(role=agent.role, llm=copy.copy(agent.llm)) for agent in self.agents])
+
+        template = _Crew([SimpleNamespace(role=role, llm=LLM(model="gpt-4o")) for role in ("analista", "redator_criativo")])
+        storage = InMemoryStorage()
+        storage.save_crew_config("relatorio", "duas tarefas", ["researcher"], [])
+        monkeypatch.setattr(CrewManager, "_perform_auto_sync", lambda manager: None)
+        monkeypatch.setattr(CrewManager, "_build_crew", lambda manager, name, agent_types: template)
+        manager = CrewManager(agent_manager=None, task_manager=object(), storage=storage, warm_up=0)
+        manager.llm_cache_policy = LLMCachePolicy(crews={"relatorio": True}, agents={"redator_criativo": False})
+        manager.llm_cache = LLMCache(str(tmp_path / "llm_cache.db"))
+
+        with manager.checkout_crew("relatorio") as crew:
+            analyst, writer = crew.agents
+            assert [analyst.llm.call("Resuma o projeto") for _ in range(2)] == ["resposta 1", "resposta 1"]
+            assert [writer.llm.call("Escreva um slogan") for _ in range(2)] == ["resposta 2", "resposta 3"]
+        assert manager.llm_cache.stats()["hits"] == 1
+        assert not any(isinstance(agent.llm, CachedLLM) for agent in template.agents)
+
+    def test_model_change_keeps_cache_and_settings(self, tmp_path):
+        cache = LLMCache(str(tmp_path / "llm_cache.db"))
+        cached = with_cache(LLM(model="gpt-4o", temperature=0.2), cache)
+        degraded = with_model(cached, "claude-3-haiku")
+        assert isinstance(degraded, CachedLLM) and degraded.response_cache is cache
+        assert (degraded.model, degraded.temperature, degraded.is_anthropic) == ("claude-3-haiku", 0.2, True)
+        assert cached.model == "gpt-4o"
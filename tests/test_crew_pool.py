@@ -0,0 +1,88 @@
+"""
+Testes do pool de instâncias de execução de crews
+"""
+
+import threading
+
+import pytest
+
+from app.crews.crew_pool import CrewPool, clone_crew
+
+
+class _FakeCrew:
+    """Crew mínima: agentes, tarefas e copy() como a Crew do crewai"""
+
+    def __init__(self, agents, tasks, verbose=True, memory=False):
+        self.agents = agents
+        self.tasks = tasks
+        self.verbose = verbose
+        self.memory = memory
+
+    def copy(self):
+        return _FakeCrew(list(self.agents), list(self.tasks))
+
+
+class _CrewWithoutCopy(_FakeCrew):
+    def copy(self):
+        raise RuntimeError("sem cópia")
+
+
+class TestCrewPool:
+    """Cada execução recebe uma instância própria; o template nunca é alterado"""
+
+    @pytest.fixture
+    def template(self):
+        return _FakeCrew(["pesquisador"], ["tarefa_padrao"])
+
+    def test_checkout_returns_independent_instance(self, template):
+        pool = CrewPool("crew_a", template)
+        with pool.instance() as crew:
+            assert crew is not template
+            crew.tasks = ["tarefa_dinamica"]
+        assert template.tasks == ["tarefa_padrao"]
+
+    def test_checkin_restores_original_tasks(self, template):
+        pool = CrewPool("crew_a", template, size=1)
+        with pool.instance() as crew:
+            crew.tasks = ["tarefa_dinamica"]
+        with pool.instance() as reused:
+            assert reused is crew
+            assert reused.tasks == ["tarefa_padrao"]
+
+    def test_concurrent_checkouts_get_distinct_instances(self, template):
+        pool = CrewPool("crew_a", template, size=2)
+        barrier = threading.Barrier(4)
+        seen = []
+
+        def run():
+            with pool.instance() as crew:
+                seen.append(crew)
+                barrier.wait(5)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(crew) for crew in seen}) == 4
+        assert pool.idle_count() == 2  # as instâncias além de `size` são descartadas
+
+    def test_prefill_creates_up_to_size(self, template):
+        pool = CrewPool("crew_a", template, size=2)
+        assert pool.prefill(1) == 1
+        assert pool.prefill() == 1
+        assert pool.prefill(5) == 0
+        assert pool.idle_count() == 2
+
+    def test_instance_without_agents_is_rejected(self):
+        pool = CrewPool("vazia", _FakeCrew([], ["tarefa"]))
+        with pytest.raises(ValueError):
+            pool.checkout()
+
+    def test_clone_failure_is_not_shallow_copied(self):
+        template = _CrewWithoutCopy(["analista"], ["tarefa"])
+        with pytest.raises(RuntimeError):
+            clone_crew(template)
+        with pytest.raises(RuntimeError):
+            CrewPool("sem_copia", template).checkout()
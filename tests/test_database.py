@@ -0,0 +1,560 @@
+"""
+Testes para o DatabaseManager (SQLite)
+"""
+
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.database import DatabaseManager, build_fts_query
+from app.utils.blob_store import CHUNK_CHARS
+from app.utils.migrations import SCHEMA_VERSION, _migration_001_base_tables, parse_duration_ms, run_migrations
+from app.utils.result_sections import index_sections
+from app.utils.retention import RetentionPolicy, apply_retention, list_archives
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "crews_test.db"))
+    yield manager
+    manager.close()
+
+
+class TestConnectionManager:
+    """Testes do gerenciamento de conexões"""
+
+    def test_wal_mode_and_pragmas(self, db):
+        conn = db.connections.connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_connection_reused_within_thread(self, db):
+        assert db.connections.connection() is db.connections.connection()
+
+    def test_connection_per_thread(self, db):
+        main_conn = db.connections.connection()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db.connections.connection()))
+        thread.start()
+        thread.join()
+        assert other[0] is not main_conn
+
+    def test_managers_share_connections_for_same_file(self, db):
+        other = DatabaseManager(db.db_path)
+        assert other.connections is db.connections
+
+    def test_transaction_rollback_on_error(self, db):
+        with pytest.raises(RuntimeError):
+            with db.connections.transaction() as conn:
+                conn.execute("INSERT INTO executions (crew_name, topic, start_time) VALUES ('c', 't', 'x')")
+                raise RuntimeError("falha")
+        assert db.get_execution_history() == []
+
+    def test_concurrent_writes(self, db):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(20):
+                    execution_id = db.save_execution("crew", "tópico", datetime.now())
+                    db.update_execution_result(execution_id, "ok", datetime.now(), "0:00:01")
+            except sqlite3.Error as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert db.get_statistics()["total_executions"] == 80
+
+    def test_in_memory_database_shared_between_threads(self):
+        manager = DatabaseManager(":memory:")
+        manager.save_execution("crew", "tópico", datetime.now())
+        counts = []
+        thread = threading.Thread(target=lambda: counts.append(manager.get_statistics()["total_executions"]))
+        thread.start()
+        thread.join()
+        assert counts == [1]
+        manager.close()
+
+
+class TestExecutions:
+    """Testes de persistência de execuções"""
+
+    def test_save_and_get_details(self, db):
+        execution_id = db.save_execution("crew_a", "ponte", datetime.now())
+        db.update_execution_result(execution_id, "resultado", datetime.now(), "0:01:23")
+        db.save_task_result(execution_id, "pesquisador", "pesquisar", "dados")
+
+        details = db.get_execution_details(execution_id)
+        assert details["status"] == "completed"
+        assert details["result"] == "resultado"
+        assert details["task_results"][0]["agent_name"] == "pesquisador"
+
+    def test_critical_path_is_not_a_task_result(self, db):
+        execution_id = db.save_execution("crew_a", "ponte", datetime.now())
+        db.save_critical_path(execution_id, "pesquisa → redacao (12.0s)")
+        details = db.get_execution_details(execution_id)
+        assert details["critical_path"] == "pesquisa → redacao (12.0s)"
+        assert details["task_results"] == []
+
+    def test_evaluation_report(self, db):
+        execution_id = db.save_execution("crew_a", "ponte", datetime.now())
+        db.save_evaluation_report(execution_id, "relatório")
+        assert db.get_evaluation_report(execution_id) == "relatório"
+
+    def test_crew_configs(self, db):
+        db.save_crew_config("crew_a", "desc", ["researcher"], ["task"])
+        assert db.get_crew_config("crew_a")["agent_types"] == ["researcher"]
+        assert db.delete_crew_config("crew_a")
+        assert db.get_crew_config("crew_a") is None
+
+
+class TestMigrations:
+    """Testes do runner de migrações"""
+
+    def test_schema_version_and_indexes(self, db):
+        conn = db.connections.connection()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_executions_created_at", "idx_executions_status", "idx_execution_results_execution"} <= indexes
+
+    def test_migrations_are_idempotent(self, db):
+        assert run_migrations(db.connections.connection()) == SCHEMA_VERSION
+
+    def test_backfill_of_legacy_database(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        with sqlite3.connect(db_path) as conn:
+            _migration_001_base_tables(conn)
+            conn.execute(
+                "INSERT INTO executions (crew_name, topic, start_time, end_time, duration, status) "
+                "VALUES ('crew', 'tópico', '2025-06-22T16:41:20.318280', '2025-06-22T16:42:09.606193', '0:00:49', 'error')"
+            )
+            conn.execute(
+                "INSERT INTO executions (crew_name, topic, start_time, duration) VALUES ('crew', 't', 'inválido', '0:01:23')"
+            )
+
+        manager = DatabaseManager(db_path)
+        rows = manager.connections.connection().execute(
+            "SELECT duration_ms, start_ts, created_ts FROM executions ORDER BY id"
+        ).fetchall()
+        manager.close()
+
+        assert rows[0][0] == 49288
+        assert rows[0][1] is not None and rows[0][2] is not None
+        assert rows[1][0] == 83000
+
+    def test_critical_path_rows_move_to_column(self, tmp_path):
+        db_path = str(tmp_path / "v11.db")
+        manager = DatabaseManager(db_path)
+        execution_id = manager.save_execution("crew", "ponte", datetime.now())
+        manager.save_task_result(execution_id, "pesquisador", "pesquisar", "dados")
+        manager.save_task_result(execution_id, "planejador de tarefas", "Caminho crítico do DAG de tarefas", "a → b (3.0s)")
+        manager.close()
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("ALTER TABLE executions DROP COLUMN critical_path")
+            conn.execute("ALTER TABLE executions DROP COLUMN inputs")
+            conn.execute("ALTER TABLE execution_results DROP COLUMN task_index")
+            conn.execute("PRAGMA user_version = 11")
+
+        manager = DatabaseManager(db_path)
+        details = manager.get_execution_details(execution_id)
+        assert details["critical_path"] == "a → b (3.0s)"
+        assert [task["agent_name"] for task in details["task_results"]] == ["pesquisador"]
+        if manager.full_text_search_enabled:
+            assert manager.search_full_text("crítico") == []
+        manager.close()
+
+    def test_duration_ms_recorded_on_update(self, db):
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        execution_id = db.save_execution("crew", "tópico", start)
+        db.update_execution_result(execution_id, "ok", datetime(2025, 1, 1, 10, 1, 23, 500000), "0:01:23")
+        assert db.get_execution_details(execution_id)["duration_ms"] == 83500
+
+    def test_parse_duration_ms(self):
+        assert parse_duration_ms("0:01:23") == 83000
+        assert parse_duration_ms("1 day, 0:00:01") == 86401000
+        assert parse_duration_ms("N/A") is None
+
+
+class TestExecutionHistoryPage:
+    """Testes do histórico paginado por cursor"""
+
+    def _populate(self, db, count=7):
+        for i in range(count):
+            execution_id = db.save_execution("crew_a" if i % 2 else "crew_b", f"tópico {i}", datetime.now())
+            db.update_execution_result(execution_id, "x" * 500, datetime.now(), "0:00:01", "completed" if i % 3 else "error")
+
+    def test_pages_cover_all_rows_without_overlap(self, db):
+        self._populate(db)
+        seen, cursor = [], None
+        while True:
+            page = db.get_execution_history_page(limit=3, cursor=cursor)
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) == len(set(seen)) == 7
+
+    def test_preview_and_projection(self, db):
+        self._populate(db, 1)
+        item = db.get_execution_history_page(preview_chars=50)["items"][0]
+        assert len(item["result_preview"]) == 50
+        assert "result" not in item
+
+    def test_filters(self, db):
+        self._populate(db)
+        page = db.get_execution_history_page(crew_name="crew_a", status="completed")
+        assert page["items"] and all(i["crew_name"] == "crew_a" and i["status"] == "completed" for i in page["items"])
+        assert db.get_execution_history_page(date_from=date.today())["items"]
+        assert db.get_execution_history_page(date_to=date.today() - timedelta(days=2))["items"] == []
+        assert db.get_execution_crew_names() == ["crew_a", "crew_b"]
+
+
+class TestFullTextSearch:
+    """Testes da busca textual (FTS5)"""
+
+    def _populate(self, db):
+        first = db.save_execution("crew_geo", "Fundação de ponte", datetime.now())
+        db.update_execution_result(first, "Estacas escavadas para fundações profundas", datetime.now(), "0:00:01")
+        db.save_task_result(first, "geotécnico", "Sondagem SPT", "Solo argiloso com baixa resistência")
+        second = db.save_execution("crew_hidro", "Drenagem urbana", datetime.now())
+        db.update_execution_result(second, "Bacia de detenção", datetime.now(), "0:00:01")
+        db.save_evaluation_report(second, "Avaliação: drenagem adequada")
+        return first, second
+
+    def test_ranked_search_with_snippet(self, db):
+        first, _ = self._populate(db)
+        results = db.search_full_text("fundacoes")
+        assert results[0]["execution_id"] == first
+        assert "**" in results[0]["snippet"]
+
+    def test_prefix_and_kinds(self, db):
+        first, second = self._populate(db)
+        assert {r["execution_id"] for r in db.search_full_text("argil")} == {first}
+        assert db.search_full_text("argil", prefix=False) == []
+        evaluations = db.search_full_text("drenagem", kinds=["evaluation"])
+        assert [(r["kind"], r["execution_id"]) for r in evaluations] == [("evaluation", second)]
+
+    def test_index_follows_updates(self, db):
+        first, _ = self._populate(db)
+        db.update_execution_result(first, "Muro de arrimo", datetime.now(), "0:00:02")
+        assert db.search_full_text("estacas") == []
+        assert db.search_full_text("arrimo")[0]["execution_id"] == first
+
+    def test_index_does_not_copy_content(self, db):
+        first, second = self._populate(db)
+        segments = ["Bacia de detenção", "\n\n---\n", "Avaliação: drenagem adequada"]
+        db.update_execution_result(second, segments, datetime.now(), "0:00:01")
+        with db.connections.read() as conn:
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index_content'").fetchone() is None
+        # O relatório só é encontrado na sua própria entrada, não no corpo da execução
+        assert [r["kind"] for r in db.search_full_text("adequada")] == ["evaluation"]
+        assert "**Estacas**" in db.search_full_text("estacas")[0]["snippet"]
+
+    def test_search_executions_uses_index(self, db):
+        first, _ = self._populate(db)
+        rows = db.search_executions("sondagem")
+        assert [row["id"] for row in rows] == [first]
+        assert rows[0]["result"].startswith("Estacas")
+
+    def test_query_is_sanitized(self, db):
+        self._populate(db)
+        assert build_fts_query('ponte" OR drenagem') == '"ponte" "OR" "drenagem"*'
+        assert db.search_full_text('"NEAR(') == []
+
+
+class TestStatisticsRollups:
+    """Testes dos agregados incrementais de estatísticas"""
+
+    def _run(self, db, crew, seconds, status="completed", start=None):
+        start = start or datetime.now() - timedelta(seconds=seconds)
+        execution_id = db.save_execution(crew, "tópico", start)
+        db.update_execution_result(execution_id, "ok", start + timedelta(seconds=seconds), "0:00:00", status)
+        return execution_id
+
+    def test_counters_per_crew_and_window(self, db):
+        for seconds in range(1, 11):
+            self._run(db, "crew_a", seconds)
+        self._run(db, "crew_b", 5, status="error")
+        self._run(db, "crew_b", 5, start=datetime.now() - timedelta(days=3))
+        db.save_execution("crew_b", "em andamento", datetime.now())
+
+        stats = db.get_statistics_v2("all")
+        assert stats["total_executions"] == 13
+        assert stats["successful_executions"] == 11
+        assert stats["failed_executions"] == 1
+        assert stats["running_executions"] == 1
+        assert stats["most_executed_crew"] == "crew_a"
+        assert stats["per_crew"]["crew_a"]["avg_duration_ms"] == 5500
+
+        recent = db.get_statistics_v2("24h")
+        assert recent["total_executions"] == 12
+        assert db.get_statistics_v2("7d")["total_executions"] == 13
+
+    def test_percentiles_are_approximate(self, db):
+        for seconds in range(1, 101):
+            self._run(db, "crew_a", seconds)
+        percentiles = db.get_statistics_v2("all")["duration_percentiles_ms"]
+        assert 50000 <= percentiles["p50"] <= 50000 * 1.2
+        assert 95000 <= percentiles["p95"] <= 95000 * 1.2
+        assert percentiles["p50"] <= percentiles["p95"] <= percentiles["p99"]
+
+    def test_repeated_update_is_counted_once(self, db):
+        execution_id = self._run(db, "crew_a", 1)
+        db.update_execution_result(execution_id, "ok", datetime.now(), "0:00:01", "error")
+        stats = db.get_statistics_v2("all")
+        assert (stats["successful_executions"], stats["failed_executions"]) == (1, 0)
+
+    def test_legacy_statistics_api(self, db):
+        self._run(db, "crew_a", 1)
+        self._run(db, "crew_a", 1, status="error")
+        stats = db.get_statistics()
+        assert stats["total_executions"] == 2
+        assert stats["success_rate"] == 50
+
+    def test_invalid_window(self, db):
+        with pytest.raises(ValueError):
+            db.get_statistics_v2("1y")
+
+
+class TestWriteBehind:
+    """Testes da fila de escrita em lote"""
+
+    @pytest.fixture
+    def queued_db(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "queued.db"), write_behind=True)
+        yield manager
+        manager.close()
+
+    def test_flush_persists_pending_events(self, queued_db):
+        execution_id = queued_db.save_execution("crew", "tópico", datetime.now())
+        for i in range(50):
+            queued_db.save_task_result(execution_id, "agente", f"tarefa {i}", "resultado")
+        queued_db.update_execution_result(execution_id, "final", datetime.now(), "0:00:01")
+
+        assert queued_db.flush(timeout=5)
+        details = queued_db.get_execution_details(execution_id)
+        assert details["status"] == "completed"
+        assert len(details["task_results"]) == 50
+        assert queued_db.write_queue.batches_written < 50
+
+    def test_concurrent_producers(self, queued_db):
+        execution_id = queued_db.save_execution("crew", "tópico", datetime.now())
+
+        def producer(worker):
+            for i in range(25):
+                queued_db.save_task_result(execution_id, f"agente {worker}", f"tarefa {i}", "ok")
+
+        threads = [threading.Thread(target=producer, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(queued_db.get_execution_details(execution_id)["task_results"]) == 200
+
+    def test_close_flushes_and_stops_writer(self, tmp_path):
+        db_path = str(tmp_path / "shutdown.db")
+        manager = DatabaseManager(db_path, write_behind=True)
+        execution_id = manager.save_execution("crew", "tópico", datetime.now())
+        manager.save_task_result(execution_id, "agente", "tarefa", "ok")
+        manager.close()
+
+        assert not manager.write_queue._thread.is_alive()
+        reopened = DatabaseManager(db_path)
+        assert len(reopened.get_execution_details(execution_id)["task_results"]) == 1
+        reopened.close()
+
+    def test_invalid_event_does_not_drop_batch(self, queued_db):
+        execution_id = queued_db.save_execution("crew", "tópico", datetime.now())
+        queued_db.write_queue.submit("task_result", ("inválido",))
+        queued_db.save_task_result(execution_id, "agente", "tarefa", "ok")
+        queued_db.flush(timeout=5)
+        assert len(queued_db.get_execution_details(execution_id)["task_results"]) == 1
+        assert queued_db.write_queue.last_error is not None
+
+
+class TestBlobStore:
+    """Testes do armazenamento comprimido e deduplicado de conteúdo"""
+
+    def test_result_segments_are_deduplicated(self, db):
+        report = "Relatório de avaliação detalhado. " * 200
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        db.save_evaluation_report(execution_id, report)
+        db.update_execution_result(execution_id, ["resultado", "\n\n---\n", report], datetime.now(), "0:00:01")
+
+        conn = db.connections.connection()
+        assert conn.execute("SELECT result FROM executions").fetchone()[0] is None
+        assert conn.execute("SELECT COUNT(*) FROM blobs WHERE size > 1000").fetchone()[0] == 1
+        assert db.get_execution_details(execution_id)["result"] == f"resultado\n\n---\n{report}"
+        assert db.get_evaluation_report(execution_id) == report
+
+    def test_large_content_is_compressed(self, db):
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        db.save_task_result(execution_id, "agente", "tarefa", "camada de argila " * 500)
+
+        codec, size, stored_size = db.connections.connection().execute(
+            "SELECT codec, size, stored_size FROM blobs"
+        ).fetchone()
+        assert codec in ("zlib", "zstd")
+        assert stored_size < size / 10
+        assert db.get_execution_details(execution_id)["task_results"][0]["task_result"].startswith("camada")
+
+    def test_history_uses_preview_column(self, db):
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        db.update_execution_result(execution_id, "x" * 5000, datetime.now(), "0:00:01")
+        item = db.get_execution_history_page(preview_chars=50)["items"][0]
+        assert item["result_preview"] == "x" * 50
+
+    def test_legacy_content_is_migrated(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        with sqlite3.connect(db_path) as conn:
+            _migration_001_base_tables(conn)
+            conn.execute(
+                "INSERT INTO executions (crew_name, topic, start_time, status, result) "
+                "VALUES ('crew', 'tópico', '2025-06-22T16:41:20', 'completed', 'Fundação em radier')"
+            )
+            conn.execute(
+                "INSERT INTO execution_results (execution_id, agent_name, task_result) VALUES (1, 'agente', 'saída')"
+            )
+
+        manager = DatabaseManager(db_path)
+        details = manager.get_execution_details(1)
+        assert details["result"] == "Fundação em radier"
+        assert details["task_results"][0]["task_result"] == "saída"
+        if manager.full_text_search_enabled:
+            assert manager.search_full_text("radier")[0]["execution_id"] == 1
+        manager.close()
+
+
+class TestResultSections:
+    """Testes da leitura do resultado por trechos e do índice de seções"""
+
+    RESULT = "Resumo inicial\n\n# Fundação\nEstacas hélice\n```\n# comentário\n```\n## Solo\nArgila mole\n"
+
+    def test_index_sections(self):
+        sections = index_sections(self.RESULT)
+        assert [(s["level"], s["title"]) for s in sections] == [(0, "Início"), (1, "Fundação"), (2, "Solo")]
+        assert "".join(self.RESULT[s["offset"] : s["offset"] + s["length"]] for s in sections) == self.RESULT
+        assert index_sections("# Título\ntexto")[0]["title"] == "Título"
+
+    def test_long_sections_are_split(self):
+        sections = index_sections("# Grande\n" + "x" * 250, max_chars=100)
+        assert [s["title"] for s in sections] == ["Grande", "Grande (parte 2)", "Grande (parte 3)"]
+        assert max(s["length"] for s in sections) == 100
+
+    def test_range_length_and_sections(self, db):
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        db.update_execution_result(execution_id, self.RESULT, datetime.now(), "0:00:01")
+
+        assert db.get_result_length(execution_id) == len(self.RESULT)
+        assert db.get_result_range(execution_id, 2, 10) == self.RESULT[2:12]
+        solo = db.get_result_sections(execution_id)[-1]
+        assert db.get_result_range(execution_id, solo["offset"], solo["length"]) == "## Solo\nArgila mole\n"
+        assert db.get_result_range(999) is None
+
+        details = db.get_execution_details(execution_id, include_result=False)
+        assert details["result"] is None and details["result_size"] == len(self.RESULT)
+
+    def test_range_reads_only_needed_chunks(self, db):
+        result = "a" * CHUNK_CHARS + "b" * CHUNK_CHARS + "c" * 10
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        db.update_execution_result(execution_id, [result, "relatório"], datetime.now(), "0:00:01")
+
+        conn = db.connections.connection()
+        assert conn.execute("SELECT json_array_length(result_blobs) FROM executions").fetchone()[0] == 4
+        assert db.get_result_range(execution_id, CHUNK_CHARS - 2, 4) == "aabb"
+        assert db.get_result_range(execution_id, len(result) - 2, 6) == "ccrela"
+        assert db.get_execution_details(execution_id)["result"] == result + "relatório"
+
+    def test_legacy_result_uses_sql_substr(self, db):
+        execution_id = db.save_execution("crew", "tópico", datetime.now())
+        with db.connections.transaction() as conn:
+            conn.execute("UPDATE executions SET result = ? WHERE id = ?", (self.RESULT, execution_id))
+        assert db.get_result_range(execution_id, 0, 14) == "Resumo inicial"
+        assert db.get_result_length(execution_id) == len(self.RESULT)
+        assert len(db.get_result_sections(execution_id)) == 3
+
+
+class TestRetention:
+    """Testes da retenção e dos arquivos mensais"""
+
+    NOW = datetime(2025, 6, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+    def _execution(self, db, crew, topic, created_at, result):
+        execution_id = db.save_execution(crew, topic, datetime.now())
+        db.update_execution_result(execution_id, result, datetime.now(), "0:00:01")
+        db.save_task_result(execution_id, "agente", "tarefa", f"saída de {topic}")
+        created_ts = int(datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp() * 1000)
+        with db.connections.transaction() as conn:
+            conn.execute("UPDATE executions SET created_at = ?, created_ts = ? WHERE id = ?", (created_at, created_ts, execution_id))
+        return execution_id
+
+    @pytest.fixture
+    def populated(self, db):
+        ids = {
+            "old_jan": self._execution(db, "crew_a", "barragem", "2025-01-10 10:00:00", "Vertedouro em degraus"),
+            "old_feb": self._execution(db, "crew_a", "ponte", "2025-02-10 10:00:00", "Fundação em estacas"),
+            "kept": self._execution(db, "crew_b", "túnel", "2025-02-11 10:00:00", "Revestimento em concreto"),
+            "recent": self._execution(db, "crew_a", "canal", "2025-06-10 10:00:00", "Canal trapezoidal"),
+        }
+        report = apply_retention(db, RetentionPolicy(90, {"crew_b": None}), now=self.NOW)
+        return ids, report
+
+    def test_old_executions_move_to_monthly_archives(self, db, populated):
+        ids, report = populated
+        assert report["archived"] == {"2025-01": 1, "2025-02": 1}
+        assert [month for month, _ in list_archives(db.archive_dir)] == ["2025-02", "2025-01"]
+
+        conn = db.connections.connection()
+        remaining = {row[0] for row in conn.execute("SELECT id FROM executions")}
+        assert remaining == {ids["kept"], ids["recent"]}
+        assert conn.execute("SELECT COUNT(*) FROM execution_results").fetchone()[0] == 2
+
+    def test_details_and_history_span_archives(self, db, populated):
+        ids, _ = populated
+        details = db.get_execution_details(ids["old_jan"])
+        assert details["archived"] and details["result"] == "Vertedouro em degraus"
+        assert details["task_results"][0]["task_result"] == "saída de barragem"
+
+        first = db.get_execution_history_page(limit=2)
+        second = db.get_execution_history_page(limit=2, cursor=first["next_cursor"])
+        ordered = [item["id"] for item in first["items"] + second["items"]]
+        assert ordered == [ids["recent"], ids["kept"], ids["old_feb"], ids["old_jan"]]
+        assert second["next_cursor"] is None
+
+        january = db.get_execution_history_page(date_from=date(2025, 1, 1), date_to=date(2025, 1, 31))
+        assert [item["id"] for item in january["items"]] == [ids["old_jan"]]
+        assert "crew_a" in db.get_execution_crew_names()
+
+    def test_first_page_does_not_attach_archives(self, db, populated):
+        self._execution(db, "crew_a", "adutora", "2025-06-12 10:00:00", "Adutora por gravidade")
+        db.get_execution_history_page(limit=1)
+        attached = [row[1] for row in db.connections.connection().execute("PRAGMA database_list")]
+        assert not any(name.startswith("archive_") for name in attached)
+
+    def test_search_spans_archives(self, db, populated):
+        ids, _ = populated
+        if db.full_text_search_enabled:
+            assert {r["execution_id"] for r in db.search_full_text("estacas")} == {ids["old_feb"]}
+            assert db.search_full_text("estacas", date_from=date(2025, 6, 1)) == []
+        assert [row["id"] for row in db.search_executions("vertedouro")] == [ids["old_jan"]]
+
+    def test_archives_are_read_only_and_space_is_reported(self, db, populated):
+        ids, report = populated
+        assert report["bytes_reclaimed"] >= 0
+        assert db.connections.connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        db.get_execution_details(ids["old_jan"])
+        with pytest.raises(sqlite3.OperationalError):
+            db.connections.connection().execute("DELETE FROM archive_2025_01.executions")
+
+    def test_retention_is_idempotent(self, db, populated):
+        assert apply_retention(db, RetentionPolicy(90, {"crew_b": None}), now=self.NOW)["archived"] == {}
@@ -0,0 +1,195 @@
+"""
+Testes do motor de execução de crews em segundo plano
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.crews.cancellation import CancellationToken, ExecutionCancelled
+from app.crews.execution_engine import ExecutionEngine
+from app.utils.database import DatabaseManager
+
+
+class _FakeCrewManager:
+    """CrewManager mínimo: grava o resultado (ou a interrupção) como o CrewManager real"""
+
+    def __init__(self, storage):
+        self.db_manager = storage
+        self.release = threading.Event()
+        self.release.set()
+        self.running = []
+        self.tokens = {}
+
+    def list_crew_names(self):
+        return ["crew_a", "vazia"]
+
+    def execute_crew_safe(self, crew_name, inputs=None, execution_id=None, timeout=None):
+        self.running.append(execution_id)
+        token = self.tokens[execution_id] = CancellationToken(timeout)
+        try:
+            while not self.release.wait(0.01):  # cada espera é um "passo" do agente
+                token.check()
+        except ExecutionCancelled as e:
+            self.db_manager.update_execution_result(execution_id, "parcial", datetime.now(), "0:00:01", e.status, str(e))
+            return None
+        finally:
+            del self.tokens[execution_id]
+        if crew_name == "vazia":
+            return None
+        result = f"resultado de {inputs['topic']}"
+        self.db_manager.update_execution_result(execution_id, result, datetime.now(), "0:00:01", "completed")
+        return result
+
+    execute_crew = execute_crew_safe
+
+    def cancel_execution(self, execution_id, reason=None):
+        token = self.tokens.get(execution_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def resume_execution(self, execution_id):
+        self.db_manager.reopen_execution(execution_id)
+        self.db_manager.update_execution_result(execution_id, "retomada", datetime.now(), "0:00:02", "completed")
+        return "retomada"
+
+
+class TestExecutionEngine:
+    """submit/status/result/cancel com estado persistido em executions"""
+
+    @pytest.fixture
+    def storage(self, tmp_path):
+        manager = DatabaseManager(str(tmp_path / "crews_test.db"))
+        yield manager
+        manager.close()
+
+    @pytest.fixture
+    def crew_manager(self, storage):
+        return _FakeCrewManager(storage)
+
+    @pytest.fixture
+    def engine(self, crew_manager):
+        engine = ExecutionEngine(crew_manager, max_workers=2)
+        yield engine
+        crew_manager.release.set()
+        engine.shutdown()
+
+    def test_submit_and_result(self, engine, storage):
+        job_id = engine.submit("crew_a", {"topic": "ponte"})
+        assert engine.result(job_id, timeout=5) == "resultado de ponte"
+
+        job = engine.status(job_id)
+        assert job["status"] == "completed" and job["done"]
+        assert storage.get_statistics()["successful_executions"] == 1
+        assert engine.active_jobs() == []
+
+    def test_unknown_crew_is_rejected(self, engine):
+        with pytest.raises(ValueError):
+            engine.submit("inexistente", {"topic": "x"})
+
+    def test_jobs_run_in_parallel_and_queue_can_be_cancelled(self, engine, crew_manager):
+        crew_manager.release.clear()
+        first = engine.submit("crew_a", {"topic": "a"})
+        second = engine.submit("crew_a", {"topic": "b"})
+        queued = engine.submit("crew_a", {"topic": "c"})
+
+        for _ in range(100):
+            if len(crew_manager.running) == 2:
+                break
+            threading.Event().wait(0.01)
+        assert sorted(crew_manager.running) == [first, second]
+        assert engine.status(queued)["status"] == "queued"
+        assert engine.status(first)["status"] == "running"
+
+        assert engine.cancel(queued)
+        crew_manager.release.set()
+        assert engine.result(first, timeout=5) == "resultado de a"
+        assert engine.status(queued)["status"] == "cancelled"
+        assert engine.result(queued) is None
+
+    def test_running_job_is_interrupted(self, engine, crew_manager):
+        crew_manager.release.clear()
+        job_id = engine.submit("crew_a", {"topic": "a"})
+        for _ in range(100):
+            if crew_manager.running:
+                break
+            threading.Event().wait(0.01)
+
+        assert engine.cancel(job_id)
+        assert engine.result(job_id, timeout=5) == "parcial"
+        assert engine.status(job_id)["status"] == "cancelled"
+        assert not engine.cancel(job_id)  # já terminou
+
+    def test_deadline_ends_job_as_timeout(self, engine, crew_manager):
+        crew_manager.release.clear()
+        job_id = engine.submit("crew_a", {"topic": "a"}, timeout=0.05)
+        engine.result(job_id, timeout=5)
+        job = engine.status(job_id)
+        assert job["status"] == "timeout" and job["done"]
+        assert "Prazo" in job["error_message"]
+
+    def test_run_without_result_is_marked_as_error(self, engine):
+        job_id = engine.submit("vazia", {"topic": "x"})
+        assert engine.result(job_id, timeout=5) is None
+        job = engine.status(job_id)
+        assert job["status"] == "error" and job["error_message"]
+
+    def test_resume_failed_job(self, engine):
+        job_id = engine.submit("vazia", {"topic": "x"})
+        assert engine.result(job_id, timeout=5) is None
+        assert engine.resume(job_id)
+        assert engine.result(job_id, timeout=5) == "retomada"
+        assert engine.status(job_id)["status"] == "completed"
+        assert not engine.resume(job_id)
+
+    def test_queued_executions_count_as_active(self, storage):
+        execution_id = storage.save_execution("crew_a", "fila", datetime(2025, 1, 1, 10, 59), status="queued")
+        assert storage.get_statistics_v2()["running_executions"] == 1
+
+        assert storage.start_execution(execution_id, datetime(2025, 1, 1, 11, 1))
+        assert not storage.start_execution(execution_id, datetime(2025, 1, 1, 11, 2))
+        conn = storage.connections.connection()
+        hours = conn.execute(
+            "SELECT bucket_ts, total FROM execution_rollups WHERE granularity = 'hour' ORDER BY bucket_ts"
+        ).fetchall()
+        assert [total for _, total in hours] == [0, 1]
+
+    def test_batch_items_are_queued_jobs(self, engine, storage):
+        batch_id = engine.submit_batch("crew_a", [{"topic": f"item {i}"} for i in range(3)])
+        executions = storage.get_batch_executions(batch_id, include_result=False)
+        for execution in executions:
+            engine.result(execution["id"], timeout=5)
+
+        executions = storage.get_batch_executions(batch_id)
+        assert [execution["result"] for execution in executions] == [f"resultado de item {i}" for i in range(3)]
+        assert engine.active_jobs() == []
+
+    def test_batch_fail_fast_cancels_queued_items(self, storage, crew_manager):
+        engine = ExecutionEngine(crew_manager, max_workers=1)
+        try:
+            batch_id = engine.submit_batch("vazia", [{"topic": f"item {i}"} for i in range(3)], fail_fast=True)
+            for execution in storage.get_batch_executions(batch_id, include_result=False):
+                engine.result(execution["id"], timeout=5)
+        finally:
+            engine.shutdown()
+
+        statuses = [execution["status"] for execution in storage.get_batch_executions(batch_id, include_result=False)]
+        assert statuses == ["error", "cancelled", "cancelled"]
+        assert len(crew_manager.running) == 1
+
+    def test_cancel_batch(self, engine, storage, crew_manager):
+        crew_manager.release.clear()
+        batch_id = engine.submit_batch("crew_a", [{"topic": f"item {i}"} for i in range(3)])
+        for _ in range(100):
+            if len(crew_manager.running) == 2:
+                break
+            threading.Event().wait(0.01)
+
+        assert engine.cancel_batch(batch_id) == 3
+        for execution in storage.get_batch_executions(batch_id, include_result=False):
+            engine.result(execution["id"], timeout=5)
+        statuses = [execution["status"] for execution in storage.get_batch_executions(batch_id, include_result=False)]
+        assert statuses == ["cancelled"] * 3
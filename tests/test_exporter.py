@@ -0,0 +1,68 @@
+"""
+Testes da exportação em streaming do histórico
+"""
+
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.utils.database import DatabaseManager
+from app.utils.exporter import export_history, iter_rows, load_watermark, write_table
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "crews_test.db"))
+    for i in range(5):
+        execution_id = manager.save_execution("crew_a" if i % 2 else "crew_b", f"tópico {i}", datetime.now())
+        manager.save_task_result(execution_id, "agente", "tarefa", f"saída {i}")
+        manager.update_execution_result(execution_id, [f"resultado {i}", " + relatório"], datetime.now(), "0:00:01")
+        manager.save_evaluation_report(execution_id, f"relatório {i}")
+    manager.save_execution("crew_a", "em andamento", datetime.now())
+    yield manager
+    manager.close()
+
+
+class TestExporter:
+    """Testes de NDJSON, Parquet, filtros e watermark"""
+
+    def test_ndjson_streams_decompressed_rows(self, db):
+        sink = io.BytesIO()
+        count = write_table(iter_rows(db, "executions", chunk_size=2), "executions", sink, chunk_size=2)
+        rows = [json.loads(line) for line in sink.getvalue().decode("utf-8").splitlines()]
+
+        assert count == 5  # execuções em andamento ficam para a próxima exportação
+        assert rows[0]["result"] == "resultado 0 + relatório"
+        assert "result_blobs" not in rows[0]
+
+    def test_crew_filter(self, db):
+        rows = list(iter_rows(db, "execution_results", crew_name="crew_a"))
+        assert [row["task_result"] for row in rows] == ["saída 1", "saída 3"]
+
+    def test_incremental_export_from_watermark(self, db, tmp_path):
+        watermark_path = str(tmp_path / "exports" / "watermark.json")
+        first = export_history(db, str(tmp_path / "exports"), watermark_path=watermark_path)
+        assert {table: info["rows"] for table, info in first.items()} == {
+            "executions": 5,
+            "execution_results": 5,
+            "evaluation_reports": 5,
+        }
+
+        running = db.get_execution_history_page(status="running")["items"][0]["id"]
+        db.update_execution_result(running, "concluída depois", datetime.now(), "0:00:02")
+        second = export_history(db, str(tmp_path / "exports2"), watermark_path=watermark_path)
+        assert {table: info["rows"] for table, info in second.items()} == {
+            "executions": 1,
+            "execution_results": 0,
+            "evaluation_reports": 0,
+        }
+        assert load_watermark(watermark_path)["executions"][1] == running
+
+    def test_parquet_export(self, db, tmp_path):
+        parquet = pytest.importorskip("pyarrow.parquet")
+        summary = export_history(db, str(tmp_path), "parquet", tables=["evaluation_reports"])
+        table = parquet.read_table(summary["evaluation_reports"]["path"])
+        assert table.num_rows == 5
+        assert table.column("evaluation_report").to_pylist()[0] == "relatório 0"
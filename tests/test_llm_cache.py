@@ -0,0 +1,60 @@
+"""
+Testes do cache de respostas do LLM (chave, validade, remoção LRU e configuração)
+"""
+
+import time
+
+from app.utils.llm_cache import LLMCache, LLMCachePolicy, cache_key
+
+
+class TestLLMCache:
+    """Correspondência exata, TTL, limite de entradas e métricas de acerto"""
+
+    def test_cache_key_normalizes_messages(self):
+        params = {"temperature": 0.2, "seed": None}
+        key = cache_key("gpt-4o", params, [{"role": "user", "content": "Avalie  a crew\n"}])
+        assert key == cache_key("gpt-4o", {"temperature": 0.2}, "Avalie a crew\n")
+        assert key != cache_key("gpt-4o", {"temperature": 0.7}, "Avalie a crew\n")
+        assert key != cache_key("gpt-4o-mini", params, "Avalie a crew\n")
+        assert key != cache_key("gpt-4o", params, "Avalie outra crew\n")
+
+    def test_hits_misses_and_ttl(self, tmp_path):
+        cache = LLMCache(str(tmp_path / "cache.db"), ttl_hours=1)
+        assert cache.get("k1") is None
+        cache.put("k1", "gpt-4o", "resposta " * 100)
+        assert cache.get("k1") == "resposta " * 100
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"], stats["total_hits"]) == (1, 1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+        cache.ttl_ms = 1
+        time.sleep(0.01)
+        assert cache.get("k1") is None  # expirada
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_are_evicted(self, tmp_path):
+        cache = LLMCache(str(tmp_path / "cache.db"), max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, "gpt-4o", key)
+            time.sleep(0.002)
+        cache.get("a")  # "b" passa a ser a menos usada
+        time.sleep(0.002)
+        cache.put("c", "gpt-4o", "c")
+        assert cache.prune() == 1
+        assert [cache.get(key) for key in ("a", "b", "c")] == ["a", None, "c"]
+        assert cache.clear() == 2
+
+
+class TestLLMCachePolicy:
+    """O valor mais específico vale: agente > crew > padrão"""
+
+    def test_enabled_for(self, tmp_path):
+        config = tmp_path / "llm_cache.yaml"
+        config.write_text("enabled: false\ncrews:\n  relatorio: true\nagents:\n  redator_criativo: false\n")
+        policy = LLMCachePolicy.load(str(config))
+        assert policy.in_use()
+        assert policy.enabled_for("relatorio", ["pesquisador"])
+        assert not policy.enabled_for("relatorio", ["redator_criativo"])
+        assert not policy.enabled_for("outra", ["pesquisador"])
+        assert not LLMCachePolicy.load(str(tmp_path / "ausente.yaml")).in_use()
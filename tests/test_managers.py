@@ -0,0 +1,68 @@
+"""
+Testes do registro de gerenciadores compartilhados pelo processo
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.utils import managers
+from app.utils.managers import SharedManagers, get_shared_managers, reset_shared_managers
+
+
+class _FakeCrewManager:
+    def __init__(self):
+        self.reloads = 0
+        self.db_manager = self
+
+    def reload_configs(self):
+        self.reloads += 1
+        return True
+
+    def flush(self):
+        return True
+
+
+class TestSharedManagers:
+    """Uma única instância por processo, construída uma vez mesmo com sessões concorrentes"""
+
+    @pytest.fixture(autouse=True)
+    def clean_registry(self):
+        reset_shared_managers()
+        yield
+        reset_shared_managers()
+
+    def _factory(self, calls):
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return SharedManagers(object(), object(), object(), _FakeCrewManager())
+
+        return factory
+
+    def test_concurrent_sessions_share_one_instance(self):
+        calls, results = [], []
+        factory = self._factory(calls)
+        threads = [threading.Thread(target=lambda: results.append(get_shared_managers(factory))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert get_shared_managers(factory) is results[0]
+
+    def test_reset_builds_new_instance(self):
+        calls = []
+        first = get_shared_managers(self._factory(calls))
+        reset_shared_managers()
+        assert get_shared_managers(self._factory(calls)) is not first
+        assert len(calls) == 2
+
+    def test_reload_configs_is_shared(self):
+        shared = get_shared_managers(self._factory([]))
+        assert shared.reload_configs()
+        assert shared.crew_manager.reloads == 1
+        assert managers._shared_managers is shared
@@ -0,0 +1,115 @@
+"""
+Testes dos pipelines de crews (etapas ligadas por filas limitadas)
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from app.crews.pipeline import CrewPipeline, PipelineStage
+from app.utils.storage import InMemoryStorage
+
+
+class _FakeCrewManager:
+    """CrewManager mínimo: cada crew leva `delay` segundos e grava o resultado"""
+
+    def __init__(self, delay=0.02):
+        self.db_manager = InMemoryStorage()
+        self.delay = delay
+        self.intervals = []  # (crew, início, fim)
+        self.gates = {}
+        self._lock = threading.Lock()
+
+    def list_crew_names(self):
+        return ["pesquisa", "analise", "redacao"]
+
+    def execute_crew_safe(self, crew_name, inputs=None, execution_id=None, context=None):
+        started = time.monotonic()
+        if crew_name in self.gates:
+            self.gates[crew_name].wait(5)
+        time.sleep(self.delay)
+        with self._lock:
+            self.intervals.append((crew_name, started, time.monotonic()))
+        if "falha" in inputs["topic"] and crew_name == "analise":
+            return None
+        result = f"{crew_name}({context[0] if context else inputs['topic']})"
+        self.db_manager.update_execution_result(execution_id, result, datetime.now(), "0:00:01", "completed")
+        return result
+
+
+class TestCrewPipeline:
+    """Itens fluem pelas etapas em paralelo, com filas limitadas e métricas por etapa"""
+
+    def test_items_flow_through_all_stages(self):
+        manager = _FakeCrewManager()
+        pipeline = CrewPipeline(manager, [PipelineStage("pesquisa"), PipelineStage("analise", concurrency=2)])
+        progress = []
+        run = pipeline.run([{"topic": f"ponte {i}"} for i in range(4)], progress=lambda *p: progress.append(p))
+
+        assert [item["result"] for item in run["items"]] == [f"analise(pesquisa(ponte {i}))" for i in range(4)]
+        assert progress[-1] == (4, 4)
+        assert [metrics["completed"] for metrics in run["metrics"]] == [4, 4]
+        assert run["metrics"][0]["latency_avg"] >= manager.delay
+        assert len(manager.db_manager.get_batch_executions(run["batch_id"])) == 8
+
+    def test_stages_overlap(self):
+        manager = _FakeCrewManager(delay=0.05)
+        pipeline = CrewPipeline(manager, [PipelineStage("pesquisa"), PipelineStage("analise")])
+        pipeline.run([{"topic": f"item {i}"} for i in range(4)])
+
+        research = [interval for interval in manager.intervals if interval[0] == "pesquisa"]
+        analysis = [interval for interval in manager.intervals if interval[0] == "analise"]
+        assert any(r[1] < a[2] and a[1] < r[2] for r in research for a in analysis)
+
+    def test_failed_item_does_not_reach_next_stage(self):
+        manager = _FakeCrewManager(delay=0)
+        stages = [PipelineStage("pesquisa"), PipelineStage("analise"), PipelineStage("redacao")]
+        run = CrewPipeline(manager, stages).run([{"topic": "falha"}, {"topic": "ok"}])
+
+        failed, ok = run["items"]
+        assert failed["status"] == "error" and failed["failed_stage"] == "2. analise"
+        assert ok["status"] == "completed"
+        assert [metrics["failed"] for metrics in run["metrics"]] == [0, 1, 0]
+        statuses = [execution["status"] for execution in manager.db_manager.get_batch_executions(run["batch_id"])]
+        assert statuses.count("error") == 1
+
+    def test_backpressure_bounds_upstream_work(self):
+        manager = _FakeCrewManager(delay=0)
+        manager.gates["analise"] = threading.Event()
+        pipeline = CrewPipeline(manager, [PipelineStage("pesquisa"), PipelineStage("analise", queue_size=1)])
+        thread = threading.Thread(target=pipeline.run, args=([{"topic": f"item {i}"} for i in range(10)],))
+        thread.start()
+        time.sleep(0.2)
+
+        # 1 item em análise + 1 na fila + 1 aguardando para entrar na fila
+        research_runs = sum(1 for interval in manager.intervals if interval[0] == "pesquisa")
+        assert research_runs <= 3
+        manager.gates["analise"].set()
+        thread.join(5)
+        assert not thread.is_alive()
+
+    def test_stage_errors_do_not_stall_the_pipeline(self, monkeypatch):
+        manager = _FakeCrewManager(delay=0)
+        original_save = manager.db_manager.save_execution
+
+        def save_execution(crew_name, topic, *args, **kwargs):
+            if topic == "sem registro" and crew_name == "analise":
+                raise RuntimeError("banco indisponível")
+            return original_save(crew_name, topic, *args, **kwargs)
+
+        monkeypatch.setattr(manager.db_manager, "save_execution", save_execution)
+        pipeline = CrewPipeline(manager, [PipelineStage("pesquisa"), PipelineStage("analise")])
+        inputs, results = [{"topic": "sem registro"}, {"topic": "ok"}], []
+        thread = threading.Thread(target=lambda: results.append(pipeline.run(inputs)))
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        failed, ok = results[0]["items"]
+        assert failed["status"] == "error" and failed["failed_stage"] == "2. analise"
+        assert ok["result"] == "analise(pesquisa(ok))"
+
+    def test_unknown_crew_is_rejected(self):
+        with pytest.raises(ValueError):
+            CrewPipeline(_FakeCrewManager(), [PipelineStage("inexistente")])
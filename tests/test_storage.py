@@ -0,0 +1,191 @@
+"""
+Testes de contrato dos motores de armazenamento (SQLite e memória)
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.database import DatabaseManager
+from app.utils.storage import InMemoryStorage, StorageBackend, create_storage
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def storage(request, tmp_path):
+    engine = DatabaseManager(str(tmp_path / "contract.db")) if request.param == "sqlite" else InMemoryStorage()
+    yield engine
+    engine.close()
+
+
+class TestStorageContract:
+    """Mesmo comportamento nos dois motores"""
+
+    def test_engines_implement_protocol(self, storage):
+        assert isinstance(storage, StorageBackend)
+
+
+    def test_execution_lifecycle(self, storage):
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        execution_id = storage.save_execution("crew_a", "ponte", start)
+        assert storage.get_execution_details(execution_id)["inputs"] is None
+        storage.save_execution_inputs(execution_id, {"topic": "ponte", "cidade": "Pelotas"})
+        storage.save_task_result(execution_id, "pesquisador", "pesquisar", "dados de sondagem", task_index=0)
+        storage.update_execution_result(execution_id, ["resultado", " + relatório"], start + timedelta(seconds=83), "0:01:23")
+
+        details = storage.get_execution_details(execution_id)
+        assert details["status"] == "completed"
+        assert details["result"] == "resultado + relatório"
+        assert details["duration_ms"] == 83000
+        assert details["inputs"] == {"topic": "ponte", "cidade": "Pelotas"}
+        [task] = details["task_results"]
+        assert (task["task_index"], task["task_result"]) == (0, "dados de sondagem")
+        assert storage.get_execution_crew_names() == ["crew_a"]
+
+
+    def test_result_range_and_sections(self, storage):
+        execution_id = storage.save_execution("crew_a", "ponte", datetime.now())
+        result = "# Vão\n40 m\n# Pilares\nConcreto"
+        storage.update_execution_result(execution_id, result, datetime.now(), "0:00:01")
+
+        sections = storage.get_result_sections(execution_id)
+        assert [section["title"] for section in sections] == ["Vão", "Pilares"]
+        assert storage.get_result_range(execution_id, sections[1]["offset"], sections[1]["length"]) == "# Pilares\nConcreto"
+        assert storage.get_result_length(execution_id) == len(result)
+        assert storage.get_execution_details(execution_id, include_result=False)["result"] is None
+
+
+    def test_batch_executions(self, storage):
+        ids = [storage.save_execution("crew_a", f"item {i}", datetime.now(), status="queued", batch_id="lote-1") for i in range(3)]
+        storage.save_execution("crew_a", "avulsa", datetime.now())
+        storage.update_execution_result(ids[1], "orçamento", datetime.now(), "0:00:02")
+
+        batch = storage.get_batch_executions("lote-1")
+        assert [execution["id"] for execution in batch] == ids
+        assert [execution["status"] for execution in batch] == ["queued", "completed", "queued"]
+        assert batch[1]["result"] == "orçamento"
+        assert storage.get_batch_executions("lote-1", include_result=False)[1]["result"] is None
+        assert storage.get_batch_executions("inexistente") == []
+
+
+    def test_reopen_failed_execution(self, storage):
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        failed = storage.save_execution("crew_a", "ponte", start)
+        storage.update_execution_result(failed, "", start + timedelta(seconds=5), "0:00:05", "error", "falhou")
+        completed = storage.save_execution("crew_a", "ponte", start)
+        storage.update_execution_result(completed, "ok", start + timedelta(seconds=5), "0:00:05")
+
+        assert not storage.reopen_execution(completed)
+        assert storage.reopen_execution(failed)
+        assert not storage.reopen_execution(failed)  # já está em andamento
+        details = storage.get_execution_details(failed)
+        assert details["status"] == "running" and details["error_message"] is None
+        assert storage.get_statistics_v2()["failed_executions"] == 0
+
+        storage.update_execution_result(failed, "retomada", start + timedelta(seconds=9), "0:00:09")
+        statistics = storage.get_statistics_v2()
+        assert statistics["successful_executions"] == 2 and statistics["failed_executions"] == 0
+
+
+    def test_task_metrics(self, storage):
+        execution_id = storage.save_execution("crew_a", "ponte", datetime.now())
+        metrics = {
+            "start_ts": 1_000,
+            "end_ts": 4_500,
+            "duration_ms": 3_500,
+            "output_chars": 17,
+            "step_count": 4,
+            "tool_calls": 3,
+            "tool_names": {"FileReadTool": 2, "brave_search_tool": 1},
+        }
+        storage.save_task_result(execution_id, "pesquisador", "pesquisar", "dados de sondagem", metrics=metrics)
+        storage.save_task_result(execution_id, "redator", "redigir", "texto")
+
+        measured, plain = storage.get_execution_details(execution_id)["task_results"]
+        assert {key: measured[key] for key in metrics} == metrics
+        assert plain["duration_ms"] is None and plain["tool_names"] == {}
+
+
+    def test_usage(self, storage):
+        start = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+        first = storage.save_execution("crew_a", "ponte", start)
+        storage.record_execution_usage(first, "gpt-4o", 1_000, 200, 0.0045)
+        storage.record_execution_usage(first, "gpt-4o", 500, 100, 0.00225)  # ex: avaliação
+        second = storage.save_execution("crew_a", "viaduto", start + timedelta(days=1))
+        storage.record_execution_usage(second, "gpt-4o", 2_000, 400, 0.009)
+        storage.save_task_result(second, "pesquisador", "pesquisar", "dados", metrics={"prompt_tokens": 2_000, "cost_usd": 0.009})
+        untracked = storage.save_execution("crew_b", "túnel", start)
+        storage.record_execution_usage(untracked, "modelo-local", 300, 30, None)
+
+        details = storage.get_execution_details(first)
+        assert (details["model"], details["prompt_tokens"], details["completion_tokens"]) == ("gpt-4o", 1_500, 300)
+        assert details["cost_usd"] == pytest.approx(0.00675)
+        assert storage.get_execution_details(untracked)["cost_usd"] is None
+        assert storage.get_execution_details(second)["task_results"][0]["prompt_tokens"] == 2_000
+
+        summary = storage.get_usage_summary(crew_name="crew_a")
+        assert [(row["day"], row["total_tokens"]) for row in summary] == [("2025-03-11", 2_400), ("2025-03-10", 1_800)]
+        assert [row["day"] for row in storage.get_usage_summary(since=date(2025, 3, 11))] == ["2025-03-11"]
+        assert storage.get_average_execution_cost("crew_a") == pytest.approx((0.00675 + 0.009) / 2)
+        assert storage.get_average_execution_cost("crew_b") is None
+
+
+    def test_history_page_cursor(self, storage):
+        ids = [storage.save_execution("crew_a", f"tópico {i}", datetime.now()) for i in range(5)]
+        first = storage.get_execution_history_page(limit=3)
+        second = storage.get_execution_history_page(limit=3, cursor=first["next_cursor"])
+        assert [item["id"] for item in first["items"] + second["items"]] == ids[::-1]
+        assert second["next_cursor"] is None
+
+
+    def test_crew_configs_and_evaluations(self, storage):
+        storage.save_crew_config("crew_a", "desc", ["researcher"], ["task"])
+        assert storage.get_crew_config("crew_a")["agent_types"] == ["researcher"]
+        assert [config["crew_name"] for config in storage.get_all_crew_configs()] == ["crew_a"]
+        assert storage.delete_crew_config("crew_a")
+        assert storage.get_crew_config("crew_a") is None
+
+        execution_id = storage.save_execution("crew_a", "ponte", datetime.now())
+        storage.save_evaluation_report(execution_id, "Avaliação: drenagem adequada")
+        assert storage.get_evaluation_report(execution_id) == "Avaliação: drenagem adequada"
+
+
+    def test_search(self, storage):
+        execution_id = storage.save_execution("crew_geo", "Fundação de ponte", datetime.now())
+        storage.update_execution_result(execution_id, "Estacas escavadas para fundações", datetime.now(), "0:00:01")
+        storage.save_evaluation_report(execution_id, "Avaliação: solução adequada")
+
+        results = storage.search_full_text("fundacoes")
+        assert results and results[0]["execution_id"] == execution_id
+        assert [r["kind"] for r in storage.search_full_text("adequ", kinds=["evaluation"])] == ["evaluation"]
+        assert [row["id"] for row in storage.search_executions("estacas")] == [execution_id]
+
+
+    def test_statistics(self, storage):
+        start = datetime.now()
+        ok = storage.save_execution("crew_a", "t", start)
+        storage.update_execution_result(ok, "ok", start + timedelta(seconds=2), "0:00:02")
+        failed = storage.save_execution("crew_b", "t", start)
+        storage.update_execution_result(failed, "", start + timedelta(seconds=1), "0:00:01", "error", "falha")
+        storage.save_execution("crew_a", "t", start)
+
+        stats = storage.get_statistics_v2("24h")
+        assert (stats["total_executions"], stats["successful_executions"], stats["running_executions"]) == (3, 1, 1)
+        assert stats["most_executed_crew"] == "crew_a"
+        assert storage.get_statistics()["success_rate"] == pytest.approx(100 / 3)
+
+
+class TestCreateStorage:
+    """Testes da escolha do motor por configuração"""
+
+    def test_create_storage_from_environment(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("STORAGE_BACKEND", "memory")
+        assert isinstance(create_storage(), InMemoryStorage)
+
+        monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+        monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "env.db"))
+        engine = create_storage()
+        assert isinstance(engine, DatabaseManager) and engine.db_path == str(tmp_path / "env.db")
+        engine.close()
+
+        with pytest.raises(ValueError):
+            create_storage("postgres")
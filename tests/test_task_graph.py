@@ -0,0 +1,103 @@
+"""
+Testes do planejamento de tarefas como DAG de dependências
+"""
+
+import pytest
+
+from app.crews.task_graph import TaskGraph, TaskGraphError, task_dependencies
+
+CONFIGS = {
+    "hydrological_study_task": {},
+    "geotechnical_report_task": {},
+    "environmental_licensing_task": {"context": "Texto livre de contexto"},
+    "foundation_design_task": {"depends_on": ["geotechnical_report_task"]},
+    "technical_writing_task": {
+        "depends_on": ["hydrological_study_task", "foundation_design_task"],
+        "dependencies": "environmental_licensing_task",
+    },
+}
+
+
+def _respects_crewai_async_rules(plan, graph):
+    """Regras do crewAI: assíncronas não dependem de assíncronas do mesmo bloco e no máximo uma no final"""
+    trailing = 0
+    for is_async in reversed([flag for _, flag in plan]):
+        if not is_async:
+            break
+        trailing += 1
+    if trailing > 1:
+        return False
+    for index, (task, is_async) in enumerate(plan):
+        if not is_async:
+            continue
+        for previous, previous_async in reversed(plan[:index]):
+            if not previous_async:
+                break
+            if previous in graph.dependencies[task]:
+                return False
+    return True
+
+
+class TestTaskGraph:
+    """Níveis paralelos, plano assíncrono válido, ciclos e caminho crítico"""
+
+    def test_dependencies_from_config(self):
+        assert task_dependencies(CONFIGS["technical_writing_task"]) == [
+            "hydrological_study_task",
+            "foundation_design_task",
+            "environmental_licensing_task",
+        ]
+        assert task_dependencies(CONFIGS["environmental_licensing_task"]) == []
+        assert task_dependencies({"context": ["a", "b"]}) == ["a", "b"]
+
+    def test_independent_tasks_share_a_level(self):
+        graph = TaskGraph.from_configs(list(CONFIGS), CONFIGS)
+        assert graph.levels == [
+            ["hydrological_study_task", "geotechnical_report_task", "environmental_licensing_task"],
+            ["foundation_design_task"],
+            ["technical_writing_task"],
+        ]
+        plan = graph.plan()
+        assert [flag for _, flag in plan] == [True, True, True, False, False]
+        assert _respects_crewai_async_rules(plan, graph)
+
+    @pytest.mark.parametrize(
+        "dependencies",
+        [
+            {"b": ["a"], "c": ["a"], "d": ["b"], "e": ["c"]},  # níveis paralelos consecutivos
+            {},  # tudo independente
+            {"c": ["a"], "d": ["b"]},
+            {"b": ["a"], "c": ["a"]},
+        ],
+    )
+    def test_plan_is_valid_for_crewai(self, dependencies):
+        graph = TaskGraph(["a", "b", "c", "d", "e"], dependencies)
+        plan = graph.plan()
+        assert [task for task, _ in plan] == graph.order
+        assert _respects_crewai_async_rules(plan, graph)
+
+    def test_cycle_is_rejected(self):
+        with pytest.raises(TaskGraphError, match="a → c → b → a"):
+            TaskGraph(["a", "b", "c", "d"], {"a": ["c"], "b": ["a"], "c": ["b"]})
+
+    def test_duplicated_task_is_rejected(self):
+        with pytest.raises(TaskGraphError):
+            TaskGraph(["a", "a"], {})
+
+    def test_dependencies_outside_crew_are_ignored(self):
+        graph = TaskGraph.from_configs(["technical_writing_task"], CONFIGS)
+        assert graph.levels == [["technical_writing_task"]]
+
+    def test_critical_path(self):
+        graph = TaskGraph.from_configs(list(CONFIGS), CONFIGS)
+        durations = {
+            "hydrological_study_task": 50,
+            "geotechnical_report_task": 30,
+            "environmental_licensing_task": 10,
+            "foundation_design_task": 40,
+            "technical_writing_task": 20,
+        }
+        path, total = graph.critical_path(durations)
+        assert path == ["geotechnical_report_task", "foundation_design_task", "technical_writing_task"]
+        assert total == 90
+        assert graph.critical_path({})[1] == 0
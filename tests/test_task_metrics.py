@@ -0,0 +1,57 @@
+"""
+Testes das métricas por tarefa (tempos, passos e ferramentas) e da linha do tempo
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.crews.task_metrics import TaskMetricsRecorder, agent_busy_time, step_tool_names, timeline_rows
+
+
+def _output(agent, raw="saída"):
+    return SimpleNamespace(agent=agent, raw=raw, description="tarefa")
+
+
+class TestTaskMetrics:
+    """Passos atribuídos à tarefa do agente, tempos da tarefa e agente gargalo"""
+
+    def test_step_tool_names(self):
+        assert step_tool_names(SimpleNamespace(tool="FileReadTool", tool_input="x")) == ["FileReadTool"]
+        assert step_tool_names(SimpleNamespace(output="resposta final")) == []
+        legacy = [(SimpleNamespace(tool="CSVSearchTool"), "observação"), (SimpleNamespace(tool=None), "")]
+        assert step_tool_names(legacy) == ["CSVSearchTool"]
+
+    def test_steps_belong_to_the_agent_task(self):
+        recorder = TaskMetricsRecorder()
+        recorder.record_step("pesquisador", SimpleNamespace(tool="brave_search_tool"))
+        recorder.record_step("pesquisador", SimpleNamespace(tool="brave_search_tool"))
+        recorder.record_step("redator", SimpleNamespace(tool="FileReadTool"))
+        recorder.record_step("pesquisador", SimpleNamespace(output="fim"))
+
+        task = SimpleNamespace(start_time=datetime(2025, 1, 1, 10, 0, 0), end_time=datetime(2025, 1, 1, 10, 0, 12))
+        metrics = recorder.finish_task(task, _output("pesquisador", "dados"))
+        assert metrics["duration_ms"] == 12_000
+        assert metrics["step_count"] == 3 and metrics["tool_calls"] == 2
+        assert metrics["tool_names"] == {"brave_search_tool": 2}
+        assert metrics["output_chars"] == 5
+
+        # Os passos do redator ficam para a tarefa dele
+        assert recorder.finish_task(SimpleNamespace(), _output("redator"))["tool_names"] == {"FileReadTool": 1}
+
+    def test_task_without_times_starts_after_previous(self):
+        recorder = TaskMetricsRecorder()
+        first = recorder.finish_task(SimpleNamespace(), _output("pesquisador"))
+        second = recorder.finish_task(SimpleNamespace(), _output("redator"))
+        assert first["duration_ms"] >= 0
+        assert second["start_ts"] == first["end_ts"]
+
+    def test_timeline_and_bottleneck(self):
+        task_results = [
+            {"agent_name": "redator", "task_description": "redigir", "start_ts": 5_000, "end_ts": 6_000, "duration_ms": 1_000},
+            {"agent_name": "pesquisador", "task_description": "pesquisar", "start_ts": 0, "end_ts": 4_000, "duration_ms": 4_000},
+            {"agent_name": "planejador de tarefas", "task_description": "Caminho crítico", "start_ts": None, "end_ts": None},
+        ]
+        rows = timeline_rows(task_results)
+        assert [row["task"] for row in rows] == ["pesquisar", "redigir"]
+        assert rows[0]["duration_s"] == 4.0
+        assert agent_busy_time(task_results) == [("pesquisador", 4_000, 0.8), ("redator", 1_000, 0.2)]